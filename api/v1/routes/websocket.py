@@ -2,15 +2,13 @@
 WebSocket routes for real-time data streaming
 """
 import logging
-from flask import Blueprint
+from flask import Blueprint, request
 from flask_socketio import SocketIO, emit, join_room, leave_room, disconnect
-import MetaTrader5 as mt5
 import time
-from threading import Thread, Event
 
 from api.middleware.auth import verify_token, verify_api_key
-from core.mt5_connection import mt5_connection
-from services.market_service import market_service
+from services.stream_hub import channel_name, stream_hub
+from services.tick_poller import tick_poller
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +17,6 @@ websocket_bp = Blueprint('websocket', __name__)
 # Global SocketIO instance (will be initialized in app.py)
 socketio: SocketIO = None
 
-# Active subscriptions tracking
-active_subscriptions = {}
-subscription_threads = {}
-stop_events = {}
-
 
 def init_socketio(app):
     """Initialize SocketIO with the Flask app"""
@@ -38,6 +31,8 @@ def init_socketio(app):
         engineio_logger=False
     )
 
+    tick_poller.emit = emit_tick
+    stream_hub.emit = emit_stream
     register_socketio_handlers(socketio)
     return socketio
 
@@ -63,46 +58,16 @@ def verify_ws_auth(auth_data):
     return False
 
 
-def stream_tick_data(symbol: str, room: str, stop_event: Event):
-    """
-    Stream tick data for a symbol to a WebSocket room
-
-    Args:
-        symbol: Trading symbol
-        room: WebSocket room name
-        stop_event: Event to signal stopping
-    """
-    logger.info(f"Starting tick stream for {symbol} in room {room}")
-
-    while not stop_event.is_set():
-        try:
-            mt5_connection.ensure_connection()
-
-            # Get latest tick
-            tick = mt5.symbol_info_tick(symbol)
-            if tick:
-                tick_data = {
-                    "symbol": symbol,
-                    "time": tick.time,
-                    "bid": tick.bid,
-                    "ask": tick.ask,
-                    "last": tick.last,
-                    "volume": tick.volume,
-                    "spread": tick.ask - tick.bid if tick.ask and tick.bid else 0
-                }
-
-                # Emit to room
-                if socketio:
-                    socketio.emit('tick_update', tick_data, room=room)
+def emit_tick(symbol: str, tick_data: dict):
+    """Emit a changed tick to the room of its symbol (called by the tick poller)"""
+    if socketio:
+        socketio.emit('tick_update', tick_data, room=f"tick_{symbol}")
 
-            # Sleep for 1 second
-            time.sleep(1)
 
-        except Exception as e:
-            logger.error(f"Error streaming tick for {symbol}: {e}")
-            time.sleep(5)  # Wait before retry
-
-    logger.info(f"Stopped tick stream for {symbol} in room {room}")
+def emit_stream(event: str, payload: dict, room: str):
+    """Emit a stream snapshot (to one sid) or delta (to the channel room)"""
+    if socketio:
+        socketio.emit(event, payload, room=room)
 
 
 def register_socketio_handlers(sio: SocketIO):
@@ -121,10 +86,9 @@ def register_socketio_handlers(sio: SocketIO):
     @sio.on('disconnect')
     def handle_disconnect():
         """Handle client disconnection"""
-        logger.info("Client disconnected")
-
-        # Clean up any active subscriptions for this client
-        # (This is simplified - in production, track subscriptions per client)
+        symbols = tick_poller.remove_client(request.sid)
+        channels = stream_hub.remove_client(request.sid)
+        logger.info(f"Client disconnected (subscriptions removed: {symbols + channels})")
 
     @sio.on('subscribe_tick')
     def handle_subscribe_tick(data):
@@ -153,24 +117,8 @@ def register_socketio_handlers(sio: SocketIO):
         room = f"tick_{symbol}"
         join_room(room)
 
-        # Start streaming if not already active
-        if room not in active_subscriptions:
-            active_subscriptions[room] = set()
-            stop_event = Event()
-            stop_events[room] = stop_event
-
-            # Start background thread for streaming
-            thread = Thread(
-                target=stream_tick_data,
-                args=(symbol, room, stop_event),
-                daemon=True
-            )
-            thread.start()
-            subscription_threads[room] = thread
-
-        # Track this client's subscription
-        # (In production, use request.sid to track individual clients)
-        active_subscriptions[room].add('client')  # Simplified
+        # Poller compartilhado: o símbolo passa a ser consultado enquanto houver assinantes
+        tick_poller.subscribe(request.sid, symbol)
 
         emit('subscribed', {
             'symbol': symbol,
@@ -196,18 +144,8 @@ def register_socketio_handlers(sio: SocketIO):
         room = f"tick_{symbol}"
         leave_room(room)
 
-        # Remove from active subscriptions
-        if room in active_subscriptions:
-            active_subscriptions[room].discard('client')
-
-            # Stop streaming if no more subscribers
-            if len(active_subscriptions[room]) == 0:
-                if room in stop_events:
-                    stop_events[room].set()
-                    del stop_events[room]
-                if room in subscription_threads:
-                    del subscription_threads[room]
-                del active_subscriptions[room]
+        # Stop polling the symbol when its last subscriber leaves
+        tick_poller.unsubscribe(request.sid, symbol)
 
         emit('unsubscribed', {
             'symbol': symbol,
@@ -216,6 +154,106 @@ def register_socketio_handlers(sio: SocketIO):
 
         logger.info(f"Client unsubscribed from {symbol}")
 
+    @sio.on('set_tick_interval')
+    def handle_set_tick_interval(data):
+        """
+        Change the poll interval shared by all tick subscriptions
+
+        Expected data: {
+            'interval': 0.1,
+            'token': 'jwt_token_or_api_key'
+        }
+        """
+        if not verify_ws_auth(data):
+            emit('error', {'message': 'Authentication required'})
+            return
+
+        try:
+            interval = tick_poller.set_poll_interval(float(data.get('interval')))
+        except (TypeError, ValueError):
+            emit('error', {'message': 'Interval (seconds) must be a finite number'})
+            return
+
+        emit('tick_interval', {'interval': interval})
+
+    @sio.on('subscribe_stream')
+    def handle_subscribe_stream(data):
+        """
+        Subscribe to a delta-encoded stream
+
+        Expected data: {
+            'channel': 'bars:BTCUSDc:M1' | 'positions' | 'account',
+            'version': 12,  # optional: version held before a reconnect
+            'token': 'jwt_token_or_api_key'
+        }
+
+        Sends 'stream_snapshot' (full state) unless the client already holds the
+        current version, then 'stream_delta' messages with 'base' and 'version'.
+        """
+        if not verify_ws_auth(data):
+            emit('error', {'message': 'Authentication required'})
+            disconnect()
+            return
+
+        channel = data.get('channel')
+        if not channel:
+            emit('error', {'message': 'Channel is required'})
+            return
+
+        try:
+            channel = channel_name(channel)
+        except ValueError as e:
+            emit('error', {'message': str(e)})
+            return
+
+        # Entra na sala antes do snapshot para não perder o primeiro delta
+        join_room(channel)
+        info = stream_hub.subscribe(request.sid, channel, data.get('version'))
+
+        emit('stream_subscribed', info)
+        logger.info(f"Client subscribed to stream {channel}")
+
+    @sio.on('resync_stream')
+    def handle_resync_stream(data):
+        """
+        Request the full state of a subscribed stream (e.g. after a version gap)
+
+        Expected data: {
+            'channel': 'positions'
+        }
+        """
+        channel = (data or {}).get('channel')
+        try:
+            channel = channel_name(channel) if channel else None
+        except ValueError:
+            channel = None
+        if not channel or not stream_hub.resync(request.sid, channel):
+            emit('error', {'message': f'Not subscribed to stream {channel}'})
+
+    @sio.on('unsubscribe_stream')
+    def handle_unsubscribe_stream(data):
+        """
+        Unsubscribe from a stream
+
+        Expected data: {
+            'channel': 'positions'
+        }
+        """
+        channel = (data or {}).get('channel')
+        if not channel:
+            emit('error', {'message': 'Channel is required'})
+            return
+
+        try:
+            channel = channel_name(channel)
+        except ValueError as e:
+            emit('error', {'message': str(e)})
+            return
+
+        leave_room(channel)
+        stream_hub.unsubscribe(request.sid, channel)
+        emit('stream_unsubscribed', {'channel': channel})
+
     @sio.on('ping')
     def handle_ping():
         """Handle ping for keepalive"""
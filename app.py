@@ -1,10 +1,11 @@
 import logging
 import os
 import time
+import requests
 from datetime import datetime
 from flask import Flask, jsonify, request, render_template
 from dotenv import load_dotenv
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5
 from werkzeug.middleware.proxy_fix import ProxyFix
 from flasgger import Swagger, swag_from
 
@@ -32,6 +33,7 @@ from services.market_service import market_service
 from services.cache_service import cache_service
 from services.ollama_service import ollama_service
 from services.sync_mt5_trades_service import mt5_trade_sync
+from services.status_snapshot import StatusSnapshot
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -212,10 +214,98 @@ def mlp_stop():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+# Status do /mlp/status: seções caras montadas em segundo plano, cada uma no seu intervalo
+STATUS_MAX_LOGS = 100
+STATUS_MAX_ROWS = 50
+
+
+def _status_logs():
+    log_file_path = 'logs/mt5_connector.log'
+    if not os.path.exists(log_file_path):
+        return []
+    try:
+        with open(log_file_path, 'r', encoding='utf-8') as f:
+            from collections import deque
+            return list(deque(f, STATUS_MAX_LOGS))
+    except Exception as e:
+        return [f"Erro ao ler logs: {str(e)}"]
+
+
+def _status_analyses():
+    try:
+        from services.mlp_storage import mlp_storage
+        return mlp_storage.get_analyses(limit=STATUS_MAX_ROWS)
+    except Exception as e:
+        return [{"error": f"Erro ao obter análises: {str(e)}"}]
+
+
+def _status_trades():
+    try:
+        from services.mlp_storage import mlp_storage
+        return mlp_storage.get_trades(days=7, limit=STATUS_MAX_ROWS)
+    except Exception as e:
+        return [{"error": f"Erro ao obter trades: {str(e)}"}]
+
+
+def _status_daily_stats():
+    try:
+        from services.mlp_storage import mlp_storage
+        return mlp_storage.get_daily_stats(days=7)
+    except Exception as e:
+        return [{"error": f"Erro ao obter estatísticas: {str(e)}"}]
+
+
+def _status_config():
+    try:
+        # Pegar configuração diretamente do trading engine
+        trading_config = bot_controller.trading_engine.config.trading
+        return {
+            'symbol': trading_config.symbol,
+            'timeframe': 'M1',  # Pode ser adicionado ao config depois
+            'lot_size': trading_config.lot_size,
+            'take_profit': trading_config.take_profit_pips,
+            'stop_loss': trading_config.stop_loss_pips,
+            'confidence_threshold': 0.65,  # Pode ser adicionado ao config depois
+            'max_positions': trading_config.max_positions,
+            'auto_trading_enabled': True
+        }
+    except Exception as e:
+        return {"error": f"Erro ao obter configuração: {str(e)}"}
+
+
+def _status_webhook():
+    try:
+        # Test if MT5 can reach the webhook
+        test_response = requests.get(f"{bot_controller.api_base_url}/ping", timeout=5)
+        return {
+            'status': 'reachable' if test_response.status_code == 200 else 'unreachable',
+            'response_time_ms': test_response.elapsed.total_seconds() * 1000,
+            'status_code': test_response.status_code
+        }
+    except Exception as e:
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+
+
+mlp_status_snapshot = StatusSnapshot('mlp-status')
+mlp_status_snapshot.add_section('status', lambda: bot_controller.trading_engine.get_status(), 2.0)
+mlp_status_snapshot.add_section('logs', _status_logs, 2.0)
+mlp_status_snapshot.add_section('recent_analyses', _status_analyses, 5.0)
+mlp_status_snapshot.add_section('recent_trades', _status_trades, 10.0)
+mlp_status_snapshot.add_section('daily_stats', _status_daily_stats, 60.0)
+mlp_status_snapshot.add_section('config', _status_config, 30.0)
+mlp_status_snapshot.add_section('webhook_connectivity', _status_webhook, 30.0, initial={'status': 'pending'})
+
+
 @app.route('/mlp/status', methods=['GET'])
 def mlp_status():
     """
     Obtém status completo do bot MLP com logs em tempo real
+
+    Servido do snapshot em memória atualizado em segundo plano (cada seção no
+    seu intervalo): a requisição não consulta MT5, banco nem rede.
     ---
     tags:
       - MLP Bot
@@ -235,6 +325,10 @@ def mlp_status():
         type: integer
         default: 5
         description: Número de trades recentes
+      - name: fields
+        in: query
+        type: string
+        description: Campos da resposta separados por vírgula (ex. is_running,logs,daily_stats)
     responses:
       200:
         description: Status completo obtido com sucesso
@@ -265,113 +359,42 @@ def mlp_status():
               type: object
     """
     try:
-        # Status básico do bot
-        status = bot_controller.trading_engine.get_status()
-
-        # Logs recentes
+        fields = request.args.get('fields')
+        fields = {field.strip() for field in fields.split(',') if field.strip()} if fields else None
         logs_lines = int(request.args.get('logs', 10))
-        logs = []
-        try:
-            log_file_path = 'logs/mt5_connector.log'
-            if os.path.exists(log_file_path):
-                with open(log_file_path, 'r', encoding='utf-8') as f:
-                    from collections import deque
-                    logs = list(deque(f, logs_lines))
-        except Exception as e:
-            logs = [f"Erro ao ler logs: {str(e)}"]
-
-        # Análises recentes
         analyses_count = int(request.args.get('analyses', 5))
-        recent_analyses = []
-        try:
-            from services.mlp_storage import mlp_storage
-            analyses = mlp_storage.get_analyses(limit=analyses_count)
-            recent_analyses = analyses
-        except Exception as e:
-            recent_analyses = [{"error": f"Erro ao obter análises: {str(e)}"}]
-
-        # Trades recentes
         trades_count = int(request.args.get('trades', 5))
-        recent_trades = []
-        try:
-            from services.mlp_storage import mlp_storage
-            trades = mlp_storage.get_trades(days=7, limit=trades_count)
-            recent_trades = trades
-        except Exception as e:
-            recent_trades = [{"error": f"Erro ao obter trades: {str(e)}"}]
 
-        # Configuração atual do bot
-        config = {}
-        try:
-            # Pegar configuração diretamente do trading engine
-            trading_config = bot_controller.trading_engine.config.trading
-            config = {
-                'symbol': trading_config.symbol,
-                'timeframe': 'M1',  # Pode ser adicionado ao config depois
-                'lot_size': trading_config.lot_size,
-                'take_profit': trading_config.take_profit_pips,
-                'stop_loss': trading_config.stop_loss_pips,
-                'confidence_threshold': 0.65,  # Pode ser adicionado ao config depois
-                'max_positions': trading_config.max_positions,
-                'auto_trading_enabled': True
-            }
-        except Exception as e:
-            config = {"error": f"Erro ao obter configuração: {str(e)}"}
-
-        # Estatísticas diárias
-        daily_stats = []
-        try:
-            from services.mlp_storage import mlp_storage
-            stats = mlp_storage.get_daily_stats(days=7)
-            daily_stats = stats
-        except Exception as e:
-            daily_stats = [{"error": f"Erro ao obter estatísticas: {str(e)}"}]
+        # Só as seções necessárias para os campos pedidos; campos fora das seções
+        # conhecidas vêm da seção 'status' (get_status do trading engine)
+        sections = None
+        if fields is not None:
+            sections = fields & set(mlp_status_snapshot.get_stats())
+            if fields - sections - {'system_status', 'timestamp'}:
+                sections.add('status')
+        snapshot = mlp_status_snapshot.get(sections)
+
+        result = dict(snapshot.pop('status', None) or {})
+        if 'logs' in snapshot:
+            snapshot['logs'] = snapshot['logs'][-logs_lines:] if logs_lines > 0 else []
+        if 'recent_analyses' in snapshot:
+            snapshot['recent_analyses'] = snapshot['recent_analyses'][:analyses_count]
+        if 'recent_trades' in snapshot:
+            snapshot['recent_trades'] = snapshot['recent_trades'][:trades_count]
+        result.update(snapshot)
 
         # Status do sistema
-        system_status = {
+        result['system_status'] = {
             'server_time': datetime.now().isoformat(),
             'python_version': f"{os.sys.version_info.major}.{os.sys.version_info.minor}",
             'flask_status': 'running',
             'mt5_connection_status': 'connected' if mt5_connection.is_initialized else 'disconnected',
             'database_status': 'connected' if 'storage_available' in globals() and storage_available else 'disconnected'
         }
+        result['timestamp'] = datetime.now().isoformat()
 
-        # Webhook connectivity test
-        webhook_test = {}
-        try:
-            # Test if MT5 can reach the webhook
-            test_response = requests.get(f"{bot_controller.api_base_url}/ping", timeout=5)
-            webhook_test = {
-                'status': 'reachable' if test_response.status_code == 200 else 'unreachable',
-                'response_time_ms': test_response.elapsed.total_seconds() * 1000,
-                'status_code': test_response.status_code
-            }
-        except Exception as e:
-            webhook_test = {
-                'status': 'error',
-                'error': str(e)
-            }
-
-        # Debug: verificar se chegamos aqui
-        print("DEBUG: Chegamos na parte do status completo")
-        print(f"DEBUG: Status keys: {list(status.keys())}")
-        print(f"DEBUG: Logs count: {len(logs)}")
-        print(f"DEBUG: Analyses count: {len(recent_analyses)}")
-
-        result = {
-            **status,
-            'logs': logs,
-            'recent_analyses': recent_analyses,
-            'recent_trades': recent_trades,
-            'daily_stats': daily_stats,
-            'config': config,
-            'system_status': system_status,
-            'webhook_connectivity': webhook_test,
-            'timestamp': datetime.now().isoformat()
-        }
-
-        print(f"DEBUG: Result keys: {list(result.keys())}")
-        print(f"DEBUG: Result size: {len(str(result))}")
+        if fields is not None:
+            result = {key: value for key, value in result.items() if key in fields}
 
         return jsonify(result)
     except Exception as e:
@@ -616,8 +639,9 @@ def mlp_market_data():
             # Garantir que MT5 está conectado
             mt5_connection.ensure_connection()
 
-            # Obter dados diretamente com MT5
-            rates = mt5.copy_rates_from_pos(symbol, timeframe_mt5, 0, count)
+            # Obter dados do cache compartilhado de barras
+            from services.bar_cache import bar_cache
+            rates = bar_cache.get_rates(symbol, timeframe_mt5, count)
 
         except Exception as e:
             return jsonify({
@@ -788,6 +812,16 @@ def mlp_analytics():
         type: integer
         default: 30
         example: 7
+      - name: symbol
+        in: query
+        type: string
+        required: false
+        description: Filtrar por símbolo
+      - name: bot_id
+        in: query
+        type: string
+        required: false
+        description: Filtrar por bot
     responses:
       200:
         description: Estatísticas diárias
@@ -801,8 +835,12 @@ def mlp_analytics():
 
         days = int(request.args.get('days', 30))
 
-        # Usar MLPStorage independente
-        stats = mlp_storage.get_daily_stats(days=days)
+        # Usar MLPStorage independente (rollup por data, símbolo e bot)
+        stats = mlp_storage.get_daily_stats(
+            days=days,
+            symbol=request.args.get('symbol'),
+            bot_id=request.args.get('bot_id')
+        )
 
         return jsonify({
             'analytics': stats,
@@ -1804,6 +1842,15 @@ if __name__ == '__main__':
         print(f"ERRO Status sistema: Erro ao verificar - {str(e)}")
     print()
 
+    # Gravação contínua de ticks dos símbolos configurados (TICK_RECORDER_SYMBOLS)
+    from core.config import settings
+    from services.tick_store import tick_recorder
+    for tick_symbol in settings.TICK_RECORDER_SYMBOLS:
+        tick_recorder.watch(tick_symbol)
+    if settings.TICK_RECORDER_SYMBOLS:
+        print(f"Gravando ticks de: {', '.join(settings.TICK_RECORDER_SYMBOLS)}")
+    print()
+
     # 6. Mensagem final
     print("[6/6] SISTEMA PRONTO PARA OPERACAO!")
     print("Bons ganhos! Graficos em alta, profits subindo!")
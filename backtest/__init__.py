@@ -0,0 +1,13 @@
+"""
+Backtesting - offline evaluation of the bot strategies over historical bars
+"""
+from .engine import Backtester, BacktestResult, load_bars, simulated_environment
+from .simulated_mt5 import SimulatedMT5, SymbolSpec
+from .sweep import ParameterSweep
+from .vectorized import VectorizedBacktester, rule_signals
+from .walk_forward import WalkForward
+
+__all__ = [
+    'Backtester', 'BacktestResult', 'ParameterSweep', 'SimulatedMT5', 'SymbolSpec', 'VectorizedBacktester',
+    'WalkForward', 'load_bars', 'rule_signals', 'simulated_environment',
+]
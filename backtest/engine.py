@@ -0,0 +1,303 @@
+"""
+Event-driven backtester - replays history through the existing engines
+
+The backtester walks the bars one at a time on the virtual clock of
+``SimulatedMT5`` and, while it runs, routes the MT5 gateway to the simulated
+module: every ``mt5`` consumer, and the memo, positions snapshot and bar cache
+built on it, reach the simulation instead of the terminal.
+``TradingEngine.analyze_and_trade`` and the ``BotInstance`` rule strategy
+therefore run unchanged; database writes and the live analysis cache are
+disabled for the duration of the run.
+
+The swap is process-wide: run backtests in their own process (the
+``run_backtest.py`` script or a worker pool), never inside the live server.
+"""
+import contextlib
+import importlib
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from core.mt5_gateway import mt5_gateway
+from services.bar_cache import timeframe_seconds
+from .simulated_mt5 import RATES_DTYPE, SimulatedMT5, SymbolSpec
+
+logger = logging.getLogger(__name__)
+
+# Barras de histórico visíveis antes da primeira análise
+DEFAULT_WARMUP = 100
+
+EQUITY_DTYPE = np.dtype([('time', '<i8'), ('balance', '<f8'), ('equity', '<f8')])
+
+
+class _NullStorage:
+    """Stands in for ``mlp_storage`` during a backtest: accepts every call, writes nothing"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+@dataclass
+class BacktestResult:
+    """Trade list, equity curve and summary of a backtest run"""
+    symbol: str
+    initial_balance: float
+    trades: List[Dict]
+    equity_curve: np.ndarray
+    bars: int
+    elapsed: float
+    analyses: int = 0
+    signals: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def final_balance(self) -> float:
+        return float(self.equity_curve['balance'][-1]) if len(self.equity_curve) else self.initial_balance
+
+    def summary(self) -> Dict:
+        """
+        Performance metrics of the run
+
+        Returns:
+            Dictionary with net profit, win rate, profit factor and drawdown
+        """
+        profits = np.array([trade['profit'] for trade in self.trades], dtype=float)
+        gross_win = float(profits[profits > 0].sum())
+        gross_loss = float(-profits[profits < 0].sum())
+        equity = self.equity_curve['equity'] if len(self.equity_curve) else np.array([self.initial_balance])
+        peak = np.maximum.accumulate(equity)
+        drawdown = peak - equity
+        worst = int(np.argmax(drawdown)) if len(drawdown) else 0
+
+        return {
+            'symbol': self.symbol,
+            'bars': self.bars,
+            'analyses': self.analyses,
+            'signals': self.signals,
+            'total_trades': len(self.trades),
+            'winning_trades': int((profits > 0).sum()),
+            'losing_trades': int((profits < 0).sum()),
+            'win_rate': round(float((profits > 0).mean()) * 100, 2) if len(profits) else 0.0,
+            'net_profit': round(float(profits.sum()), 2),
+            'gross_profit': round(gross_win, 2),
+            'gross_loss': round(gross_loss, 2),
+            'profit_factor': round(gross_win / gross_loss, 3) if gross_loss else (math.inf if gross_win else 0.0),
+            'max_drawdown': round(float(drawdown[worst]), 2),
+            'max_drawdown_pct': round(float(drawdown[worst] / peak[worst]) * 100, 2) if peak[worst] else 0.0,
+            'initial_balance': self.initial_balance,
+            'final_balance': round(self.final_balance, 2),
+            'elapsed_seconds': round(self.elapsed, 3),
+            'bars_per_second': round(self.bars / self.elapsed) if self.elapsed else None,
+        }
+
+
+class Backtester:
+    """Replays bars through a strategy step on the virtual clock of ``SimulatedMT5``"""
+
+    def __init__(self, symbol: str, bars: np.ndarray, timeframe: int = 1,
+                 spec: Optional[SymbolSpec] = None, initial_balance: float = 10000.0,
+                 warmup: int = DEFAULT_WARMUP):
+        """
+        Args:
+            symbol: Symbol name the strategies trade
+            bars: Historical bars (see ``load_bars``), oldest first
+            timeframe: MT5 timeframe of ``bars``
+            spec: Contract and costs (defaults to ``symbols_config``)
+            initial_balance: Starting balance
+            warmup: Bars visible before the first strategy step
+        """
+        self.symbol = symbol
+        self.bars = bars
+        self.timeframe = timeframe
+        self.spec = spec or SymbolSpec.load(symbol)
+        self.initial_balance = initial_balance
+        self.warmup = warmup
+
+    def run(self, step: Callable[[SimulatedMT5, int], None],
+            due: Optional[Callable[[int], bool]] = None) -> BacktestResult:
+        """
+        Replay every bar after the warm-up through ``step``
+
+        Args:
+            step: Called with (simulator, bar index) after each due bar closes
+            due: Bars on which ``step`` runs (default: every bar)
+
+        Returns:
+            BacktestResult with the closed trades and the equity curve
+        """
+        sim = SimulatedMT5(self.symbol, self.bars, self.timeframe, self.spec, self.initial_balance)
+        n = len(sim.bars)
+        first = min(self.warmup, n)
+        equity = np.zeros(max(n - first, 0), dtype=EQUITY_DTYPE)
+        signals: Dict[str, int] = {}
+        analyses = 0
+
+        start = time.perf_counter()
+        with simulated_environment(sim, signals):
+            sim.index = first - 1  # histórico de aquecimento: sem estratégia nem ordens
+            for row, i in enumerate(range(first, n)):
+                sim.advance(i)
+                if due is None or due(i):
+                    step(sim, i)
+                    analyses += 1
+                equity[row] = (sim.time, sim.balance, sim.equity())
+            if n:
+                sim.close_all('END')
+                if len(equity):
+                    equity[-1]['balance'] = equity[-1]['equity'] = sim.balance
+        elapsed = time.perf_counter() - start
+
+        return BacktestResult(
+            symbol=self.symbol,
+            initial_balance=self.initial_balance,
+            trades=sim.trades,
+            equity_curve=equity,
+            bars=len(equity),
+            elapsed=elapsed,
+            analyses=analyses,
+            signals=signals,
+        )
+
+    def run_bot(self, config: Dict, bot_id: str = 'backtest') -> BacktestResult:
+        """
+        Backtest the ``BotInstance`` rule strategy with a bot config
+
+        The bot analyses on every close of its timeframe (``trigger='bar_close'``)
+        or every ``analysis_interval`` seconds of virtual time, and trading is
+        always executed (``trading.auto_execute``).
+
+        Args:
+            config: Bot config as stored by the bot manager
+            bot_id: Id used in order comments
+        """
+        from services.bot_manager_service import BotInstance
+
+        config = dict(config, symbol=self.symbol)
+        config['trading'] = dict(config.get('trading', {}), auto_execute=True)
+        bot = BotInstance(bot_id, config, None)
+        bot.is_running = True
+
+        due = bot_due_mask(bot, self.bars['time'], self.timeframe, self.warmup)
+        return self.run(lambda sim, i: bot._analysis_step(), lambda i: bool(due[i]))
+
+    def run_engine(self, engine=None, every: int = 1) -> BacktestResult:
+        """
+        Backtest ``TradingEngine.analyze_and_trade`` (MLP signals)
+
+        Args:
+            engine: TradingEngine with a trained model (a new one is created if None)
+            every: Run the analysis every ``every`` bars
+        """
+        from bot.trading_engine import TradingEngine
+
+        engine = engine or TradingEngine()
+        engine.config.trading.symbol = self.symbol
+        engine.is_running = True
+        try:
+            return self.run(lambda sim, i: engine.analyze_and_trade(), lambda i: (i - self.warmup) % every == 0)
+        finally:
+            engine.is_running = False
+
+
+def bot_due_mask(bot, times: np.ndarray, timeframe: int, warmup: int) -> np.ndarray:
+    """
+    Bars on which a ``BotInstance`` analyses during a backtest
+
+    ``trigger='bar_close'``: the last base bar of each period of the bot
+    timeframe; ``'interval'``: every ``analysis_interval`` seconds of virtual
+    time counted from the warm-up.
+
+    Returns:
+        Boolean mask aligned with ``times``
+    """
+    times = np.asarray(times, dtype=np.int64)
+    if bot.trigger_mode == 'bar_close':
+        # Analisa quando a última barra base de um período do timeframe do bot fecha
+        period = timeframe_seconds(bot.timeframe)
+        return np.r_[times[1:] // period != times[:-1] // period, True][:len(times)]
+    every = max(1, int(round(bot.analysis_interval / timeframe_seconds(timeframe))))
+    return (np.arange(len(times)) - warmup) % every == 0
+
+
+@contextlib.contextmanager
+def simulated_environment(sim: SimulatedMT5, signals: Optional[Dict[str, int]] = None):
+    """
+    Point every MetaTrader5 consumer at ``sim`` for the duration of the block
+
+    The MT5 gateway is the single switch: ``mt5_gateway.route(sim)``. Also
+    isolates the run from the live process: no database writes, the analysis
+    cache replaced by a signal counter and INFO logging muted (the engines
+    log every cycle).
+    """
+    signals = {} if signals is None else signals
+
+    def record(bot_id, analysis):
+        signal = analysis.get('signal', 'HOLD')
+        signals[signal] = signals.get(signal, 0) + 1
+
+    # Só o que não passa pelo gateway: gravação no banco e feed de análises
+    replacements = [
+        ('bot.trading_engine', 'storage_available', False),
+        ('services.mlp_storage', 'mlp_storage', _NullStorage()),
+        ('routes.bot_analysis_routes', 'add_analysis_to_cache', record),
+    ]
+
+    saved = []
+    previous_disable = logging.root.manager.disable
+    try:
+        for module_name, attribute, value in replacements:
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                continue
+            saved.append((module, attribute, getattr(module, attribute)))
+            setattr(module, attribute, value)
+
+        from core.mt5_connection import mt5_connection
+        saved.append((mt5_connection, '_initialized', mt5_connection._initialized))
+        saved.append((mt5_connection, '_logged_in', mt5_connection._logged_in))
+        mt5_connection._initialized = mt5_connection._logged_in = True
+
+        logging.disable(logging.INFO)
+        with mt5_gateway.route(sim):
+            yield sim
+    finally:
+        logging.disable(previous_disable)
+        for target, attribute, value in reversed(saved):
+            setattr(target, attribute, value)
+
+
+def load_bars(path: str) -> np.ndarray:
+    """
+    Load historical bars from a file
+
+    Supported formats: ``.npy`` (structured array with MT5 rate fields), a
+    bar store file ``.bin`` (memory-mapped, see ``services.bar_store``) and
+    ``.csv`` with columns time, open, high, low, close and optionally
+    tick_volume/volume, spread and real_volume. ``time`` may be epoch seconds
+    or a date string.
+
+    Returns:
+        Structured array sorted by time
+    """
+    if path.endswith('.npy'):
+        bars = np.load(path)
+    elif path.endswith('.bin'):
+        # Arquivo do bar store: já ordenado por tempo, mapeado sem cópia
+        return np.memmap(path, dtype=RATES_DTYPE, mode='r')
+    else:
+        import pandas as pd
+
+        frame = pd.read_csv(path)
+        frame.columns = [column.strip().lower().lstrip('<').rstrip('>') for column in frame.columns]
+        if not pd.api.types.is_numeric_dtype(frame['time']):
+            frame['time'] = pd.to_datetime(frame['time']).astype('datetime64[s]').astype('int64')
+        if 'tick_volume' not in frame and 'volume' in frame:
+            frame['tick_volume'] = frame['volume']
+        columns = [name for name in RATES_DTYPE.names if name in frame]
+        bars = frame[columns].to_records(index=False)
+        bars = np.asarray(bars)
+    return np.sort(bars, order='time')
@@ -0,0 +1,532 @@
+"""
+Simulated MetaTrader5 module - replays historical bars on a virtual clock
+
+``SimulatedMT5`` exposes the subset of the ``MetaTrader5`` package used by the
+trading engines (rates, ticks, symbol/account info, ``order_send``,
+``positions_get``, deal history) over bars loaded from a file. The clock is a
+bar index: ``advance(i)`` closes bar ``i``, fills stop-loss/take-profit orders
+that the bar touched and makes it the newest visible bar. Nothing waits on the
+wall clock, so a month of M1 replays in seconds.
+
+Pricing model:
+    - bid is the bar price, ask = bid + spread (bar ``spread`` column when set,
+      otherwise ``spread_typical`` from ``symbols_config``)
+    - market orders fill at the close of the current bar
+    - SL/TP are checked against the next bars' open/high/low; a gap through
+      the level fills at the open, and a bar touching both SL and TP is
+      assumed to hit the SL first
+    - ``commission_per_lot`` is charged once per round trip, on close
+"""
+from collections import namedtuple
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.bar_cache import timeframe_seconds
+from services.bar_store import RATES_DTYPE
+
+Tick = namedtuple('Tick', 'time bid ask last volume time_msc flags volume_real')
+SymbolInfo = namedtuple(
+    'SymbolInfo',
+    'name bid ask point digits spread trade_contract_size trade_tick_value trade_tick_size '
+    'volume_min volume_max volume_step trade_stops_level visible'
+)
+AccountInfo = namedtuple('AccountInfo', 'login balance equity profit margin margin_free leverage currency server')
+TerminalInfo = namedtuple('TerminalInfo', 'connected trade_allowed name company build')
+TradePosition = namedtuple(
+    'TradePosition',
+    'ticket time type magic identifier volume price_open sl tp price_current swap profit symbol comment'
+)
+TradeDeal = namedtuple(
+    'TradeDeal',
+    'ticket order time type entry magic position_id volume price commission swap profit fee symbol comment external_id'
+)
+OrderSendResult = namedtuple(
+    'OrderSendResult',
+    'retcode deal order volume price bid ask comment request_id retcode_external request'
+)
+
+
+@dataclass
+class SymbolSpec:
+    """Contract and cost parameters of a symbol (columns of ``symbols_config``)"""
+    symbol: str
+    digits: int = 2
+    point: float = 0.01
+    tick_size: float = 0.01
+    tick_value: float = 0.01
+    contract_size: float = 1.0
+    volume_min: float = 0.01
+    volume_max: float = 100.0
+    volume_step: float = 0.01
+    spread_typical: int = 0
+    commission_per_lot: float = 0.0
+    stops_level: int = 0
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'SymbolSpec':
+        fields = cls.__dataclass_fields__
+        return cls(**{key: config[key] for key in fields if config.get(key) is not None})
+
+    @classmethod
+    def load(cls, symbol: str, db_path: Optional[str] = None) -> 'SymbolSpec':
+        """Read the symbol from ``symbols_config`` (defaults if it is not configured)"""
+        from services.symbols_config_service import SymbolsConfigService
+
+        service = SymbolsConfigService(db_path) if db_path else SymbolsConfigService()
+        try:
+            config = service.get_symbol_config(symbol)
+        except Exception:
+            config = None
+        return cls.from_config(config) if config else cls(symbol=symbol)
+
+
+class _Position:
+    """Open position of the simulated account"""
+
+    def __init__(self, ticket: int, symbol: str, type_: int, volume: float, price: float,
+                 sl: float, tp: float, magic: int, comment: str, time: int, bar: int):
+        self.ticket = ticket
+        self.symbol = symbol
+        self.type = type_
+        self.volume = volume
+        self.price_open = price
+        self.sl = sl or 0.0
+        self.tp = tp or 0.0
+        self.magic = magic
+        self.comment = comment
+        self.time = time
+        self.bar = bar
+
+
+class SimulatedMT5:
+    """Drop-in stand-in for the ``MetaTrader5`` module over historical bars"""
+
+    TIMEFRAME_M1, TIMEFRAME_M2, TIMEFRAME_M3, TIMEFRAME_M4, TIMEFRAME_M5 = 1, 2, 3, 4, 5
+    TIMEFRAME_M6, TIMEFRAME_M10, TIMEFRAME_M12, TIMEFRAME_M15, TIMEFRAME_M20, TIMEFRAME_M30 = 6, 10, 12, 15, 20, 30
+    TIMEFRAME_H1, TIMEFRAME_H2, TIMEFRAME_H3, TIMEFRAME_H4 = 0x4001, 0x4002, 0x4003, 0x4004
+    TIMEFRAME_H6, TIMEFRAME_H8, TIMEFRAME_H12, TIMEFRAME_D1 = 0x4006, 0x4008, 0x400C, 0x4018
+    TIMEFRAME_W1, TIMEFRAME_MN1 = 0x8001, 0xC001
+
+    ORDER_TYPE_BUY, ORDER_TYPE_SELL = 0, 1
+    POSITION_TYPE_BUY, POSITION_TYPE_SELL = 0, 1
+    TRADE_ACTION_DEAL, TRADE_ACTION_SLTP = 1, 6
+    ORDER_TIME_GTC = 0
+    ORDER_FILLING_FOK, ORDER_FILLING_IOC, ORDER_FILLING_RETURN = 0, 1, 2
+    DEAL_TYPE_BUY, DEAL_TYPE_SELL = 0, 1
+    DEAL_ENTRY_IN, DEAL_ENTRY_OUT, DEAL_ENTRY_INOUT, DEAL_ENTRY_OUT_BY = 0, 1, 2, 3
+    TRADE_RETCODE_DONE = 10009
+    TRADE_RETCODE_INVALID = 10013
+    TRADE_RETCODE_INVALID_VOLUME = 10014
+    TRADE_RETCODE_INVALID_STOPS = 10016
+    TRADE_RETCODE_POSITION_CLOSED = 10036
+    COPY_TICKS_ALL = -1
+
+    __name__ = 'MetaTrader5'
+
+    def __init__(self, symbol: str, bars: np.ndarray, timeframe: int = 1,
+                 spec: Optional[SymbolSpec] = None, initial_balance: float = 10000.0,
+                 leverage: int = 100):
+        """
+        Args:
+            symbol: Symbol the bars belong to
+            bars: Structured array with at least time/open/high/low/close
+            timeframe: MT5 timeframe of ``bars``; higher timeframes are aggregated from it
+            spec: Contract and costs (defaults to ``symbols_config``)
+            initial_balance: Starting balance of the simulated account
+            leverage: Account leverage (reported only)
+        """
+        self.symbol = symbol
+        self.bars = _as_rates(bars)
+        self.timeframe = timeframe
+        self.bar_seconds = timeframe_seconds(timeframe)
+        self.spec = spec or SymbolSpec.load(symbol)
+        self.initial_balance = float(initial_balance)
+        self.balance = float(initial_balance)
+        self.leverage = leverage
+
+        self.index = -1  # última barra fechada visível
+        self.positions: Dict[int, _Position] = {}
+        self.trades: List[Dict] = []
+        self.deals: List[TradeDeal] = []
+        self._next_ticket = 1
+        self._resampled: Dict[int, tuple] = {}
+
+    # ------------------------------------------------------------------
+    # Relógio virtual
+    # ------------------------------------------------------------------
+
+    @property
+    def time(self) -> int:
+        """Virtual server time: close time of the current bar"""
+        return int(self.bars['time'][self.index]) + self.bar_seconds
+
+    def advance(self, index: int) -> List[Dict]:
+        """
+        Close bar ``index`` and fill the SL/TP levels it touched
+
+        Returns:
+            Trades closed by SL/TP in this bar
+        """
+        if index <= self.index:
+            raise ValueError(f"O relógio só avança: barra {index} <= {self.index}")
+        bar = self.bars[index]
+        self.index = index
+
+        closed = []
+        for position in list(self.positions.values()):
+            if position.bar >= index:
+                continue
+            fill = self._stop_fill(position, bar)
+            if fill is not None:
+                price, reason = fill
+                closed.append(self._close(position, price, reason))
+        return closed
+
+    def close_all(self, reason: str = 'END') -> List[Dict]:
+        """Close every open position at the current price"""
+        return [
+            self._close(position, self._exit_price(position), reason)
+            for position in list(self.positions.values())
+        ]
+
+    def equity(self) -> float:
+        return self.balance + sum(self._floating(position) for position in self.positions.values())
+
+    # ------------------------------------------------------------------
+    # API do MetaTrader5
+    # ------------------------------------------------------------------
+
+    def initialize(self, *args, **kwargs) -> bool:
+        return True
+
+    def login(self, *args, **kwargs) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        pass
+
+    def last_error(self) -> tuple:
+        return (1, 'Success')
+
+    def version(self) -> tuple:
+        return (500, 0, 'backtest')
+
+    def terminal_info(self) -> TerminalInfo:
+        return TerminalInfo(True, True, 'Backtest', 'Simulated', 0)
+
+    def account_info(self) -> AccountInfo:
+        equity = self.equity()
+        return AccountInfo(0, self.balance, equity, equity - self.balance, 0.0, equity, self.leverage, 'USD', 'Backtest')
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        return symbol == self.symbol
+
+    def symbol_info(self, symbol: str) -> Optional[SymbolInfo]:
+        if symbol != self.symbol or self.index < 0:
+            return None
+        spec = self.spec
+        bid = self._bid()
+        return SymbolInfo(
+            symbol, bid, bid + self._spread_price(), spec.point, spec.digits, self._spread_points(),
+            spec.contract_size, spec.tick_value, spec.tick_size,
+            spec.volume_min, spec.volume_max, spec.volume_step, spec.stops_level, True
+        )
+
+    def symbol_info_tick(self, symbol: str) -> Optional[Tick]:
+        if symbol != self.symbol or self.index < 0:
+            return None
+        bid = self._bid()
+        return Tick(self.time, bid, bid + self._spread_price(), bid, 0, self.time * 1000, 0, 0.0)
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int) -> Optional[np.ndarray]:
+        """Latest bars as of the virtual clock (position 0 = newest visible bar)"""
+        if symbol != self.symbol or self.index < 0 or count <= 0:
+            return None
+        rates = self._rates(timeframe)
+        end = len(rates) - start_pos
+        if end <= 0:
+            return None
+        return rates[max(0, end - count):end].copy()
+
+    def copy_rates_range(self, symbol: str, timeframe: int, date_from, date_to) -> Optional[np.ndarray]:
+        if symbol != self.symbol or self.index < 0:
+            return None
+        rates = self._rates(timeframe)
+        start, end = _epoch(date_from), _epoch(date_to)
+        return rates[(rates['time'] >= start) & (rates['time'] <= end)].copy()
+
+    def positions_get(self, symbol: Optional[str] = None, ticket: Optional[int] = None,
+                      magic: Optional[int] = None, group: Optional[str] = None) -> tuple:
+        return tuple(
+            self._position_tuple(position) for position in self.positions.values()
+            if (symbol is None or position.symbol == symbol)
+            and (ticket is None or position.ticket == ticket)
+            and (magic is None or position.magic == magic)
+        )
+
+    def positions_total(self) -> int:
+        return len(self.positions)
+
+    def orders_get(self, *args, **kwargs) -> tuple:
+        return ()
+
+    def history_deals_get(self, date_from=None, date_to=None, **kwargs) -> tuple:
+        start = _epoch(date_from) if date_from is not None else 0
+        end = _epoch(date_to) if date_to is not None else self.time
+        return tuple(deal for deal in self.deals if start <= deal.time <= end)
+
+    def order_send(self, request: Dict) -> OrderSendResult:
+        """Execute a market order (open, close by ``position``) or an SL/TP change"""
+        action = request.get('action')
+        if request.get('symbol', self.symbol) != self.symbol or self.index < 0:
+            return self._result(self.TRADE_RETCODE_INVALID, request, comment='Invalid symbol')
+
+        if action == self.TRADE_ACTION_SLTP:
+            position = self.positions.get(request.get('position'))
+            if position is None:
+                return self._result(self.TRADE_RETCODE_POSITION_CLOSED, request, comment='Position not found')
+            position.sl = request.get('sl', position.sl) or 0.0
+            position.tp = request.get('tp', position.tp) or 0.0
+            return self._result(self.TRADE_RETCODE_DONE, request, order=position.ticket)
+
+        if action != self.TRADE_ACTION_DEAL:
+            return self._result(self.TRADE_RETCODE_INVALID, request, comment='Unsupported action')
+
+        if request.get('position'):
+            return self._close_request(request)
+
+        volume = float(request.get('volume', 0))
+        if not self._valid_volume(volume):
+            return self._result(self.TRADE_RETCODE_INVALID_VOLUME, request, comment='Invalid volume')
+
+        type_ = request.get('type')
+        bid = self._bid()
+        if type_ == self.ORDER_TYPE_BUY:
+            price = bid + self._spread_price()
+        elif type_ == self.ORDER_TYPE_SELL:
+            price = bid
+        else:
+            return self._result(self.TRADE_RETCODE_INVALID, request, comment='Invalid order type')
+
+        sl, tp = request.get('sl') or 0.0, request.get('tp') or 0.0
+        if not self._valid_stops(type_, price, sl, tp):
+            return self._result(self.TRADE_RETCODE_INVALID_STOPS, request, comment='Invalid stops')
+
+        ticket = self._ticket()
+        position = _Position(
+            ticket, self.symbol, type_, volume, price, sl, tp,
+            request.get('magic', 0), request.get('comment', ''), self.time, self.index
+        )
+        self.positions[ticket] = position
+        self._deal(position, self.DEAL_ENTRY_IN, type_, volume, price, 0.0, 0.0)
+        return self._result(self.TRADE_RETCODE_DONE, request, order=ticket, deal=ticket, volume=volume, price=price)
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _close_request(self, request: Dict) -> OrderSendResult:
+        position = self.positions.get(request['position'])
+        if position is None:
+            return self._result(self.TRADE_RETCODE_POSITION_CLOSED, request, comment='Position not found')
+
+        volume = min(float(request.get('volume') or position.volume), position.volume)
+        price = self._exit_price(position)
+        if volume < position.volume:
+            # Fechamento parcial: a parte restante continua aberta com o mesmo ticket
+            remainder = position.volume - volume
+            position.volume = volume
+            self._close(position, price, 'CLOSE')
+            position.volume = round(remainder, 8)
+            self.positions[position.ticket] = position
+        else:
+            self._close(position, price, 'CLOSE')
+        return self._result(
+            self.TRADE_RETCODE_DONE, request, order=position.ticket, deal=position.ticket,
+            volume=volume, price=price
+        )
+
+    def _stop_fill(self, position: _Position, bar) -> Optional[tuple]:
+        """Price and reason if the bar touched the position's SL or TP"""
+        spread = self._spread_price(bar)
+        if position.type == self.POSITION_TYPE_BUY:
+            # Compra fecha no bid
+            open_, high, low = bar['open'], bar['high'], bar['low']
+            if position.sl and low <= position.sl:
+                return (min(open_, position.sl), 'SL')
+            if position.tp and high >= position.tp:
+                return (max(open_, position.tp), 'TP')
+        else:
+            # Venda fecha no ask
+            open_, high, low = bar['open'] + spread, bar['high'] + spread, bar['low'] + spread
+            if position.sl and high >= position.sl:
+                return (max(open_, position.sl), 'SL')
+            if position.tp and low <= position.tp:
+                return (min(open_, position.tp), 'TP')
+        return None
+
+    def _close(self, position: _Position, price: float, reason: str) -> Dict:
+        del self.positions[position.ticket]
+        gross = self._profit(position, price)
+        commission = self.spec.commission_per_lot * position.volume
+        profit = gross - commission
+        self.balance += profit
+
+        close_type = self.DEAL_TYPE_SELL if position.type == self.POSITION_TYPE_BUY else self.DEAL_TYPE_BUY
+        self._deal(position, self.DEAL_ENTRY_OUT, close_type, position.volume, price, -commission, gross)
+
+        trade = {
+            'ticket': position.ticket,
+            'symbol': position.symbol,
+            'type': 'BUY' if position.type == self.POSITION_TYPE_BUY else 'SELL',
+            'volume': position.volume,
+            'magic': position.magic,
+            'comment': position.comment,
+            'entry_time': position.time,
+            'entry_price': position.price_open,
+            'exit_time': self.time,
+            'exit_price': float(price),
+            'sl': position.sl,
+            'tp': position.tp,
+            'gross_profit': gross,
+            'commission': commission,
+            'profit': profit,
+            'bars_held': self.index - position.bar,
+            'exit_reason': reason,
+        }
+        self.trades.append(trade)
+        return trade
+
+    def _deal(self, position: _Position, entry: int, type_: int, volume: float, price: float,
+              commission: float, profit: float) -> None:
+        ticket = self._ticket()
+        self.deals.append(TradeDeal(
+            ticket, position.ticket, self.time, type_, entry, position.magic, position.ticket,
+            volume, float(price), commission, 0.0, profit, 0.0, position.symbol, position.comment, ''
+        ))
+
+    def _profit(self, position: _Position, price: float) -> float:
+        direction = 1 if position.type == self.POSITION_TYPE_BUY else -1
+        ticks = direction * (price - position.price_open) / self.spec.tick_size
+        return float(ticks * self.spec.tick_value * position.volume)
+
+    def _floating(self, position: _Position) -> float:
+        return self._profit(position, self._exit_price(position))
+
+    def _exit_price(self, position: _Position) -> float:
+        bid = self._bid()
+        return bid if position.type == self.POSITION_TYPE_BUY else bid + self._spread_price()
+
+    def _bid(self) -> float:
+        return float(self.bars['close'][self.index])
+
+    def _spread_points(self, bar=None) -> int:
+        bar = self.bars[self.index] if bar is None else bar
+        return int(bar['spread']) or int(self.spec.spread_typical or 0)
+
+    def _spread_price(self, bar=None) -> float:
+        return self._spread_points(bar) * self.spec.point
+
+    def _valid_volume(self, volume: float) -> bool:
+        spec = self.spec
+        if volume < spec.volume_min - 1e-9 or volume > spec.volume_max + 1e-9:
+            return False
+        steps = (volume - spec.volume_min) / spec.volume_step
+        return abs(steps - round(steps)) < 1e-6
+
+    def _valid_stops(self, type_: int, price: float, sl: float, tp: float) -> bool:
+        distance = self.spec.stops_level * self.spec.point
+        if type_ == self.ORDER_TYPE_BUY:
+            return (not sl or sl <= price - distance) and (not tp or tp >= price + distance)
+        return (not sl or sl >= price + distance) and (not tp or tp <= price - distance)
+
+    def _position_tuple(self, position: _Position) -> TradePosition:
+        return TradePosition(
+            position.ticket, position.time, position.type, position.magic, position.ticket,
+            position.volume, position.price_open, position.sl, position.tp,
+            self._exit_price(position), 0.0, self._floating(position), position.symbol, position.comment
+        )
+
+    def _result(self, retcode: int, request: Dict, order: int = 0, deal: int = 0,
+                volume: float = 0.0, price: float = 0.0, comment: str = 'Request executed') -> OrderSendResult:
+        bid = self._bid() if self.index >= 0 else 0.0
+        if retcode != self.TRADE_RETCODE_DONE and comment == 'Request executed':
+            comment = 'Rejected'
+        return OrderSendResult(
+            retcode, deal, order, volume, price, bid, bid + self._spread_price() if self.index >= 0 else 0.0,
+            comment, 0, 0, request
+        )
+
+    def _ticket(self) -> int:
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        return ticket
+
+    def _rates(self, timeframe: int) -> np.ndarray:
+        """Visible bars of ``timeframe``: base bars or aggregated, including the forming bar"""
+        visible = self.index + 1
+        if timeframe == self.timeframe:
+            return self.bars[:visible]
+
+        seconds = timeframe_seconds(timeframe)
+        if seconds < self.bar_seconds or seconds % self.bar_seconds:
+            raise ValueError(f"Timeframe {timeframe} não pode ser agregado a partir de {self.timeframe}")
+
+        if timeframe not in self._resampled:
+            self._resampled[timeframe] = _resample(self.bars, seconds)
+        aggregated, starts = self._resampled[timeframe]
+
+        # Barras completas até a última visível + barra em formação agregada até o relógio
+        bucket = np.searchsorted(starts, visible - 1, side='right') - 1
+        current = _aggregate(self.bars[starts[bucket]:visible], seconds)
+        return np.concatenate((aggregated[:bucket], current))
+
+
+def _as_rates(bars: np.ndarray) -> np.ndarray:
+    """Copy the bars into the MT5 rates dtype (missing columns are zero)"""
+    if bars.dtype == RATES_DTYPE:
+        return bars  # já no formato (ex.: barras em memória compartilhada): sem cópia
+    rates = np.zeros(len(bars), dtype=RATES_DTYPE)
+    for name in RATES_DTYPE.names:
+        if name in bars.dtype.names:
+            rates[name] = bars[name]
+    if 'tick_volume' not in bars.dtype.names and 'volume' in bars.dtype.names:
+        rates['tick_volume'] = bars['volume']
+    return rates
+
+
+def _resample(bars: np.ndarray, seconds: int) -> tuple:
+    """Aggregate base bars into ``seconds`` buckets; returns (bars, start index of each bucket)"""
+    buckets = bars['time'] // seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    out = np.zeros(len(starts), dtype=RATES_DTYPE)
+    out['time'] = buckets[starts] * seconds
+    out['open'] = bars['open'][starts]
+    out['high'] = np.maximum.reduceat(bars['high'], starts)
+    out['low'] = np.minimum.reduceat(bars['low'], starts)
+    out['close'] = bars['close'][np.r_[starts[1:], len(bars)] - 1]
+    out['tick_volume'] = np.add.reduceat(bars['tick_volume'], starts)
+    out['real_volume'] = np.add.reduceat(bars['real_volume'], starts)
+    out['spread'] = bars['spread'][starts]
+    return out, starts
+
+
+def _aggregate(bars: np.ndarray, seconds: int) -> np.ndarray:
+    out = np.zeros(1, dtype=RATES_DTYPE)
+    out['time'] = (bars['time'][0] // seconds) * seconds
+    out['open'] = bars['open'][0]
+    out['high'] = bars['high'].max()
+    out['low'] = bars['low'].min()
+    out['close'] = bars['close'][-1]
+    out['tick_volume'] = bars['tick_volume'].sum()
+    out['real_volume'] = bars['real_volume'].sum()
+    out['spread'] = bars['spread'][0]
+    return out
+
+
+def _epoch(value) -> int:
+    if hasattr(value, 'timestamp'):
+        return int(value.timestamp())
+    return int(value)
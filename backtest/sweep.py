@@ -0,0 +1,227 @@
+"""
+Parameter sweep - ranks bot configs by backtesting them in a process pool
+
+A search space maps config keys (dotted for nested keys, e.g.
+``signals.min_confidence``) to candidate values. ``grid`` expands every
+combination; ``sample`` draws random configs, where a list is a choice and a
+``(low, high)`` tuple a uniform range (integers when both ends are ints).
+
+The bars are copied once into a ``multiprocessing.shared_memory`` block and
+every worker maps that block as its bar array: configs travel to the
+workers as small dicts, never the bars. Each worker keeps one
+``VectorizedBacktester`` (or ``Backtester`` for ``mode='replay'``), so the
+signal cache is reused by every config the worker evaluates.
+"""
+import copy
+import itertools
+import logging
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .engine import DEFAULT_WARMUP, Backtester
+from .simulated_mt5 import RATES_DTYPE, SymbolSpec, _as_rates
+from .vectorized import VectorizedBacktester
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros ajustados à mão hoje em bot_templates.json / UI do bot manager
+DEFAULT_SPACE = {
+    'lot_size': [0.01, 0.02, 0.05],
+    'take_profit': [2000, 5000, 8000],
+    'stop_loss': [3000, 5000, 10000],
+    'signals.min_confidence': [0.65, 0.70, 0.85],
+    'max_positions': [1, 2, 3],
+}
+
+# Lotes de configs por tarefa enviada ao pool (por worker)
+CHUNKS_PER_WORKER = 4
+
+
+def grid(space: Dict[str, Iterable]) -> List[Dict[str, Any]]:
+    """Every combination of the values in ``space``"""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(list(space[key]) for key in keys))]
+
+
+def sample(space: Dict[str, Any], count: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Random configs from ``space``
+
+    Args:
+        space: Lists are sampled as choices, ``(low, high)`` tuples as uniform ranges
+        count: Number of configs
+        seed: Seed for reproducible draws
+    """
+    rng = random.Random(seed)
+
+    def draw(values):
+        if isinstance(values, tuple):
+            low, high = values
+            if isinstance(low, int) and isinstance(high, int):
+                return rng.randint(low, high)
+            return rng.uniform(low, high)
+        return rng.choice(list(values))
+
+    return [{key: draw(values) for key, values in space.items()} for _ in range(count)]
+
+
+def apply_params(config: Dict, params: Dict[str, Any]) -> Dict:
+    """Copy of ``config`` with ``params`` set (dotted keys address nested dicts)"""
+    config = copy.deepcopy(config)
+    for key, value in params.items():
+        target = config
+        *parents, leaf = key.split('.')
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    return config
+
+
+def rank(results: List[Dict], min_trades: int = 1) -> List[Dict]:
+    """
+    Order sweep results best first
+
+    Profit factor descending, then relative drawdown ascending, then net
+    profit; configs with fewer than ``min_trades`` trades go last.
+    """
+    def key(result):
+        enough = result['total_trades'] >= min_trades
+        return (not enough, -result['profit_factor'], result['max_drawdown_pct'], -result['net_profit'])
+
+    ordered = sorted(results, key=key)
+    for position, result in enumerate(ordered, 1):
+        result['rank'] = position
+    return ordered
+
+
+class _SharedBars:
+    """Bars copied into a shared memory block, mapped by name in the workers"""
+
+    def __init__(self, bars: np.ndarray):
+        bars = _as_rates(bars)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(bars.nbytes, 1))
+        self.array = np.ndarray(bars.shape, dtype=bars.dtype, buffer=self.shm.buf)
+        self.array[:] = bars
+        self.descriptor = (self.shm.name, len(bars))
+
+    def close(self):
+        del self.array
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Estado de cada processo worker (preenchido por _init_worker)
+_worker: Dict[str, Any] = {}
+
+
+def _attach_bars(descriptor) -> tuple:
+    """Map the shared bars in a worker; returns (shared memory, bar array)"""
+    name, length = descriptor
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: o registro cai no resource tracker do processo pai,
+        # que o remove no unlink do fim da varredura
+        shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray((length,), dtype=RATES_DTYPE, buffer=shm.buf)
+
+
+def _init_worker(descriptor, symbol, timeframe, spec, initial_balance, warmup, mode):
+    shm, bars = _attach_bars(descriptor)
+
+    # Logs INFO de cada ciclo do bot não interessam numa varredura
+    logging.disable(logging.INFO)
+    backtester_class = Backtester if mode == 'replay' else VectorizedBacktester
+    _worker['shm'] = shm
+    _worker['backtester'] = backtester_class(symbol, bars, timeframe, spec, initial_balance, warmup)
+
+
+def _evaluate(jobs: List[tuple]) -> List[Dict]:
+    backtester = _worker['backtester']
+    results = []
+    for params, config in jobs:
+        try:
+            summary = backtester.run_bot(config).summary()
+        except Exception as e:
+            logger.error(f"Sweep: config {params} falhou - {e}")
+            continue
+        summary.pop('signals', None)
+        results.append(dict(summary, params=params))
+    return results
+
+
+class ParameterSweep:
+    """Backtests many configs of one bot over the same bars in a process pool"""
+
+    def __init__(self, symbol: str, bars: np.ndarray, timeframe: int = 1,
+                 spec: Optional[SymbolSpec] = None, initial_balance: float = 10000.0,
+                 warmup: int = DEFAULT_WARMUP, workers: Optional[int] = None,
+                 mode: str = 'vectorized'):
+        """
+        Args:
+            symbol: Symbol of the bars
+            bars: Historical bars (see ``load_bars``), oldest first
+            timeframe: MT5 timeframe of ``bars``
+            spec: Contract and costs (defaults to ``symbols_config``)
+            initial_balance: Starting balance of every backtest
+            warmup: Bars visible before the first analysis
+            workers: Worker processes (default: CPU count)
+            mode: ``'vectorized'`` (rule strategy, fast) or ``'replay'`` (event replay)
+        """
+        if mode not in ('vectorized', 'replay'):
+            raise ValueError(f"Modo de sweep inválido: {mode}")
+        self.symbol = symbol
+        self.bars = bars
+        self.timeframe = timeframe
+        self.spec = spec or SymbolSpec.load(symbol)
+        self.initial_balance = initial_balance
+        self.warmup = warmup
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+
+    def run(self, base_config: Dict, configs: List[Dict[str, Any]], min_trades: int = 1) -> List[Dict]:
+        """
+        Backtest ``base_config`` with each parameter set and rank the results
+
+        Args:
+            base_config: Bot config the parameters are applied to
+            configs: Parameter sets (from ``grid`` or ``sample``)
+            min_trades: Results with fewer trades are ranked last
+
+        Returns:
+            Summaries (``BacktestResult.summary`` plus ``params`` and ``rank``), best first
+        """
+        jobs = [(params, apply_params(base_config, params)) for params in configs]
+        if not jobs:
+            return []
+
+        workers = min(self.workers, len(jobs))
+        size = max(1, math.ceil(len(jobs) / (workers * CHUNKS_PER_WORKER)))
+        chunks = [jobs[start:start + size] for start in range(0, len(jobs), size)]
+
+        shared = _SharedBars(self.bars)
+        try:
+            initargs = (shared.descriptor, self.symbol, self.timeframe, self.spec,
+                        self.initial_balance, self.warmup, self.mode)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+                results = [result for chunk in pool.map(_evaluate, chunks) for result in chunk]
+        finally:
+            shared.close()
+
+        logger.info(f"Sweep {self.symbol}: {len(results)}/{len(jobs)} configs em {workers} workers")
+        return rank(results, min_trades)
+
+    def grid(self, base_config: Dict, space: Dict[str, Iterable] = None, min_trades: int = 1) -> List[Dict]:
+        """Backtest every combination of ``space`` (default: ``DEFAULT_SPACE``)"""
+        return self.run(base_config, grid(space or DEFAULT_SPACE), min_trades)
+
+    def random(self, base_config: Dict, space: Dict[str, Any], count: int,
+               seed: Optional[int] = None, min_trades: int = 1) -> List[Dict]:
+        """Backtest ``count`` random draws from ``space``"""
+        return self.run(base_config, sample(space, count, seed), min_trades)
@@ -0,0 +1,404 @@
+"""
+Vectorized backtest of the ``BotInstance`` rule strategy
+
+The RSI/SMA rules of ``BotInstance`` (``services.bot_strategy``) are evaluated over the
+whole bar array at once, and only the entries (a few per thousand bars) are
+walked: each one looks ahead with NumPy for the first bar that touches its
+stop-loss or take-profit. Fills, costs and the ``max_positions`` limit follow
+the ``SimulatedMT5`` model, so the trades match an event replay of the same
+config (``Backtester.run_bot``) while a config is evaluated in milliseconds.
+
+Signals depend only on the timeframe and trigger of the config and are
+cached per backtester: a parameter sweep over lots, stops, ``min_confidence``
+and ``max_positions`` recomputes the indicators once.
+"""
+import bisect
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.bar_cache import timeframe_seconds
+from services.bot_strategy import ANALYSIS_BARS
+from utils.indicators import rsi, sma
+from .engine import DEFAULT_WARMUP, EQUITY_DTYPE, BacktestResult, bot_due_mask
+from .simulated_mt5 import SimulatedMT5, SymbolSpec, _resample
+
+BUY, SELL, HOLD = 1, -1, 0
+SIGNAL_NAMES = {BUY: 'BUY', SELL: 'SELL', HOLD: 'HOLD'}
+
+# Barras à frente de cada entrada checadas de uma vez para SL/TP (as posições
+# que seguem abertas depois disso são buscadas uma a uma) e entradas por bloco
+_EXIT_WINDOW = 32
+_EXIT_BLOCK = 32768
+
+
+def rule_signals(close: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Signal and confidence of the ``BotInstance`` rules for every bar
+
+    Args:
+        close: Closes of the bot timeframe, oldest first
+
+    Returns:
+        (signal as BUY/SELL/HOLD int8, confidence) arrays aligned with ``close``
+    """
+    close = np.asarray(close, dtype=np.float64)
+    rsi_14 = rsi(close, 14)
+    sma_20 = sma(close, 20)
+    sma_50 = sma(close, 50)
+
+    # Mesmos valores neutros do bot enquanto os indicadores aquecem
+    rsi_14 = np.where(np.isnan(rsi_14), 50.0, rsi_14)
+    sma_20 = np.where(np.isnan(sma_20), close, sma_20)
+    sma_50 = np.where(np.isnan(sma_50), close, sma_50)
+
+    # Regras na ordem de prioridade do bot (np.select usa a primeira verdadeira)
+    conditions = [
+        rsi_14 < 30,
+        rsi_14 > 70,
+        rsi_14 < 40,
+        rsi_14 > 60,
+        (close > sma_20) & (sma_20 > sma_50) & (rsi_14 > 50),
+        (close < sma_20) & (sma_20 < sma_50) & (rsi_14 < 50),
+    ]
+    signal = np.select(conditions, [BUY, SELL, BUY, SELL, BUY, SELL], HOLD).astype(np.int8)
+    confidence = np.select(conditions, [0.85, 0.85, 0.70, 0.70, 0.65, 0.65], 0.50)
+    return signal, confidence
+
+
+class VectorizedBacktester:
+    """Whole-array backtest of the ``BotInstance`` rule strategy"""
+
+    def __init__(self, symbol: str, bars: np.ndarray, timeframe: int = 1,
+                 spec: Optional[SymbolSpec] = None, initial_balance: float = 10000.0,
+                 warmup: int = DEFAULT_WARMUP):
+        """
+        Args:
+            symbol: Symbol name the strategy trades
+            bars: Historical bars (see ``load_bars``), oldest first
+            timeframe: MT5 timeframe of ``bars``
+            spec: Contract and costs (defaults to ``symbols_config``)
+            initial_balance: Starting balance
+            warmup: Bars visible before the first analysis
+        """
+        # O simulador só normaliza as barras e valida volume/stops como no replay
+        self.sim = SimulatedMT5(symbol, bars, timeframe, spec, initial_balance)
+        self.symbol = symbol
+        self.bars = self.sim.bars
+        self.timeframe = timeframe
+        self.spec = self.sim.spec
+        self.initial_balance = float(initial_balance)
+        self.warmup = warmup
+        self.bar_seconds = timeframe_seconds(timeframe)
+
+        bars = self.bars
+        spread_points = np.where(bars['spread'] != 0, bars['spread'], int(self.spec.spread_typical or 0))
+        self.spread = spread_points * self.spec.point
+        self.open, self.high, self.low, self.close = bars['open'], bars['high'], bars['low'], bars['close']
+        # Vendas fecham no ask
+        self.ask_open = self.open + self.spread
+        self.ask_high = self.high + self.spread
+        self.ask_low = self.low + self.spread
+        self._signals: Dict[tuple, tuple] = {}
+
+    def signals(self, config: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Analysis bars and their signals for a bot config (cached per schedule)
+
+        Returns:
+            (bar indices analysed, signal, confidence) aligned with each other
+        """
+        key = (config.get('timeframe'), config.get('trigger'), config.get('analysis_interval'))
+        if key not in self._signals:
+            from services.bot_manager_service import BotInstance
+
+            # O próprio BotInstance interpreta timeframe/trigger/intervalo da config
+            bot = BotInstance('backtest', dict(config, symbol=self.symbol), None)
+            self._signals[key] = self._compute_signals(bot)
+        return self._signals[key]
+
+    def _compute_signals(self, bot) -> tuple:
+        n = len(self.bars)
+        first = min(self.warmup, n)
+        due = bot_due_mask(bot, self.bars['time'], self.timeframe, self.warmup)
+        due[:first] = False
+        indices = np.flatnonzero(due)
+
+        if bot.timeframe == self.timeframe:
+            close, positions = self.close, indices
+        elif bot.trigger_mode == 'bar_close':
+            # Cada análise vê a barra agregada que acabou de fechar
+            aggregated, starts = _resample(self.bars, timeframe_seconds(bot.timeframe))
+            close = aggregated['close']
+            positions = np.searchsorted(starts, indices, side='right') - 1
+        else:
+            raise ValueError("Modo 'interval' em timeframe diferente das barras: use Backtester.run_bot")
+
+        if not len(indices):
+            return indices, np.zeros(0, dtype=np.int8), np.zeros(0)
+
+        # O bot semeia os indicadores com a primeira janela que recebe
+        start = max(0, int(positions[0]) - ANALYSIS_BARS + 1)
+        signal, confidence = rule_signals(close[start:])
+        return indices, signal[positions - start], confidence[positions - start]
+
+    def run_bot(self, config: Dict, bot_id: str = 'backtest') -> BacktestResult:
+        """
+        Backtest the rule strategy with a bot config
+
+        Same inputs and result as ``Backtester.run_bot``; ``trading.auto_execute``
+        is implied. Trade tickets are numbered in entry order.
+
+        Args:
+            config: Bot config as stored by the bot manager
+            bot_id: Id used in order comments
+        """
+        started = time.perf_counter()
+        indices, signal, confidence = self.signals(config)
+        return self.run_signals(indices, signal, confidence, config, bot_id, started)
+
+    def run_signals(self, indices: np.ndarray, signal: np.ndarray, confidence: np.ndarray,
+                    config: Dict, bot_id: str = 'backtest', started: Optional[float] = None) -> BacktestResult:
+        """
+        Execute precomputed signals with the bot order rules
+
+        Args:
+            indices: Bars analysed, ascending
+            signal: BUY/SELL/HOLD per analysed bar
+            confidence: Confidence per analysed bar
+            config: Bot config (lot_size, take_profit, stop_loss,
+                signals.min_confidence, max_positions, advanced.magic_number)
+            bot_id: Id used in order comments
+        """
+        started = time.perf_counter() if started is None else started
+        indices = np.asarray(indices, dtype=np.int64)
+        signal = np.asarray(signal, dtype=np.int8)
+        confidence = np.asarray(confidence, dtype=np.float64)
+
+        min_confidence = config.get('signals', {}).get('min_confidence', 0.65)
+        taken = (signal != HOLD) & (confidence >= min_confidence)
+        trades = self._execute(indices[taken], signal[taken], config, bot_id)
+        equity = self._equity_curve(trades)
+
+        counts = np.bincount(signal.astype(np.int64) + 1, minlength=3)
+        signals = {SIGNAL_NAMES[value]: int(counts[value + 1]) for value in (BUY, SELL, HOLD) if counts[value + 1]}
+
+        return BacktestResult(
+            symbol=self.symbol,
+            initial_balance=self.initial_balance,
+            trades=[trade for _, _, trade in trades],
+            equity_curve=equity,
+            bars=len(equity),
+            elapsed=time.perf_counter() - started,
+            analyses=len(indices),
+            signals=signals,
+        )
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+
+    def _execute(self, entries: np.ndarray, sides: np.ndarray, config: Dict, bot_id: str) -> List[tuple]:
+        """Open positions at the entry bars within ``max_positions``; returns (exit bar, entry bar, trade)"""
+        lot_size = float(config.get('lot_size', 0.01))
+        if not self.sim._valid_volume(lot_size) or not len(entries):
+            return []  # volume inválido: toda ordem seria rejeitada pelo servidor
+
+        point = self.spec.point
+        stop_loss = config.get('stop_loss', 10000) * point
+        take_profit = config.get('take_profit', 5000) * point
+        magic = config.get('advanced', {}).get('magic_number', 123456)
+        comment = f"Bot {bot_id[:8]}"
+        # O bot só recusa quando já existem posições abertas (max_positions <= 0 ainda abre uma)
+        limit = max(1, int(config.get('max_positions', 1)))
+
+        # Preço, SL/TP e saída de uma posição aberta em cada entrada candidata
+        buy = sides == BUY
+        prices = np.where(buy, self.close[entries] + self.spread[entries], self.close[entries])
+        sl = np.where(buy, prices - stop_loss, prices + stop_loss)
+        tp = np.where(buy, prices + take_profit, prices - take_profit)
+        exit_bars, exit_prices, exit_sl = self._first_exits(entries, buy, sl, tp)
+
+        trades = []
+        open_exits: List[int] = []  # heap com a barra de saída das posições abertas
+        n = len(self.bars)
+        entry_list, buy_list = entries.tolist(), buy.tolist()
+        price_list, sl_list, tp_list = prices.tolist(), sl.tolist(), tp.tolist()
+        exit_bar_list, exit_price_list, exit_sl_list = exit_bars.tolist(), exit_prices.tolist(), exit_sl.tolist()
+        k = 0
+        while k < len(entry_list):
+            i = entry_list[k]
+            # Saídas por SL/TP da barra i acontecem antes da análise da barra i
+            while open_exits and open_exits[0] <= i:
+                heapq.heappop(open_exits)
+            if len(open_exits) >= limit:
+                # Pula direto para a primeira entrada a partir da próxima saída
+                k = bisect.bisect_left(entry_list, open_exits[0])
+                continue
+
+            side = BUY if buy_list[k] else SELL
+            price, order_sl, order_tp = price_list[k], sl_list[k], tp_list[k]
+            order_type = SimulatedMT5.ORDER_TYPE_BUY if side == BUY else SimulatedMT5.ORDER_TYPE_SELL
+            if not self.sim._valid_stops(order_type, price, order_sl, order_tp):
+                k += 1
+                continue
+
+            if exit_bar_list[k] >= 0:
+                exit_bar, exit_price = exit_bar_list[k], exit_price_list[k]
+                reason = 'SL' if exit_sl_list[k] else 'TP'
+            else:
+                exit_bar, exit_price, reason = self._find_exit(side, i + _EXIT_WINDOW + 1, order_sl, order_tp)
+            heapq.heappush(open_exits, n if reason == 'END' else exit_bar)
+            trades.append((exit_bar, i, self._trade(
+                len(trades) + 1, side, lot_size, magic, comment, i, price, order_sl, order_tp,
+                exit_bar, exit_price, reason
+            )))
+            k += 1
+
+        # Mesma ordem de fechamento do replay: por barra, END por último
+        trades.sort(key=lambda item: (item[0], item[2]['exit_reason'] == 'END', item[2]['ticket']))
+        return trades
+
+    def _first_exits(self, entries: np.ndarray, buy: np.ndarray, sl: np.ndarray,
+                     tp: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        SL/TP exit within ``_EXIT_WINDOW`` bars of every entry, all entries at once
+
+        Returns:
+            (exit bar or -1 when not resolved in the window, exit price, hit was the SL)
+        """
+        n = len(self.bars)
+        exit_bars = np.full(len(entries), -1, dtype=np.int64)
+        exit_prices = np.zeros(len(entries))
+        exit_sl = np.zeros(len(entries), dtype=bool)
+        ahead = np.arange(1, _EXIT_WINDOW + 1)
+
+        for side in (BUY, SELL):
+            rows_all = np.flatnonzero(buy if side == BUY else ~buy)
+            for block in range(0, len(rows_all), _EXIT_BLOCK):
+                rows = rows_all[block:block + _EXIT_BLOCK]
+                bars = entries[rows, None] + ahead
+                inside = bars < n
+                bars = np.minimum(bars, n - 1)
+                level_sl, level_tp = sl[rows, None], tp[rows, None]
+                if side == BUY:
+                    # Compra fecha no bid
+                    sl_hit = (self.low[bars] <= level_sl) & (level_sl != 0) & inside
+                    tp_hit = (self.high[bars] >= level_tp) & (level_tp != 0) & inside
+                else:
+                    # Venda fecha no ask
+                    sl_hit = (self.ask_high[bars] >= level_sl) & (level_sl != 0) & inside
+                    tp_hit = (self.ask_low[bars] <= level_tp) & (level_tp != 0) & inside
+                hit = sl_hit | tp_hit
+                found = hit.any(axis=1)
+                offset = hit.argmax(axis=1)[found]
+                rows, bars = rows[found], bars[found, offset]
+                stopped = sl_hit[found, offset]
+
+                # SL ganha quando a barra toca os dois; gap além do nível preenche na abertura
+                if side == BUY:
+                    opens = self.open[bars]
+                    price = np.where(stopped, np.minimum(opens, sl[rows]), np.maximum(opens, tp[rows]))
+                else:
+                    opens = self.ask_open[bars]
+                    price = np.where(stopped, np.maximum(opens, sl[rows]), np.minimum(opens, tp[rows]))
+                exit_bars[rows], exit_prices[rows], exit_sl[rows] = bars, price, stopped
+        return exit_bars, exit_prices, exit_sl
+
+    def _find_exit(self, side: int, start: int, sl: float, tp: float) -> Tuple[int, float, str]:
+        """First bar from ``start`` on touching SL or TP of one position (long holds)"""
+        n = len(self.bars)
+        chunk = _EXIT_WINDOW * 4
+        while start < n:
+            stop = min(n, start + chunk)
+            if side == BUY:
+                sl_hit = self.low[start:stop] <= sl if sl else np.zeros(stop - start, dtype=bool)
+                tp_hit = self.high[start:stop] >= tp if tp else np.zeros(stop - start, dtype=bool)
+            else:
+                sl_hit = self.ask_high[start:stop] >= sl if sl else np.zeros(stop - start, dtype=bool)
+                tp_hit = self.ask_low[start:stop] <= tp if tp else np.zeros(stop - start, dtype=bool)
+            hit = sl_hit | tp_hit
+            if hit.any():
+                offset = int(np.argmax(hit))
+                j = start + offset
+                if side == BUY:
+                    if sl_hit[offset]:
+                        return j, float(min(self.open[j], sl)), 'SL'
+                    return j, float(max(self.open[j], tp)), 'TP'
+                if sl_hit[offset]:
+                    return j, float(max(self.ask_open[j], sl)), 'SL'
+                return j, float(min(self.ask_open[j], tp)), 'TP'
+            start, chunk = stop, chunk * 2
+
+        # Ainda aberta no fim: fecha no preço da última barra
+        last = n - 1
+        price = float(self.close[last]) if side == BUY else float(self.close[last]) + float(self.spread[last])
+        return last, price, 'END'
+
+    def _trade(self, ticket: int, side: int, volume: float, magic: int, comment: str, entry: int,
+               price: float, sl: float, tp: float, exit_bar: int, exit_price: float, reason: str) -> Dict:
+        spec = self.spec
+        ticks = side * (exit_price - price) / spec.tick_size
+        gross = float(ticks * spec.tick_value * volume)
+        commission = spec.commission_per_lot * volume
+        times = self.bars['time']
+        return {
+            'ticket': ticket,
+            'symbol': self.symbol,
+            'type': SIGNAL_NAMES[side],
+            'volume': volume,
+            'magic': magic,
+            'comment': comment,
+            'entry_time': int(times[entry]) + self.bar_seconds,
+            'entry_price': price,
+            'exit_time': int(times[exit_bar]) + self.bar_seconds,
+            'exit_price': exit_price,
+            'sl': sl,
+            'tp': tp,
+            'gross_profit': gross,
+            'commission': commission,
+            'profit': gross - commission,
+            'bars_held': exit_bar - entry,
+            'exit_reason': reason,
+        }
+
+    def _equity_curve(self, trades: List[tuple]) -> np.ndarray:
+        """Balance and marked-to-market equity after each bar (from the warm-up on)"""
+        n = len(self.bars)
+        first = min(self.warmup, n)
+        spec = self.spec
+
+        realized = np.zeros(n + 1)
+        # Flutuante = coeficiente * preço de saída + constante, somado por faixa de barras abertas
+        buy_coef, sell_coef, constant = np.zeros(n + 1), np.zeros(n + 1), np.zeros(n + 1)
+        end_profit = 0.0
+        for exit_bar, entry, trade in trades:
+            if trade['exit_reason'] == 'END':
+                # Fechada depois da última barra: entra no saldo só na última linha
+                end_profit += trade['profit']
+                until = n
+            else:
+                realized[exit_bar] += trade['profit']
+                until = exit_bar
+            side = BUY if trade['type'] == 'BUY' else SELL
+            coef = side * spec.tick_value * trade['volume'] / spec.tick_size
+            target = buy_coef if side == BUY else sell_coef
+            target[entry] += coef
+            target[until] -= coef
+            constant[entry] -= coef * trade['entry_price']
+            constant[until] += coef * trade['entry_price']
+
+        balance = self.initial_balance + np.cumsum(realized[:n])
+        floating = (np.cumsum(buy_coef[:n]) * self.close
+                    + np.cumsum(sell_coef[:n]) * (self.close + self.spread)
+                    + np.cumsum(constant[:n]))
+
+        equity = np.zeros(n - first, dtype=EQUITY_DTYPE)
+        equity['time'] = self.bars['time'][first:] + self.bar_seconds
+        equity['balance'] = balance[first:]
+        equity['equity'] = balance[first:] + floating[first:]
+        if len(equity):
+            equity[-1]['balance'] = equity[-1]['equity'] = balance[-1] + end_profit
+        return equity
@@ -0,0 +1,360 @@
+"""
+Walk-forward training and evaluation of ``MLPModel``
+
+History is cut into time-ordered folds: each fold trains a fresh model on a
+rolling window of bars and trades the following window out of sample, with
+no shuffling across the boundary. Fold boundaries are aligned to multiples of
+the step since the Unix epoch, so appending a new period of bars adds folds
+without moving the existing ones.
+
+Folds train in parallel in a process pool (bars in shared memory, as in the
+parameter sweep). Each completed fold is cached on disk under a key made of
+its boundaries, the model/label/execution settings and a fingerprint of the
+bars it saw; a rerun only trains folds whose key is not in the cache.
+
+Out-of-sample trading metrics come from executing the model's signals with
+the bot order rules (``VectorizedBacktester.run_signals``).
+"""
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from services.bar_cache import timeframe_seconds
+from .engine import BacktestResult
+from .simulated_mt5 import SymbolSpec, _as_rates
+from .sweep import _SharedBars, _attach_bars
+from .vectorized import BUY, HOLD, SELL, VectorizedBacktester
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+# Barras antes do início do treino usadas só para aquecer os indicadores
+FEATURE_WARMUP = 200
+
+DEFAULT_CACHE_DIR = "bot/models/walk_forward/"
+
+# Execução das predições fora da amostra: regras de ordem do bot com o limiar
+# de confiança do TradingEngine
+DEFAULT_EXECUTION = {
+    'lot_size': 0.01,
+    'take_profit': 5000,
+    'stop_loss': 10000,
+    'max_positions': 1,
+    'signals': {'min_confidence': 0.6},
+}
+
+# Classes do MLPModel (0=BUY, 1=SELL, 2=HOLD) -> sinal do backtest vetorizado
+_CLASS_SIGNALS = np.array([BUY, SELL, HOLD], dtype=np.int8)
+
+
+@dataclass
+class Fold:
+    """Boundaries of one walk-forward fold (epoch seconds, end exclusive)"""
+    index: int
+    train_start: int
+    test_start: int
+    test_end: int
+
+    @property
+    def label(self) -> str:
+        return datetime.fromtimestamp(self.test_start, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def forward_labels(close: np.ndarray, horizon: int = 1, threshold: float = 0.001) -> np.ndarray:
+    """
+    Labels from the return over the next ``horizon`` bars
+
+    Same classes and threshold as ``MLPModel.generate_training_labels`` (0=BUY,
+    1=SELL, 2=HOLD), but looking ahead, so a row never sees its own label in
+    the features. The last ``horizon`` rows have no label (-1).
+    """
+    close = np.asarray(close, dtype=np.float64)
+    labels = np.full(len(close), -1, dtype=np.int64)
+    if len(close) > horizon:
+        future = close[horizon:] / close[:-horizon] - 1.0
+        labels[:-horizon] = np.where(future > threshold, 0, np.where(future < -threshold, 1, 2))
+    return labels
+
+
+def make_folds(times: np.ndarray, train_days: float, test_days: float, bar_seconds: int = 60,
+               include_partial: bool = False) -> List[Fold]:
+    """
+    Rolling folds covered by the bars
+
+    Test windows of ``test_days`` are aligned to multiples of their length
+    since the epoch, each preceded by ``train_days`` of training bars.
+
+    Args:
+        times: Bar open times, ascending
+        include_partial: Also return a last fold whose test window is still open
+    """
+    if not len(times):
+        return []
+    train, step = int(train_days * DAY), int(test_days * DAY)
+    first, end = int(times[0]), int(times[-1]) + bar_seconds
+
+    folds = []
+    test_start = -(-(first + train) // step) * step  # primeiro múltiplo com treino completo
+    while test_start < end:
+        test_end = test_start + step
+        if test_end > end and not (include_partial and test_start < end):
+            break
+        folds.append(Fold(len(folds), test_start - train, test_start, test_end))
+        test_start = test_end
+    return folds
+
+
+def _model_settings() -> Dict[str, Any]:
+    """Architecture and features the fold models are built with (``BotConfig.mlp``)"""
+    from bot.config import get_config
+
+    mlp = get_config().mlp
+    return {
+        'hidden_layers': list(mlp.hidden_layers),
+        'learning_rate': mlp.learning_rate,
+        'epochs': mlp.epochs,
+        'batch_size': mlp.batch_size,
+        'features': list(mlp.features),
+    }
+
+
+# Estado de cada processo worker (preenchido por _init_worker)
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(descriptor):
+    shm, bars = _attach_bars(descriptor)
+    _worker['shm'], _worker['bars'] = shm, bars
+    logging.disable(logging.INFO)
+    try:
+        # Um thread de BLAS por processo: o paralelismo vem dos folds
+        from threadpoolctl import threadpool_limits
+        _worker['threads'] = threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def _run_fold(task: Dict[str, Any]) -> Dict[str, Any]:
+    return train_fold(_worker['bars'], **task)
+
+
+def train_fold(bars: np.ndarray, fold: Fold, symbol: str, timeframe: int, spec: SymbolSpec,
+               horizon: int, threshold: float, execution: Dict, initial_balance: float,
+               model_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Train a fresh ``MLPModel`` on the fold's train window and trade its test window
+
+    Returns:
+        Fold report: sample counts, accuracy and the trading summary and trades
+    """
+    from bot.mlp_model import MLPModel
+
+    times = bars['time']
+    train_from, test_from, test_to = np.searchsorted(times, [fold.train_start, fold.test_start, fold.test_end])
+    warm_from = max(0, int(train_from) - FEATURE_WARMUP)
+    window = bars[warm_from:test_to]
+
+    model = MLPModel(model_path=model_path) if model_path else MLPModel()
+    preprocessor = model.preprocessor
+    frame = pd.DataFrame({name: window[name] for name in window.dtype.names})
+    features = preprocessor._calculate_technical_indicators(frame)
+    columns = preprocessor._select_features(features.columns)
+    X = features[columns].to_numpy(dtype=np.float64)
+    labels = forward_labels(window['close'], horizon, threshold)
+
+    # Linhas de treino cujo rótulo olha para dentro do teste ficam de fora
+    train_rows = np.arange(train_from - warm_from, test_from - warm_from)
+    train_rows = train_rows[(labels[train_rows] >= 0) & (train_rows + horizon < test_from - warm_from)]
+    test_rows = np.arange(test_from - warm_from, test_to - warm_from)
+    if len(train_rows) < 100 or not len(test_rows):
+        raise ValueError(f"Fold {fold.label}: dados insuficientes ({len(train_rows)} treino, {len(test_rows)} teste)")
+
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().fit(X[train_rows])
+    estimator = model.build_model()
+    estimator.fit(scaler.transform(X[train_rows]), labels[train_rows])
+
+    X_test = scaler.transform(X[test_rows])
+    probabilities = estimator.predict_proba(X_test)
+    best = probabilities.argmax(axis=1)
+    predicted = estimator.classes_[best].astype(np.int64)
+    confidence = probabilities[np.arange(len(best)), best]
+    labelled = labels[test_rows] >= 0
+
+    # Execução fora da amostra: só as barras do teste, posições abertas fecham no fim
+    backtester = VectorizedBacktester(
+        symbol, bars[test_from:test_to], timeframe, spec, initial_balance, warmup=0
+    )
+    result: BacktestResult = backtester.run_signals(
+        np.arange(len(test_rows)), _CLASS_SIGNALS[predicted], confidence, execution, bot_id='walkforward'
+    )
+    summary = result.summary()
+    summary.pop('signals', None)
+
+    if model_path:
+        import joblib
+
+        os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+        joblib.dump(estimator, model_path)
+        joblib.dump(scaler, model_path.replace('.pkl', '_scaler.pkl'))
+
+    return {
+        'fold': fold.index,
+        'train_start': fold.train_start,
+        'test_start': fold.test_start,
+        'test_end': fold.test_end,
+        'samples_train': int(len(train_rows)),
+        'samples_test': int(len(test_rows)),
+        'train_accuracy': float(estimator.score(scaler.transform(X[train_rows]), labels[train_rows])),
+        'test_accuracy': float((predicted[labelled] == labels[test_rows][labelled]).mean()) if labelled.any() else None,
+        'label_distribution': {name: int((labels[train_rows] == value).sum())
+                               for value, name in enumerate(('BUY', 'SELL', 'HOLD'))},
+        'signals': {name: int((predicted == value).sum()) for value, name in enumerate(('BUY', 'SELL', 'HOLD'))},
+        'epochs_trained': int(getattr(estimator, 'n_iter_', 0)),
+        'model_path': model_path,
+        'trading': summary,
+        'trades': result.trades,
+    }
+
+
+class WalkForward:
+    """Rolling-window training and out-of-sample evaluation of the MLP model"""
+
+    def __init__(self, symbol: str, bars: np.ndarray, timeframe: int = 1,
+                 spec: Optional[SymbolSpec] = None, train_days: float = 30, test_days: float = 7,
+                 horizon: int = 1, threshold: float = 0.001, execution: Optional[Dict] = None,
+                 initial_balance: float = 10000.0, cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                 workers: Optional[int] = None):
+        """
+        Args:
+            symbol: Symbol of the bars
+            bars: Historical bars (see ``load_bars``), oldest first
+            timeframe: MT5 timeframe of ``bars``
+            spec: Contract and costs (defaults to ``symbols_config``)
+            train_days: Length of each training window
+            test_days: Length of each out-of-sample window (and the step between folds)
+            horizon: Bars ahead the labels look
+            threshold: Return that separates BUY/SELL from HOLD
+            execution: Bot order rules for the out-of-sample trades (``DEFAULT_EXECUTION``)
+            initial_balance: Starting balance of each fold
+            cache_dir: Where completed folds are stored (None disables the cache)
+            workers: Worker processes (default: CPU count)
+        """
+        self.symbol = symbol
+        self.bars = _as_rates(bars)
+        self.timeframe = timeframe
+        self.spec = spec or SymbolSpec.load(symbol)
+        self.train_days = train_days
+        self.test_days = test_days
+        self.horizon = horizon
+        self.threshold = threshold
+        self.execution = execution or DEFAULT_EXECUTION
+        self.initial_balance = initial_balance
+        self.cache_dir = cache_dir
+        self.workers = workers or os.cpu_count() or 1
+
+    def folds(self, include_partial: bool = False) -> List[Fold]:
+        return make_folds(self.bars['time'], self.train_days, self.test_days,
+                          timeframe_seconds(self.timeframe), include_partial)
+
+    def fold_key(self, fold: Fold, settings: Dict[str, Any]) -> str:
+        """Cache key: fold boundaries, settings and a fingerprint of the bars the fold reads"""
+        times = self.bars['time']
+        start, end = np.searchsorted(times, [fold.train_start, fold.test_end])
+        window = self.bars[max(0, int(start) - FEATURE_WARMUP):end]
+        description = json.dumps({
+            'symbol': self.symbol,
+            'timeframe': self.timeframe,
+            'fold': [fold.train_start, fold.test_start, fold.test_end],
+            'model': settings,
+            'labels': [self.horizon, self.threshold],
+            'execution': self.execution,
+            'spec': asdict(self.spec),
+            'balance': self.initial_balance,
+        }, sort_keys=True, default=str)
+        digest = hashlib.sha1(description.encode())
+        digest.update(np.ascontiguousarray(window).tobytes())
+        return digest.hexdigest()[:16]
+
+    def _cache_path(self, fold: Fold, key: str, extension: str) -> str:
+        return os.path.join(self.cache_dir, f"{self.symbol}_{fold.label}_{key}.{extension}")
+
+    def run(self, include_partial: bool = False) -> Dict[str, Any]:
+        """
+        Train and evaluate every fold (cached folds are loaded, not retrained)
+
+        Returns:
+            ``{'folds': [...], 'summary': {...}}`` with one report per fold
+            (see ``train_fold``) plus ``cached`` and the out-of-sample totals
+        """
+        settings = _model_settings()
+        reports: Dict[int, Dict] = {}
+        tasks = []
+
+        for fold in self.folds(include_partial):
+            key = self.fold_key(fold, settings)
+            path = self._cache_path(fold, key, 'json') if self.cache_dir else None
+            if path and os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    reports[fold.index] = dict(json.load(f), cached=True)
+                continue
+            tasks.append((fold, key, {
+                'fold': fold, 'symbol': self.symbol, 'timeframe': self.timeframe, 'spec': self.spec,
+                'horizon': self.horizon, 'threshold': self.threshold, 'execution': self.execution,
+                'initial_balance': self.initial_balance,
+                'model_path': self._cache_path(fold, key, 'pkl') if self.cache_dir else None,
+            }))
+
+        if tasks:
+            logger.info(f"Walk-forward {self.symbol}: {len(tasks)} folds para treinar, {len(reports)} em cache")
+            shared = _SharedBars(self.bars)
+            try:
+                workers = min(self.workers, len(tasks))
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(shared.descriptor,)) as pool:
+                    futures = [(fold, key, pool.submit(_run_fold, task)) for fold, key, task in tasks]
+                    for fold, key, future in futures:
+                        try:
+                            report = future.result()
+                        except Exception as e:
+                            logger.error(f"Walk-forward: fold {fold.label} falhou - {e}")
+                            continue
+                        if self.cache_dir:
+                            os.makedirs(self.cache_dir, exist_ok=True)
+                            with open(self._cache_path(fold, key, 'json'), 'w', encoding='utf-8') as f:
+                                json.dump(report, f, default=float)
+                        reports[fold.index] = dict(report, cached=False)
+            finally:
+                shared.close()
+
+        folds = [reports[index] for index in sorted(reports)]
+        return {'folds': folds, 'summary': summarize(folds, self.initial_balance)}
+
+
+def summarize(folds: List[Dict], initial_balance: float = 10000.0) -> Dict[str, Any]:
+    """Out-of-sample totals over the folds (trades of every test window together)"""
+    profits = np.array([trade['profit'] for fold in folds for trade in fold['trades']], dtype=float)
+    gross_win = float(profits[profits > 0].sum())
+    gross_loss = float(-profits[profits < 0].sum())
+    accuracies = [fold['test_accuracy'] for fold in folds if fold.get('test_accuracy') is not None]
+    return {
+        'folds': len(folds),
+        'total_trades': int(len(profits)),
+        'win_rate': round(float((profits > 0).mean()) * 100, 2) if len(profits) else 0.0,
+        'net_profit': round(float(profits.sum()), 2),
+        'profit_factor': round(gross_win / gross_loss, 3) if gross_loss else (float('inf') if gross_win else 0.0),
+        'worst_fold_drawdown_pct': max((fold['trading']['max_drawdown_pct'] for fold in folds), default=0.0),
+        'profitable_folds': sum(1 for fold in folds if fold['trading']['net_profit'] > 0),
+        'mean_test_accuracy': round(float(np.mean(accuracies)), 4) if accuracies else None,
+        'initial_balance': initial_balance,
+    }
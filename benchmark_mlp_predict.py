@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da inferência do MLPModel: caminho completo x linha única
+
+Treina um modelo pequeno com dados sintéticos (sem MT5) em um diretório
+temporário e mede a latência por chamada de ``MLPModel.predict`` em cada modo,
+incluindo o forward pass NumPy exportado.
+
+Uso: python benchmark_mlp_predict.py [--calls 200] [--window 60]
+"""
+
+import argparse
+import dataclasses
+import os
+import tempfile
+import threading
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from bot.mlp_model import MLPModel
+from services.inference_service import inference_service
+from utils.indicators import StreamingIndicators
+
+
+def gerar_barras(n: int, seed: int = 42) -> pd.DataFrame:
+    """Barras M1 sintéticas (random walk)"""
+    rng = np.random.default_rng(seed)
+    close = 50000 + np.cumsum(rng.normal(0, 25, n))
+    return pd.DataFrame({
+        'time': pd.date_range('2025-01-01', periods=n, freq='min'),
+        'open': close + rng.normal(0, 5, n),
+        'high': close + rng.random(n) * 15,
+        'low': close - rng.random(n) * 15,
+        'close': close,
+        'tick_volume': rng.integers(10, 100, n),
+    })
+
+
+def medir(model: MLPModel, window: pd.DataFrame, calls: int, **kwargs) -> float:
+    """Latência média por chamada em microssegundos"""
+    model.predict(window, **kwargs)  # aquecimento
+    total = timeit.timeit(lambda: model.predict(window, **kwargs), number=calls)
+    return total / calls * 1e6
+
+
+def medir_bots(model: MLPModel, window: pd.DataFrame, indicators: dict, bots: int, calls: int) -> float:
+    """Predições por segundo com ``bots`` threads disparadas juntas a cada tick"""
+    # A cada tick o "scheduler" anuncia os bots devidos e todos predizem ao mesmo tempo
+    tick = threading.Barrier(bots, action=lambda: inference_service.expect(bots))
+    barrier = threading.Barrier(bots + 1)
+
+    def bot():
+        barrier.wait()
+        for _ in range(calls):
+            tick.wait()
+            model.predict(window, indicators=indicators)
+
+    threads = [threading.Thread(target=bot) for _ in range(bots)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return bots * calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--window', type=int, default=60)
+    parser.add_argument('--bots', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = MLPModel(model_path=os.path.join(tmp, 'mlp_model.pkl'))
+        history = gerar_barras(3000)
+        model.train(history, model.generate_training_labels(history))
+
+        window = gerar_barras(args.window, seed=7)
+
+        # Indicadores da última barra como o TradingEngine os mantém (StreamingIndicators)
+        streaming = StreamingIndicators()
+        for high, low, close in zip(window['high'], window['low'], window['close']):
+            latest = streaming.update(high, low, close)
+
+        legacy_us = medir(model, window, args.calls, fast=False)
+        fast_us = medir(model, window, args.calls, fast=True)
+        streaming_us = medir(model, window, args.calls, fast=True, indicators=latest)
+
+        # Mesmo modelo exportado para .npz e avaliado em NumPy (BotConfig.inference_backend)
+        model.save_model()
+        runtime = MLPModel(model_path=model.model_path)
+        runtime.config = dataclasses.replace(runtime.config, inference_backend='numpy')
+        runtime.load_model()
+        numpy_us = medir(runtime, window, args.calls, fast=True, indicators=latest)
+
+        # Vários bots compartilhando o modelo: lote entre bots x uma chamada por bot
+        batched = medir_bots(runtime, window, latest, args.bots, args.calls)
+        runtime.config = dataclasses.replace(runtime.config, batch_inference=False)
+        unbatched = medir_bots(runtime, window, latest, args.bots, args.calls)
+
+    print("=" * 60)
+    print(f"MLPModel.predict - janela de {args.window} barras, {args.calls} chamadas")
+    print(f"  caminho completo : {legacy_us:10.1f} us/chamada")
+    print(f"  linha única      : {fast_us:10.1f} us/chamada ({legacy_us / fast_us:.1f}x)")
+    print(f"  + indicadores    : {streaming_us:10.1f} us/chamada ({legacy_us / streaming_us:.1f}x)")
+    print(f"  + backend numpy  : {numpy_us:10.1f} us/chamada ({legacy_us / numpy_us:.1f}x)")
+    print(f"{args.bots} bots simultâneos (backend numpy)")
+    print(f"  uma chamada/bot  : {unbatched:10.0f} predições/s")
+    print(f"  lote entre bots  : {batched:10.0f} predições/s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -250,7 +250,7 @@ class BotAPIController:
         def get_market_data():
             """Obtém dados de mercado"""
             try:
-                import MetaTrader5 as mt5
+                from core.mt5_gateway import mt5
 
                 symbol = request.args.get('symbol', self.config.trading.symbol)
                 timeframe = request.args.get('timeframe', 'M1')
@@ -268,8 +268,9 @@ class BotAPIController:
 
                 timeframe_mt5 = tf_dict.get(timeframe, mt5.TIMEFRAME_M1)
 
-                # Obter dados usando MT5 diretamente
-                rates = mt5.copy_rates_from_pos(symbol, timeframe_mt5, 0, count)
+                # Obter dados do cache compartilhado de barras
+                from services.bar_cache import bar_cache
+                rates = bar_cache.get_rates(symbol, timeframe_mt5, count)
 
                 if rates is None or len(rates) == 0:
                     return jsonify({
@@ -68,6 +68,8 @@ class BotConfig:
     log_file: str = "bot/logs/trading_bot.log"
     api_port: int = 5002
     model_save_path: str = "bot/models/"
+    inference_backend: str = "sklearn"  # "sklearn" (pickle) ou "numpy" (exportação .npz)
+    batch_inference: bool = True  # avalia as linhas de todos os bots do tick em uma única matriz
 
     def __post_init__(self):
         if self.trading is None:
@@ -111,6 +113,10 @@ def load_config_from_env() -> BotConfig:
         config.mlp.learning_rate = float(os.getenv('MLP_LEARNING_RATE'))
     if os.getenv('MLP_EPOCHS'):
         config.mlp.epochs = int(os.getenv('MLP_EPOCHS'))
+    if os.getenv('MLP_INFERENCE_BACKEND'):
+        config.inference_backend = os.getenv('MLP_INFERENCE_BACKEND')
+    if os.getenv('MLP_BATCH_INFERENCE'):
+        config.batch_inference = os.getenv('MLP_BATCH_INFERENCE').lower() in ('1', 'true', 'yes')
 
     return config
 
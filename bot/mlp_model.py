@@ -3,16 +3,35 @@ Modelo MLP para análise de mercado e predição de sinais de trading
 """
 import numpy as np
 import pandas as pd
-from sklearn.neural_network import MLPClassifier
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
 import os
 import logging
-from typing import Tuple, Dict, Any
-import joblib
+import threading
+from typing import Tuple, Dict, Any, Optional
 
 from .config import get_config
+from .mlp_runtime import NumpyMLP, export_npz
+from services.inference_service import inference_service
+from utils.indicators import compute_indicators
+
+# scikit-learn e joblib são importados só quando necessários (treino ou backend
+# "sklearn"), para que bots com o backend "numpy" não carreguem a pilha inteira
+
+# Modelos carregados do disco, compartilhados (somente leitura) entre as instâncias
+# de MLPModel do processo: (backend, caminho, mtime) -> (estimador, scaler)
+_shared_models: Dict[Tuple[str, str, float], Tuple[Any, Any]] = {}
+_shared_models_lock = threading.Lock()
+
+
+def _load_shared(backend: str, path: str, loader) -> Tuple[Any, Any]:
+    """Carrega (estimador, scaler) uma vez por arquivo/versão e reutiliza nas demais instâncias"""
+    key = (backend, os.path.abspath(path), os.path.getmtime(path))
+    with _shared_models_lock:
+        if key not in _shared_models:
+            # Versões antigas do mesmo arquivo não são mais usadas
+            for old in [k for k in _shared_models if k[:2] == key[:2]]:
+                del _shared_models[old]
+            _shared_models[key] = loader()
+        return _shared_models[key]
 
 
 class MarketDataPreprocessor:
@@ -20,80 +39,101 @@ class MarketDataPreprocessor:
 
     def __init__(self):
         self.config = get_config()
-        self.scaler = StandardScaler()
-        self.feature_scaler = StandardScaler()
+        self.scaler = None  # StandardScaler ajustado no treino ou carregado do disco
+
+    def _select_features(self, available) -> list:
+        """Features configuradas presentes nos dados (na ordem da configuração)"""
+        selected_features = [feature for feature in self.config.mlp.features if feature in available]
+
+        if not selected_features:
+            raise ValueError("Nenhuma feature válida encontrada nos dados")
+
+        return selected_features
+
+    def prepare_features(self, market_data: pd.DataFrame, fit: bool = False) -> np.ndarray:
+        """
+        Prepara features para o modelo
 
-    def prepare_features(self, market_data: pd.DataFrame) -> np.ndarray:
-        """Prepara features para o modelo"""
+        Args:
+            market_data: Barras (open, high, low, close, ...)
+            fit: Ajusta ``self.scaler`` nestes dados (só no treino). Fora do
+                treino a janela é normalizada com um scaler local, sem tocar no
+                scaler do treino, que é compartilhado pelos bots do processo.
+        """
         # Calcula indicadores técnicos
         features = self._calculate_technical_indicators(market_data)
 
         # Seleciona features configuradas
-        selected_features = []
-        for feature in self.config.mlp.features:
-            if feature in features.columns:
-                selected_features.append(feature)
-
-        if not selected_features:
-            raise ValueError("Nenhuma feature válida encontrada nos dados")
+        selected_features = self._select_features(features.columns)
 
         feature_data = features[selected_features].values
 
-        # Normaliza dados
+        # Normaliza dados (sempre em um scaler novo: o carregado do disco é compartilhado)
         if len(feature_data) > 0:
-            feature_data = self.scaler.fit_transform(feature_data)
+            from sklearn.preprocessing import StandardScaler
+            scaler = StandardScaler()
+            feature_data = scaler.fit_transform(feature_data)
+            if fit:
+                self.scaler = scaler
 
         return feature_data
 
-    def _calculate_technical_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
-        """Calcula indicadores técnicos"""
-        df = data.copy()
+    def prepare_latest_features(self, market_data: pd.DataFrame,
+                                indicators: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """
+        Features normalizadas apenas da última barra (caminho de inferência)
+
+        A normalização usa o scaler persistido no treino, sem reajustá-lo.
+
+        Args:
+            market_data: Janela de barras (open, high, low, close, ...)
+            indicators: Valores dos indicadores na última barra, quando o chamador
+                já os mantém (ex.: ``StreamingIndicators`` do TradingEngine);
+                se None, são calculados a partir dos arrays de preço
+
+        Returns:
+            Array (1, n_features)
+
+        Raises:
+            ValueError: Sem scaler do treino (modelo não treinado/carregado)
+        """
+        if not hasattr(self.scaler, 'mean_'):
+            raise ValueError("Scaler do treino não carregado")
+
+        if indicators is None:
+            computed = compute_indicators(
+                market_data['high'].to_numpy(dtype=np.float64),
+                market_data['low'].to_numpy(dtype=np.float64),
+                market_data['close'].to_numpy(dtype=np.float64)
+            )
+            indicators = {name: values[-1] for name, values in computed.items()}
 
-        # RSI
-        df['rsi'] = self._calculate_rsi(df['close'])
+        latest = dict(indicators)
+        for column in market_data.columns:
+            if column not in latest:
+                latest[column] = market_data[column].iat[-1]
 
-        # MACD
-        df['macd'], df['macd_signal'], df['macd_histogram'] = self._calculate_macd(df['close'])
+        selected_features = self._select_features(latest)
+        row = np.array([[latest[feature] for feature in selected_features]], dtype=np.float64)
+        row = np.nan_to_num(row, nan=0.0)
 
-        # Médias móveis
-        df['sma_20'] = df['close'].rolling(window=20).mean()
-        df['sma_50'] = df['close'].rolling(window=50).mean()
+        return (row - self.scaler.mean_) / self.scaler.scale_
 
-        # Bandas de Bollinger
-        df['bb_middle'] = df['close'].rolling(window=20).mean()
-        df['bb_std'] = df['close'].rolling(window=20).std()
-        df['bb_upper'] = df['bb_middle'] + (df['bb_std'] * 2)
-        df['bb_lower'] = df['bb_middle'] - (df['bb_std'] * 2)
+    def _calculate_technical_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Calcula indicadores técnicos (implementação compartilhada em utils.indicators)"""
+        df = data.copy()
 
-        # Williams %R
-        df['williams_r'] = self._calculate_williams_r(df)
+        indicators = compute_indicators(
+            df['high'].to_numpy(dtype=np.float64),
+            df['low'].to_numpy(dtype=np.float64),
+            df['close'].to_numpy(dtype=np.float64)
+        )
+        for name, values in indicators.items():
+            df[name] = values
 
         # Retorna apenas colunas necessárias
         return df.fillna(0)
 
-    def _calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
-        """Calcula RSI"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
-
-    def _calculate_macd(self, prices: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[pd.Series, pd.Series, pd.Series]:
-        """Calcula MACD"""
-        ema_fast = prices.ewm(span=fast).mean()
-        ema_slow = prices.ewm(span=slow).mean()
-        macd = ema_fast - ema_slow
-        macd_signal = macd.ewm(span=signal).mean()
-        macd_histogram = macd - macd_signal
-        return macd, macd_signal, macd_histogram
-
-    def _calculate_williams_r(self, data: pd.DataFrame, period: int = 14) -> pd.Series:
-        """Calcula Williams %R"""
-        highest_high = data['high'].rolling(window=period).max()
-        lowest_low = data['low'].rolling(window=period).min()
-        return -100 * (highest_high - data['close']) / (highest_high - lowest_low)
-
 
 class MLPModel:
     """Modelo MLP para predição de sinais de trading usando scikit-learn"""
@@ -103,12 +143,15 @@ class MLPModel:
         self.model = None
         self.preprocessor = MarketDataPreprocessor()
         self.model_path = model_path or self.config.model_save_path + "mlp_model.pkl"
+        self.numpy_path = self.model_path.replace('.pkl', '.npz')
 
         # Configurar logging
         self.logger = logging.getLogger(__name__)
 
-    def build_model(self) -> MLPClassifier:
+    def build_model(self):
         """Constrói modelo MLP usando scikit-learn"""
+        from sklearn.neural_network import MLPClassifier
+
         # Criar arquitetura baseada na configuração
         hidden_layers = self.config.mlp.hidden_layers
 
@@ -132,21 +175,27 @@ class MLPModel:
 
     def train(self, market_data: pd.DataFrame, labels: np.ndarray) -> Dict[str, Any]:
         """Treina o modelo MLP"""
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score
+        import joblib
+
         try:
             # Preparar dados
-            features = self.preprocessor.prepare_features(market_data)
+            features = self.preprocessor.prepare_features(market_data, fit=True)
 
             if len(features) == 0:
                 raise ValueError("Dados de features vazios")
 
-            # Dividir dados
+            # Dividir dados em ordem temporal: o teste são as barras mais recentes
+            # (embaralhar mistura o futuro no treino); validação walk-forward
+            # completa em backtest.walk_forward
             X_train, X_test, y_train, y_test = train_test_split(
-                features, labels, test_size=0.2, random_state=42
+                features, labels, test_size=0.2, shuffle=False
             )
 
-            # Construir modelo se não existir
-            if self.model is None:
-                self.model = self.build_model()
+            # Sempre um modelo novo: fit() sem warm_start reinicia os pesos de qualquer
+            # forma, e o estimador carregado do disco é compartilhado com outros bots
+            self.model = self.build_model()
 
             # Treinar modelo
             self.model.fit(X_train, y_train)
@@ -179,26 +228,52 @@ class MLPModel:
             self.logger.error(f"Erro ao treinar modelo: {str(e)}")
             raise
 
-    def predict(self, market_data: pd.DataFrame) -> Tuple[str, float]:
-        """Faz predição usando o modelo treinado"""
+    def predict(self, market_data: pd.DataFrame, fast: bool = True,
+                indicators: Optional[Dict[str, float]] = None) -> Tuple[str, float]:
+        """
+        Faz predição usando o modelo treinado
+
+        Args:
+            market_data: Janela de barras (open, high, low, close, ...)
+            fast: Usa o caminho de linha única (features só da última barra, scaler
+                persistido e uma única passada de predict_proba). False mantém o
+                caminho antigo, que processa a janela inteira.
+            indicators: Indicadores já calculados para a última barra (só no modo fast)
+        """
         try:
             if self.model is None:
                 self.load_model()
 
-            # Preparar dados
-            features = self.preprocessor.prepare_features(market_data)
+            if fast:
+                if not hasattr(self.preprocessor.scaler, 'mean_'):
+                    # Sem o scaler do treino não há como normalizar a linha
+                    self.logger.warning("Predição sem scaler treinado: retornando HOLD")
+                    return "HOLD", 0.5
+                features = self.preprocessor.prepare_latest_features(market_data, indicators)
+            else:
+                features = self.preprocessor.prepare_features(market_data)
 
             if len(features) == 0:
                 return "HOLD", 0.5
 
-            # Fazer predição
-            predictions = self.model.predict_proba(features)
-            predicted_class = self.model.predict(features)[-1]  # Última predição
-            confidence = np.max(predictions[-1])  # Última probabilidade
+            if fast:
+                # Uma passada: classe e confiança saem da mesma distribuição. Com
+                # batch_inference a linha é avaliada junto com a dos outros bots
+                if self.config.batch_inference:
+                    probabilities = inference_service.predict_proba(self.model, features)[-1]
+                else:
+                    probabilities = self.model.predict_proba(features)[-1]
+                best = int(np.argmax(probabilities))
+                predicted_class = self.model.classes_[best]
+                confidence = probabilities[best]
+            else:
+                predictions = self.model.predict_proba(features)
+                predicted_class = self.model.predict(features)[-1]  # Última predição
+                confidence = np.max(predictions[-1])  # Última probabilidade
 
             # Converter para sinal de trading
             signal_map = {0: "BUY", 1: "SELL", 2: "HOLD"}
-            signal = signal_map[predicted_class]
+            signal = signal_map[int(predicted_class)]
 
             return signal, float(confidence)
 
@@ -207,25 +282,54 @@ class MLPModel:
             return "HOLD", 0.5
 
     def save_model(self):
-        """Salva o modelo treinado"""
+        """Salva o modelo treinado (pickle do scikit-learn + exportação NumPy)"""
         try:
-            if self.model:
+            if self.model and not isinstance(self.model, NumpyMLP):
+                import joblib
+
                 os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
                 joblib.dump(self.model, self.model_path)
                 self.logger.info(f"Modelo salvo em: {self.model_path}")
+
+                if hasattr(self.model, 'coefs_'):
+                    self.export_numpy()
         except Exception as e:
             self.logger.error(f"Erro ao salvar modelo: {str(e)}")
 
+    def export_numpy(self, path: str = None) -> str:
+        """
+        Exporta pesos, biases e scaler do modelo treinado para ``.npz``
+
+        Args:
+            path: Arquivo de saída (padrão: caminho do modelo com extensão .npz)
+
+        Returns:
+            Caminho gravado
+        """
+        path = path or self.numpy_path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        export_npz(self.model, self.preprocessor.scaler, path)
+        self.logger.info(f"Modelo exportado para NumPy em: {path}")
+        return path
+
     def load_model(self):
-        """Carrega modelo treinado"""
+        """Carrega modelo treinado (backend definido em BotConfig.inference_backend)"""
+        if self.config.inference_backend == 'numpy':
+            if os.path.exists(self.numpy_path):
+                try:
+                    self.model, self.preprocessor.scaler = _load_shared('numpy', self.numpy_path, self._load_numpy)
+                    self.logger.info(f"Modelo NumPy carregado de: {self.numpy_path}")
+                    return
+                except Exception as e:
+                    self.logger.error(f"Erro ao carregar modelo NumPy: {str(e)}")
+            else:
+                self.logger.warning(f"Exportação NumPy não encontrada em: {self.numpy_path}; usando scikit-learn")
+
         try:
             if os.path.exists(self.model_path):
-                self.model = joblib.load(self.model_path)
-
-                # Carregar scaler
-                scaler_path = self.model_path.replace('.pkl', '_scaler.pkl')
-                if os.path.exists(scaler_path):
-                    self.preprocessor.scaler = joblib.load(scaler_path)
+                self.model, scaler = _load_shared('sklearn', self.model_path, self._load_pickle)
+                if scaler is not None:
+                    self.preprocessor.scaler = scaler
 
                 self.logger.info(f"Modelo carregado de: {self.model_path}")
             else:
@@ -235,6 +339,22 @@ class MLPModel:
             self.logger.error(f"Erro ao carregar modelo: {str(e)}")
             self.model = self.build_model()
 
+    def _load_numpy(self) -> Tuple[NumpyMLP, Any]:
+        model = NumpyMLP.load(self.numpy_path)
+        return model, model.scaler
+
+    def _load_pickle(self) -> Tuple[Any, Any]:
+        import joblib
+
+        model = joblib.load(self.model_path)
+
+        # Carregar scaler
+        scaler = None
+        scaler_path = self.model_path.replace('.pkl', '_scaler.pkl')
+        if os.path.exists(scaler_path):
+            scaler = joblib.load(scaler_path)
+        return model, scaler
+
     def generate_training_labels(self, market_data: pd.DataFrame) -> np.ndarray:
         """Gera labels de treinamento baseados nos dados históricos"""
         # Estratégia simples: baseado no movimento do preço
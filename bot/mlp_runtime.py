@@ -0,0 +1,135 @@
+"""
+Forward pass do MLP em NumPy puro (sem scikit-learn em tempo de execução)
+
+``export_npz`` grava pesos, biases, classes e média/desvio do scaler de um
+MLPClassifier treinado em um ``.npz`` compacto. ``NumpyMLP`` carrega esse
+arquivo e avalia a rede com algumas multiplicações de matriz em float32,
+expondo a mesma interface usada pelo MLPModel (``predict_proba``, ``predict``
+e ``classes_``).
+"""
+from typing import Optional
+
+import numpy as np
+
+# Formato do arquivo exportado (incrementar se os campos mudarem)
+FORMAT_VERSION = 1
+
+_HIDDEN_ACTIVATIONS = {
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'tanh': lambda x: np.tanh(x, out=x),
+    'logistic': lambda x: np.divide(1, 1 + np.exp(-x, out=x), out=x),
+    'identity': lambda x: x,
+}
+
+
+def export_npz(model, scaler, path: str) -> str:
+    """
+    Exporta um MLPClassifier treinado e seu StandardScaler para ``.npz``
+
+    Args:
+        model: MLPClassifier treinado (coefs_, intercepts_, classes_)
+        scaler: StandardScaler ajustado no treino (mean_, scale_)
+        path: Caminho do arquivo de saída
+
+    Returns:
+        Caminho gravado
+    """
+    if not hasattr(model, 'coefs_'):
+        raise ValueError("Modelo não treinado - nada para exportar")
+    if not hasattr(scaler, 'mean_'):
+        raise ValueError("Scaler não ajustado - nada para exportar")
+
+    arrays = {
+        'format_version': np.array(FORMAT_VERSION),
+        'activation': np.array(model.activation),
+        'out_activation': np.array(model.out_activation_),
+        'classes': np.asarray(model.classes_),
+        'scaler_mean': np.asarray(scaler.mean_, dtype=np.float32),
+        'scaler_scale': np.asarray(scaler.scale_, dtype=np.float32),
+    }
+    for i, (weights, bias) in enumerate(zip(model.coefs_, model.intercepts_)):
+        arrays[f'W{i}'] = np.asarray(weights, dtype=np.float32)
+        arrays[f'b{i}'] = np.asarray(bias, dtype=np.float32)
+
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    return path
+
+
+class ExportedScaler:
+    """Subconjunto do StandardScaler usado na inferência (mean_, scale_)"""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float32) - self.mean_) / self.scale_
+
+
+class NumpyMLP:
+    """MLP exportado avaliado com NumPy em float32"""
+
+    def __init__(self, weights, biases, classes: np.ndarray,
+                 activation: str = 'relu', out_activation: str = 'softmax',
+                 scaler: Optional[ExportedScaler] = None):
+        if activation not in _HIDDEN_ACTIVATIONS:
+            raise ValueError(f"Ativação não suportada: {activation}")
+        if out_activation not in ('softmax', 'logistic'):
+            raise ValueError(f"Ativação de saída não suportada: {out_activation}")
+
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.classes_ = classes
+        self.activation = activation
+        self.out_activation = out_activation
+        self.scaler = scaler
+
+    @classmethod
+    def load(cls, path: str) -> 'NumpyMLP':
+        """Carrega um modelo gravado por ``export_npz``"""
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data['format_version'])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Versão de exportação não suportada: {version}")
+
+            layers = sum(1 for name in data.files if name.startswith('W'))
+            return cls(
+                weights=[data[f'W{i}'] for i in range(layers)],
+                biases=[data[f'b{i}'] for i in range(layers)],
+                classes=data['classes'],
+                activation=str(data['activation']),
+                out_activation=str(data['out_activation']),
+                scaler=ExportedScaler(data['scaler_mean'], data['scaler_scale']),
+            )
+
+    @property
+    def n_features_in_(self) -> int:
+        return self.weights[0].shape[0]
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Probabilidades por classe (mesma ordem de ``classes_``)"""
+        hidden = _HIDDEN_ACTIVATIONS[self.activation]
+        out = np.asarray(X, dtype=np.float32)
+        if out.ndim == 1:
+            out = out.reshape(1, -1)
+
+        last = len(self.weights) - 1
+        for i, (weights, bias) in enumerate(zip(self.weights, self.biases)):
+            out = out @ weights
+            out += bias
+            if i != last:
+                out = hidden(out)
+
+        if self.out_activation == 'logistic':
+            # Classificação binária: uma saída = probabilidade da classe positiva
+            positive = 1.0 / (1.0 + np.exp(-out[:, 0]))
+            return np.column_stack((1.0 - positive, positive))
+
+        out -= out.max(axis=1, keepdims=True)
+        np.exp(out, out=out)
+        out /= out.sum(axis=1, keepdims=True)
+        return out
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
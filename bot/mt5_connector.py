@@ -1,7 +1,7 @@
 """
 Conector MT5 para execução de operações de trading
 """
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -0,0 +1,69 @@
+"""
+Runtime headless dos bots gerenciados
+
+Cada bot criado ou carregado pelo BotManagerService montava um
+``BotAPIController`` inteiro: um app Flask com suas rotas, um TradingEngine e
+um MLPModel (com o próprio preprocessor). Criar ou carregar 100 bots levava
+segundos e centenas de MB, e como ``get_config()`` devolve a configuração
+global, o ajuste de símbolo/lote de um bot alterava a de todos.
+
+Aqui um bot gerenciado recebe só o estado da sua estratégia: um TradingEngine
+com uma cópia própria da seção ``trading`` da configuração. O resto é
+compartilhado por referência: as seções ``mlp``/``mt5`` da configuração, um
+único MLPModel por processo, o cache de barras e o gateway MT5 (o engine de
+um bot não encerra a conexão ao parar).
+"""
+import dataclasses
+import threading
+from typing import Dict, Optional
+
+from .config import BotConfig, get_config
+from .mlp_model import MLPModel
+from .trading_engine import TradingEngine
+
+_shared_model: Optional[MLPModel] = None
+_shared_model_lock = threading.Lock()
+
+
+def shared_model() -> MLPModel:
+    """MLPModel único do processo, usado (somente leitura) por todos os bots gerenciados"""
+    global _shared_model
+    with _shared_model_lock:
+        if _shared_model is None:
+            _shared_model = MLPModel()
+        return _shared_model
+
+
+def bot_config(config: Dict, base: BotConfig = None) -> BotConfig:
+    """
+    Configuração de engine de um bot
+
+    Args:
+        config: Configuração do bot (symbol, lot_size, take_profit, stop_loss,
+            max_positions, advanced.magic_number)
+        base: Configuração de origem (padrão: get_config())
+
+    Returns:
+        BotConfig com ``trading`` próprio do bot; as demais seções são as da base
+    """
+    base = base or get_config()
+    trading = dataclasses.replace(
+        base.trading,
+        symbol=config.get('symbol', 'BTCUSDc'),
+        lot_size=config.get('lot_size', 0.01),
+        take_profit_pips=int(config.get('take_profit', 5000)),
+        stop_loss_pips=int(config.get('stop_loss', 10000)),
+        max_positions=config.get('max_positions', 1),
+        magic_number=config.get('advanced', {}).get('magic_number', base.trading.magic_number),
+    )
+    return dataclasses.replace(base, trading=trading)
+
+
+def create_bot_engine(config: Dict) -> TradingEngine:
+    """
+    TradingEngine headless de um bot gerenciado
+
+    Sem app Flask nem modelo próprio: compartilha o MLPModel do processo e não
+    é dono da conexão com o MT5.
+    """
+    return TradingEngine(config=bot_config(config), mlp_model=shared_model(), owns_connection=False)
@@ -6,12 +6,9 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 import json
-import threading
 import pandas as pd
 import numpy as np
-import MetaTrader5 as mt5
-
-from .config import get_config
+from .config import BotConfig, get_config
 from .mlp_model import MLPModel
 
 # Import absoluto para evitar problemas com execução direta
@@ -19,6 +16,13 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.mt5_connection import mt5_connection, MT5ConnectionError
+from core.mt5_gateway import mt5
+from core.mt5_memo import mt5_memo
+from services.bar_cache import bar_cache
+from services.bar_store import bar_store
+from services.bot_scheduler import Reschedule, bot_scheduler
+from services.positions_snapshot import positions_snapshot
+from utils.indicators import StreamingIndicators, rsi as rsi_series
 
 # Setup MLP storage - now using SQLite database
 django_storage_available = False  # Natural progression from Django removal
@@ -46,12 +50,23 @@ def convert_numpy_types(data):
 class TradingEngine:
     """Motor principal do bot de trading"""
 
-    def __init__(self):
-        self.config = get_config()
-        self.mlp_model = MLPModel()
+    def __init__(self, config: BotConfig = None, mlp_model: MLPModel = None, owns_connection: bool = True):
+        """
+        Args:
+            config: Configuração do engine (padrão: get_config())
+            mlp_model: Modelo compartilhado (padrão: um MLPModel próprio)
+            owns_connection: Se stop() encerra a conexão com o MT5 (False para
+                engines de bots gerenciados, que compartilham o gateway)
+        """
+        self.config = config or get_config()
+        self.mlp_model = mlp_model or MLPModel()
+        self.owns_connection = owns_connection
+        # Indicadores incrementais: cada ciclo processa só as barras novas
+        self.indicators = StreamingIndicators()
         self.is_running = False
         self.trade_executed = False
         self.last_prediction = None
+        self.bot_id = None  # definido pelo BotManagerService para bots gerenciados
         self.performance_metrics = {
             'total_trades': 0,
             'winning_trades': 0,
@@ -63,9 +78,11 @@ class TradingEngine:
         # Configurar logging
         self.logger = logging.getLogger(__name__)
 
-        # Thread para monitoramento
-        self.monitor_thread = None
-        self.stop_monitoring = threading.Event()
+        # Monitoramento roda como job do scheduler central (sem thread própria)
+        self.monitor_job_id = f"engine:{id(self)}"
+        self.monitor_interval = 10  # Verificação frequente para operações únicas
+        self.analysis_interval = 60  # 1 minuto entre análises
+        self.last_analysis_time = 0
 
     def start(self) -> bool:
         """Inicia o bot de trading"""
@@ -83,10 +100,12 @@ class TradingEngine:
 
             # Iniciar monitoramento
             self.is_running = True
-            self.stop_monitoring.clear()
-            self.monitor_thread = threading.Thread(target=self._monitor_loop)
-            self.monitor_thread.daemon = True
-            self.monitor_thread.start()
+            self.last_analysis_time = 0
+            self.logger.info(f"Modo de operação única: {self.config.trading.single_operation_mode}")
+            self.logger.info(f"Aguardar fechamento da posição: {self.config.trading.wait_for_position_close}")
+            bot_scheduler.schedule(
+                self.monitor_job_id, self._monitor_step, self.monitor_interval, inference=True
+            )
 
             self.logger.info("Trading Bot iniciado com sucesso")
             return True
@@ -100,15 +119,13 @@ class TradingEngine:
         try:
             self.logger.info("Parando Trading Bot...")
 
-            # Parar monitoramento
+            # Parar monitoramento (uma execução em andamento termina, sem novas)
             self.is_running = False
-            self.stop_monitoring.set()
-
-            if self.monitor_thread and self.monitor_thread.is_alive():
-                self.monitor_thread.join(timeout=5)
+            bot_scheduler.cancel(self.monitor_job_id)
 
-            # Desconectar MT5 usando mt5_connection
-            mt5_connection.shutdown()
+            # Desconectar MT5 usando mt5_connection (só se o engine for dono da conexão)
+            if self.owns_connection:
+                mt5_connection.shutdown()
 
             self.logger.info("Trading Bot parado")
         except Exception as e:
@@ -126,44 +143,43 @@ class TradingEngine:
 
             # Aguardar/fechar posições existentes usando mt5_connection
             # SOMENTE 1 POSIÇÃO POR VEZ - regra do usuário
-            positions = mt5.positions_get()
+            positions = positions_snapshot.get().by_magic(self.config.trading.magic_number)
             if positions is not None and len(positions) > 0:
                 # Fechar todas as posições existentes primeiro
                 closed_count = 0
                 for pos in positions:
-                    if pos.magic == self.config.trading.magic_number:
-                        try:
-                            # Fechar posição
-                            close_type = mt5.ORDER_TYPE_SELL if pos.type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY
-
-                            close_request = {
-                                "action": mt5.TRADE_ACTION_DEAL,
-                                "position": pos.ticket,
-                                "symbol": pos.symbol,
-                                "volume": pos.volume,
-                                "type": close_type,
-                                "magic": self.config.trading.magic_number,
-                                "comment": "Bot Rebalance - Max 1 Position"
+                    try:
+                        # Fechar posição
+                        close_type = mt5.ORDER_TYPE_SELL if pos.type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY
+
+                        close_request = {
+                            "action": mt5.TRADE_ACTION_DEAL,
+                            "position": pos.ticket,
+                            "symbol": pos.symbol,
+                            "volume": pos.volume,
+                            "type": close_type,
+                            "magic": self.config.trading.magic_number,
+                            "comment": "Bot Rebalance - Max 1 Position"
+                        }
+
+                        close_result = mt5.order_send(close_request)
+                        if close_result.retcode == mt5.TRADE_RETCODE_DONE:
+                            closed_count += 1
+                            self.logger.info(f"Posição {pos.ticket} fechada - abrindo nova posição")
+
+                            # Salvar trade finalizado no histórico
+                            trade_update = {
+                                'exit_price': close_result.price,
+                                'profit': close_result.profit if hasattr(close_result, 'profit') else 0,
+                                'exit_reason': 'CLOSED_FOR_NEW_TRADE'
                             }
+                            try:
+                                mlp_storage.update_trade(str(pos.ticket), trade_update)
+                            except Exception as e:
+                                self.logger.error(f"Erro ao atualizar trade {pos.ticket}: {e}")
 
-                            close_result = mt5.order_send(close_request)
-                            if close_result.retcode == mt5.TRADE_RETCODE_DONE:
-                                closed_count += 1
-                                self.logger.info(f"Posição {pos.ticket} fechada - abrindo nova posição")
-
-                                # Salvar trade finalizado no histórico
-                                trade_update = {
-                                    'exit_price': close_result.price,
-                                    'profit': close_result.profit if hasattr(close_result, 'profit') else 0,
-                                    'exit_reason': 'CLOSED_FOR_NEW_TRADE'
-                                }
-                                try:
-                                    mlp_storage.update_trade(str(pos.ticket), trade_update)
-                                except Exception as e:
-                                    self.logger.error(f"Erro ao atualizar trade {pos.ticket}: {e}")
-
-                        except Exception as e:
-                            self.logger.error(f"Erro ao fechar posição {pos.ticket}: {e}")
+                    except Exception as e:
+                        self.logger.error(f"Erro ao fechar posição {pos.ticket}: {e}")
 
                 self.logger.info(f"Fechou {closed_count} posições antes de abrir nova")
 
@@ -172,12 +188,13 @@ class TradingEngine:
             if symbol_info is None:
                 return {'success': False, 'error': 'Não foi possível obter informações do terminal'}
 
-            # Para obter preços atuais, precisamos usar MT5 diretamente
-            symbol_data = mt5.symbol_info(self.config.trading.symbol)
-            if symbol_data is None:
+            # Especificação do símbolo (memo de horas) e preço atual pelo último tick
+            symbol_data = mt5_memo.symbol_info(self.config.trading.symbol)
+            tick = mt5_memo.symbol_info_tick(self.config.trading.symbol)
+            if symbol_data is None or tick is None:
                 return {'success': False, 'error': 'Não foi possível obter informações do símbolo'}
 
-            current_price = symbol_data.ask if signal == 'BUY' else symbol_data.bid
+            current_price = tick.ask if signal == 'BUY' else tick.bid
 
             # Configurações específicas do teste
             account_info = mt5_connection.get_account_info()
@@ -269,7 +286,8 @@ class TradingEngine:
                             'entry_price': current_price,
                             'sl_price': sl,
                             'tp_price': tp,
-                            'analysis_id': analysis_id
+                            'analysis_id': analysis_id,
+                            'bot_id': self.bot_id
                         }
                         trade_id = mlp_storage.add_trade(trade_data)
                         self.logger.info(f"Trade salvo no banco - ID: {trade_id}")
@@ -321,8 +339,8 @@ class TradingEngine:
 
             timeframe_mt5 = tf_dict.get('M1', mt5.TIMEFRAME_M1)
 
-            # Obter dados
-            rates = mt5.copy_rates_from_pos(self.config.trading.symbol, timeframe_mt5, 0, self.config.mlp.sequence_length)
+            # Obter dados (cache compartilhado de barras)
+            rates = bar_cache.get_rates(self.config.trading.symbol, timeframe_mt5, self.config.mlp.sequence_length)
 
             if rates is None or len(rates) == 0:
                 self.logger.error(f"Não foi possível obter dados para {self.config.trading.symbol}")
@@ -336,24 +354,22 @@ class TradingEngine:
             if len(market_data) < 30:  # Mínimo de dados necessários
                 return {'success': False, 'error': 'Dados insuficientes para análise'}
 
-            # Calcular indicadores técnicos
+            # Calcular indicadores técnicos (O(1) por barra nova)
+            latest = self.indicators.sync(rates)
             indicators = {
-                'rsi': self._calculate_rsi(market_data['close'], 14).iloc[-1] if len(market_data) > 14 else None,
-                'macd_signal': self._calculate_macd_signal(market_data['close']).iloc[-1] if len(market_data) > 26 else None,
-                'bb_upper': self._calculate_bollinger_bands(market_data['close'], 20)[0].iloc[-1] if len(market_data) > 20 else None,
-                'bb_lower': self._calculate_bollinger_bands(market_data['close'], 20)[1].iloc[-1] if len(market_data) > 20 else None,
-                'sma_20': market_data['close'].rolling(window=20).mean().iloc[-1] if len(market_data) >= 20 else None,
-                'sma_50': market_data['close'].rolling(window=50).mean().iloc[-1] if len(market_data) >= 50 else None,
+                name: (None if np.isnan(latest[name]) else latest[name])
+                for name in ('rsi', 'macd_signal', 'bb_upper', 'bb_lower', 'sma_20', 'sma_50')
             }
 
             # Fazer predição
-            signal, confidence = self.mlp_model.predict(market_data)
+            signal, confidence = self.mlp_model.predict(market_data, indicators=latest)
 
             self.logger.info(f"Análise: {signal} (Confiança: {confidence:.2f})")
 
             # Preparar dados para salvar no Django
             analysis_data = {
                 'symbol': self.config.trading.symbol,
+                'bot_id': self.bot_id,
                 'signal': signal,
                 'confidence': confidence,
                 'indicators': indicators,
@@ -406,20 +422,19 @@ class TradingEngine:
     def get_status(self) -> Dict[str, Any]:
         """Obtém status atual do bot"""
         try:
-            positions_mt5 = mt5.positions_get()
+            positions_mt5 = positions_snapshot.get().by_magic(self.config.trading.magic_number)
 
             positions = []
             if positions_mt5:
                 for pos in positions_mt5:
-                    if pos.magic == self.config.trading.magic_number:
-                        position = {
-                            'ticket': pos.ticket,
-                            'type': 'BUY' if pos.type == mt5.POSITION_TYPE_BUY else 'SELL',
-                            'volume': pos.volume,
-                            'profit': pos.profit,
-                            'symbol': pos.symbol
-                        }
-                        positions.append(position)
+                    position = {
+                        'ticket': pos.ticket,
+                        'type': 'BUY' if pos.type == mt5.POSITION_TYPE_BUY else 'SELL',
+                        'volume': pos.volume,
+                        'profit': pos.profit,
+                        'symbol': pos.symbol
+                    }
+                    positions.append(position)
 
             # Obter informações da conta usando mt5_connection
             account_info = mt5_connection.get_account_info()
@@ -443,32 +458,14 @@ class TradingEngine:
         try:
             self.logger.info(f"Iniciando treinamento com {days} dias de dados...")
 
-            all_data = []
-            tf_dict = {
-                'M1': mt5.TIMEFRAME_M1,
-                'M5': mt5.TIMEFRAME_M5,
-                'M15': mt5.TIMEFRAME_M15
-            }
-
-            for tf_name, tf_mt5 in tf_dict.items():
-                # Calcular count baseado no timeframe
-                count = min(days * 24 * 60 // int(tf_name[1:]), 10000)
-
-                # Obter dados
-                rates = mt5.copy_rates_from_pos(self.config.trading.symbol, tf_mt5, 0, count)
-
-                if rates is not None and len(rates) > 0:
-                    # Converter para DataFrame
-                    df = pd.DataFrame(rates)
-                    df['time'] = pd.to_datetime(df['time'], unit='s')
-                    df = df[['time', 'open', 'high', 'low', 'close', 'tick_volume']]
-                    all_data.append(df)
-
-            if not all_data:
+            # Barras M1 do bar store local: do MT5 só as novas e os buracos da janela
+            rates = bar_store.history(self.config.trading.symbol, mt5.TIMEFRAME_M1, days)
+            if len(rates) == 0:
                 return {'success': False, 'error': 'Não foi possível obter dados históricos'}
 
-            # Usar dados M1 para treinamento
-            training_data = all_data[0] if all_data else pd.DataFrame()
+            training_data = pd.DataFrame(rates)
+            training_data['time'] = pd.to_datetime(training_data['time'], unit='s')
+            training_data = training_data[['time', 'open', 'high', 'low', 'close', 'tick_volume']]
 
             if len(training_data) < 100:
                 return {'success': False, 'error': 'Dados insuficientes para treinamento'}
@@ -494,113 +491,105 @@ class TradingEngine:
             self.logger.error(f"Erro no treinamento: {str(e)}")
             return {'success': False, 'error': str(e)}
 
-    def _monitor_loop(self):
-        """Loop principal de monitoramento"""
-        self.logger.info("Iniciando loop de monitoramento...")
-        self.logger.info(f"Modo de operação única: {self.config.trading.single_operation_mode}")
-        self.logger.info(f"Aguardar fechamento da posição: {self.config.trading.wait_for_position_close}")
-
-        last_analysis_time = 0
-        analysis_interval = 60  # 1 minuto entre análises
-
-        while not self.stop_monitoring.is_set():
-            try:
-                current_time = time.time()
-
-                # Modo de operação única - só executa se não tiver trade ainda
-                if self.config.trading.single_operation_mode and self.trade_executed:
-                    # Aguardar fechamento da posição se habilitado
-                    if self.config.trading.wait_for_position_close:
-                        positions = mt5.positions_get(magic=self.config.trading.magic_number)
-                        if positions is None or len(positions) == 0:
-                            self.logger.info("Posição fechada - operação única concluída, encerrando o bot.")
-                            # Salvar evento no banco
-                            if storage_available:
-                                try:
-                                    mlp_storage.add_bot_event(
-                                        'OPERATION_COMPLETED',
-                                        'Operação única concluída - posição fechada',
-                                        {'mode': 'single_operation', 'wait_for_close': True}
-                                    )
-                                except Exception as e:
-                                    self.logger.error(f"Erro ao salvar evento: {e}")
-
-                            self.stop()
-                            break
-                        else:
-                            self.logger.info(f"Aguardando fechamento da posição... (Ticket: {positions[0].ticket})")
-                            time.sleep(30)  # Verificar a cada 30 segundos
-                            continue
-                    else:
-                        # Não aguardar fechamento - encerrar imediatamente após executar
-                        self.logger.info("Operação única executada - encerrando o bot.")
-                        self.stop()
-                        break
-
-                # Executar análise apenas no intervalo correto
-                if current_time - last_analysis_time >= analysis_interval:
-                    if not self.trade_executed:
-                        result = self.analyze_and_trade()
-                        if result.get('success') and result.get('ticket'):
-                            self.trade_executed = True
-                            self.logger.info(f"Trade executado (Ticket: {result.get('ticket')}) - operação única iniciada")
-                            last_analysis_time = current_time
-
-                            # Salvar evento no banco
-                            if storage_available:
-                                try:
-                                    mlp_storage.add_bot_event(
-                                        'TRADE_EXECUTED',
-                                        f"Operação única executada - Ticket: {result.get('ticket')}",
-                                        {
-                                            'ticket': result.get('ticket'),
-                                            'signal': result.get('signal'),
-                                            'price': result.get('price'),
-                                            'sl': result.get('sl'),
-                                            'tp': result.get('tp'),
-                                            'mode': 'single_operation'
-                                        }
-                                    )
-                                except Exception as e:
-                                    self.logger.error(f"Erro ao salvar evento: {e}")
-                    else:
-                        last_analysis_time = current_time
+    def _monitor_step(self) -> Optional[Reschedule]:
+        """
+        Um ciclo de monitoramento (executado pelo scheduler central)
 
-                # Aguardar próximo ciclo
-                time.sleep(10)  # Verificação mais frequente para operações únicas
+        Returns:
+            Reschedule com os segundos até o próximo ciclo, ou None para o intervalo padrão
+        """
+        try:
+            current_time = time.time()
+
+            # Modo de operação única - só executa se não tiver trade ainda
+            if self.config.trading.single_operation_mode and self.trade_executed:
+                # Aguardar fechamento da posição se habilitado
+                if self.config.trading.wait_for_position_close:
+                    positions = positions_snapshot.get().by_magic(self.config.trading.magic_number)
+                    if len(positions) == 0:
+                        self.logger.info("Posição fechada - operação única concluída, encerrando o bot.")
+                        # Salvar evento no banco
+                        if storage_available:
+                            try:
+                                mlp_storage.queue_bot_event(
+                                    'OPERATION_COMPLETED',
+                                    'Operação única concluída - posição fechada',
+                                    {'mode': 'single_operation', 'wait_for_close': True}
+                                )
+                            except Exception as e:
+                                self.logger.error(f"Erro ao salvar evento: {e}")
 
-            except Exception as e:
-                self.logger.error(f"Erro no loop de monitoramento: {str(e)}")
-                time.sleep(30)  # Aguardar 30 segundos em caso de erro
+                        self.stop()
+                        return None
+                    else:
+                        self.logger.info(f"Aguardando fechamento da posição... (Ticket: {positions[0].ticket})")
+                        return Reschedule(30)  # Verificar a cada 30 segundos
+                else:
+                    # Não aguardar fechamento - encerrar imediatamente após executar
+                    self.logger.info("Operação única executada - encerrando o bot.")
+                    self.stop()
+                    return None
+
+            # Executar análise apenas no intervalo correto
+            if current_time - self.last_analysis_time >= self.analysis_interval:
+                if not self.trade_executed:
+                    result = self.analyze_and_trade()
+                    if result.get('success') and result.get('ticket'):
+                        self.trade_executed = True
+                        self.logger.info(f"Trade executado (Ticket: {result.get('ticket')}) - operação única iniciada")
+                        self.last_analysis_time = current_time
+
+                        # Salvar evento no banco
+                        if storage_available:
+                            try:
+                                mlp_storage.queue_bot_event(
+                                    'TRADE_EXECUTED',
+                                    f"Operação única executada - Ticket: {result.get('ticket')}",
+                                    {
+                                        'ticket': result.get('ticket'),
+                                        'signal': result.get('signal'),
+                                        'price': result.get('price'),
+                                        'sl': result.get('sl'),
+                                        'tp': result.get('tp'),
+                                        'mode': 'single_operation'
+                                    }
+                                )
+                            except Exception as e:
+                                self.logger.error(f"Erro ao salvar evento: {e}")
+                else:
+                    self.last_analysis_time = current_time
+
+            return None
 
-        self.logger.info("Loop de monitoramento finalizado")
+        except Exception as e:
+            self.logger.error(f"Erro no loop de monitoramento: {str(e)}")
+            return Reschedule(30)  # Aguardar 30 segundos em caso de erro
 
     def emergency_close_all(self) -> Dict[str, Any]:
         """Fecha todas as posições em caso de emergência"""
         try:
             # Obter posições do bot (com magic number específico)
-            positions_mt5 = mt5.positions_get()
+            positions_mt5 = positions_snapshot.get(max_age=0).by_magic(self.config.trading.magic_number)
 
             closed_positions = []
             if positions_mt5:
                 for pos in positions_mt5:
-                    if pos.magic == self.config.trading.magic_number:
-                        # Fechar posição
-                        close_type = mt5.ORDER_TYPE_SELL if pos.type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY
-
-                        request = {
-                            "action": mt5.TRADE_ACTION_DEAL,
-                            "position": pos.ticket,
-                            "symbol": pos.symbol,
-                            "volume": pos.volume,
-                            "type": close_type,
-                            "magic": self.config.trading.magic_number,
-                            "comment": "Emergency Close"
-                        }
-
-                        result = mt5.order_send(request)
-                        if result.retcode == mt5.TRADE_RETCODE_DONE:
-                            closed_positions.append(pos.ticket)
+                    # Fechar posição
+                    close_type = mt5.ORDER_TYPE_SELL if pos.type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY
+
+                    request = {
+                        "action": mt5.TRADE_ACTION_DEAL,
+                        "position": pos.ticket,
+                        "symbol": pos.symbol,
+                        "volume": pos.volume,
+                        "type": close_type,
+                        "magic": self.config.trading.magic_number,
+                        "comment": "Emergency Close"
+                    }
+
+                    result = mt5.order_send(request)
+                    if result.retcode == mt5.TRADE_RETCODE_DONE:
+                        closed_positions.append(pos.ticket)
 
             return {
                 'success': True,
@@ -615,21 +604,20 @@ class TradingEngine:
     def get_performance_report(self) -> Dict[str, Any]:
         """Gera relatório de performance"""
         try:
-            # Obter posições do bot usando MT5 diretamente
-            positions_mt5 = mt5.positions_get()
+            # Posições do bot pelo snapshot compartilhado (índice por magic number)
+            positions_mt5 = positions_snapshot.get().by_magic(self.config.trading.magic_number)
 
             positions = []
             if positions_mt5:
                 for pos in positions_mt5:
-                    if pos.magic == self.config.trading.magic_number:
-                        position = {
-                            'ticket': pos.ticket,
-                            'type': 'BUY' if pos.type == mt5.POSITION_TYPE_BUY else 'SELL',
-                            'profit': pos.profit,
-                            'volume': pos.volume,
-                            'open_time': datetime.fromtimestamp(pos.time)
-                        }
-                        positions.append(position)
+                    position = {
+                        'ticket': pos.ticket,
+                        'type': 'BUY' if pos.type == mt5.POSITION_TYPE_BUY else 'SELL',
+                        'profit': pos.profit,
+                        'volume': pos.volume,
+                        'open_time': datetime.fromtimestamp(pos.time)
+                    }
+                    positions.append(position)
 
             # Obter informações da conta usando mt5_connection
             account_info = mt5_connection.get_account_info()
@@ -695,14 +683,14 @@ class TradingEngine:
             # Determina o tipo de ordem de fechamento
             close_type = mt5.ORDER_TYPE_SELL if pos.type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY
             
-            # Obter informações do símbolo para o preço de fechamento
-            symbol_info = mt5.symbol_info(pos.symbol)
-            if not symbol_info:
+            # Último tick do símbolo para o preço de fechamento
+            tick = mt5_memo.symbol_info_tick(pos.symbol)
+            if not tick:
                 self.logger.error(f"Could not get symbol info for {pos.symbol}")
                 return {'success': False, 'error': f'Could not get symbol info for {pos.symbol}'}
 
             # Preço de fechamento
-            price = symbol_info.bid if close_type == mt5.ORDER_TYPE_SELL else symbol_info.ask
+            price = tick.bid if close_type == mt5.ORDER_TYPE_SELL else tick.ask
 
             request = {
                 "action": mt5.TRADE_ACTION_DEAL,
@@ -737,35 +725,13 @@ class TradingEngine:
             return {'success': False, 'error': str(e)}
 
     # Métodos auxiliares para cálculos técnicos
-    def _calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
-        """Calculate RSI"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
-
-    def _calculate_macd_signal(self, prices: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9) -> pd.Series:
-        """Calculate MACD signal line"""
-        fast_ema = prices.ewm(span=fast).mean()
-        slow_ema = prices.ewm(span=slow).mean()
-        macd = fast_ema - slow_ema
-        return macd.ewm(span=signal).mean()
-
-    def _calculate_bollinger_bands(self, prices: pd.Series, period: int = 20, std_dev: int = 2) -> tuple:
-        """Calculate Bollinger Bands"""
-        sma = prices.rolling(window=period).mean()
-        std = prices.rolling(window=period).std()
-        upper = sma + (std * std_dev)
-        lower = sma - (std * std_dev)
-        return upper, lower
-
     def _detect_rsi_divergence(self, data: pd.DataFrame) -> bool:
         """Detect RSI divergence (simplified)"""
         if len(data) < 20:
             return False
+        rsi_values = rsi_series(data['close'].to_numpy(dtype=np.float64))
         return (data['close'].iloc[-1] < data['close'].iloc[-10] and
-                self._calculate_rsi(data['close']).iloc[-1] > self._calculate_rsi(data['close']).iloc[-10])
+                rsi_values[-1] > rsi_values[-10])
 
     def _detect_volume_spike(self, data: pd.DataFrame) -> bool:
         """Detect volume spike (simplified)"""
@@ -29,6 +29,13 @@ else:
 
 conn.close()
 
+if count > 0:
+    # DELETE direto não passa pelo hook do rollup: recalcular a partir do que sobrou
+    from services.mlp_storage import mlp_storage
+
+    rows = mlp_storage.rebuild_daily_rollup()
+    print(f"✓ Rollup diário recalculado: {rows} linha(s)")
+
 print("\n" + "="*80)
 print("  BANCO LIMPO!")
 print("="*80)
@@ -54,6 +54,12 @@ class Settings:
     MT5_PASSWORD: Optional[str] = os.getenv("MT5_PASSWORD")
     MT5_SERVER: Optional[str] = os.getenv("MT5_SERVER")
     MT5_TIMEOUT: int = int(os.getenv("MT5_TIMEOUT", "60000"))
+    # Espera máxima (segundos) por uma chamada enfileirada no gateway MT5
+    MT5_GATEWAY_TIMEOUT: float = float(os.getenv("MT5_GATEWAY_TIMEOUT", "30"))
+    # Memo de leituras do MT5 (segundos): especificação do símbolo, conta/terminal e ticks
+    MT5_MEMO_TTL_SYMBOL: float = float(os.getenv("MT5_MEMO_TTL_SYMBOL", "14400"))
+    MT5_MEMO_TTL_ACCOUNT: float = float(os.getenv("MT5_MEMO_TTL_ACCOUNT", "1.0"))
+    MT5_MEMO_TTL_TICK: float = float(os.getenv("MT5_MEMO_TTL_TICK", "0.1"))
 
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -62,6 +68,20 @@ class Settings:
     # WebSocket
     WS_HEARTBEAT_INTERVAL: int = 30
     WS_MAX_CONNECTIONS: int = 100
+    # Intervalo (segundos) do poller de ticks compartilhado pelas salas (mínimo 0.1)
+    WS_TICK_POLL_INTERVAL: float = float(os.getenv("WS_TICK_POLL_INTERVAL", "1.0"))
+    # Intervalo (segundos) dos streams de barras, posições e conta
+    WS_STREAM_INTERVAL: float = float(os.getenv("WS_STREAM_INTERVAL", "1.0"))
+
+    # Bot scheduler (pool compartilhado por todos os bots)
+    BOT_SCHEDULER_WORKERS: int = int(os.getenv("BOT_SCHEDULER_WORKERS", "8"))
+    # Processos worker da análise dos bots, por hash do símbolo (0 = tudo no processo principal)
+    BOT_SHARD_WORKERS: int = int(os.getenv("BOT_SHARD_WORKERS", "0"))
+
+    # Tick recorder (símbolos gravados continuamente em data/ticks, separados por vírgula)
+    TICK_RECORDER_SYMBOLS: list = [
+        symbol.strip() for symbol in os.getenv("TICK_RECORDER_SYMBOLS", "").split(",") if symbol.strip()
+    ]
 
     # Scalping Bot (default settings)
     SCALPING_SYMBOL: str = os.getenv("SCALPING_SYMBOL", "BTCUSDc")
@@ -2,7 +2,8 @@
 MetaTrader5 connection manager (Singleton pattern)
 """
 import logging
-import MetaTrader5 as mt5
+from .mt5_gateway import mt5
+from .mt5_memo import mt5_memo
 from typing import Optional
 from .config import settings
 from .exceptions import MT5ConnectionError, MT5InitializationError, MT5LoginError
@@ -131,22 +132,22 @@ class MT5Connection:
         return mt5.version()
 
     def get_terminal_info(self) -> Optional[dict]:
-        """Get MT5 terminal information"""
+        """Get MT5 terminal information (memoized for about a second)"""
         if not self._initialized:
             return None
 
-        info = mt5.terminal_info()
+        info = mt5_memo.terminal_info()
         if info is None:
             return None
 
         return info._asdict()
 
     def get_account_info(self) -> Optional[dict]:
-        """Get MT5 account information"""
+        """Get MT5 account information (memoized for about a second)"""
         if not self._initialized or not self._logged_in:
             return None
 
-        info = mt5.account_info()
+        info = mt5_memo.account_info()
         if info is None:
             return None
 
@@ -0,0 +1,430 @@
+"""
+MT5 gateway - one thread owns the terminal connection
+
+The MetaTrader5 package talks to the terminal over a single IPC channel, yet
+Flask request threads, bot jobs, the trade sync, the WebSocket pollers and the
+scalping thread all called it at the same time. The gateway runs every call on
+one owner thread, taken from a priority queue: order operations (and the
+connection calls) go ahead of ordinary reads, which go ahead of bulk bar and
+history downloads. An identical read that is already queued or running is
+not repeated: the callers share its result. Every function keeps call,
+error and latency counters.
+
+A caller that times out abandons its call: if the owner thread has not
+started it yet (and no other caller shares it) the call is dropped and never
+reaches the terminal. An ``order_send`` that is already running when its
+caller times out is waited for instead, so a retry never duplicates an order
+whose outcome is unknown.
+
+``mt5`` is a drop-in for the module (``from core.mt5_gateway import mt5``):
+constants come straight from the package and functions go through the
+gateway. ``initialize()`` without arguments is answered without a terminal
+round-trip once the connection is up, and ``last_error()`` returns the error
+of the calling thread's own last failed call.
+
+``route(module)`` sends every call (and constant) to another module for the
+duration of a block. The route is process-wide: calls from every thread go
+to that module, run on the thread that makes them, and the caches built on
+the gateway (memo, positions snapshot, bar cache) stop serving live data.
+Backtests route the gateway to the simulated terminal; never route it inside
+the live server.
+"""
+import contextlib
+import functools
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import MetaTrader5 as _mt5
+
+from .config import settings
+from .exceptions import MT5ConnectionError
+
+logger = logging.getLogger(__name__)
+
+# Prioridades da fila (menor sai primeiro)
+PRIORITY_ORDER = 0
+PRIORITY_READ = 1
+PRIORITY_BULK = 2
+
+_ORDER_FUNCTIONS = frozenset({'order_send', 'order_check', 'initialize', 'login', 'shutdown'})
+_BULK_FUNCTIONS = frozenset({
+    'copy_rates_from', 'copy_rates_from_pos', 'copy_rates_range', 'copy_ticks_from', 'copy_ticks_range',
+    'history_deals_get', 'history_deals_total', 'history_orders_get', 'history_orders_total', 'symbols_get',
+})
+# Leituras sem efeito colateral: chamadas idênticas em andamento compartilham o resultado
+# (o resultado é compartilhado, quem recebe não deve alterá-lo)
+_COALESCED_FUNCTIONS = _BULK_FUNCTIONS | frozenset({
+    'account_info', 'terminal_info', 'version', 'symbol_info', 'symbol_info_tick', 'symbols_total',
+    'positions_get', 'positions_total', 'orders_get', 'orders_total',
+})
+
+# Funções que não podem ser repetidas: já em execução, o chamador espera o resultado
+_UNSAFE_TO_REPEAT = frozenset({'order_send'})
+
+# Resposta de last_error() quando a última chamada da thread deu certo
+_SUCCESS = (1, 'Success')
+
+
+def call_priority(name: str) -> int:
+    """Queue priority of an MT5 function"""
+    if name in _ORDER_FUNCTIONS:
+        return PRIORITY_ORDER
+    if name in _BULK_FUNCTIONS:
+        return PRIORITY_BULK
+    return PRIORITY_READ
+
+
+class _Call:
+    """A queued MT5 call and the future its callers wait on"""
+
+    __slots__ = ('name', 'args', 'kwargs', 'key', 'future', 'enqueued', 'waiters', 'started', 'cancelled')
+
+    def __init__(self, name: str, args: tuple, kwargs: dict, key: Optional[tuple]):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+        # Chamadores esperando (mais de um quando coalescida); alterados sob o lock do gateway
+        self.waiters = 1
+        self.started = False
+        self.cancelled = False
+
+
+class _FunctionStats:
+    """Counters of one MT5 function"""
+
+    __slots__ = ('calls', 'coalesced', 'errors', 'total_time', 'max_time', 'total_wait')
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.total_wait = 0.0
+
+    def to_dict(self) -> dict:
+        calls = self.calls or 1
+        return {
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'avg_ms': round(self.total_time / calls * 1000, 3),
+            'max_ms': round(self.max_time * 1000, 3),
+            'avg_wait_ms': round(self.total_wait / calls * 1000, 3),
+        }
+
+
+class MT5Gateway:
+    """Runs every MetaTrader5 call on one owner thread, by priority"""
+
+    def __init__(self, module=_mt5, timeout: Optional[float] = None):
+        """
+        Args:
+            module: MetaTrader5 module (or a stand-in) the owner thread calls
+            timeout: Seconds a caller waits for its call (default ``MT5_GATEWAY_TIMEOUT``)
+        """
+        self.module = module
+        self.timeout = timeout or settings.MT5_GATEWAY_TIMEOUT
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._inflight: Dict[tuple, _Call] = {}
+        self._functions: Dict[str, _FunctionStats] = {}
+        self._listeners: Dict[str, List[Callable]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._connected = False
+        self._route = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'cancelled': 0,
+            'initialize_skipped': 0,
+        }
+
+    @property
+    def connected(self) -> bool:
+        """True after a successful ``initialize`` (until ``shutdown``)"""
+        return self._connected
+
+    @property
+    def routed(self):
+        """Module the calls are routed to (see ``route``), or None"""
+        return self._route
+
+    @contextlib.contextmanager
+    def route(self, module):
+        """
+        Send every call straight to ``module`` for the duration of the block
+
+        Process-wide: while the block runs, calls from any thread of the
+        process go to ``module`` (each on the thread that makes it, without
+        queue or counters; order listeners still run). Used by backtests,
+        in their own process, to put a simulated terminal behind every
+        consumer of ``mt5``; never use it inside the live server.
+        """
+        previous = self._route
+        self._route = module
+        try:
+            yield module
+        finally:
+            self._route = previous
+
+    def call(self, name: str, /, *args, **kwargs) -> Any:
+        """
+        Run an MT5 function on the owner thread and return its result
+
+        Args:
+            name: Function name (``positions_get``, ``order_send``, ...)
+
+        Raises:
+            MT5ConnectionError: The call did not complete within the timeout
+        """
+        return self.execute(name, args, kwargs)
+
+    def execute(
+        self,
+        name: str,
+        args: tuple = (),
+        kwargs: Optional[dict] = None,
+        priority: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """
+        ``call`` with an explicit priority and timeout
+
+        Args:
+            name: Function name
+            args: Positional arguments of the function
+            kwargs: Keyword arguments of the function
+            priority: Queue priority (default by function, see ``call_priority``)
+            timeout: Seconds to wait (default ``self.timeout``)
+
+        Raises:
+            MT5ConnectionError: The call did not complete within the timeout
+                (a call not yet started is dropped; a running ``order_send``
+                is waited for instead)
+        """
+        kwargs = kwargs or {}
+        routed = self._route
+        if routed is not None:
+            result, error = self._run(name, args, kwargs, 0.0, routed)
+        elif threading.current_thread() is self._thread:
+            # Já na thread dona (ex.: chamada feita por outra chamada): executa direto
+            result, error = self._run(name, args, kwargs, 0.0)
+        else:
+            call = self._submit(name, args, kwargs, call_priority(name) if priority is None else priority)
+            result, error = self._wait(call, timeout or self.timeout)
+        self._local.last_error = error
+        return result
+
+    def initialize(self, *args, **kwargs) -> bool:
+        """``mt5.initialize``; without arguments, True at once when already connected"""
+        if self._connected and self._route is None and not args and not kwargs:
+            with self._lock:
+                self._stats['initialize_skipped'] += 1
+            return True
+        return self.execute('initialize', args, kwargs)
+
+    def last_error(self) -> Tuple[int, str]:
+        """Error of the calling thread's last gateway call"""
+        error = getattr(self._local, 'last_error', None)
+        if error is None:
+            return self.execute('last_error')
+        return error
+
+    def on_call(self, names: Iterable[str], callback: Callable[[str, tuple, dict, Any], None]) -> None:
+        """
+        Call ``callback(name, args, kwargs, result)`` after each of these functions
+
+        Runs on the owner thread right after the call (e.g. cache invalidation
+        on ``order_send``); it must not call the gateway back.
+        """
+        with self._lock:
+            for name in names:
+                self._listeners.setdefault(name, []).append(callback)
+
+    def stop(self) -> None:
+        """Stop the owner thread after the queued calls (restarted by the next call)"""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put((PRIORITY_BULK + 1, next(self._seq), None))
+        thread.join(timeout=self.timeout)
+        with self._lock:
+            if self._thread is thread:
+                self._thread = None
+
+    def get_stats(self) -> Dict:
+        """Global counters and call/error/latency counters per function"""
+        with self._lock:
+            return {
+                **self._stats,
+                'connected': self._connected,
+                'queued': self._queue.qsize(),
+                'inflight': len(self._inflight),
+                'functions': {name: stats.to_dict() for name, stats in sorted(self._functions.items())},
+            }
+
+    def _submit(self, name: str, args: tuple, kwargs: dict, priority: int) -> _Call:
+        key = None
+        if name in _COALESCED_FUNCTIONS:
+            key = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                key = None
+
+        with self._lock:
+            if key is not None:
+                pending = self._inflight.get(key)
+                if pending is not None:
+                    pending.waiters += 1
+                    self._stats['coalesced'] += 1
+                    self._function(name).coalesced += 1
+                    return pending
+            call = _Call(name, args, kwargs, key)
+            if key is not None:
+                self._inflight[key] = call
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run_loop, name='mt5-gateway', daemon=True)
+                self._thread.start()
+            self._queue.put((priority, next(self._seq), call))
+        return call
+
+    def _wait(self, call: _Call, timeout: float) -> Tuple[Any, Optional[tuple]]:
+        try:
+            return call.future.result(timeout)
+        except FutureTimeoutError:
+            pass
+
+        with self._lock:
+            self._stats['timeouts'] += 1
+            call.waiters -= 1
+            if not call.started:
+                if call.waiters == 0:
+                    # Ninguém mais espera: a thread dona descarta a chamada sem executá-la
+                    call.cancelled = True
+                    self._stats['cancelled'] += 1
+                    if call.key is not None and self._inflight.get(call.key) is call:
+                        del self._inflight[call.key]
+                raise MT5ConnectionError(f"MT5 gateway: {call.name} não executada em {timeout}s (descartada)")
+            if call.name not in _UNSAFE_TO_REPEAT:
+                raise MT5ConnectionError(f"MT5 gateway: {call.name} não respondeu em {timeout}s")
+
+        # Ordem já enviada ao terminal: desistir deixaria o resultado desconhecido
+        logger.warning(f"MT5 gateway: {call.name} em execução há mais de {timeout}s, aguardando o resultado")
+        return call.future.result()
+
+    def _run_loop(self) -> None:
+        while True:
+            _, _, call = self._queue.get()
+            if call is None:
+                return
+            with self._lock:
+                if call.cancelled:
+                    continue
+                call.started = True
+            try:
+                outcome = self._run(call.name, call.args, call.kwargs, time.perf_counter() - call.enqueued)
+            except BaseException as e:
+                self._finish(call)
+                call.future.set_exception(e)
+            else:
+                self._finish(call)
+                call.future.set_result(outcome)
+
+    def _finish(self, call: _Call) -> None:
+        # Sai dos "em andamento" antes de entregar: um pedido novo faz uma chamada nova
+        if call.key is not None:
+            with self._lock:
+                if self._inflight.get(call.key) is call:
+                    del self._inflight[call.key]
+
+    def _run(self, name: str, args: tuple, kwargs: dict, waited: float,
+             routed=None) -> Tuple[Any, Optional[tuple]]:
+        """Call the function (owner thread, or the caller when routed); returns (result, last error if it failed)"""
+        module = self.module if routed is None else routed
+        func = getattr(module, name)
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            failed = result is None or result is False
+            # last_error só vale logo após a chamada, na mesma thread
+            error = self._read_last_error(module) if failed and name != 'last_error' else _SUCCESS
+        except Exception:
+            if routed is None:
+                self._record(name, time.perf_counter() - started, waited, failed=True)
+            raise
+
+        if routed is None:
+            # Chamadas desviadas (backtest) não entram nos contadores nem no estado da conexão
+            self._record(name, time.perf_counter() - started, waited, failed)
+            if name == 'initialize' and result:
+                self._connected = True
+            elif name == 'shutdown':
+                self._connected = False
+        for callback in self._listeners.get(name, ()):
+            try:
+                callback(name, args, kwargs, result)
+            except Exception as e:
+                logger.error(f"MT5 gateway: erro no listener de {name} - {e}")
+        return result, error
+
+    def _read_last_error(self, module) -> tuple:
+        try:
+            return tuple(module.last_error())
+        except Exception:
+            return (-1, 'last_error indisponível')
+
+    def _record(self, name: str, elapsed: float, waited: float, failed: bool) -> None:
+        with self._lock:
+            stats = self._function(name)
+            stats.calls += 1
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+            stats.total_wait += waited
+            self._stats['calls'] += 1
+            if failed:
+                stats.errors += 1
+                self._stats['errors'] += 1
+
+    def _function(self, name: str) -> _FunctionStats:
+        stats = self._functions.get(name)
+        if stats is None:
+            stats = self._functions[name] = _FunctionStats()
+        return stats
+
+
+class MT5Module:
+    """The MetaTrader5 module seen through a gateway (constants pass through)"""
+
+    def __init__(self, gateway: MT5Gateway):
+        self._gateway = gateway
+
+    def __getattr__(self, name: str) -> Any:
+        routed = self._gateway.routed
+        value = getattr(self._gateway.module if routed is None else routed, name)
+        if name.startswith('_') or not callable(value):
+            return value
+        if name == 'initialize':
+            return self._gateway.initialize
+        if name == 'last_error':
+            return self._gateway.last_error
+        return functools.partial(self._gateway.call, name)
+
+
+# Global instances
+mt5_gateway = MT5Gateway()
+mt5 = MT5Module(mt5_gateway)
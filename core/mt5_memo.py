@@ -0,0 +1,166 @@
+"""
+MT5 memo - short-lived in-process copies of repeated MetaTrader5 reads
+
+The order path and the status endpoints ask the terminal the same things
+many times within a few milliseconds: the symbol specification (point,
+digits, contract size, volume limits), the last tick, the account and the
+terminal info. The memo keeps the last answer of each read for a TTL that
+fits how fast it changes:
+
+- ``symbol_info``: hours (contract specification; prices come from the tick)
+- ``account_info`` / ``terminal_info``: about a second
+- ``symbol_info_tick``: about 100 ms
+
+An ``order_send`` through the MT5 gateway drops the account and the tick of
+the order symbol, so the next read after an order always reaches the
+terminal. Failed reads (None) are never kept, and nothing is memoized while
+the gateway is routed to another module (backtests run on a virtual clock).
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .config import settings
+from .mt5_gateway import mt5, mt5_gateway
+
+logger = logging.getLogger(__name__)
+
+# Funções do MT5 que passam pelo memo
+MEMO_FUNCTIONS = ('symbol_info', 'symbol_info_tick', 'account_info', 'terminal_info')
+# Eventos que alteram conta, posições e preços
+ORDER_EVENTS = ('order_send',)
+
+
+def default_ttls() -> Dict[str, float]:
+    """TTL in seconds of each memoized function, from the settings"""
+    return {
+        'symbol_info': settings.MT5_MEMO_TTL_SYMBOL,
+        'symbol_info_tick': settings.MT5_MEMO_TTL_TICK,
+        'account_info': settings.MT5_MEMO_TTL_ACCOUNT,
+        'terminal_info': settings.MT5_MEMO_TTL_ACCOUNT,
+    }
+
+
+class MT5Memo:
+    """Per-function TTL memo of MT5 reads, dropped on order events"""
+
+    def __init__(self, module=mt5, ttls: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            module: MetaTrader5 module (default: the gateway proxy)
+            ttls: Seconds each function result is kept (0 disables the memo
+                for that function; default from the settings)
+        """
+        self.module = module
+        self.ttls = {**default_ttls(), **(ttls or {})}
+        self._entries: Dict[tuple, tuple] = {}  # (função, args) -> (expira em, valor)
+        self._lock = threading.Lock()
+        self._stats = {name: {'hits': 0, 'misses': 0} for name in MEMO_FUNCTIONS}
+        self._invalidations = 0
+        # Incrementada a cada invalidação: uma leitura iniciada antes não é guardada
+        self._generation = 0
+
+    def symbol_info(self, symbol: str) -> Any:
+        """Symbol specification (do not read prices from it)"""
+        return self.get('symbol_info', symbol)
+
+    def symbol_info_tick(self, symbol: str) -> Any:
+        return self.get('symbol_info_tick', symbol)
+
+    def account_info(self) -> Any:
+        return self.get('account_info')
+
+    def terminal_info(self) -> Any:
+        return self.get('terminal_info')
+
+    def get(self, name: str, *args) -> Any:
+        """
+        Result of ``mt5.<name>(*args)``, from the memo while it is fresh
+
+        Args:
+            name: One of ``MEMO_FUNCTIONS``
+        """
+        if mt5_gateway.routed is not None:
+            # Terminal simulado: os TTLs são em tempo real, o relógio do backtest não
+            return getattr(self.module, name)(*args)
+
+        key = (name, args)
+        ttl = self.ttls.get(name, 0)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._stats[name]['hits'] += 1
+                return entry[1]
+            self._stats[name]['misses'] += 1
+            generation = self._generation
+
+        # Fora do lock: a consulta ao terminal não bloqueia as outras leituras
+        value = getattr(self.module, name)(*args)
+        if value is not None and ttl > 0:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[key] = (time.monotonic() + ttl, value)
+        return value
+
+    def invalidate(self, name: Optional[str] = None, *args) -> int:
+        """
+        Drop memoized results
+
+        Args:
+            name: Only this function (all when None)
+            args: Only this call of the function (e.g. one symbol)
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            if name is None:
+                keys = list(self._entries)
+            elif args:
+                keys = [(name, args)] if (name, args) in self._entries else []
+            else:
+                keys = [key for key in self._entries if key[0] == name]
+            for key in keys:
+                del self._entries[key]
+            self._invalidations += 1
+            self._generation += 1
+            return len(keys)
+
+    def on_order_event(self, name: str, args: tuple, kwargs: dict, result: Any) -> None:
+        """Gateway listener: an order changes the account and moves the symbol"""
+        request = args[0] if args else kwargs.get('request')
+        symbol = request.get('symbol') if isinstance(request, dict) else None
+        self.invalidate('account_info')
+        if symbol:
+            self.invalidate('symbol_info_tick', symbol)
+        else:
+            self.invalidate('symbol_info_tick')
+
+    def get_stats(self) -> Dict:
+        """Hits, misses and hit rate per function and overall"""
+        with self._lock:
+            functions = {}
+            for name, counters in self._stats.items():
+                total = counters['hits'] + counters['misses']
+                functions[name] = {
+                    **counters,
+                    'hit_rate': round(counters['hits'] / total, 4) if total else 0.0,
+                    'ttl': self.ttls.get(name, 0),
+                }
+            hits = sum(counters['hits'] for counters in self._stats.values())
+            total = hits + sum(counters['misses'] for counters in self._stats.values())
+            return {
+                'hits': hits,
+                'misses': total - hits,
+                'hit_rate': round(hits / total, 4) if total else 0.0,
+                'entries': len(self._entries),
+                'invalidations': self._invalidations,
+                'functions': functions,
+            }
+
+
+# Global instance (invalidado pelas ordens que passam pelo gateway)
+mt5_memo = MT5Memo()
+mt5_gateway.on_call(ORDER_EVENTS, mt5_memo.on_order_event)
@@ -1,4 +1,4 @@
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5
 from datetime import datetime, timedelta
 from typing import List, Dict
 import pandas as pd
@@ -115,29 +115,23 @@ def close_all_positions(order_type='all', magic=None, type_filling=mt5.ORDER_FIL
         return []
 
 def get_positions(magic=None):
+    # Import local: services importa lib
+    from services.positions_snapshot import positions_snapshot
+
     # First check if MT5 is initialized
     if not mt5.initialize():
         logger.error("Failed to initialize MT5.")
         return pd.DataFrame()
 
-    total_positions = mt5.positions_total()
-    if total_positions is None:
-        logger.error("Failed to get positions total.")
+    # Snapshot compartilhado (uma consulta ao MT5 por ciclo, índice por magic number)
+    view = positions_snapshot.get()
+    if not view.valid:
+        logger.error("Failed to retrieve positions.")
         return pd.DataFrame()
 
-    if total_positions > 0:
-        positions = mt5.positions_get()
-        if positions is None:
-            logger.error("Failed to retrieve positions.")
-            return pd.DataFrame()
-
-        positions_data = [pos._asdict() for pos in positions]
-        positions_df = pd.DataFrame(positions_data)
-
-        if magic is not None:
-            positions_df = positions_df[positions_df['magic'] == magic]
-
-        return positions_df
+    positions = view.positions if magic is None else view.by_magic(magic)
+    if positions:
+        return pd.DataFrame([pos._asdict() for pos in positions])
     else:
         return pd.DataFrame(columns=['ticket', 'time', 'time_msc', 'time_update', 'time_update_msc', 'type',
                                    'magic', 'identifier', 'reason', 'volume', 'price_open', 'sl', 'tp',
@@ -0,0 +1,18 @@
+"""
+Recalcula o rollup de estatísticas diárias (data, símbolo, bot)
+a partir das análises e trades gravados no banco.
+
+Uso: python rebuild_daily_stats.py
+"""
+from services.mlp_storage import mlp_storage
+
+
+if __name__ == "__main__":
+    rows = mlp_storage.rebuild_daily_rollup()
+    print(f"Rollup diário recalculado: {rows} linha(s) (data, símbolo, bot)")
+
+    for stats in mlp_storage.get_daily_stats(days=7):
+        print(
+            f"{stats['date']}: {stats['total_analyses']} análises, "
+            f"{stats['total_trades']} trades, lucro {stats['total_profit']:.2f}"
+        )
@@ -1,27 +1,32 @@
 """
 Rotas para análises dos bots individuais
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from datetime import datetime
+import json
 import logging
+import queue
+
+from services.analysis_feed import analysis_feed
 
 bot_analysis_bp = Blueprint('bot_analysis', __name__)
 logger = logging.getLogger(__name__)
 
-# Armazenar últimas análises em memória (por bot)
-recent_analyses_cache = {}
+# Intervalo (segundos) dos comentários de keepalive do stream SSE
+SSE_KEEPALIVE = 15
 
 
 def add_analysis_to_cache(bot_id, analysis):
-    """Adiciona análise ao cache em memória"""
-    if bot_id not in recent_analyses_cache:
-        recent_analyses_cache[bot_id] = []
-    
-    recent_analyses_cache[bot_id].append(analysis)
-    
-    # Manter apenas últimas 20 análises por bot
-    if len(recent_analyses_cache[bot_id]) > 20:
-        recent_analyses_cache[bot_id] = recent_analyses_cache[bot_id][-20:]
+    """Publica a análise no feed em memória (buffers por bot/global e assinantes SSE)"""
+    analysis_feed.publish(bot_id, analysis)
+
+
+def _running_bot_ids():
+    from services.bot_manager_service import bot_manager
+
+    # Só os ids: get_all_bots monta o status completo (posições) de cada bot
+    with bot_manager.lock:
+        return {bot_id for bot_id, bot in bot_manager.bots.items() if bot.is_running}
 
 
 @bot_analysis_bp.route('/bots/analyses/live', methods=['GET'])
@@ -30,39 +35,10 @@ def get_live_analyses():
     Obtém análises em tempo real (apenas da memória, sem banco de dados)
     """
     try:
-        from services.bot_manager_service import bot_manager
-        
-        # Obter todos os bots ativos
-        bots = bot_manager.get_all_bots()
-        active_bots = [b for b in bots if b.get('is_running')]
-        
-        if not active_bots:
-            return jsonify({
-                'success': True,
-                'analyses': [],
-                'total': 0,
-                'timestamp': datetime.now().isoformat()
-            })
-        
-        # Coletar análises do cache
-        all_analyses = []
-        
-        for bot_data in active_bots:
-            bot_id = bot_data.get('bot_id')
-            
-            if bot_id in recent_analyses_cache:
-                bot_analyses = recent_analyses_cache[bot_id]
-                all_analyses.extend(bot_analyses)
-        
-        # Ordenar por timestamp (mais recente primeiro)
-        all_analyses.sort(
-            key=lambda x: x.get('timestamp', ''),
-            reverse=True
-        )
-        
-        # Limitar a 30 análises
-        all_analyses = all_analyses[:30]
-        
+        # Anel global já em ordem de chegada: lê só as 30 mais recentes dos bots ativos
+        active_bot_ids = _running_bot_ids()
+        all_analyses = analysis_feed.latest(30, active_bot_ids) if active_bot_ids else []
+
         return jsonify({
             'success': True,
             'analyses': all_analyses,
@@ -79,6 +55,59 @@ def get_live_analyses():
         }), 500
 
 
+def _sse_event(seq, analysis):
+    return f"id: {seq}\nevent: analysis\ndata: {json.dumps(analysis, default=str)}\n\n"
+
+
+@bot_analysis_bp.route('/bots/analyses/stream', methods=['GET'])
+def stream_analyses():
+    """
+    Stream de análises em tempo real (Server-Sent Events)
+
+    Cada análise publicada pelos bots é enviada como evento 'analysis' com id
+    sequencial. Ao reconectar, o navegador envia Last-Event-ID e recebe as
+    análises perdidas que ainda estão no buffer.
+
+    Query params:
+        bot_id: Apenas as análises de um bot (opcional)
+        backlog: Quantas análises recentes enviar na conexão (padrão 30)
+    """
+    bot_id = request.args.get('bot_id')
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    backlog = request.args.get('backlog', 30, type=int)
+
+    # Assina antes de ler o buffer para não perder análises entre os dois
+    subscription = analysis_feed.subscribe(bot_id)
+    if last_event_id and last_event_id.isdigit():
+        initial = analysis_feed.since(int(last_event_id), bot_id)
+    else:
+        initial = analysis_feed.since(0, bot_id)[-backlog:] if backlog > 0 else []
+
+    def generate():
+        last_seq = 0
+        try:
+            for seq, analysis in initial:
+                last_seq = seq
+                yield _sse_event(seq, analysis)
+            while True:
+                try:
+                    seq, analysis = subscription.get(timeout=SSE_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if seq <= last_seq:
+                    continue  # já enviada no backlog
+                last_seq = seq
+                yield _sse_event(seq, analysis)
+        finally:
+            analysis_feed.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
 @bot_analysis_bp.route('/bots/analyses', methods=['GET'])
 def get_bots_analyses():
     """
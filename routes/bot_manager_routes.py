@@ -223,7 +223,7 @@ def close_position(bot_id, ticket):
     Fecha uma posição específica
     """
     try:
-        import MetaTrader5 as mt5
+        from core.mt5_gateway import mt5
         
         if not mt5.initialize():
             return jsonify({
@@ -292,6 +292,25 @@ def close_position(bot_id, ticket):
         }), 500
 
 
+@bot_manager_bp.route('/bots/scheduler', methods=['GET'])
+def get_scheduler_stats():
+    """
+    Estatísticas do scheduler central dos bots
+    """
+    try:
+        return jsonify({
+            'success': True,
+            'scheduler': bot_manager.get_scheduler_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+
 @bot_manager_bp.route('/bots/emergency-stop-all', methods=['POST'])
 def emergency_stop_all():
     """
@@ -1,19 +1,22 @@
 from flask import Blueprint, jsonify, render_template, request
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5
+from core.mt5_memo import mt5_memo
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 from lib import get_positions
+from services.bar_cache import bar_cache
+from utils.indicators import rsi as rsi_series, sma, rolling_std, ema
 
 def analyze_market(df):
     """
     Basic market analysis function (stub replacement for pattern_analyzer)
     """
     try:
-        current_price = df['close'].iloc[-1]
-        sma_20 = df['close'].rolling(window=20).mean().iloc[-1]
-        rsi = 100 - (100 / (1 + (df['close'].diff().where(df['close'].diff() > 0, 0).rolling(window=14).mean() /
-                                   df['close'].diff().where(df['close'].diff() < 0, 0).rolling(window=14).mean()).iloc[-1]))
+        close = df['close'].to_numpy(dtype=np.float64)
+        current_price = close[-1]
+        sma_20 = df['sma_20'].iloc[-1] if 'sma_20' in df else sma(close, 20)[-1]
+        rsi = df['rsi'].iloc[-1] if 'rsi' in df else rsi_series(close, 14)[-1]
 
         direction = "BULLISH" if current_price > sma_20 else "BEARISH"
         confidence = abs((current_price - sma_20) / sma_20) * 100
@@ -69,8 +72,8 @@ def get_account_info():
         if not mt5.initialize():
             return jsonify({"error": "MT5 não conectado"}), 500
 
-        # Get account info
-        account_info = mt5.account_info()
+        # Get account info (memo de ~1s)
+        account_info = mt5_memo.account_info()
         if account_info is None:
             return jsonify({"error": "Conta não logada no MT5"}), 404
 
@@ -134,7 +137,7 @@ def get_account_balance():
         if not mt5.initialize():
             return jsonify({"error": "MT5 não conectado"}), 500
 
-        account_info = mt5.account_info()
+        account_info = mt5_memo.account_info()
         if account_info is None:
             return jsonify({"error": "Conta não logada no MT5"}), 404
 
@@ -553,9 +556,9 @@ def get_btcusd_stats():
         total_profit = btc_positions['profit'].sum() if not btc_positions.empty else 0.0
 
         # Get historical data for analysis
-        rates_m1 = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M1, 0, 100)
-        rates_h1 = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_H1, 0, 24)
-        rates_d1 = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_D1, 0, 7)
+        rates_m1 = bar_cache.get_rates(symbol, mt5.TIMEFRAME_M1, 100)
+        rates_h1 = bar_cache.get_rates(symbol, mt5.TIMEFRAME_H1, 24)
+        rates_d1 = bar_cache.get_rates(symbol, mt5.TIMEFRAME_D1, 7)
 
         df_m1 = pd.DataFrame(rates_m1) if rates_m1 is not None else pd.DataFrame()
         df_h1 = pd.DataFrame(rates_h1) if rates_h1 is not None else pd.DataFrame()
@@ -680,7 +683,7 @@ def get_btcusd_candles(timeframe):
             return jsonify({"error": "MT5 initialization failed"}), 500
 
         # Get data
-        rates = mt5.copy_rates_from_pos(symbol, timeframe_map[timeframe], 0, num_bars)
+        rates = bar_cache.get_rates(symbol, timeframe_map[timeframe], num_bars)
         if rates is None:
             return jsonify({"error": "Failed to get rates data"}), 404
 
@@ -764,7 +767,7 @@ def get_btcusd_analysis(timeframe):
             return jsonify({"error": "MT5 initialization failed"}), 500
 
         # Get data with extra bars for calculations
-        rates = mt5.copy_rates_from_pos(symbol, timeframe_map[timeframe], 0, num_bars)
+        rates = bar_cache.get_rates(symbol, timeframe_map[timeframe], num_bars)
         if rates is None:
             return jsonify({"error": "Failed to get rates data"}), 404
 
@@ -773,19 +776,15 @@ def get_btcusd_analysis(timeframe):
             return jsonify({"error": "No data available"}), 404
 
         # Calculate indicators for analysis
-        df['sma_20'] = df['close'].rolling(window=20).mean()
-        df['sma_50'] = df['close'].rolling(window=50).mean()
+        close = df['close'].to_numpy(dtype=np.float64)
+        df['sma_20'] = sma(close, 20)
+        df['sma_50'] = sma(close, 50)
+        df['rsi'] = rsi_series(close, 14)
 
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-
-        df['ema_12'] = df['close'].ewm(span=12, adjust=False).mean()
-        df['ema_26'] = df['close'].ewm(span=26, adjust=False).mean()
+        df['ema_12'] = ema(close, 12, adjust=False)
+        df['ema_26'] = ema(close, 26, adjust=False)
         df['macd'] = df['ema_12'] - df['ema_26']
-        df['macd_signal'] = df['macd'].ewm(span=9, adjust=False).mean()
+        df['macd_signal'] = ema(df['macd'].to_numpy(), 9, adjust=False)
 
         df['time'] = pd.to_datetime(df['time'], unit='s')
         df = df.set_index('time')
@@ -858,7 +857,7 @@ def get_btcusd_indicators(timeframe):
             return jsonify({"error": "MT5 initialization failed"}), 500
 
         # Get maximum available data for reliable indicator calculations
-        rates = mt5.copy_rates_from_pos(symbol, timeframe_map[timeframe], 0, num_bars)
+        rates = bar_cache.get_rates(symbol, timeframe_map[timeframe], num_bars)
         if rates is None:
             return jsonify({"error": "Failed to get rates data from MT5"}), 404
 
@@ -887,13 +886,14 @@ def get_btcusd_indicators(timeframe):
         rolling_window_20 = min(20, max(1, df_len // 4))
         rolling_window_50 = min(50, max(1, df_len // 2))
 
-        df['sma_20'] = df['close'].rolling(window=rolling_window_20).mean().ffill().bfill().fillna(mean_price)
-        df['sma_50'] = df['close'].rolling(window=rolling_window_50).mean().ffill().bfill().fillna(mean_price * 0.98)
+        close = df['close'].to_numpy(dtype=np.float64)
+        df['sma_20'] = pd.Series(sma(close, rolling_window_20), index=df.index).ffill().bfill().fillna(mean_price)
+        df['sma_50'] = pd.Series(sma(close, rolling_window_50), index=df.index).ffill().bfill().fillna(mean_price * 0.98)
 
         # Bollinger Bands - always provide reasonable bands
         bb_window = min(20, max(1, df_len // 4))
-        df['bb_middle'] = df['close'].rolling(window=bb_window).mean().ffill().bfill().fillna(mean_price)
-        df['bb_std'] = df['close'].rolling(window=bb_window).std().ffill().bfill().fillna(df['close'].std() if df_len > 1 else current_price * 0.02)
+        df['bb_middle'] = pd.Series(sma(close, bb_window), index=df.index).ffill().bfill().fillna(mean_price)
+        df['bb_std'] = pd.Series(rolling_std(close, bb_window), index=df.index).ffill().bfill().fillna(df['close'].std() if df_len > 1 else current_price * 0.02)
 
         # Ensure reasonable std dev even with small data
         df['bb_std'] = df['bb_std'].fillna(current_price * 0.02).clip(lower=current_price * 0.01)
@@ -906,11 +906,7 @@ def get_btcusd_indicators(timeframe):
                 # Simple RSI approximation for smaller datasets
                 rsi_period = min(14, df_len - 1)
                 if rsi_period > 1:
-                    delta = df['close'].diff().fillna(0)
-                    gain = delta.where(delta > 0, 0).rolling(window=rsi_period).mean()
-                    loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_period).mean()
-                    rs = gain / loss.where(loss != 0, 0.000001)  # Avoid division by zero
-                    df['rsi'] = (100 - (100 / (1 + rs))).fillna(50).clip(0, 100)
+                    df['rsi'] = pd.Series(rsi_series(close, rsi_period), index=df.index).fillna(50).clip(0, 100)
                 else:
                     # For very small datasets, estimate based on recent movement
                     recent_change = df['close'].iloc[-1] - df['close'].iloc[0] if df_len > 1 else 0
@@ -927,10 +923,10 @@ def get_btcusd_indicators(timeframe):
                 ema_long_period = min(26, df_len - 1)
                 signal_period = min(9, df_len - 1)
 
-                df['ema_12'] = df['close'].ewm(span=ema_short_period, adjust=False).mean()
-                df['ema_26'] = df['close'].ewm(span=ema_long_period, adjust=False).mean()
+                df['ema_12'] = ema(close, ema_short_period, adjust=False)
+                df['ema_26'] = ema(close, ema_long_period, adjust=False)
                 df['macd'] = df['ema_12'] - df['ema_26']
-                df['macd_signal'] = df['macd'].ewm(span=signal_period, adjust=False).mean()
+                df['macd_signal'] = ema(df['macd'].to_numpy(), signal_period, adjust=False)
                 df['macd_histogram'] = df['macd'] - df['macd_signal']
             except Exception as e:
                 df['macd'] = df['macd_signal'] = df['macd_histogram'] = 0
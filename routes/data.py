@@ -1,11 +1,13 @@
 from flask import Blueprint, jsonify, request
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5
 import logging
 from datetime import datetime
 import pytz
 import pandas as pd
 from flasgger import swag_from
 from lib import get_timeframe
+from services.bar_cache import bar_cache
+from services.bar_store import bar_store
 
 data_bp = Blueprint('data', __name__)
 logger = logging.getLogger(__name__)
@@ -85,7 +87,7 @@ def fetch_data_pos_endpoint():
 
         mt5_timeframe = get_timeframe(timeframe)
         
-        rates = mt5.copy_rates_from_pos(symbol, mt5_timeframe, 0, num_bars)
+        rates = bar_cache.get_rates(symbol, mt5_timeframe, num_bars)
         if rates is None:
             return jsonify({"error": "Failed to get rates data"}), 404
         
@@ -189,8 +191,9 @@ def fetch_data_range_endpoint():
         start_date = utc.localize(datetime.fromisoformat(start_str.replace('Z', '+00:00')))
         end_date = utc.localize(datetime.fromisoformat(end_str.replace('Z', '+00:00')))
         
-        rates = mt5.copy_rates_range(symbol, mt5_timeframe, start_date, end_date)
-        if rates is None:
+        # Servido do bar store local; só os trechos ainda não baixados vão ao MT5
+        rates = bar_store.get_range(symbol, mt5_timeframe, int(start_date.timestamp()), int(end_date.timestamp()))
+        if len(rates) == 0:
             return jsonify({"error": "Failed to get rates data"}), 404
         
         df = pd.DataFrame(rates)
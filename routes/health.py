@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5, mt5_gateway
+from core.mt5_memo import mt5_memo
 from flasgger import swag_from
 
 health_bp = Blueprint('health', __name__)
@@ -35,4 +36,37 @@ def health_check():
         "status": "healthy",
         "mt5_connected": mt5 is not None,
         "mt5_initialized": initialized
-    }), 200
\ No newline at end of file
+    }), 200
+
+
+@health_bp.route('/health/mt5-gateway')
+@swag_from({
+    'tags': ['Health'],
+    'responses': {
+        200: {
+            'description': 'MT5 gateway counters',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'calls': {'type': 'integer'},
+                    'coalesced': {'type': 'integer'},
+                    'errors': {'type': 'integer'},
+                    'timeouts': {'type': 'integer'},
+                    'queued': {'type': 'integer'},
+                    'functions': {'type': 'object'},
+                    'memo': {'type': 'object'}
+                }
+            }
+        }
+    }
+})
+def mt5_gateway_stats():
+    """
+    MT5 Gateway Stats
+    ---
+    description: Queue depth and per-function call, error and latency counters of the MT5 gateway, plus the hit rate of the MT5 read memo.
+    responses:
+      200:
+        description: MT5 gateway counters
+    """
+    return jsonify({**mt5_gateway.get_stats(), 'memo': mt5_memo.get_stats()}), 200
@@ -1,5 +1,5 @@
 from flask import Blueprint, jsonify, request
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5
 import logging
 from flasgger import swag_from
 
@@ -1,5 +1,5 @@
 from flask import Blueprint, jsonify, request, render_template
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5
 import threading
 import sys
 import os
@@ -8,6 +8,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scalping_bot import ScalpingBot
+from services.tick_store import tick_recorder
 
 scalping_bp = Blueprint('scalping', __name__)
 
@@ -327,6 +328,7 @@ def execute_manual_trade():
                 "status": "error",
                 "message": "Falha ao obter preço atual"
             }), 500
+        tick_recorder.record("BTCUSDc", tick)
 
         current_price = tick.ask if order_type_str == "BUY" else tick.bid
 
@@ -455,6 +457,7 @@ def close_position():
                 "status": "error",
                 "message": "Falha ao obter preço atual"
             }), 500
+        tick_recorder.record(position.symbol, tick)
 
         close_price = tick.bid if position.type == mt5.ORDER_TYPE_BUY else tick.ask
 
@@ -1,5 +1,5 @@
 from flask import Blueprint, jsonify
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5
 from flasgger import swag_from
 import logging
 
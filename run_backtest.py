@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Backtest de um bot sobre barras históricas (sem MT5)
+
+Reproduz o arquivo de barras no MetaTrader5 simulado, rodando a estratégia de
+regras do BotInstance (template de bot_templates.json ou config JSON) ou o
+TradingEngine com o modelo MLP salvo. Com --vectorized a estratégia de regras
+roda sobre o array inteiro de barras (mesmos trades, muito mais rápido). Grava a
+lista de trades e a curva de equity em CSV.
+
+Uso:
+    python run_backtest.py barras_btc_m1.csv --symbol BTCUSDc --template btc_auto_trade
+    python run_backtest.py barras.npy --symbol XAUUSDc --config bot.json --out resultado
+    python run_backtest.py barras.csv --symbol BTCUSDc --engine
+    python run_backtest.py barras_btc_m1.npy --symbol BTCUSDc --vectorized
+"""
+
+import argparse
+import json
+
+import pandas as pd
+
+from backtest import Backtester, VectorizedBacktester, load_bars
+from lib import get_timeframe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('bars', help='Arquivo de barras (.csv ou .npy)')
+    parser.add_argument('--symbol', required=True, help='Símbolo das barras (custos de symbols_config)')
+    parser.add_argument('--timeframe', default='M1', help='Timeframe das barras do arquivo')
+    parser.add_argument('--template', help='Template de bot_templates.json')
+    parser.add_argument('--config', help='Arquivo JSON com a config do bot')
+    parser.add_argument('--engine', action='store_true', help='Usar o TradingEngine (modelo MLP) em vez do BotInstance')
+    parser.add_argument('--vectorized', action='store_true', help='Estratégia de regras vetorizada (sem replay barra a barra)')
+    parser.add_argument('--balance', type=float, default=10000.0, help='Saldo inicial')
+    parser.add_argument('--warmup', type=int, default=100, help='Barras de aquecimento')
+    parser.add_argument('--out', help='Prefixo dos CSVs de saída (<out>_trades.csv e <out>_equity.csv)')
+    args = parser.parse_args()
+
+    bars = load_bars(args.bars)
+    backtester_class = VectorizedBacktester if args.vectorized and not args.engine else Backtester
+    backtester = backtester_class(
+        args.symbol, bars, get_timeframe(args.timeframe),
+        initial_balance=args.balance, warmup=args.warmup
+    )
+
+    if args.engine:
+        result = backtester.run_engine()
+    else:
+        if args.config:
+            with open(args.config, encoding='utf-8') as f:
+                config = json.load(f)
+        else:
+            with open('bot_templates.json', encoding='utf-8') as f:
+                config = json.load(f)[args.template or 'btc_auto_trade']
+        result = backtester.run_bot(config)
+
+    summary = result.summary()
+    print("=" * 60)
+    print(f"Backtest {args.symbol} - {summary['bars']} barras em {summary['elapsed_seconds']:.1f}s")
+    for key in ('total_trades', 'win_rate', 'net_profit', 'profit_factor', 'max_drawdown', 'max_drawdown_pct', 'final_balance'):
+        print(f"  {key:18s}: {summary[key]}")
+    print("=" * 60)
+
+    if args.out:
+        pd.DataFrame(result.trades).to_csv(f"{args.out}_trades.csv", index=False)
+        pd.DataFrame(result.equity_curve).to_csv(f"{args.out}_equity.csv", index=False)
+        print(f"Trades e equity gravados em {args.out}_trades.csv / {args.out}_equity.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Varredura de parâmetros de um bot sobre barras históricas (sem MT5)
+
+Testa combinações de lot_size, take_profit, stop_loss, signals.min_confidence
+e max_positions de um template (ou config JSON) em paralelo, com as barras em
+memória compartilhada entre os workers, e lista as melhores por profit factor
+e drawdown.
+
+Cada --param recebe valores separados por vírgula (grade) ou um intervalo
+min:max (busca aleatória, exige --random). Sem --param usa a grade padrão.
+
+Uso:
+    python run_sweep.py barras_btc_m1.npy --symbol BTCUSDc --template btc_auto_trade
+    python run_sweep.py barras.csv --symbol BTCUSDc --param take_profit=2000,5000,8000 --param stop_loss=3000,10000
+    python run_sweep.py barras.npy --symbol BTCUSDc --random 500 --param take_profit=1000:10000 \\
+        --param signals.min_confidence=0.65,0.70,0.85 --workers 8 --out ranking.csv
+"""
+
+import argparse
+import json
+
+import pandas as pd
+
+from backtest import ParameterSweep, load_bars
+from backtest.sweep import DEFAULT_SPACE, grid, sample
+from lib import get_timeframe
+
+
+def parse_param(text: str):
+    """'chave=v1,v2' -> lista de valores; 'chave=min:max' -> intervalo (tupla)"""
+    key, _, values = text.partition('=')
+    if ':' in values:
+        low, high = (json.loads(value) for value in values.split(':', 1))
+        return key.strip(), (low, high)
+    return key.strip(), [json.loads(value) for value in values.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('bars', help='Arquivo de barras (.csv ou .npy)')
+    parser.add_argument('--symbol', required=True, help='Símbolo das barras (custos de symbols_config)')
+    parser.add_argument('--timeframe', default='M1', help='Timeframe das barras do arquivo')
+    parser.add_argument('--template', help='Template de bot_templates.json')
+    parser.add_argument('--config', help='Arquivo JSON com a config base do bot')
+    parser.add_argument('--param', action='append', default=[], help='Parâmetro a variar (chave=v1,v2 ou chave=min:max)')
+    parser.add_argument('--random', type=int, help='Número de configs sorteadas (busca aleatória)')
+    parser.add_argument('--seed', type=int, help='Semente da busca aleatória')
+    parser.add_argument('--replay', action='store_true', help='Replay barra a barra em vez da estratégia vetorizada')
+    parser.add_argument('--workers', type=int, help='Processos (padrão: número de CPUs)')
+    parser.add_argument('--min-trades', type=int, default=10, help='Mínimo de trades para entrar no topo do ranking')
+    parser.add_argument('--balance', type=float, default=10000.0, help='Saldo inicial')
+    parser.add_argument('--warmup', type=int, default=100, help='Barras de aquecimento')
+    parser.add_argument('--top', type=int, default=20, help='Quantas configs mostrar')
+    parser.add_argument('--out', help='CSV com o ranking completo')
+    args = parser.parse_args()
+
+    if args.config:
+        with open(args.config, encoding='utf-8') as f:
+            base_config = json.load(f)
+    else:
+        with open('bot_templates.json', encoding='utf-8') as f:
+            base_config = json.load(f)[args.template or 'btc_auto_trade']
+
+    space = dict(parse_param(text) for text in args.param) or DEFAULT_SPACE
+    if args.random:
+        configs = sample(space, args.random, args.seed)
+    elif any(isinstance(values, tuple) for values in space.values()):
+        parser.error('Intervalos min:max exigem --random')
+    else:
+        configs = grid(space)
+
+    sweep = ParameterSweep(
+        args.symbol, load_bars(args.bars), get_timeframe(args.timeframe),
+        initial_balance=args.balance, warmup=args.warmup, workers=args.workers,
+        mode='replay' if args.replay else 'vectorized'
+    )
+    print(f"Varrendo {len(configs)} configs de {args.symbol} em {sweep.workers} processos...")
+    results = sweep.run(base_config, configs, min_trades=args.min_trades)
+
+    columns = ['rank', 'profit_factor', 'max_drawdown_pct', 'net_profit', 'total_trades', 'win_rate']
+    print("=" * 100)
+    for result in results[:args.top]:
+        metrics = '  '.join(f"{column}={result[column]}" for column in columns)
+        print(f"{metrics}  {result['params']}")
+    print("=" * 100)
+
+    if args.out:
+        frame = pd.DataFrame([dict(result.pop('params'), **result) for result in results])
+        frame.to_csv(args.out, index=False)
+        print(f"Ranking gravado em {args.out}")
+
+
+if __name__ == "__main__":
+    main()
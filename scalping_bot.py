@@ -3,12 +3,14 @@ Bot de Scalping - Implementação básica
 Logica simples de scalping baseada em indicadores técnicos
 """
 
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5
 import time
 import threading
 from datetime import datetime
 import logging
 
+from services.tick_store import tick_recorder
+
 logger = logging.getLogger(__name__)
 
 class ScalpingBot:
@@ -68,6 +70,7 @@ class ScalpingBot:
             tick = mt5.symbol_info_tick(self.symbol)
             if not tick:
                 return {"error": "Falha ao obter dados do símbolo"}
+            tick_recorder.record(self.symbol, tick)
 
             # Simulação de análise
             current_price = tick.ask if tick.ask > 0 else tick.bid
@@ -4,5 +4,7 @@ Business logic services
 from .market_service import MarketService
 from .trading_service import TradingService
 from .cache_service import CacheService
+from .bar_cache import BarCache
+from .bar_store import BarStore
 
-__all__ = ["MarketService", "TradingService", "CacheService"]
+__all__ = ["MarketService", "TradingService", "CacheService", "BarCache", "BarStore"]
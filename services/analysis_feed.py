@@ -0,0 +1,162 @@
+"""
+Live analysis feed - in-process pub/sub of bot analyses
+
+Bots publish each analysis once. The feed keeps the last analyses of every
+bot (a bounded deque per bot) and a bounded ring of the most recent analyses
+of all bots in arrival order, which is time order. Reading the latest ``k``
+analyses walks the ring from its newest end instead of merging and sorting
+the caches of every bot.
+
+Subscribers (the SSE endpoint) get a bounded queue of their own. A subscriber
+that falls behind loses its oldest queued analyses, never blocking the bots.
+Every analysis gets a sequence number, so a reconnecting client can ask for
+what it missed (``since``).
+"""
+import itertools
+import logging
+import queue
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Análises mantidas por bot
+DEFAULT_PER_BOT = 20
+# Análises recentes de todos os bots (anel global)
+DEFAULT_RECENT = 500
+# Capacidade da fila de cada assinante
+DEFAULT_SUBSCRIBER_QUEUE = 100
+
+
+class FeedSubscription:
+    """Queue of ``(seq, analysis)`` published after the subscription"""
+
+    def __init__(self, bot_id: Optional[str], maxsize: int):
+        self.bot_id = bot_id
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def get(self, timeout: Optional[float] = None):
+        """Next ``(seq, analysis)``; raises ``queue.Empty`` on timeout"""
+        return self.queue.get(timeout=timeout)
+
+    def _offer(self, item) -> None:
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                # Assinante lento: descarta a mais antiga
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+class AnalysisFeed:
+    """Bounded per-bot and global analysis buffers with live subscribers"""
+
+    def __init__(
+        self,
+        per_bot: int = DEFAULT_PER_BOT,
+        recent: int = DEFAULT_RECENT,
+        subscriber_queue: int = DEFAULT_SUBSCRIBER_QUEUE
+    ):
+        self.per_bot = per_bot
+        self.subscriber_queue = subscriber_queue
+        self._by_bot: Dict[str, deque] = {}
+        self._recent: deque = deque(maxlen=recent)  # (seq, analysis), mais antiga à esquerda
+        self._subscribers: List[FeedSubscription] = []
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stats = {
+            'published': 0,
+        }
+
+    def publish(self, bot_id: str, analysis: Dict) -> int:
+        """
+        Store an analysis and hand it to the subscribers
+
+        Returns:
+            Sequence number of the analysis
+        """
+        with self._lock:
+            seq = next(self._seq)
+            entry = (seq, analysis)
+            bot_analyses = self._by_bot.get(bot_id)
+            if bot_analyses is None:
+                bot_analyses = self._by_bot[bot_id] = deque(maxlen=self.per_bot)
+            bot_analyses.append(analysis)
+            self._recent.append(entry)
+            self._stats['published'] += 1
+            subscribers = [
+                subscription for subscription in self._subscribers
+                if subscription.bot_id is None or subscription.bot_id == bot_id
+            ]
+
+        for subscription in subscribers:
+            subscription._offer(entry)
+        return seq
+
+    def latest(self, limit: int = 30, bot_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Most recent analyses, newest first
+
+        Args:
+            limit: Maximum number of analyses
+            bot_ids: Only analyses of these bots (e.g. the running ones)
+        """
+        bot_ids = set(bot_ids) if bot_ids is not None else None
+        result = []
+        with self._lock:
+            for _, analysis in reversed(self._recent):
+                if bot_ids is None or analysis.get('bot_id') in bot_ids:
+                    result.append(analysis)
+                    if len(result) >= limit:
+                        break
+        return result
+
+    def since(self, seq: int, bot_id: Optional[str] = None) -> List[tuple]:
+        """``(seq, analysis)`` published after ``seq`` still in the ring, oldest first"""
+        missed = []
+        with self._lock:
+            for entry in reversed(self._recent):
+                if entry[0] <= seq:
+                    break
+                if bot_id is None or entry[1].get('bot_id') == bot_id:
+                    missed.append(entry)
+        missed.reverse()
+        return missed
+
+    def bot_analyses(self, bot_id: str) -> List[Dict]:
+        """Last analyses of one bot, oldest first"""
+        with self._lock:
+            return list(self._by_bot.get(bot_id, ()))
+
+    def subscribe(self, bot_id: Optional[str] = None) -> FeedSubscription:
+        """Receive every analysis published from now on (optionally of one bot)"""
+        subscription = FeedSubscription(bot_id, self.subscriber_queue)
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: FeedSubscription) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                'bots': len(self._by_bot),
+                'recent': len(self._recent),
+                'subscribers': len(self._subscribers),
+                'dropped': sum(subscription.dropped for subscription in self._subscribers),
+            }
+
+
+# Instância global
+analysis_feed = AnalysisFeed()
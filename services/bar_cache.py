@@ -0,0 +1,263 @@
+"""
+Shared OHLCV bar cache - one incremental MT5 feed per (symbol, timeframe)
+
+Every consumer (bots, trading engine, market service and routes) reads bars
+through the global ``bar_cache`` instead of calling ``mt5.copy_rates_from_pos``
+on its own. Each series is fetched in full once and afterwards only the bars
+newer than the last cached bar are requested from the terminal.
+
+While the gateway is routed to another module (backtests) the cache keeps a
+separate set of series for it, always synced (``max_age`` 0), so simulated
+and live bars never mix.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from core.mt5_gateway import mt5, mt5_gateway
+
+logger = logging.getLogger(__name__)
+
+# Janela mínima mantida por série, para que pedidos pequenos compartilhem o mesmo fetch
+DEFAULT_MIN_BARS = 100
+# Idade máxima (segundos) de uma série antes de consultar o terminal de novo
+DEFAULT_MAX_AGE = 1.0
+
+
+def timeframe_seconds(timeframe: int) -> int:
+    """
+    Duration in seconds of an MT5 timeframe constant
+
+    Args:
+        timeframe: MT5 timeframe constant (mt5.TIMEFRAME_*)
+
+    Returns:
+        Bar duration in seconds
+    """
+    if timeframe == mt5.TIMEFRAME_W1:
+        return 7 * 86400
+    if timeframe == mt5.TIMEFRAME_MN1:
+        return 30 * 86400
+    # Timeframes horários/diários usam o bit 0x4000 + número de horas
+    if timeframe & 0x4000:
+        return (timeframe & 0x3FFF) * 3600
+    return timeframe * 60
+
+
+class _BarSeries:
+    """Cached bars of a single (symbol, timeframe)"""
+
+    def __init__(self, capacity: int):
+        self.rates: Optional[np.ndarray] = None
+        self.capacity = capacity
+        self.exhausted = False  # MT5 não tem mais histórico do que o cacheado
+        self.synced_at = 0.0
+        self.lock = threading.Lock()
+
+
+class BarCache:
+    """Process-wide cache of MT5 rates keyed by (symbol, timeframe)"""
+
+    def __init__(self, min_bars: int = DEFAULT_MIN_BARS, max_age: float = DEFAULT_MAX_AGE):
+        self.min_bars = min_bars
+        self.max_age = max_age
+        self._series: Dict[Tuple[str, int], _BarSeries] = {}
+        # (módulo desviado, séries dele) enquanto o gateway está desviado
+        self._routed: Optional[Tuple[object, Dict[Tuple[str, int], _BarSeries]]] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'full_fetches': 0,
+            'incremental_fetches': 0,
+            'errors': 0,
+        }
+
+    def _table(self) -> Dict[Tuple[str, int], _BarSeries]:
+        """Series of the live terminal, or of the module the gateway is routed to"""
+        routed = mt5_gateway.routed
+        with self._lock:
+            if routed is None:
+                self._routed = None
+                return self._series
+            if self._routed is None or self._routed[0] is not routed:
+                self._routed = (routed, {})
+            return self._routed[1]
+
+    def _get_series(self, symbol: str, timeframe: int) -> _BarSeries:
+        key = (symbol, timeframe)
+        table = self._table()
+        with self._lock:
+            series = table.get(key)
+            if series is None:
+                series = _BarSeries(self.min_bars)
+                table[key] = series
+            return series
+
+    def get_rates(
+        self,
+        symbol: str,
+        timeframe: int,
+        count: int,
+        max_age: Optional[float] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Get the latest ``count`` bars of a series
+
+        Drop-in replacement for ``mt5.copy_rates_from_pos(symbol, timeframe, 0, count)``.
+        The returned array is a read-only view shared by every caller.
+
+        Args:
+            symbol: Symbol name
+            timeframe: MT5 timeframe constant
+            count: Number of bars
+            max_age: Seconds a cached series may be served without asking MT5
+                (defaults to the cache-wide ``max_age``)
+
+        Returns:
+            Read-only structured array with the same dtype as MT5 rates,
+            or None if MT5 returned no data and nothing is cached
+        """
+        if count <= 0:
+            return None
+
+        max_age = self.max_age if max_age is None else max_age
+        if mt5_gateway.routed is not None:
+            max_age = 0
+        series = self._get_series(symbol, timeframe)
+
+        with series.lock:
+            needs_full = (
+                series.rates is None
+                or (count > len(series.rates) and not series.exhausted)
+            )
+
+            if needs_full:
+                self._full_fetch(series, symbol, timeframe, count)
+            elif time.monotonic() - series.synced_at >= max_age:
+                self._incremental_fetch(series, symbol, timeframe)
+            else:
+                self._count('hits')
+
+            if series.rates is None or len(series.rates) == 0:
+                return None
+            return series.rates[-count:]
+
+    def last_bar_time(self, symbol: str, timeframe: int) -> Optional[int]:
+        """
+        Open time (MT5 server epoch) of the newest cached bar, without touching MT5
+
+        Args:
+            symbol: Symbol name
+            timeframe: MT5 timeframe constant
+
+        Returns:
+            Bar time or None if the series was never fetched
+        """
+        series = self._table().get((symbol, timeframe))
+        if series is None or series.rates is None or len(series.rates) == 0:
+            return None
+        return int(series.rates['time'][-1])
+
+    def invalidate(self, symbol: Optional[str] = None, timeframe: Optional[int] = None) -> int:
+        """
+        Drop cached series so the next read performs a full fetch
+
+        Args:
+            symbol: Only series of this symbol (all symbols if None)
+            timeframe: Only series of this timeframe (all timeframes if None)
+
+        Returns:
+            Number of series dropped
+        """
+        table = self._table()
+        with self._lock:
+            keys = [
+                key for key in table
+                if (symbol is None or key[0] == symbol)
+                and (timeframe is None or key[1] == timeframe)
+            ]
+            for key in keys:
+                del table[key]
+        return len(keys)
+
+    def get_stats(self) -> dict:
+        """
+        Cache counters and cached series
+
+        Returns:
+            Dictionary with hit/fetch counters and per-series sizes
+        """
+        with self._lock:
+            series = {
+                f"{symbol}:{timeframe}": len(s.rates) if s.rates is not None else 0
+                for (symbol, timeframe), s in self._series.items()
+            }
+            return {**self._stats, 'series': series}
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _full_fetch(self, series: _BarSeries, symbol: str, timeframe: int, count: int) -> None:
+        """Replace the series with the latest ``capacity`` bars from MT5 (capacity only grows)"""
+        series.capacity = max(series.capacity, count)
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, series.capacity)
+        self._count('full_fetches')
+
+        if rates is None or len(rates) == 0:
+            self._count('errors')
+            logger.warning(f"Bar cache: sem dados para {symbol} tf={timeframe}: {mt5.last_error()}")
+            return
+
+        rates.flags.writeable = False
+        series.rates = rates
+        series.exhausted = len(rates) < series.capacity
+        series.synced_at = time.monotonic()
+
+    def _incremental_fetch(self, series: _BarSeries, symbol: str, timeframe: int) -> None:
+        """Fetch only the bars at or after the last cached bar and merge them"""
+        cached = series.rates
+        last_time = cached['time'][-1]
+
+        # Estimativa pelo relógio local desde o último sync (independe do fuso do servidor);
+        # +2 cobre a barra em formação e a que pode ter fechado no intervalo
+        elapsed = time.monotonic() - series.synced_at
+        probe = int(elapsed // timeframe_seconds(timeframe)) + 2
+
+        while True:
+            fresh = mt5.copy_rates_from_pos(symbol, timeframe, 0, probe)
+            self._count('incremental_fetches')
+
+            if fresh is None or len(fresh) == 0:
+                # Mantém a série antiga; a próxima leitura tenta de novo
+                self._count('errors')
+                logger.warning(f"Bar cache: falha ao atualizar {symbol} tf={timeframe}: {mt5.last_error()}")
+                return
+
+            if fresh['time'][0] <= last_time or len(fresh) < probe:
+                break
+
+            if probe >= series.capacity:
+                # Lacuna maior que a janela inteira: a resposta já é a série completa
+                fresh.flags.writeable = False
+                series.rates = fresh
+                series.synced_at = time.monotonic()
+                return
+
+            probe = min(probe * 2, series.capacity)
+
+        # Barras com tempo >= primeira barra nova são substituídas (a última pode estar em formação)
+        keep = np.searchsorted(cached['time'], fresh['time'][0], side='left')
+        merged = np.concatenate((cached[:keep], fresh.astype(cached.dtype, copy=False)))
+        if len(merged) > series.capacity:
+            merged = merged[-series.capacity:]
+
+        merged.flags.writeable = False
+        series.rates = merged
+        series.synced_at = time.monotonic()
+
+
+# Global instance
+bar_cache = BarCache()
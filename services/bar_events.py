@@ -0,0 +1,193 @@
+"""
+Bar-close events - trigger analysis when a bar closes instead of polling
+
+One monitor job on the central scheduler refreshes every subscribed
+(symbol, timeframe) series through the shared bar cache and compares the
+cached last-bar time with the last one seen. When a new bar opens the previous
+one has closed, and only the subscribers of that series are fired. An
+optional intrabar mode also fires a subscriber when the price of the forming
+bar has moved by at least a relative threshold since its last event.
+"""
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from .bar_cache import bar_cache
+from .bot_scheduler import bot_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Intervalo (segundos) entre verificações das séries assinadas
+DEFAULT_POLL_INTERVAL = 1.0
+MONITOR_JOB_ID = 'bar-events'
+
+
+class _Subscription:
+    """A subscriber of one series"""
+
+    def __init__(self, key: str, callback: Callable[[str], None], intrabar_threshold: Optional[float]):
+        self.key = key
+        self.callback = callback
+        self.intrabar_threshold = intrabar_threshold
+        self.last_price: Optional[float] = None
+
+
+class _SeriesState:
+    """Last bar seen for a (symbol, timeframe) and its subscribers"""
+
+    def __init__(self):
+        self.last_time: Optional[int] = None
+        self.subscribers: Dict[str, _Subscription] = {}
+
+
+class BarCloseMonitor:
+    """Detects bar closes per (symbol, timeframe) and fires the subscribers of each series"""
+
+    def __init__(self, scheduler=bot_scheduler, cache=bar_cache, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.scheduler = scheduler
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self._series: Dict[Tuple[str, int], _SeriesState] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'polls': 0,
+            'bar_closes': 0,
+            'intrabar_events': 0,
+            'callbacks': 0,
+            'errors': 0,
+        }
+
+    def subscribe(
+        self,
+        key: str,
+        symbol: str,
+        timeframe: int,
+        callback: Callable[[str], None],
+        intrabar_threshold: Optional[float] = None
+    ) -> None:
+        """
+        Fire ``callback`` whenever a bar of the series closes
+
+        Args:
+            key: Subscriber id (e.g. the bot id); re-subscribing replaces it
+            symbol: Symbol name
+            timeframe: MT5 timeframe constant
+            callback: Called with the event reason ('bar_close' or 'intrabar')
+            intrabar_threshold: Also fire when the forming bar's price moves by this
+                fraction (e.g. 0.001 = 0.1%) since the subscriber's last event
+        """
+        with self._lock:
+            self._remove(key)
+            state = self._series.setdefault((symbol, timeframe), _SeriesState())
+            state.subscribers[key] = _Subscription(key, callback, intrabar_threshold)
+            if not self.scheduler.has_job(MONITOR_JOB_ID):
+                self.scheduler.schedule(MONITOR_JOB_ID, self._poll_job, self.poll_interval, delay=0)
+
+    def unsubscribe(self, key: str) -> bool:
+        """
+        Remove a subscriber (the monitor job stops when nobody is subscribed)
+
+        Returns:
+            True if the subscriber existed
+        """
+        with self._lock:
+            removed = self._remove(key)
+            if not self._series:
+                self.scheduler.cancel(MONITOR_JOB_ID)
+        return removed
+
+    def poll(self) -> int:
+        """
+        Check every subscribed series once
+
+        Returns:
+            Number of callbacks fired
+        """
+        with self._lock:
+            series = list(self._series.items())
+            self._stats['polls'] += 1
+
+        fired = 0
+        for (symbol, timeframe), state in series:
+            try:
+                rates = self.cache.get_rates(symbol, timeframe, 2)
+            except Exception as e:
+                rates = None
+                logger.error(f"Bar events: erro ao atualizar {symbol} tf={timeframe}: {e}")
+            if rates is None or len(rates) == 0:
+                self._count('errors')
+                continue
+
+            bar_time = int(rates['time'][-1])
+            price = float(rates['close'][-1])
+            closed = state.last_time is not None and bar_time > state.last_time
+            state.last_time = bar_time
+            if closed:
+                self._count('bar_closes')
+
+            for subscription in list(state.subscribers.values()):
+                reason = self._reason(subscription, closed, price)
+                if reason is None:
+                    continue
+                subscription.last_price = price
+                if reason == 'intrabar':
+                    self._count('intrabar_events')
+                try:
+                    subscription.callback(reason)
+                    fired += 1
+                except Exception as e:
+                    self._count('errors')
+                    logger.error(f"Bar events: erro no callback de {subscription.key}: {e}")
+
+        with self._lock:
+            self._stats['callbacks'] += fired
+        return fired
+
+    def _poll_job(self) -> None:
+        # Job do scheduler: a contagem de poll() não é um atraso
+        self.poll()
+
+    def get_stats(self) -> dict:
+        """
+        Event counters and subscribed series
+
+        Returns:
+            Dictionary with counters and subscribers per series
+        """
+        with self._lock:
+            series = {
+                f"{symbol}:{timeframe}": sorted(state.subscribers)
+                for (symbol, timeframe), state in self._series.items()
+            }
+            return {**self._stats, 'series': series}
+
+    @staticmethod
+    def _reason(subscription: _Subscription, closed: bool, price: float) -> Optional[str]:
+        if closed:
+            return 'bar_close'
+        threshold = subscription.intrabar_threshold
+        if not threshold:
+            return None
+        if subscription.last_price is None:
+            # Primeira observação: só registra o preço de referência
+            subscription.last_price = price
+            return None
+        if abs(price - subscription.last_price) >= threshold * subscription.last_price:
+            return 'intrabar'
+        return None
+
+    def _remove(self, key: str) -> bool:
+        for series_key, state in list(self._series.items()):
+            if state.subscribers.pop(key, None) is not None:
+                if not state.subscribers:
+                    del self._series[series_key]
+                return True
+        return False
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+
+# Global instance
+bar_close_monitor = BarCloseMonitor()
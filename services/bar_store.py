@@ -0,0 +1,499 @@
+"""
+Local on-disk bar store - one append-only columnar file per (symbol, timeframe)
+
+Bars are kept as fixed-width records in the MT5 rates dtype (``<symbol>/<TF>.bin``
+under the store root) and read back through ``np.memmap``: a slice of years of
+M1 is a view of the page cache, with no copying or parsing. Next to each file
+an index (``<TF>.json``) records the row count and the time spans already
+synced from MT5 (``coverage``); spans not covered are the gaps that
+``backfill`` fetches. Holes inside a covered span are market closures.
+
+New bars are appended in place (the newest stored bar may be rewritten while it
+is still forming). Backfilling older history writes the merged bars to a new
+generation of the file (``<TF>.<n>.bin``), recorded in the index; the mapped
+file is never replaced, so views returned by ``read`` stay valid. The old
+generation is deleted once the index points at the new one (on Windows a
+file that is still mapped cannot be deleted: it is retried on later writes
+and when the store is reopened).
+"""
+import glob
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from core.mt5_gateway import mt5
+
+from services.bar_cache import timeframe_seconds
+
+logger = logging.getLogger(__name__)
+
+# Formato das barras do MT5 (copy_rates_*): registros de 48 bytes
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8'),
+], align=False)
+
+DEFAULT_ROOT = "data/bars"
+# Barras pedidas ao MT5 na primeira sincronização de uma série
+DEFAULT_INITIAL_BARS = 10000
+
+_TIMEFRAME_NAMES = {
+    'M1': 'TIMEFRAME_M1', 'M5': 'TIMEFRAME_M5', 'M15': 'TIMEFRAME_M15', 'M30': 'TIMEFRAME_M30',
+    'H1': 'TIMEFRAME_H1', 'H4': 'TIMEFRAME_H4', 'D1': 'TIMEFRAME_D1', 'W1': 'TIMEFRAME_W1',
+    'MN1': 'TIMEFRAME_MN1',
+}
+
+
+def timeframe_name(timeframe: int) -> str:
+    """Short name of an MT5 timeframe constant (M1, H4, ...), used in file names"""
+    for name, constant in _TIMEFRAME_NAMES.items():
+        if getattr(mt5, constant, None) == timeframe:
+            return name
+    return f"TF{timeframe}"
+
+
+def as_rates(rates: np.ndarray) -> np.ndarray:
+    """Rates in the store dtype, sorted by time, one bar per time (last one wins)"""
+    rates = np.asarray(rates)
+    if rates.dtype != RATES_DTYPE:
+        converted = np.zeros(len(rates), dtype=RATES_DTYPE)
+        for name in RATES_DTYPE.names:
+            if rates.dtype.names and name in rates.dtype.names:
+                converted[name] = rates[name]
+        rates = converted
+    if len(rates) > 1 and not (np.diff(rates['time']) > 0).all():
+        # np.unique fica com a primeira ocorrência: inverte para manter a mais recente
+        reversed_rates = rates[::-1]
+        _, first = np.unique(reversed_rates['time'], return_index=True)
+        rates = reversed_rates[first]
+    return rates
+
+
+def _merge_spans(spans: List[List[int]]) -> List[List[int]]:
+    merged: List[List[int]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _to_datetime(epoch: int) -> datetime:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+
+class _StoredSeries:
+    """File, index and current memory map of one (symbol, timeframe)"""
+
+    def __init__(self, base: str, bar_seconds: int):
+        self.base = base
+        self.index_path = base + '.json'
+        self.bar_seconds = bar_seconds
+        self.generation = 0
+        self.rows = 0
+        self.coverage: List[List[int]] = []
+        self.mapped: Optional[np.ndarray] = None
+        # Gerações antigas ainda não apagadas (mapeadas por algum leitor no Windows)
+        self.stale: List[str] = []
+        self.lock = threading.RLock()
+
+    @property
+    def data_path(self) -> str:
+        return self.generation_path(self.generation)
+
+    def generation_path(self, generation: int) -> str:
+        # Geração 0 mantém o nome original do arquivo
+        return f"{self.base}.bin" if generation == 0 else f"{self.base}.{generation}.bin"
+
+
+class BarStore:
+    """Append-only bar files per (symbol, timeframe) with memory-mapped reads"""
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+        self._series: Dict[Tuple[str, int], _StoredSeries] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'appended_bars': 0,
+            'rewrites': 0,
+            'mt5_fetches': 0,
+            'reads': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Arquivos e índice
+    # ------------------------------------------------------------------
+
+    def _get_series(self, symbol: str, timeframe: int) -> _StoredSeries:
+        key = (symbol, timeframe)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                base = os.path.join(self.root, symbol, timeframe_name(timeframe))
+                series = _StoredSeries(base, timeframe_seconds(timeframe))
+                self._load_index(series)
+                self._remove_stale(series)
+                self._series[key] = series
+            return series
+
+    def _load_index(self, series: _StoredSeries) -> None:
+        """Read the index, repairing it when the data file does not match"""
+        index = None
+        if os.path.exists(series.index_path):
+            try:
+                with open(series.index_path, encoding='utf-8') as f:
+                    index = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Bar store: índice ilegível {series.index_path} - {e}")
+
+        generations = self._generations_on_disk(series)
+        if index is not None and index.get('generation', 0) in generations:
+            series.generation = index.get('generation', 0)
+        elif generations:
+            # Sem índice válido: a geração mais nova é a última gravada por completo
+            series.generation = max(generations)
+        series.stale = [series.generation_path(g) for g in generations if g != series.generation]
+
+        size = os.path.getsize(series.data_path) if os.path.exists(series.data_path) else 0
+        if size % RATES_DTYPE.itemsize:
+            # Escrita interrompida no meio de um registro: descarta o pedaço
+            size -= size % RATES_DTYPE.itemsize
+            with open(series.data_path, 'r+b') as f:
+                f.truncate(size)
+            logger.warning(f"Bar store: registro incompleto removido de {series.data_path}")
+        rows = size // RATES_DTYPE.itemsize
+
+        series.rows = rows
+        if index is not None and index.get('rows') == rows and index.get('generation', 0) == series.generation:
+            series.coverage = [list(span) for span in index.get('coverage', [])]
+        else:
+            # Índice ausente ou de outra versão do arquivo: cobertura = trechos contíguos dos dados
+            series.coverage = self._contiguous_spans(series)
+            if rows:
+                self._save_index(series)
+
+    @staticmethod
+    def _generations_on_disk(series: _StoredSeries) -> List[int]:
+        generations = [0] if os.path.exists(series.generation_path(0)) else []
+        for path in glob.glob(glob.escape(series.base) + '.*.bin'):
+            suffix = path[len(series.base) + 1:-len('.bin')]
+            if suffix.isdigit():
+                generations.append(int(suffix))
+        return sorted(generations)
+
+    def _remove_stale(self, series: _StoredSeries) -> None:
+        """Delete old generations (kept when still mapped somewhere, on Windows)"""
+        remaining = []
+        for path in series.stale:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.debug(f"Bar store: {path} ainda em uso, removido depois - {e}")
+                remaining.append(path)
+        series.stale = remaining
+
+    def _contiguous_spans(self, series: _StoredSeries) -> List[List[int]]:
+        times = self._map(series)['time']
+        if not len(times):
+            return []
+        breaks = np.flatnonzero(np.diff(times) > series.bar_seconds)
+        starts = np.r_[0, breaks + 1]
+        ends = np.r_[breaks, len(times) - 1]
+        spans = [[int(times[s]), int(times[e]) + series.bar_seconds] for s, e in zip(starts, ends)]
+        # A última barra pode ter sido gravada em formação
+        spans[-1][1] = int(times[-1])
+        return [span for span in spans if span[1] > span[0]]
+
+    def _save_index(self, series: _StoredSeries) -> None:
+        os.makedirs(os.path.dirname(series.index_path), exist_ok=True)
+        temp = series.index_path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({'rows': series.rows, 'generation': series.generation,
+                       'dtype': RATES_DTYPE.descr, 'coverage': series.coverage}, f)
+        os.replace(temp, series.index_path)
+
+    def _map(self, series: _StoredSeries) -> np.ndarray:
+        """Read-only memory map of the stored rows (remapped only when the file grew)"""
+        if series.rows == 0:
+            return np.zeros(0, dtype=RATES_DTYPE)
+        if series.mapped is None or len(series.mapped) != series.rows:
+            series.mapped = np.memmap(series.data_path, dtype=RATES_DTYPE, mode='r', shape=(series.rows,))
+        return series.mapped
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def read(
+        self,
+        symbol: str,
+        timeframe: int,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        count: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Stored bars of a series, as a view of the memory-mapped file
+
+        Args:
+            symbol: Symbol name
+            timeframe: MT5 timeframe constant
+            start: First bar time (epoch seconds, inclusive)
+            end: Last bar time (epoch seconds, inclusive)
+            count: Keep only the newest ``count`` bars of the range
+
+        Returns:
+            Read-only structured array (MT5 rates dtype); empty if nothing is stored
+        """
+        series = self._get_series(symbol, timeframe)
+        with series.lock:
+            rates = self._map(series)
+        self._stats['reads'] += 1
+
+        times = rates['time']
+        first = int(np.searchsorted(times, start, side='left')) if start is not None else 0
+        last = int(np.searchsorted(times, end, side='right')) if end is not None else len(rates)
+        if count is not None:
+            first = max(first, last - count)
+        return rates[first:last]
+
+    def coverage(self, symbol: str, timeframe: int) -> List[Tuple[int, int]]:
+        """Time spans ``[start, end)`` already synced from MT5"""
+        series = self._get_series(symbol, timeframe)
+        with series.lock:
+            return [tuple(span) for span in series.coverage]
+
+    def gaps(self, symbol: str, timeframe: int, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Spans of ``[start, end)`` the store has not synced yet
+
+        Returns:
+            List of ``(start, end)`` epoch spans to backfill
+        """
+        gaps = []
+        cursor = start
+        for span_start, span_end in self.coverage(symbol, timeframe):
+            if span_end <= cursor:
+                continue
+            if span_start >= end:
+                break
+            if span_start > cursor:
+                gaps.append((cursor, min(span_start, end)))
+            cursor = max(cursor, span_end)
+            if cursor >= end:
+                break
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def missing_bars(self, symbol: str, timeframe: int, start: Optional[int] = None,
+                     end: Optional[int] = None, min_seconds: Optional[int] = None) -> List[Tuple[int, int]]:
+        """
+        Holes between consecutive stored bars (market closures or lost bars)
+
+        Args:
+            min_seconds: Only holes at least this long (default: one bar)
+
+        Returns:
+            List of ``(first missing bar time, next stored bar time)``
+        """
+        series = self._get_series(symbol, timeframe)
+        times = np.asarray(self.read(symbol, timeframe, start, end)['time'])
+        if len(times) < 2:
+            return []
+        step = series.bar_seconds
+        holes = np.flatnonzero(np.diff(times) - step >= max(min_seconds or step, 1))
+        return [(int(times[i]) + step, int(times[i + 1])) for i in holes]
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def write(self, symbol: str, timeframe: int, rates: np.ndarray,
+              span: Optional[Tuple[int, int]] = None) -> int:
+        """
+        Store bars fetched from MT5
+
+        Bars newer than the stored ones are appended in place (the newest
+        stored bar is rewritten when the batch starts at its time); older
+        bars are merged by rewriting the file.
+
+        Args:
+            symbol: Symbol name
+            timeframe: MT5 timeframe constant
+            rates: Bars as returned by ``copy_rates_*``
+            span: Time span ``[start, end)`` the batch is complete for (default:
+                first to last bar); marks it as synced even where it has no bars
+
+        Returns:
+            Number of bars not stored before
+        """
+        rates = as_rates(rates if rates is not None else np.zeros(0, dtype=RATES_DTYPE))
+        series = self._get_series(symbol, timeframe)
+
+        with series.lock:
+            if span is None and len(rates):
+                span = (int(rates['time'][0]), int(rates['time'][-1]) + series.bar_seconds)
+
+            stored = self._map(series)
+            last_time = int(stored['time'][-1]) if len(stored) else None
+            if not len(rates):
+                added = 0
+            elif last_time is None or rates['time'][0] >= last_time:
+                added = self._append(series, rates, last_time)
+            else:
+                added = self._rewrite(series, stored, rates)
+            del stored
+
+            # A barra mais recente pode estar em formação (e barras futuras ainda podem chegar):
+            # a cobertura termina na abertura dela, para que seja sempre buscada de novo
+            newest = int(self._map(series)['time'][-1]) if series.rows else None
+            if span is not None and newest is not None:
+                span = (span[0], min(span[1], newest))
+            if span is not None and span[1] > span[0]:
+                series.coverage = _merge_spans(series.coverage + [list(span)])
+            self._save_index(series)
+            # Só depois de o índice apontar para a geração nova
+            self._remove_stale(series)
+
+        self._stats['appended_bars'] += added
+        return added
+
+    def _append(self, series: _StoredSeries, rates: np.ndarray, last_time: Optional[int]) -> int:
+        os.makedirs(os.path.dirname(series.data_path), exist_ok=True)
+        overwrite = last_time is not None and int(rates['time'][0]) == last_time
+        with open(series.data_path, 'r+b' if os.path.exists(series.data_path) else 'wb') as f:
+            # A última barra gravada pode ter estado em formação: é sobrescrita
+            f.seek((series.rows - 1 if overwrite else series.rows) * RATES_DTYPE.itemsize)
+            f.write(rates.tobytes())
+        series.rows += len(rates) - (1 if overwrite else 0)
+        series.mapped = None
+        return len(rates) - (1 if overwrite else 0)
+
+    def _rewrite(self, series: _StoredSeries, stored: np.ndarray, rates: np.ndarray) -> int:
+        known = np.isin(stored['time'], rates['time'])
+        merged = np.concatenate((np.asarray(stored[~known]), rates))
+        merged = merged[np.argsort(merged['time'], kind='stable')]
+
+        # Nova geração do arquivo: o atual pode estar mapeado por leitores
+        old_path = series.data_path
+        new_path = series.generation_path(series.generation + 1)
+        temp = new_path + '.tmp'
+        merged.tofile(temp)
+        os.replace(temp, new_path)
+        series.generation += 1
+        series.stale.append(old_path)
+        series.mapped = None
+        added = len(merged) - series.rows
+        series.rows = len(merged)
+        self._stats['rewrites'] += 1
+        return added
+
+    # ------------------------------------------------------------------
+    # Sincronização com o MT5
+    # ------------------------------------------------------------------
+
+    def update(self, symbol: str, timeframe: int, initial_bars: int = DEFAULT_INITIAL_BARS) -> int:
+        """
+        Fetch the bars newer than the stored ones (the latest ``initial_bars`` on first use)
+
+        Returns:
+            Number of new bars stored
+        """
+        series = self._get_series(symbol, timeframe)
+        stored = self.read(symbol, timeframe, count=1)
+        self._stats['mt5_fetches'] += 1
+        if not len(stored):
+            rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, initial_bars)
+            if rates is None or len(rates) == 0:
+                logger.warning(f"Bar store: MT5 sem barras de {symbol} {timeframe_name(timeframe)}")
+                return 0
+            return self.write(symbol, timeframe, rates)
+
+        last_time = int(stored['time'][-1])
+        date_to = datetime.now(timezone.utc) + timedelta(days=1)
+        rates = mt5.copy_rates_range(symbol, timeframe, _to_datetime(last_time), date_to)
+        if rates is None:
+            logger.warning(f"Bar store: falha ao atualizar {symbol} {timeframe_name(timeframe)}: {mt5.last_error()}")
+            return 0
+        if len(rates) == 0:
+            return 0
+        return self.write(symbol, timeframe, rates,
+                          span=(last_time, int(rates['time'][-1]) + series.bar_seconds))
+
+    def backfill(self, symbol: str, timeframe: int, start: int, end: Optional[int] = None) -> int:
+        """
+        Fetch from MT5 every gap of ``[start, end)`` (``end`` defaults to the newest stored bar)
+
+        Spans MT5 answers with no bars (market closed, no history) are marked as
+        synced, so they are not requested again.
+
+        Returns:
+            Number of bars added
+        """
+        if end is None:
+            newest = self.read(symbol, timeframe, count=1)
+            end = int(newest['time'][-1]) if len(newest) else int(datetime.now(timezone.utc).timestamp())
+
+        added = 0
+        for gap_start, gap_end in self.gaps(symbol, timeframe, start, end):
+            self._stats['mt5_fetches'] += 1
+            rates = mt5.copy_rates_range(symbol, timeframe, _to_datetime(gap_start), _to_datetime(gap_end - 1))
+            if rates is None:
+                logger.warning(
+                    f"Bar store: falha no backfill de {symbol} {timeframe_name(timeframe)} "
+                    f"{_to_datetime(gap_start)} - {_to_datetime(gap_end)}: {mt5.last_error()}"
+                )
+                continue
+            added += self.write(symbol, timeframe, rates, span=(gap_start, gap_end))
+        if added:
+            logger.info(f"Bar store: {added} barras de {symbol} {timeframe_name(timeframe)} recuperadas")
+        return added
+
+    def get_range(self, symbol: str, timeframe: int, start: int, end: int) -> np.ndarray:
+        """
+        Bars of ``[start, end]`` (inclusive, like ``copy_rates_range``), fetching only what is missing
+
+        Returns:
+            Memory-mapped view of the stored bars in the range
+        """
+        self.backfill(symbol, timeframe, start, end + 1)
+        return self.read(symbol, timeframe, start, end)
+
+    def history(self, symbol: str, timeframe: int, days: float) -> np.ndarray:
+        """
+        The last ``days`` of bars up to the newest one (training windows)
+
+        Only bars newer than the stored ones and gaps of the window are fetched
+        from MT5; the rest is read from disk.
+
+        Returns:
+            Memory-mapped view of the stored bars; empty if MT5 has none
+        """
+        self.update(symbol, timeframe)
+        newest = self.read(symbol, timeframe, count=1)
+        if not len(newest):
+            return newest
+        start = int(newest['time'][-1]) - int(days * 86400)
+        self.backfill(symbol, timeframe, start)
+        return self.read(symbol, timeframe, start=start)
+
+    def get_stats(self) -> Dict:
+        """Store counters and the stored series"""
+        with self._lock:
+            series = {
+                f"{symbol}:{timeframe_name(timeframe)}": {'bars': item.rows, 'spans': len(item.coverage)}
+                for (symbol, timeframe), item in self._series.items()
+            }
+        return {**self._stats, 'root': self.root, 'series': series}
+
+
+# Instância global do store
+bar_store = BarStore()
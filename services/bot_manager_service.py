@@ -4,17 +4,33 @@ Serviço para gerenciar múltiplos bots simultaneamente
 import uuid
 import json
 import sqlite3
-import time
-import threading
 from datetime import datetime
 from typing import Dict, List, Optional
 from threading import Lock
 import logging
 
+from core.config import settings
+from services.bar_cache import timeframe_seconds
+from services.bar_events import bar_close_monitor
+from services.bot_scheduler import bot_scheduler
+from services.bot_shards import BotShardPool
+from services.bot_strategy import ANALYSIS_BARS, evaluate_rules
+from services.positions_snapshot import positions_snapshot
+from utils.indicators import StreamingIndicators
+from lib import get_timeframe
+
 logger = logging.getLogger(__name__)
 
 DB_PATH = "mlp_data.db"
 
+# Intervalo padrão (segundos) entre análises de um bot e atraso aleatório máximo
+# somado a cada ciclo, para que bots criados juntos não disparem ao mesmo tempo
+DEFAULT_ANALYSIS_INTERVAL = 10
+DEFAULT_ANALYSIS_JITTER = 1.0
+# No modo 'bar_close' o ciclo periódico só é reserva caso um evento se perca:
+# roda uma barra (+ margem) depois da última análise
+BAR_CLOSE_FALLBACK_MARGIN = 5
+
 
 class BotInstance:
     """Representa uma instância de bot com seu próprio trading engine"""
@@ -28,209 +44,183 @@ class BotInstance:
         else:
             self.config = config
         self.trading_engine = trading_engine
+        if trading_engine is not None:
+            # Análises e trades do engine são atribuídos a este bot no rollup diário
+            trading_engine.bot_id = bot_id
         self.created_at = datetime.now()
         self.is_running = False
         self.status = {}
-        self.analysis_thread = None
-        self.stop_analysis = False
+        # Análise periódica roda como job do scheduler central (sem thread própria)
+        self.job_id = f"bot:{bot_id}"
+        self.analysis_interval = float(self.config.get('analysis_interval', DEFAULT_ANALYSIS_INTERVAL))
+        self.analysis_jitter = float(self.config.get('analysis_jitter', DEFAULT_ANALYSIS_JITTER))
+        # 'bar_close' (padrão): analisa quando fecha uma barra do timeframe do bot;
+        # 'interval': analisa a cada analysis_interval segundos
+        self.trigger_mode = self.config.get('trigger', 'bar_close')
+        self.intrabar_threshold = self.config.get('intrabar_threshold')
+        self.timeframe_name = self.config.get('timeframe', 'M1')
+        try:
+            self.timeframe = get_timeframe(self.timeframe_name)
+        except ValueError:
+            logger.warning(f"Bot {bot_id}: Timeframe inválido {self.timeframe_name}, usando M1")
+            self.timeframe_name, self.timeframe = 'M1', get_timeframe('M1')
+        # Estado incremental dos indicadores (atualizado só com barras novas)
+        self.indicators = StreamingIndicators()
+        # Pool de processos (BotShardPool) quando a análise roda fora deste processo
+        self.shard_pool = None
         logger.info(f"Bot {bot_id}: Criado com config type={type(self.config)}")
         
     def start_analysis_loop(self):
-        """Inicia loop de análise em thread separada"""
-        if self.analysis_thread and self.analysis_thread.is_alive():
-            logger.warning(f"Bot {self.bot_id}: Thread de análise já está rodando")
+        """Agenda a análise periódica do bot no scheduler central"""
+        if bot_scheduler.has_job(self.job_id):
+            logger.warning(f"Bot {self.bot_id}: Análise já está agendada")
             return
-        
-        self.stop_analysis = False
-        self.analysis_thread = threading.Thread(target=self._analysis_loop, daemon=True)
-        self.analysis_thread.start()
-        logger.info(f"Bot {self.bot_id}: Thread de análise iniciada")
-    
+
+        if self.shard_pool is not None:
+            self.shard_pool.add_bot(self)
+
+        if self.trigger_mode == 'bar_close':
+            fallback = timeframe_seconds(self.timeframe) + BAR_CLOSE_FALLBACK_MARGIN
+            bot_scheduler.schedule(self.job_id, self._analysis_step, fallback, jitter=self.analysis_jitter, delay=0)
+            bar_close_monitor.subscribe(
+                self.bot_id, self.config.get('symbol', 'BTCUSDc'), self.timeframe,
+                self._on_bar_event, intrabar_threshold=self.intrabar_threshold
+            )
+            logger.info(f"Bot {self.bot_id}: Análise a cada fechamento de barra {self.timeframe_name}")
+        else:
+            bot_scheduler.schedule(self.job_id, self._analysis_step, self.analysis_interval, jitter=self.analysis_jitter)
+            logger.info(f"Bot {self.bot_id}: Análise agendada a cada {self.analysis_interval:.0f}s")
+
     def stop_analysis_loop(self):
-        """Para loop de análise"""
-        self.stop_analysis = True
-        if self.analysis_thread:
-            self.analysis_thread.join(timeout=5)
-            logger.info(f"Bot {self.bot_id}: Thread de análise parada")
-    
-    def _analysis_loop(self):
-        """Loop de análise que roda em thread separada"""
+        """Remove a análise do scheduler (uma execução em andamento termina, sem novas)"""
+        bar_close_monitor.unsubscribe(self.bot_id)
+        if bot_scheduler.cancel(self.job_id):
+            logger.info(f"Bot {self.bot_id}: Análise desagendada")
+        if self.shard_pool is not None:
+            self.shard_pool.remove_bot(self.bot_id)
+
+    def _on_bar_event(self, reason: str):
+        """Evento do monitor de barras: antecipa o próximo ciclo de análise"""
+        logger.debug(f"Bot {self.bot_id}: Evento {reason}, disparando análise")
+        bot_scheduler.trigger(self.job_id)
+
+    def _analysis_step(self):
+        """Um ciclo de análise (executado por um worker do scheduler)"""
+        if not self.is_running:
+            return
+
+        # Garantir que config é um dicionário
+        config = self.config
+        if isinstance(config, str):
+            config = json.loads(config)
+
+        symbol = config.get('symbol', 'BTCUSDc')
+        logger.debug(f"Bot {self.bot_id} ({symbol}): Ciclo de análise...")
         try:
-            # Garantir que config é um dicionário
-            config = self.config
-            if isinstance(config, str):
-                config = json.loads(config)
-                
-            symbol = config.get('symbol', 'BTCUSDc')
-            logger.info(f"Bot {self.bot_id}: Iniciando análise contínua de {symbol}")
-            logger.info(f"Bot {self.bot_id}: Thread ID: {threading.current_thread().ident}")
+            logger.info(f"Bot {self.bot_id}: Iniciando análise, config type={type(self.config)}, config={self.config}")
+            
+            if self.shard_pool is not None:
+                # Modo multiprocesso: indicadores e sinal rodam no processo do shard
+                # do símbolo; o resultado volta por publish_analysis
+                self.shard_pool.submit(self)
+                return
+            
+            from services.bar_cache import bar_cache
+            
+            # Obter dados do mercado (cache compartilhado entre bots do mesmo símbolo)
+            rates = bar_cache.get_rates(symbol, self.timeframe, ANALYSIS_BARS)
+            
+            analysis = self.evaluate(rates)
+            if analysis is not None:
+                self.publish_analysis(analysis)
+            
         except Exception as e:
-            logger.error(f"Bot {self.bot_id}: Erro ao iniciar thread: {e}")
+            logger.error(f"Bot {self.bot_id}: Erro na análise - {e}")
             import traceback
+            logger.error(f"Bot {self.bot_id}: Traceback completo:")
             logger.error(traceback.format_exc())
-            return
+
+    def evaluate(self, rates) -> Optional[Dict]:
+        """
+        Indicadores e sinal da estratégia sobre as barras do bot
+
+        Args:
+            rates: Barras do timeframe do bot (array estruturado do MT5)
+
+        Returns:
+            Dict com signal, confidence, indicadores, trend e market_data,
+            ou None se não há barras
+        """
+        return evaluate_rules(self.indicators, rates, self.bot_id, self.config.get('symbol', 'BTCUSDc'))
+
+    def publish_analysis(self, analysis: Dict):
+        """
+        Grava a análise, publica no cache em tempo real e executa o trade
+
+        Roda sempre no processo dono da conexão com o terminal: no modo
+        multiprocesso o resultado de ``evaluate`` volta do worker para cá.
+        """
+        from services.mlp_storage import mlp_storage
+        from routes.bot_analysis_routes import add_analysis_to_cache
+
+        config = self.config
+        if isinstance(config, str):
+            config = json.loads(config)
+
+        symbol = config.get('symbol', 'BTCUSDc')
+        signal = analysis['signal']
+        confidence = analysis['confidence']
         
-        while not self.stop_analysis and self.is_running:
-            logger.debug(f"Bot {self.bot_id} ({symbol}): Loop de análise rodando...")
-            try:
-                logger.info(f"Bot {self.bot_id}: Iniciando análise, config type={type(self.config)}, config={self.config}")
-                
-                # Gerar análise usando o trading engine
-                import MetaTrader5 as mt5
-                from services.mlp_storage import mlp_storage
-                
-                # Obter dados do mercado
-                rates = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M1, 0, 100)
-                
-                if rates is not None and len(rates) > 0:
-                    # Aqui você pode chamar o método de análise do trading_engine
-                    # Por enquanto, vou criar uma análise básica
-                    import pandas as pd
-                    df = pd.DataFrame(rates)
-                    
-                    # Calcular indicadores básicos
-                    close = df['close'].values
-                    
-                    # RSI
-                    deltas = [close[i] - close[i-1] for i in range(1, len(close))]
-                    gains = [d if d > 0 else 0 for d in deltas]
-                    losses = [-d if d < 0 else 0 for d in deltas]
-                    avg_gain = sum(gains[-14:]) / 14 if len(gains) >= 14 else 0
-                    avg_loss = sum(losses[-14:]) / 14 if len(losses) >= 14 else 0
-                    rsi = 100 - (100 / (1 + (avg_gain / avg_loss))) if avg_loss > 0 else 50
-                    
-                    # SMA
-                    sma_20 = sum(close[-20:]) / 20 if len(close) >= 20 else close[-1]
-                    sma_50 = sum(close[-50:]) / 50 if len(close) >= 50 else close[-1]
-                    
-                    # Determinar sinal baseado em indicadores (lógica melhorada)
-                    signal = 'HOLD'
-                    confidence = 0.50
-                    
-                    logger.info(f"Bot {self.bot_id} ({symbol}): RSI={rsi:.1f}, Price={close[-1]:.2f}, SMA20={sma_20:.2f}, SMA50={sma_50:.2f}")
-                    
-                    # Sinais fortes (alta confiança)
-                    if rsi < 30:
-                        signal = 'BUY'
-                        confidence = 0.85
-                        logger.info(f"Bot {self.bot_id}: RSI < 30 → BUY 85%")
-                    elif rsi > 70:
-                        signal = 'SELL'
-                        confidence = 0.85
-                        logger.info(f"Bot {self.bot_id}: RSI > 70 → SELL 85%")
-                    # Sinais médios baseados em RSI
-                    elif rsi < 40:
-                        signal = 'BUY'
-                        confidence = 0.70
-                        logger.info(f"Bot {self.bot_id}: RSI < 40 → BUY 70%")
-                    elif rsi > 60:
-                        signal = 'SELL'
-                        confidence = 0.70
-                        logger.info(f"Bot {self.bot_id}: RSI > 60 → SELL 70%")
-                    # Sinais de tendência
-                    elif close[-1] > sma_20 > sma_50 and rsi > 50:
-                        signal = 'BUY'
-                        confidence = 0.65
-                        logger.info(f"Bot {self.bot_id}: Tendência Alta + RSI > 50 → BUY 65%")
-                    elif close[-1] < sma_20 < sma_50 and rsi < 50:
-                        signal = 'SELL'
-                        confidence = 0.65
-                        logger.info(f"Bot {self.bot_id}: Tendência Baixa + RSI < 50 → SELL 65%")
-                    else:
-                        logger.info(f"Bot {self.bot_id}: Nenhuma condição atendida → HOLD 50%")
-                    
-                    # Determinar trend
-                    if sma_20 > sma_50:
-                        trend = 'BULLISH'
-                    elif sma_20 < sma_50:
-                        trend = 'BEARISH'
-                    else:
-                        trend = 'NEUTRAL'
-                    
-                    # Salvar análise no banco com timestamp local do sistema
-                    # datetime.now() já retorna horário local do sistema
-                    
-                    analysis_data = {
-                        'symbol': symbol,
-                        'timeframe': 'M1',
-                        'signal': signal,
-                        'confidence': confidence,
-                        # Não passar timestamp, deixar o banco usar CURRENT_TIMESTAMP
-                        'indicators': json.dumps({
-                            'rsi': rsi,
-                            'sma_20': sma_20,
-                            'sma_50': sma_50
-                        }),
-                        'market_conditions': json.dumps({
-                            'trend': trend
-                        }),
-                        'market_data': json.dumps({
-                            'close': float(close[-1]),
-                            'open': float(df['open'].values[-1]),
-                            'high': float(df['high'].values[-1]),
-                            'low': float(df['low'].values[-1])
-                        })
-                    }
-                    
-                    # Salvar no banco de dados
-                    mlp_storage.add_analysis(analysis_data)
-                    
-                    # Adicionar ao cache em memória para exibição em tempo real
-                    from routes.bot_analysis_routes import add_analysis_to_cache
-                    cache_data = {
-                        'bot_id': self.bot_id,
-                        'symbol': symbol,
-                        'signal': signal,
-                        'confidence': confidence,
-                        'timestamp': datetime.now().isoformat(),
-                        'indicators': {
-                            'rsi': rsi,
-                            'sma_20': sma_20,
-                            'sma_50': sma_50
-                        },
-                        'market_conditions': {
-                            'trend': trend
-                        },
-                        'market_data': {
-                            'close': float(close[-1]),
-                            'open': float(df['open'].values[-1]),
-                            'high': float(df['high'].values[-1]),
-                            'low': float(df['low'].values[-1])
-                        }
-                    }
-                    add_analysis_to_cache(self.bot_id, cache_data)
-                    
-                    logger.info(f"Bot {self.bot_id} ({symbol}): Análise salva - {signal} ({confidence*100:.1f}%)")
-                    
-                    # Executar trade se auto_execute estiver habilitado
-                    logger.info(f"Bot {self.bot_id}: ========== VERIFICANDO TRADING AUTOMÁTICO ==========")
-                    auto_execute = config.get('trading', {}).get('auto_execute', False)
-                    logger.info(f"Bot {self.bot_id}: config.trading = {config.get('trading', {})}")
-                    logger.info(f"Bot {self.bot_id}: auto_execute={auto_execute}, signal={signal}, confidence={confidence:.2f}")
-                    
-                    if auto_execute:
-                        logger.info(f"Bot {self.bot_id}: Chamando _execute_trade_if_needed...")
-                        current_price = float(close[-1])
-                        self._execute_trade_if_needed(symbol, signal, confidence, current_price, config)
-                    else:
-                        logger.info(f"Bot {self.bot_id}: Trading automático desabilitado")
-                
-                # Aguardar 10 segundos antes da próxima análise
-                time.sleep(10)
-                
-            except Exception as e:
-                logger.error(f"Bot {self.bot_id}: Erro na análise - {e}")
-                import traceback
-                logger.error(f"Bot {self.bot_id}: Traceback completo:")
-                logger.error(traceback.format_exc())
-                time.sleep(10)
+        # Salvar análise no banco com timestamp local do sistema
+        # datetime.now() já retorna horário local do sistema
+        analysis_data = {
+            'symbol': symbol,
+            'bot_id': self.bot_id,
+            'timeframe': self.timeframe_name,
+            'signal': signal,
+            'confidence': confidence,
+            # Não passar timestamp, deixar o banco usar CURRENT_TIMESTAMP
+            'indicators': json.dumps(analysis['indicators']),
+            'market_conditions': json.dumps(analysis['market_conditions']),
+            'market_data': json.dumps(analysis['market_data'])
+        }
+        
+        # Salvar no banco de dados (gravação em lote, sem esperar o commit)
+        mlp_storage.queue_analysis(analysis_data)
+        
+        # Adicionar ao cache em memória para exibição em tempo real
+        cache_data = {
+            'bot_id': self.bot_id,
+            'symbol': symbol,
+            'signal': signal,
+            'confidence': confidence,
+            'timestamp': datetime.now().isoformat(),
+            'indicators': analysis['indicators'],
+            'market_conditions': analysis['market_conditions'],
+            'market_data': analysis['market_data']
+        }
+        add_analysis_to_cache(self.bot_id, cache_data)
         
-        logger.info(f"Bot {self.bot_id}: Loop de análise encerrado")
+        logger.info(f"Bot {self.bot_id} ({symbol}): Análise salva - {signal} ({confidence*100:.1f}%)")
+        
+        # Executar trade se auto_execute estiver habilitado
+        logger.info(f"Bot {self.bot_id}: ========== VERIFICANDO TRADING AUTOMÁTICO ==========")
+        auto_execute = config.get('trading', {}).get('auto_execute', False)
+        logger.info(f"Bot {self.bot_id}: config.trading = {config.get('trading', {})}")
+        logger.info(f"Bot {self.bot_id}: auto_execute={auto_execute}, signal={signal}, confidence={confidence:.2f}")
+        
+        if auto_execute:
+            logger.info(f"Bot {self.bot_id}: Chamando _execute_trade_if_needed...")
+            current_price = analysis['market_data']['close']
+            self._execute_trade_if_needed(symbol, signal, confidence, current_price, config)
+        else:
+            logger.info(f"Bot {self.bot_id}: Trading automático desabilitado")
     
     def _execute_trade_if_needed(self, symbol: str, signal: str, confidence: float, price: float, config: dict):
         """Executa trade automaticamente se condições forem atendidas"""
         try:
-            import MetaTrader5 as mt5
+            from core.mt5_gateway import mt5
+            from core.mt5_memo import mt5_memo
             
             # Verificar se confiança é suficiente
             min_confidence = config.get('signals', {}).get('min_confidence', 0.65)
@@ -242,8 +232,8 @@ class BotInstance:
             if signal == 'HOLD':
                 return
             
-            # Verificar se já tem posição aberta
-            positions = mt5.positions_get(symbol=symbol)
+            # Verificar se já tem posição aberta (snapshot invalidado a cada ordem enviada)
+            positions = positions_snapshot.get().by_symbol(symbol)
             max_positions = config.get('max_positions', 1)
             
             if positions and len(positions) >= max_positions:
@@ -257,17 +247,19 @@ class BotInstance:
             magic_number = config.get('advanced', {}).get('magic_number', 123456)
             deviation = config.get('advanced', {}).get('deviation', 10)
             
-            # Determinar tipo de ordem
+            # Determinar tipo de ordem (especificação e tick vêm do memo do MT5)
+            tick = mt5_memo.symbol_info_tick(symbol)
+            point = mt5_memo.symbol_info(symbol).point
             if signal == 'BUY':
                 order_type = mt5.ORDER_TYPE_BUY
-                price_order = mt5.symbol_info_tick(symbol).ask
-                sl = price_order - (stop_loss_pips * mt5.symbol_info(symbol).point)
-                tp = price_order + (take_profit_pips * mt5.symbol_info(symbol).point)
+                price_order = tick.ask
+                sl = price_order - (stop_loss_pips * point)
+                tp = price_order + (take_profit_pips * point)
             else:  # SELL
                 order_type = mt5.ORDER_TYPE_SELL
-                price_order = mt5.symbol_info_tick(symbol).bid
-                sl = price_order + (stop_loss_pips * mt5.symbol_info(symbol).point)
-                tp = price_order - (take_profit_pips * mt5.symbol_info(symbol).point)
+                price_order = tick.bid
+                sl = price_order + (stop_loss_pips * point)
+                tp = price_order - (take_profit_pips * point)
             
             # Criar request
             request = {
@@ -303,10 +295,15 @@ class BotInstance:
             import traceback
             logger.error(traceback.format_exc())
     
-    def get_status(self) -> Dict:
-        """Obtém status do bot"""
+    def get_status(self, positions_view=None) -> Dict:
+        """
+        Obtém status do bot
+
+        Args:
+            positions_view: Snapshot de posições já obtido (``get_all_bots`` usa um só para todos os bots)
+        """
         try:
-            import MetaTrader5 as mt5
+            from core.mt5_gateway import mt5_gateway
             
             uptime = datetime.now() - self.created_at
             
@@ -315,39 +312,33 @@ class BotInstance:
             if isinstance(config_dict, str):
                 config_dict = json.loads(config_dict)
             
-            # Buscar posições do MT5 pelo magic number e símbolo
+            # Posições do bot pelo magic number ou pelo bot_id no comentário, no símbolo do bot
             symbol = config_dict.get('symbol', '')
             magic_number = config_dict.get('advanced', {}).get('magic_number', 123456)
             
+            if positions_view is None:
+                positions_view = positions_snapshot.get()
+            bot_positions = positions_view.for_bot(self.bot_id, magic=magic_number, symbol=symbol)
+            
             positions = []
-            positions_count = 0
+            positions_count = len(bot_positions)
             total_profit = 0.0
-            
-            if mt5.initialize():
-                # Buscar todas as posições do símbolo
-                mt5_positions = mt5.positions_get(symbol=symbol)
-                
-                if mt5_positions:
-                    for pos in mt5_positions:
-                        # Filtrar por magic number (comentário contém bot_id)
-                        if pos.magic == magic_number or self.bot_id[:8] in pos.comment:
-                            positions_count += 1
-                            total_profit += pos.profit
-                            
-                            positions.append({
-                                'ticket': pos.ticket,
-                                'symbol': pos.symbol,
-                                'type': 'BUY' if pos.type == 0 else 'SELL',
-                                'volume': pos.volume,
-                                'price_open': pos.price_open,
-                                'price_current': pos.price_current,
-                                'sl': pos.sl,
-                                'tp': pos.tp,
-                                'profit': pos.profit,
-                                'swap': pos.swap,
-                                'comment': pos.comment,
-                                'time': datetime.fromtimestamp(pos.time).isoformat()
-                            })
+            for pos in bot_positions:
+                total_profit += pos.profit
+                positions.append({
+                    'ticket': pos.ticket,
+                    'symbol': pos.symbol,
+                    'type': 'BUY' if pos.type == 0 else 'SELL',
+                    'volume': pos.volume,
+                    'price_open': pos.price_open,
+                    'price_current': pos.price_current,
+                    'sl': pos.sl,
+                    'tp': pos.tp,
+                    'profit': pos.profit,
+                    'swap': pos.swap,
+                    'comment': pos.comment,
+                    'time': datetime.fromtimestamp(pos.time).isoformat()
+                })
             
             return {
                 'bot_id': self.bot_id,
@@ -355,7 +346,7 @@ class BotInstance:
                 'is_running': self.is_running,
                 'created_at': self.created_at.isoformat(),
                 'uptime': str(uptime),
-                'mt5_connected': mt5.initialize(),
+                'mt5_connected': mt5_gateway.connected,
                 'positions_count': positions_count,
                 'performance': {
                     'total_profit': total_profit,
@@ -380,9 +371,18 @@ class BotInstance:
 class BotManagerService:
     """Gerenciador de múltiplos bots"""
     
-    def __init__(self):
+    def __init__(self, shard_workers: Optional[int] = None):
+        """
+        Args:
+            shard_workers: Processos worker para a análise dos bots (padrão:
+                BOT_SHARD_WORKERS; 0 = análise no próprio processo)
+        """
         self.bots: Dict[str, BotInstance] = {}
         self.lock = Lock()
+        if shard_workers is None:
+            shard_workers = settings.BOT_SHARD_WORKERS
+        # Modo multiprocesso: bots distribuídos entre os workers pelo hash do símbolo
+        self.shard_pool = BotShardPool(shard_workers) if shard_workers > 0 else None
         self._load_bots_from_db()
     
     def _save_bot_to_db(self, bot_id: str, config: Dict, is_running: bool = False):
@@ -472,18 +472,10 @@ class BotManagerService:
                     
                     # Recriar bot (mas não iniciar automaticamente)
                     try:
-                        from bot.api_controller import BotAPIController
-                        bot_controller = BotAPIController()
-                        
-                        trading_config = bot_controller.trading_engine.config.trading
-                        trading_config.symbol = config.get('symbol', 'BTCUSDc')
-                        trading_config.lot_size = config.get('lot_size', 0.01)
-                        trading_config.take_profit_pips = int(config.get('take_profit', 5000))
-                        trading_config.stop_loss_pips = int(config.get('stop_loss', 10000))
-                        trading_config.max_positions = config.get('max_positions', 1)
-                        
-                        bot_instance = BotInstance(bot_id, config, bot_controller.trading_engine)
+                        from bot.runtime import create_bot_engine
+                        bot_instance = BotInstance(bot_id, config, create_bot_engine(config))
                         bot_instance.is_running = False  # Não iniciar automaticamente
+                        bot_instance.shard_pool = self.shard_pool
                         
                         self.bots[bot_id] = bot_instance
                         
@@ -509,21 +501,12 @@ class BotManagerService:
             bot_id = str(uuid.uuid4())[:8]
             
             # Importar aqui para evitar circular import
-            from bot.api_controller import BotAPIController
-            
-            # Criar nova instância do bot
-            bot_controller = BotAPIController()
+            from bot.runtime import create_bot_engine
             
-            # Configurar o bot
-            trading_config = bot_controller.trading_engine.config.trading
-            trading_config.symbol = config.get('symbol', 'BTCUSDc')
-            trading_config.lot_size = config.get('lot_size', 0.01)
-            trading_config.take_profit_pips = int(config.get('take_profit', 5000))
-            trading_config.stop_loss_pips = int(config.get('stop_loss', 10000))
-            trading_config.max_positions = config.get('max_positions', 1)
-            
-            # Criar instância do bot
-            bot_instance = BotInstance(bot_id, config, bot_controller.trading_engine)
+            # Criar instância do bot (engine headless: config de trading própria,
+            # modelo, barras e gateway MT5 compartilhados)
+            bot_instance = BotInstance(bot_id, config, create_bot_engine(config))
+            bot_instance.shard_pool = self.shard_pool
             
             self.bots[bot_id] = bot_instance
             
@@ -578,10 +561,10 @@ class BotManagerService:
                 symbol = bot.config.get('symbol', 'BTCUSDc')
                 
                 # Importar MT5 para fechar posições
-                import MetaTrader5 as mt5
+                from core.mt5_gateway import mt5
                 
-                # Obter posições do símbolo
-                positions = mt5.positions_get(symbol=symbol)
+                # Obter posições do símbolo (snapshot atualizado agora: as posições vão ser fechadas)
+                positions = positions_snapshot.get(max_age=0).by_symbol(symbol)
                 
                 if positions:
                     logger.info(f"Bot {bot_id}: {len(positions)} posições encontradas para {symbol}")
@@ -678,15 +661,28 @@ class BotManagerService:
         return self.bots.get(bot_id)
     
     def get_all_bots(self) -> List[Dict]:
-        """Obtém todos os bots"""
+        """Obtém todos os bots (uma consulta de posições ao MT5 para todos)"""
+        positions_view = positions_snapshot.get()
         with self.lock:
-            return [bot.get_status() for bot in self.bots.values()]
+            return [bot.get_status(positions_view) for bot in self.bots.values()]
     
     def get_active_bots(self) -> List[Dict]:
         """Obtém apenas bots ativos"""
+        positions_view = positions_snapshot.get()
         with self.lock:
-            return [bot.get_status() for bot in self.bots.values() if bot.is_running]
+            return [bot.get_status(positions_view) for bot in self.bots.values() if bot.is_running]
     
+    def get_scheduler_stats(self) -> Dict:
+        """Estatísticas do scheduler central (intervalos, execuções, overruns por bot), dos eventos de barra, do snapshot de posições, dos workers de análise e da fila de escrita"""
+        from services.mlp_storage import mlp_storage
+        return {
+            **bot_scheduler.get_stats(),
+            'bar_events': bar_close_monitor.get_stats(),
+            'positions_snapshot': positions_snapshot.get_stats(),
+            'shards': self.shard_pool.get_stats() if self.shard_pool is not None else None,
+            'storage_writer': mlp_storage.get_writer_stats()
+        }
+
     def emergency_stop_all(self) -> Dict:
         """Para todos os bots em emergência"""
         with self.lock:
@@ -696,6 +692,7 @@ class BotManagerService:
                     if bot.is_running:
                         bot.trading_engine.emergency_close_all()
                         bot.is_running = False
+                        bot.stop_analysis_loop()
                         results[bot_id] = 'stopped'
                     else:
                         results[bot_id] = 'already_stopped'
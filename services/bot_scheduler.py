@@ -0,0 +1,308 @@
+"""
+Central bot scheduler - all periodic bot work on one bounded worker pool
+
+Replaces the thread-per-bot loops (``BotInstance`` analysis threads and
+``TradingEngine`` monitor threads). A single dispatcher thread keeps a
+priority queue of next-due times and hands due jobs to a fixed-size
+``ThreadPoolExecutor``; hundreds of bots therefore use a handful of OS threads
+and stopping a bot is just removing its job.
+
+Each job has its own interval and jitter. The next run is queued only when the
+current one finishes, so a job never runs concurrently with itself; a run that
+takes longer than its interval is counted (and logged) as an overrun. A job
+changes the delay until its next run only by returning ``Reschedule(seconds)``;
+any other return value (counts, flags) is ignored.
+
+Inference jobs (model predictions) have no jitter: their deadlines are snapped
+to a grid of their interval, so engines with the same interval come due at the
+same instant, and the dispatcher also takes the inference jobs due within
+``INFERENCE_WINDOW``. The whole group is announced to the batched inference
+service and evaluated as one matrix.
+"""
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from core.config import settings
+from .inference_service import inference_service
+
+logger = logging.getLogger(__name__)
+
+# Jobs de inferência que vencem até este tempo (segundos) depois do atual saem
+# no mesmo tick, para formar um lote só
+INFERENCE_WINDOW = 0.02
+
+
+@dataclass(frozen=True)
+class Reschedule:
+    """Return value of a job that overrides the delay until its next run"""
+
+    seconds: float
+
+
+class _Job:
+    """A periodic job and its counters"""
+
+    def __init__(self, job_id: str, func: Callable[[], Any], interval: float,
+                 jitter: float, inference: bool):
+        self.job_id = job_id
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.inference = inference
+        self.generation = 0       # incrementado a cada (re)agendamento: entradas antigas do heap são ignoradas
+        self.running = False
+        self.retrigger = False    # trigger() chegou durante uma execução
+        self.cancelled = False
+        self.runs = 0
+        self.errors = 0
+        self.overruns = 0
+        self.last_run: Optional[float] = None
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'interval': self.interval,
+            'jitter': self.jitter,
+            'running': self.running,
+            'runs': self.runs,
+            'errors': self.errors,
+            'overruns': self.overruns,
+            'last_duration': round(self.last_duration, 4),
+            'max_duration': round(self.max_duration, 4),
+        }
+
+
+class BotScheduler:
+    """Priority-queue scheduler running periodic jobs on a bounded thread pool"""
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or settings.BOT_SCHEDULER_WORKERS
+        self._jobs: Dict[str, _Job] = {}
+        self._heap: List[tuple] = []  # (due, seq, job_id, generation)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._stopped = False
+
+    def schedule(
+        self,
+        job_id: str,
+        func: Callable[[], Any],
+        interval: float,
+        jitter: float = 0.0,
+        delay: Optional[float] = None,
+        inference: bool = False
+    ) -> None:
+        """
+        Add (or replace) a periodic job
+
+        Args:
+            job_id: Unique job name (e.g. ``bot:<bot_id>``)
+            func: Callable run on the worker pool; may return ``Reschedule(seconds)``
+                to override the delay until its next run (other return values are ignored)
+            interval: Seconds between runs
+            jitter: Up to this many seconds are added at random to each delay,
+                spreading bots with the same interval
+            delay: Seconds until the first run (defaults to a random value in [0, jitter])
+            inference: The job makes a model prediction: ``jitter`` is ignored,
+                deadlines are aligned to the interval grid and jobs due in the
+                same tick are announced to the batched inference service
+        """
+        job = _Job(job_id, func, interval, jitter, inference)
+        with self._cond:
+            old = self._jobs.get(job_id)
+            if old is not None:
+                old.cancelled = True
+            self._jobs[job_id] = job
+            if inference:
+                first = self._aligned(time.monotonic() + (delay or 0.0), interval)
+            else:
+                first = time.monotonic() + (delay if delay is not None else random.uniform(0, jitter))
+            self._push(job, first)
+            self._ensure_running()
+            self._cond.notify()
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Remove a job; a run in progress finishes but the job is never run again
+
+        Returns:
+            True if the job existed
+        """
+        with self._cond:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return False
+            job.cancelled = True
+            return True
+
+    def trigger(self, job_id: str) -> bool:
+        """
+        Make a job due now (or right after the run in progress finishes)
+
+        Returns:
+            True if the job exists
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            if job.running:
+                job.retrigger = True
+            else:
+                self._push(job, time.monotonic())
+                self._cond.notify()
+            return True
+
+    def has_job(self, job_id: str) -> bool:
+        return job_id in self._jobs
+
+    def get_stats(self) -> dict:
+        """
+        Scheduler and per-job counters
+
+        Returns:
+            Dictionary with pool size, queued entries and job counters
+        """
+        with self._cond:
+            return {
+                'max_workers': self.max_workers,
+                'jobs': {job_id: job.to_dict() for job_id, job in self._jobs.items()},
+                'queued': len(self._heap),
+                'running': sum(1 for job in self._jobs.values() if job.running),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop dispatching and shut the worker pool down"""
+        with self._cond:
+            self._stopped = True
+            for job in self._jobs.values():
+                job.cancelled = True
+            self._jobs.clear()
+            self._heap.clear()
+            self._cond.notify()
+            executor, self._executor = self._executor, None
+            self._dispatcher = None
+        if executor:
+            executor.shutdown(wait=wait)
+
+    @staticmethod
+    def _aligned(due: float, grid: float) -> float:
+        """Nearest point of the ``grid`` to ``due`` that is still in the future"""
+        if grid <= 0:
+            return due
+        slot = round(due / grid) * grid
+        return slot if slot > time.monotonic() else slot + grid
+
+    def _push(self, job: _Job, due: float) -> None:
+        job.generation += 1
+        heapq.heappush(self._heap, (due, next(self._seq), job.job_id, job.generation))
+
+    def _ensure_running(self) -> None:
+        self._stopped = False
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='bot-worker')
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name='bot-scheduler', daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                if self._stopped or threading.current_thread() is not self._dispatcher:
+                    return
+
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+
+                wait = self._heap[0][0] - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+
+                now = time.monotonic()
+                due = []
+                early = []
+                while self._heap and self._heap[0][0] <= now + INFERENCE_WINDOW:
+                    entry = heapq.heappop(self._heap)
+                    _, _, job_id, generation = entry
+                    job = self._jobs.get(job_id)
+                    if job is None or job.cancelled or generation != job.generation or job.running:
+                        continue  # entrada obsoleta
+                    if entry[0] > now and not job.inference:
+                        early.append(entry)  # só inferência é antecipada
+                        continue
+                    job.running = True
+                    due.append(job)
+                for entry in early:
+                    heapq.heappush(self._heap, entry)
+
+                executor = self._executor
+
+            if not due or executor is None:
+                continue
+
+            inference_jobs = sum(1 for job in due if job.inference)
+            if inference_jobs > 1:
+                inference_service.expect(inference_jobs)
+
+            for job in due:
+                try:
+                    executor.submit(self._run_job, job)
+                except RuntimeError:
+                    return  # pool encerrado por shutdown()
+
+    def _run_job(self, job: _Job) -> None:
+        start = time.monotonic()
+        next_delay = None
+        try:
+            next_delay = job.func()
+        except Exception as e:
+            job.errors += 1
+            logger.error(f"Scheduler: erro no job {job.job_id}: {e}", exc_info=True)
+
+        duration = time.monotonic() - start
+        with self._cond:
+            job.running = False
+            job.runs += 1
+            job.last_run = start
+            job.last_duration = duration
+            job.max_duration = max(job.max_duration, duration)
+
+            if duration > job.interval:
+                job.overruns += 1
+                logger.warning(
+                    f"Scheduler: {job.job_id} levou {duration:.2f}s (intervalo {job.interval:.2f}s)"
+                )
+
+            if job.cancelled or self._stopped:
+                return
+
+            if job.retrigger:
+                job.retrigger = False
+                delay = 0.0
+            else:
+                delay = next_delay.seconds if isinstance(next_delay, Reschedule) else job.interval
+                if job.inference:
+                    # Engines com o mesmo intervalo vencem juntos (um lote por tick)
+                    self._push(job, self._aligned(time.monotonic() + delay, delay))
+                    self._cond.notify()
+                    return
+                if job.jitter:
+                    delay += random.uniform(0, job.jitter)
+            self._push(job, time.monotonic() + delay)
+            self._cond.notify()
+
+
+# Global instance
+bot_scheduler = BotScheduler()
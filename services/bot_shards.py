@@ -0,0 +1,631 @@
+"""
+Process-sharded bot analysis - bots spread over worker processes by symbol
+
+Under the GIL every bot analysis (indicators, rules, predictions) runs in the
+one Python process that owns the MT5 terminal. ``BotShardPool`` moves the
+analysis of the managed bots to ``BOT_SHARD_WORKERS`` worker processes:
+
+* Each symbol belongs to one shard (``crc32(symbol) % workers``), so all the
+  bots of a symbol, and their incremental indicator state, live in the same
+  worker.
+* Market data stays with the terminal owner: ``submit`` only queues a due bot;
+  a dispatcher thread gathers the bots due within ``DISPATCH_WINDOW``, reads
+  each (symbol, timeframe) once from ``bar_cache`` into its ``SharedBarRing``
+  (a ring buffer in ``multiprocessing.shared_memory``) and sends one
+  ``analyze`` message per shard for all of its due bots. Workers read the
+  bars from the ring and never talk to MT5.
+* The result of an analysis, including the order intent (signal and
+  confidence), goes back to the main process, where
+  ``BotInstance.publish_analysis`` stores it and sends the order through the
+  MT5 gateway.
+
+Workers are started as ``python -m services.bot_shards`` and connect back
+over an authenticated ``multiprocessing.connection``. A plain
+``multiprocessing`` spawn would re-run the main module (``app.py``), which
+connects to the terminal on import. A worker that dies is restarted on the
+next analysis of one of its bots; an analysis without an answer after
+``pending_timeout`` no longer blocks its bot (a late answer is discarded).
+"""
+import atexit
+import itertools
+import logging
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from services.bar_store import RATES_DTYPE, as_rates, timeframe_name
+from services.bot_strategy import ANALYSIS_BARS, evaluate_rules
+from utils.indicators import StreamingIndicators
+
+logger = logging.getLogger(__name__)
+
+# Barras guardadas por anel (símbolo, timeframe)
+DEFAULT_RING_CAPACITY = 512
+# Espera máxima (segundos) pela conexão dos workers ao iniciar
+DEFAULT_START_TIMEOUT = 30.0
+# Espera (segundos) pelo encerramento de um worker antes de matá-lo
+STOP_TIMEOUT = 5.0
+# Janela (segundos) em que os bots que vencem juntos são enviados num só lote
+DISPATCH_WINDOW = 0.02
+# Tempo (segundos) sem resposta do worker depois do qual o bot pode ser reenviado
+DEFAULT_PENDING_TIMEOUT = 30.0
+# Variável de ambiente com a chave de autenticação passada aos workers
+AUTHKEY_ENV = 'BOT_SHARD_AUTHKEY'
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Cabeçalho do anel (int64): sequência (ímpar durante uma escrita), total de barras escritas, capacidade
+_HEADER = 3
+_HEADER_BYTES = 8 * _HEADER
+_SEQ, _TOTAL, _CAPACITY = range(_HEADER)
+# Tentativas de leitura enquanto o anel está sendo escrito
+_READ_RETRIES = 1000
+
+
+def shard_for(symbol: str, workers: int) -> int:
+    """
+    Shard of a symbol (stable across processes and restarts, unlike ``hash``)
+
+    Args:
+        symbol: Trading symbol
+        workers: Number of shards
+
+    Returns:
+        Shard index in ``range(workers)``
+    """
+    return zlib.crc32(symbol.encode()) % workers
+
+
+class SharedBarRing:
+    """
+    Ring buffer of the last bars of one (symbol, timeframe) in shared memory
+
+    Single writer (the main process) and any number of readers. A write is
+    bracketed by a sequence counter: readers retry while it is odd or when
+    it changed during their copy.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((_HEADER,), dtype='<i8', buffer=shm.buf)
+        self.capacity = int(self.header[_CAPACITY])
+        self.bars = np.ndarray((self.capacity,), dtype=RATES_DTYPE, buffer=shm.buf, offset=_HEADER_BYTES)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @classmethod
+    def create(cls, name: Optional[str] = None, capacity: int = DEFAULT_RING_CAPACITY) -> 'SharedBarRing':
+        """New empty ring (the creator writes to it and unlinks it)"""
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_HEADER_BYTES + capacity * RATES_DTYPE.itemsize)
+        header = np.ndarray((_HEADER,), dtype='<i8', buffer=shm.buf)
+        header[:] = (0, 0, capacity)
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedBarRing':
+        """Existing ring created by another process (read side)"""
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13: sem o unregister, o resource tracker do leitor
+            # apagaria o segmento do dono quando o leitor terminasse
+            shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls(shm, owner=False)
+
+    @property
+    def total(self) -> int:
+        """Bars written since creation (a rewritten forming bar counts once)"""
+        return int(self.header[_TOTAL])
+
+    def write(self, rates: np.ndarray) -> int:
+        """
+        Append the bars newer than the last one in the ring
+
+        The last bar of the ring (the forming one) is overwritten when
+        ``rates`` carries it again.
+
+        Args:
+            rates: Bars sorted by time (MT5 rates)
+
+        Returns:
+            Number of bars written
+        """
+        if rates is None or len(rates) == 0:
+            return 0
+        rates = as_rates(rates)
+        total = self.total
+        start = total
+        if total:
+            last_time = self.bars[(total - 1) % self.capacity]['time']
+            rates = rates[rates['time'] >= last_time]
+            if not len(rates):
+                return 0
+            if rates['time'][0] == last_time:
+                start = total - 1
+        rates = rates[-self.capacity:]
+
+        self.header[_SEQ] += 1
+        self.bars[(start + np.arange(len(rates))) % self.capacity] = rates
+        self.header[_TOTAL] = start + len(rates)
+        self.header[_SEQ] += 1
+        return len(rates)
+
+    def read(self, count: int) -> Optional[np.ndarray]:
+        """
+        Copy of the last ``count`` bars, oldest first
+
+        Returns:
+            Bars (fewer if the ring holds fewer), or None if no consistent
+            copy could be taken while the writer was busy
+        """
+        for _ in range(_READ_RETRIES):
+            seq = int(self.header[_SEQ])
+            if seq % 2 == 0:
+                total = int(self.header[_TOTAL])
+                n = min(count, total, self.capacity)
+                rates = self.bars[(total - n + np.arange(n)) % self.capacity]
+                if int(self.header[_SEQ]) == seq:
+                    return rates
+            time.sleep(0)
+        return None
+
+    def close(self) -> None:
+        del self.header, self.bars
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class _Shard:
+    """One worker process, its connection and the bots assigned to it"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[subprocess.Popen] = None
+        self.conn = None
+        self.send_lock = threading.Lock()
+        self.bots: Dict[str, object] = {}
+
+    @property
+    def alive(self) -> bool:
+        return self.conn is not None and self.process is not None and self.process.poll() is None
+
+    def send(self, message) -> None:
+        with self.send_lock:
+            self.conn.send(message)
+
+
+class BotShardPool:
+    """Worker processes running the analysis of the bots, sharded by symbol"""
+
+    def __init__(self, workers: Optional[int] = None, ring_capacity: int = DEFAULT_RING_CAPACITY,
+                 start_timeout: float = DEFAULT_START_TIMEOUT, pending_timeout: float = DEFAULT_PENDING_TIMEOUT):
+        """
+        Args:
+            workers: Worker processes (default ``BOT_SHARD_WORKERS``, at least 1)
+            ring_capacity: Bars kept per shared ring
+            start_timeout: Seconds to wait for the workers to connect
+            pending_timeout: Seconds after which an unanswered analysis no
+                longer keeps its bot from being submitted again
+        """
+        self.workers = max(1, workers or settings.BOT_SHARD_WORKERS)
+        self.ring_capacity = max(ring_capacity, ANALYSIS_BARS)
+        self.start_timeout = start_timeout
+        self.pending_timeout = pending_timeout
+        self._shards = [_Shard(index) for index in range(self.workers)]
+        self._rings: Dict[Tuple[str, int], SharedBarRing] = {}
+        self._ring_lock = threading.Lock()
+        self._ring_names = itertools.count()
+        # Bots com análise em andamento -> (lote, instante do submit)
+        self._pending: Dict[str, Tuple[int, float]] = {}
+        # Bots aguardando o próximo lote do dispatcher
+        self._due: List[object] = []
+        self._batches = itertools.count(1)
+        self._wakeup = threading.Event()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._authkey = secrets.token_bytes(32)
+        self._started = False
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'batches': 0,
+            'completed': 0,
+            'skipped': 0,
+            'expired': 0,
+            'errors': 0,
+            'restarts': 0,
+            'total_ms': 0.0,
+        }
+
+    def shard_for(self, symbol: str) -> int:
+        """Shard index of a symbol in this pool"""
+        return shard_for(symbol, self.workers)
+
+    def start(self) -> None:
+        """Start the worker processes (idempotent; called by the first ``add_bot``)"""
+        with self._lock:
+            if self._started:
+                return
+            self._spawn(self._shards)
+            self._started = True
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name='bot-shards-dispatch', daemon=True)
+            self._dispatcher.start()
+        atexit.register(self.stop)
+        logger.info(f"Bot shards: {self.workers} processos worker iniciados")
+
+    def stop(self) -> None:
+        """Stop the workers and release the shared rings"""
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+            dispatcher, self._dispatcher = self._dispatcher, None
+        self._wakeup.set()
+        if dispatcher is not None:
+            dispatcher.join(STOP_TIMEOUT)
+        with self._lock:
+            for shard in self._shards:
+                self._stop_shard(shard)
+            self._pending.clear()
+            self._due.clear()
+        with self._ring_lock:
+            for ring in self._rings.values():
+                ring.close()
+            self._rings.clear()
+        logger.info("Bot shards: workers encerrados")
+
+    def add_bot(self, bot) -> None:
+        """Assign a bot (``BotInstance``) to the shard of its symbol"""
+        self.start()
+        symbol = bot.config.get('symbol', 'BTCUSDc')
+        shard = self._shards[self.shard_for(symbol)]
+        with self._lock:
+            shard.bots[bot.bot_id] = bot
+            self._pending.pop(bot.bot_id, None)
+        self._send(shard, ('add', bot.bot_id, symbol))
+
+    def remove_bot(self, bot_id: str) -> None:
+        """Drop a bot and its indicator state from its worker"""
+        with self._lock:
+            self._pending.pop(bot_id, None)
+            shard = next((s for s in self._shards if bot_id in s.bots), None)
+            if shard is None:
+                return
+            del shard.bots[bot_id]
+        self._send(shard, ('remove', bot_id))
+
+    def submit(self, bot) -> bool:
+        """
+        Queue the analysis of a bot for the next batch of its shard
+
+        The dispatcher publishes the bars and sends the batch; the result
+        comes back asynchronously to ``bot.publish_analysis``.
+
+        Returns:
+            False if the bot still has an analysis in flight (younger than
+            ``pending_timeout``) or is not assigned to this pool
+        """
+        symbol = bot.config.get('symbol', 'BTCUSDc')
+        shard = self._shards[self.shard_for(symbol)]
+        now = time.perf_counter()
+        with self._lock:
+            pending = self._pending.get(bot.bot_id)
+            if bot.bot_id not in shard.bots or (pending is not None and now - pending[1] < self.pending_timeout):
+                self._stats['skipped'] += 1
+                return False
+            if pending is not None:
+                # Worker travado ou resposta perdida: a resposta antiga, se vier, é descartada
+                self._stats['expired'] += 1
+                logger.warning(f"Bot {bot.bot_id}: sem resposta do worker {shard.index} há "
+                               f"{now - pending[1]:.0f}s, reenviando")
+            self._pending[bot.bot_id] = (0, now)
+            self._due.append(bot)
+        self._wakeup.set()
+        return True
+
+    def dispatch(self) -> int:
+        """
+        Send the queued bots: one bar read and ring write per (symbol,
+        timeframe) and one ``analyze`` message per shard
+
+        Returns:
+            Number of bots sent
+        """
+        from services.bar_cache import bar_cache
+
+        with self._lock:
+            due, self._due = self._due, []
+        if not due:
+            return 0
+
+        by_series: Dict[Tuple[str, int], List[object]] = {}
+        for bot in due:
+            by_series.setdefault((bot.config.get('symbol', 'BTCUSDc'), bot.timeframe), []).append(bot)
+
+        batches: Dict[int, List[Tuple[str, str]]] = {}
+        for (symbol, timeframe), bots in by_series.items():
+            try:
+                rates = bar_cache.get_rates(symbol, timeframe, ANALYSIS_BARS)
+            except Exception as e:
+                logger.error(f"Bot shards: erro ao ler barras de {symbol} {timeframe_name(timeframe)} - {e}")
+                rates = None
+            if rates is None or len(rates) == 0:
+                self._drop_pending(bot.bot_id for bot in bots)
+                continue
+            ring = self._ring(symbol, timeframe)
+            with self._ring_lock:
+                ring.write(rates)
+            batches.setdefault(self.shard_for(symbol), []).extend((bot.bot_id, ring.name) for bot in bots)
+
+        sent = 0
+        for index, items in batches.items():
+            batch = next(self._batches)
+            with self._lock:
+                for bot_id, _ in items:
+                    if bot_id in self._pending:
+                        self._pending[bot_id] = (batch, self._pending[bot_id][1])
+            if not self._send(self._shards[index], ('analyze', batch, ANALYSIS_BARS, items)):
+                self._drop_pending(bot_id for bot_id, _ in items)
+                continue
+            sent += len(items)
+            with self._lock:
+                self._stats['batches'] += 1
+                self._stats['submitted'] += len(items)
+        return sent
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            completed = stats.pop('total_ms')
+            return {
+                **stats,
+                'avg_ms': round(completed / stats['completed'], 3) if stats['completed'] else 0.0,
+                'workers': self.workers,
+                'started': self._started,
+                'pending': len(self._pending),
+                'rings': len(self._rings),
+                'shards': [
+                    {'index': shard.index, 'alive': shard.alive, 'bots': len(shard.bots),
+                     'pid': shard.process.pid if shard.process is not None else None}
+                    for shard in self._shards
+                ],
+            }
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            self._wakeup.wait()
+            if not self._started:
+                return
+            # Bots que vencem juntos (fechamento de barra) vão no mesmo lote
+            time.sleep(DISPATCH_WINDOW)
+            self._wakeup.clear()
+            try:
+                self.dispatch()
+            except Exception as e:
+                logger.error(f"Bot shards: erro ao despachar análises - {e}")
+
+    def _drop_pending(self, bot_ids) -> None:
+        with self._lock:
+            for bot_id in bot_ids:
+                self._pending.pop(bot_id, None)
+
+    def _ring(self, symbol: str, timeframe: int) -> SharedBarRing:
+        key = (symbol, timeframe)
+        with self._ring_lock:
+            ring = self._rings.get(key)
+            if ring is None:
+                # Nomes curtos: o macOS limita nomes de memória compartilhada a 31 caracteres
+                name = f"tm5-{os.getpid()}-{next(self._ring_names)}"
+                ring = self._rings[key] = SharedBarRing.create(name, self.ring_capacity)
+                logger.debug(f"Bot shards: anel {name} para {symbol} {timeframe_name(timeframe)}")
+            return ring
+
+    def _send(self, shard: _Shard, message) -> bool:
+        """Send to a shard, restarting its worker if it died"""
+        for attempt in range(2):
+            if not shard.alive:
+                if not self._restart(shard):
+                    return False
+            try:
+                shard.send(message)
+                return True
+            except (OSError, EOFError, AttributeError) as e:
+                logger.warning(f"Bot shards: worker {shard.index} inacessível - {e}")
+                shard.conn = None
+        return False
+
+    def _restart(self, shard: _Shard) -> bool:
+        with self._lock:
+            if shard.alive:
+                return True
+            if not self._started:
+                return False
+            logger.warning(f"Bot shards: reiniciando worker {shard.index}")
+            self._stop_shard(shard)
+            try:
+                self._spawn([shard])
+            except RuntimeError as e:
+                logger.error(f"Bot shards: {e}")
+                return False
+            self._stats['restarts'] += 1
+            for bot_id in shard.bots:
+                self._pending.pop(bot_id, None)
+            bots = [(bot_id, bot.config.get('symbol', 'BTCUSDc')) for bot_id, bot in shard.bots.items()]
+        # O estado dos indicadores morreu com o worker: os bots são registrados de novo
+        for bot_id, symbol in bots:
+            shard.send(('add', bot_id, symbol))
+        return True
+
+    def _spawn(self, shards: List[_Shard]) -> None:
+        listener = Listener(('127.0.0.1', 0), authkey=self._authkey)
+        host, port = listener.address
+        env = dict(os.environ, **{AUTHKEY_ENV: self._authkey.hex()})
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, (_PROJECT_ROOT, env.get('PYTHONPATH'))))
+        connections = {}
+
+        def accept():
+            for _ in shards:
+                conn = listener.accept()
+                _, index = conn.recv()
+                connections[index] = conn
+
+        try:
+            for shard in shards:
+                shard.process = subprocess.Popen(
+                    [sys.executable, '-m', 'services.bot_shards', str(shard.index), host, str(port)],
+                    cwd=_PROJECT_ROOT, env=env,
+                )
+            acceptor = threading.Thread(target=accept, name='bot-shards-accept', daemon=True)
+            acceptor.start()
+            acceptor.join(self.start_timeout)
+        finally:
+            listener.close()
+
+        if len(connections) < len(shards):
+            for shard in shards:
+                shard.conn = connections.get(shard.index)
+                self._stop_shard(shard)
+            raise RuntimeError(f"workers não conectaram em {self.start_timeout:.0f}s")
+
+        for shard in shards:
+            shard.conn = connections[shard.index]
+            threading.Thread(
+                target=self._read_results, args=(shard, shard.conn),
+                name=f"bot-shard-{shard.index}", daemon=True,
+            ).start()
+
+    def _stop_shard(self, shard: _Shard) -> None:
+        conn, process = shard.conn, shard.process
+        shard.conn = None
+        if conn is not None:
+            try:
+                with shard.send_lock:
+                    conn.send(None)
+            except (OSError, EOFError):
+                pass
+        if process is not None:
+            try:
+                process.wait(STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        if conn is not None:
+            conn.close()
+
+    def _read_results(self, shard: _Shard, conn) -> None:
+        """Results of one worker, published in the main process"""
+        while True:
+            try:
+                _, batch, results = conn.recv()
+            except (EOFError, OSError):
+                break
+            for bot_id, analysis, error in results:
+                with self._lock:
+                    pending = self._pending.get(bot_id)
+                    if pending is None or pending[0] != batch:
+                        # Resposta de um lote expirado (o bot já foi reenviado ou removido)
+                        continue
+                    del self._pending[bot_id]
+                    bot = shard.bots.get(bot_id)
+                    if error:
+                        self._stats['errors'] += 1
+                    else:
+                        self._stats['completed'] += 1
+                        self._stats['total_ms'] += (time.perf_counter() - pending[1]) * 1000
+                if error:
+                    logger.error(f"Bot {bot_id}: Erro na análise (worker {shard.index}) - {error}")
+                    continue
+                if bot is None or analysis is None or not bot.is_running:
+                    continue
+                try:
+                    bot.publish_analysis(analysis)
+                except Exception as e:
+                    logger.error(f"Bot {bot_id}: Erro ao publicar análise - {e}")
+
+        with self._lock:
+            for bot_id in shard.bots:
+                self._pending.pop(bot_id, None)
+        if shard.conn is conn and self._started:
+            logger.warning(f"Bot shards: worker {shard.index} desconectou")
+
+
+def serve(conn) -> None:
+    """
+    Worker loop: keep the indicator state of the shard's bots and analyse on request
+
+    Messages from the main process:
+        ('add', bot_id, symbol), ('remove', bot_id),
+        ('analyze', batch, bars, [(bot_id, ring_name), ...]) and None (exit).
+    Each 'analyze' is answered with one ('results', batch, [(bot_id, analysis, error), ...]).
+    """
+    bots: Dict[str, Tuple[str, StreamingIndicators]] = {}
+    rings: Dict[str, SharedBarRing] = {}
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            kind = message[0]
+            if kind == 'add':
+                bots[message[1]] = (message[2], StreamingIndicators())
+            elif kind == 'remove':
+                bots.pop(message[1], None)
+            elif kind == 'analyze':
+                _, batch, count, items = message
+                # Barras lidas uma vez por anel no lote
+                bars: Dict[str, Optional[np.ndarray]] = {}
+                results = []
+                for bot_id, ring_name in items:
+                    analysis, error = None, None
+                    try:
+                        if bot_id in bots:
+                            if ring_name not in bars:
+                                ring = rings.get(ring_name)
+                                if ring is None:
+                                    ring = rings[ring_name] = SharedBarRing.attach(ring_name)
+                                bars[ring_name] = ring.read(count)
+                            symbol, indicators = bots[bot_id]
+                            analysis = evaluate_rules(indicators, bars[ring_name], bot_id, symbol)
+                    except Exception as e:
+                        error = str(e)
+                    results.append((bot_id, analysis, error))
+                conn.send(('results', batch, results))
+    finally:
+        for ring in rings.values():
+            ring.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Worker entry point: ``python -m services.bot_shards <index> <host> <port>``"""
+    index, host, port = (argv or sys.argv[1:])[:3]
+    authkey = bytes.fromhex(os.environ.pop(AUTHKEY_ENV))
+    conn = Client((host, int(port)), authkey=authkey)
+    conn.send(('hello', int(index)))
+    try:
+        serve(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
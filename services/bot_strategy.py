@@ -0,0 +1,111 @@
+"""
+Rule strategy of the managed bots (RSI/SMA)
+
+The signal rules evaluated on every analysis of a ``BotInstance``. They only
+depend on the bars and on the bot's incremental indicator state, so the same
+function runs in the main process and in the shard worker processes
+(``services.bot_shards``), which must not import the bot manager.
+"""
+import logging
+import math
+from typing import Dict, Optional
+
+from utils.indicators import StreamingIndicators
+
+logger = logging.getLogger(__name__)
+
+# Barras do timeframe do bot usadas em cada análise
+ANALYSIS_BARS = 100
+
+
+def evaluate_rules(indicators: StreamingIndicators, rates, bot_id: str = '', symbol: str = '') -> Optional[Dict]:
+    """
+    Indicators and signal of the rule strategy over the bars of a bot
+
+    Args:
+        indicators: Incremental indicator state of the bot (synced with ``rates``)
+        rates: Bars of the bot timeframe (MT5 structured array)
+        bot_id: Bot id, for the logs
+        symbol: Bot symbol, for the logs
+
+    Returns:
+        Dict with signal, confidence, indicators, market_conditions and
+        market_data, or None when there are no bars
+    """
+    if rates is None or len(rates) == 0:
+        return None
+
+    close = rates['close']
+
+    # Calcular indicadores básicos (incremental: só as barras novas)
+    values = indicators.sync(rates)
+
+    # RSI (neutro enquanto não há barras suficientes)
+    rsi = 50 if math.isnan(values['rsi']) else values['rsi']
+
+    # SMA
+    sma_20 = float(close[-1]) if math.isnan(values['sma_20']) else values['sma_20']
+    sma_50 = float(close[-1]) if math.isnan(values['sma_50']) else values['sma_50']
+
+    # Determinar sinal baseado em indicadores (lógica melhorada)
+    signal = 'HOLD'
+    confidence = 0.50
+
+    logger.info(f"Bot {bot_id} ({symbol}): RSI={rsi:.1f}, Price={close[-1]:.2f}, SMA20={sma_20:.2f}, SMA50={sma_50:.2f}")
+
+    # Sinais fortes (alta confiança)
+    if rsi < 30:
+        signal = 'BUY'
+        confidence = 0.85
+        logger.info(f"Bot {bot_id}: RSI < 30 → BUY 85%")
+    elif rsi > 70:
+        signal = 'SELL'
+        confidence = 0.85
+        logger.info(f"Bot {bot_id}: RSI > 70 → SELL 85%")
+    # Sinais médios baseados em RSI
+    elif rsi < 40:
+        signal = 'BUY'
+        confidence = 0.70
+        logger.info(f"Bot {bot_id}: RSI < 40 → BUY 70%")
+    elif rsi > 60:
+        signal = 'SELL'
+        confidence = 0.70
+        logger.info(f"Bot {bot_id}: RSI > 60 → SELL 70%")
+    # Sinais de tendência
+    elif close[-1] > sma_20 > sma_50 and rsi > 50:
+        signal = 'BUY'
+        confidence = 0.65
+        logger.info(f"Bot {bot_id}: Tendência Alta + RSI > 50 → BUY 65%")
+    elif close[-1] < sma_20 < sma_50 and rsi < 50:
+        signal = 'SELL'
+        confidence = 0.65
+        logger.info(f"Bot {bot_id}: Tendência Baixa + RSI < 50 → SELL 65%")
+    else:
+        logger.info(f"Bot {bot_id}: Nenhuma condição atendida → HOLD 50%")
+
+    # Determinar trend
+    if sma_20 > sma_50:
+        trend = 'BULLISH'
+    elif sma_20 < sma_50:
+        trend = 'BEARISH'
+    else:
+        trend = 'NEUTRAL'
+
+    return {
+        'signal': signal,
+        'confidence': confidence,
+        'indicators': {
+            'rsi': float(rsi),
+            'sma_20': float(sma_20),
+            'sma_50': float(sma_50)
+        },
+        'market_conditions': {
+            'trend': trend
+        },
+        'market_data': {
+            'close': float(close[-1]),
+            'open': float(rates['open'][-1]),
+            'high': float(rates['high'][-1]),
+            'low': float(rates['low'][-1])
+        }
+    }
@@ -0,0 +1,169 @@
+"""
+Batched inference service - one matrix evaluation per tick for all bots
+
+Bots that share a model submit their latest feature row; rows queued at the
+same time are stacked into one (N x features) matrix and evaluated with a
+single ``predict_proba`` call per model, then each caller receives its own
+probability row.
+
+There is no dedicated worker thread: the first caller to find the service idle
+becomes the leader and evaluates everything queued (including rows that arrive
+while it is busy), while the other callers just wait on their futures. A lone
+bot therefore pays no hand-off latency. The scheduler announces how many bots
+are due in a tick with ``expect``; the leader then waits (up to ``max_wait``)
+until all of those rows are queued and evaluates them as one matrix.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Máximo de linhas avaliadas em uma única chamada
+DEFAULT_MAX_BATCH = 256
+# Tempo máximo (segundos) que o líder espera pelas linhas anunciadas com expect()
+DEFAULT_MAX_WAIT = 0.005
+
+
+class BatchInferenceService:
+    """Collects feature rows from many bots and evaluates them per model in one call"""
+
+    def __init__(self, max_batch: int = DEFAULT_MAX_BATCH, max_wait: float = DEFAULT_MAX_WAIT):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: List[Tuple[object, np.ndarray, Future]] = []
+        self._lock = threading.Condition()
+        self._leading = False
+        self._expected = 0
+        self._stats = {
+            'requests': 0,
+            'batches': 0,
+            'rows': 0,
+            'max_batch_rows': 0,
+            'errors': 0,
+            'wait_timeouts': 0,
+        }
+
+    def expect(self, count: int) -> None:
+        """
+        Announce that ``count`` more rows are about to be submitted (bots due this tick)
+
+        Args:
+            count: Number of callers that will call ``predict_proba`` shortly
+        """
+        with self._lock:
+            self._expected += count
+
+    def predict_proba(self, model, features: np.ndarray, timeout: float = 5.0) -> np.ndarray:
+        """
+        Evaluate feature rows together with the rows of every other caller
+
+        Args:
+            model: Estimator with ``predict_proba`` (MLPClassifier or NumpyMLP);
+                requests for the same object are batched together
+            features: Array (n_rows, n_features), usually a single row
+            timeout: Seconds to wait for another caller's batch
+
+        Returns:
+            Array (n_rows, n_classes)
+        """
+        future = Future()
+        with self._lock:
+            self._pending.append((model, np.atleast_2d(features), future))
+            self._stats['requests'] += 1
+            lead = not self._leading
+            self._leading = True
+            self._lock.notify_all()
+
+        if lead:
+            self._drain()
+        return future.result(timeout=timeout)
+
+    def flush(self) -> int:
+        """
+        Evaluate everything queued right now on the calling thread
+
+        Returns:
+            Number of rows evaluated
+        """
+        with self._lock:
+            batch, self._pending = self._pending, []
+        return self._evaluate(batch)
+
+    def get_stats(self) -> dict:
+        """
+        Batching counters
+
+        Returns:
+            Dictionary with requests, batches, rows and average rows per batch
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        stats['avg_batch_rows'] = round(stats['rows'] / stats['batches'], 2) if stats['batches'] else 0.0
+        return stats
+
+    def _drain(self) -> None:
+        """Leader loop: evaluate queued rows until the queue is empty, then step down"""
+        while True:
+            with self._lock:
+                # Espera as linhas dos outros bots anunciados para este tick
+                target = min(self._expected, self.max_batch)
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < target:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        # Algum bot anunciado não enviou: descarta a expectativa
+                        self._stats['wait_timeouts'] += 1
+                        self._expected = 0
+                        break
+                    self._lock.wait(remaining)
+
+                if not self._pending:
+                    self._leading = False
+                    return
+                batch = self._pending[:self.max_batch]
+                self._pending = self._pending[self.max_batch:]
+                self._expected = max(0, self._expected - len(batch))
+            self._evaluate(batch)
+
+    def _evaluate(self, batch: List[Tuple[object, np.ndarray, Future]]) -> int:
+        """Group by model, run one predict_proba per model and split the result"""
+        groups: Dict[int, List[Tuple[object, np.ndarray, Future]]] = {}
+        for item in batch:
+            groups.setdefault(id(item[0]), []).append(item)
+
+        rows = 0
+        for items in groups.values():
+            model = items[0][0]
+            try:
+                matrix = np.vstack([features for _, features, _ in items])
+                probabilities = model.predict_proba(matrix)
+            except Exception as e:
+                with self._lock:
+                    self._stats['errors'] += 1
+                logger.error(f"Batch inference: falha ao avaliar lote de {len(items)} pedidos: {e}")
+                for _, _, future in items:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for _, features, future in items:
+                future.set_result(probabilities[offset:offset + len(features)])
+                offset += len(features)
+
+            rows += len(matrix)
+            with self._lock:
+                self._stats['batches'] += 1
+                self._stats['rows'] += len(matrix)
+                self._stats['max_batch_rows'] = max(self._stats['max_batch_rows'], len(matrix))
+
+        return rows
+
+
+# Global instance
+inference_service = BatchInferenceService()
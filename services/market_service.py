@@ -2,7 +2,7 @@
 Market data service - handles symbol info, ticks, candles, etc.
 """
 import logging
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5
 import pandas as pd
 from typing import List, Optional
 from datetime import datetime
@@ -12,6 +12,8 @@ from core.mt5_connection import mt5_connection
 from core.exceptions import SymbolNotFoundError, MT5Exception
 from core.config import settings
 from .cache_service import cache_service
+from .bar_cache import bar_cache
+from .bar_store import bar_store
 from lib import get_timeframe
 
 logger = logging.getLogger(__name__)
@@ -160,17 +162,19 @@ class MarketService:
         mt5_timeframe = get_timeframe(timeframe)
 
         if from_date and to_date:
-            # Fetch by date range
             utc = pytz.UTC
             if from_date.tzinfo is None:
                 from_date = utc.localize(from_date)
             if to_date.tzinfo is None:
                 to_date = utc.localize(to_date)
 
-            rates = mt5.copy_rates_range(symbol, mt5_timeframe, from_date, to_date)
+            # Fetch by date range (local bar store, backfilled from MT5 on demand)
+            rates = bar_store.get_range(
+                symbol, mt5_timeframe, int(from_date.timestamp()), int(to_date.timestamp())
+            )
         else:
-            # Fetch by count
-            rates = mt5.copy_rates_from_pos(symbol, mt5_timeframe, 0, count)
+            # Fetch by count (shared incremental bar cache)
+            rates = bar_cache.get_rates(symbol, mt5_timeframe, count)
 
         if rates is None or len(rates) == 0:
             raise SymbolNotFoundError(f"Failed to get candle data for {symbol}")
@@ -4,20 +4,38 @@ Substitui arquivos JSON por banco SQLite com SQLAlchemy
 Versão final com persistência adequada
 """
 
+import atexit
 import os
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, Boolean
+from sqlalchemy import create_engine, event, func, inspect, text, Column, Integer, String, Float, DateTime, Text, Boolean, Index, UniqueConstraint
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
 from pathlib import Path
 
+from .storage_writer import WriteBehindWriter
+
 # Database setup
 Base = declarative_base()
 DATABASE_URL = f"sqlite:///{os.path.join(os.path.dirname(__file__), '..', 'mlp_data.db')}"
 engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+class StorageSession(Session):
+    """Sessões do armazenamento MLP: só elas recebem o hook do rollup diário"""
+
+
+def session_factory(bind) -> sessionmaker:
+    """Fábrica de sessões do armazenamento MLP ligada a ``bind`` (engine ou conexão)"""
+    return sessionmaker(autocommit=False, autoflush=False, bind=bind, class_=StorageSession)
+
+
+SessionLocal = session_factory(engine)
+
+# Limite de parâmetros por instrução das versões antigas do SQLite
+SQLITE_MAX_VARIABLES = 999
 
 
 class MLPAnalysis(Base):
@@ -30,6 +48,7 @@ class MLPAnalysis(Base):
     signal = Column(String)  # BUY, SELL, HOLD
     confidence = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    bot_id = Column(String, nullable=True, index=True)  # bot que gerou a análise
 
     # Indicadores técnicos
     rsi = Column(Float, nullable=True)
@@ -77,6 +96,7 @@ class MLPTrade(Base):
 
     # Referências
     analysis_id = Column(Integer, nullable=True)
+    bot_id = Column(String, nullable=True, index=True)
 
 
 class MLPDailyStats(Base):
@@ -101,6 +121,37 @@ class MLPDailyStats(Base):
     avg_profit = Column(Float, nullable=True)
 
 
+class MLPDailyRollup(Base):
+    """Contadores diários por (data, símbolo, bot), mantidos a cada inserção/atualização"""
+    __tablename__ = "mlp_daily_rollup"
+
+    id = Column(Integer, primary_key=True)
+    date = Column(String, nullable=False)  # YYYY-MM-DD
+    symbol = Column(String, nullable=False, default='')
+    bot_id = Column(String, nullable=False, default='')  # '' = sem bot (análises antigas/manuais)
+
+    total_analyses = Column(Integer, default=0)
+    buy_signals = Column(Integer, default=0)
+    sell_signals = Column(Integer, default=0)
+    hold_signals = Column(Integer, default=0)
+    total_trades = Column(Integer, default=0)
+    winning_trades = Column(Integer, default=0)
+    losing_trades = Column(Integer, default=0)
+    total_profit = Column(Float, default=0.0)
+
+    __table_args__ = (
+        UniqueConstraint('date', 'symbol', 'bot_id', name='uq_daily_rollup_key'),
+        Index('ix_daily_rollup_date', 'date'),
+    )
+
+
+# Colunas somadas no rollup
+ROLLUP_COUNTERS = (
+    'total_analyses', 'buy_signals', 'sell_signals', 'hold_signals',
+    'total_trades', 'winning_trades', 'losing_trades', 'total_profit',
+)
+
+
 class MT5TradeHistory(Base):
     """Tabela para histórico de trades da conta MT5 (não apenas do bot)"""
     __tablename__ = "mt5_trade_history"
@@ -136,6 +187,16 @@ class MT5TradeHistory(Base):
     )
 
 
+class MT5SyncCursor(Base):
+    """Última posição sincronizada do histórico MT5 (high-watermark)"""
+    __tablename__ = "mt5_sync_cursor"
+
+    name = Column(String, primary_key=True)
+    last_time = Column(Integer, default=0)    # deal.time (epoch) do último deal gravado
+    last_ticket = Column(Integer, default=0)  # maior ticket gravado
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class MLPBotEvent(Base):
     """Tabela para registrar eventos do ciclo de vida do bot"""
     __tablename__ = "mlp_bot_events"
@@ -150,12 +211,96 @@ class MLPBotEvent(Base):
         {'sqlite_autoincrement': True},
     )
 
+def _rollup_key(obj, when: Optional[datetime]) -> tuple:
+    when = when or datetime.utcnow()
+    return when.strftime('%Y-%m-%d'), obj.symbol or '', obj.bot_id or ''
+
+
+def _analysis_delta(analysis: MLPAnalysis, sign: int) -> Dict:
+    signal = analysis.signal if analysis.signal in ('BUY', 'SELL') else 'HOLD'
+    return {'total_analyses': sign, f'{signal.lower()}_signals': sign}
+
+
+def _profit_delta(profit: Optional[float], sign: int) -> Dict:
+    if profit is None:
+        return {}
+    return {
+        'total_profit': sign * profit,
+        'winning_trades': sign * int(profit > 0),
+        'losing_trades': sign * int(profit < 0),
+    }
+
+
+def _apply_rollup_deltas(connection, deltas: Dict[tuple, Dict]) -> None:
+    """Soma os deltas no rollup com um INSERT ... ON CONFLICT por chave"""
+    for (date, symbol, bot_id), delta in deltas.items():
+        values = {counter: delta.get(counter, 0) for counter in ROLLUP_COUNTERS}
+        if not any(values.values()):
+            continue
+        stmt = sqlite_insert(MLPDailyRollup).values(date=date, symbol=symbol, bot_id=bot_id, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['date', 'symbol', 'bot_id'],
+            set_={
+                counter: getattr(MLPDailyRollup, counter) + getattr(stmt.excluded, counter)
+                for counter in ROLLUP_COUNTERS
+            }
+        )
+        connection.execute(stmt)
+
+
+@event.listens_for(StorageSession, 'before_flush')
+def _update_daily_rollup(session: Session, flush_context, instances) -> None:
+    """Mantém o rollup diário na mesma transação das análises e trades gravados"""
+    deltas: Dict[tuple, Dict] = {}
+
+    def add(key: tuple, delta: Dict) -> None:
+        bucket = deltas.setdefault(key, {})
+        for counter, value in delta.items():
+            bucket[counter] = bucket.get(counter, 0) + value
+
+    for obj in session.new:
+        if isinstance(obj, MLPAnalysis):
+            add(_rollup_key(obj, obj.timestamp), _analysis_delta(obj, 1))
+        elif isinstance(obj, MLPTrade):
+            add(_rollup_key(obj, obj.created_at), {'total_trades': 1, **_profit_delta(obj.profit, 1)})
+
+    for obj in session.deleted:
+        if isinstance(obj, MLPAnalysis):
+            add(_rollup_key(obj, obj.timestamp), _analysis_delta(obj, -1))
+        elif isinstance(obj, MLPTrade):
+            add(_rollup_key(obj, obj.created_at), {'total_trades': -1, **_profit_delta(obj.profit, -1)})
+
+    for obj in session.dirty:
+        if not isinstance(obj, MLPTrade):
+            continue
+        history = inspect(obj).attrs.profit.history
+        if not history.has_changes():
+            continue
+        key = _rollup_key(obj, obj.created_at)
+        for old in history.deleted:
+            add(key, _profit_delta(old, -1))
+        for new in history.added:
+            add(key, _profit_delta(new, 1))
+
+    if deltas:
+        _apply_rollup_deltas(session.connection(), deltas)
+
+
 class MLPStorage:
     """Classe de storage persistente usando SQLite"""
 
     def __init__(self):
+        # Gravação em lote para análises e eventos dos bots
+        self.writer = WriteBehindWriter(self.get_db)
+        atexit.register(self.writer.close)
+
         # Criar banco se não existir
+        rollup_exists = inspect(engine).has_table(MLPDailyRollup.__tablename__)
         Base.metadata.create_all(bind=engine)
+        self._upgrade_schema()
+        if not rollup_exists:
+            # Banco anterior ao rollup: calcular a partir das linhas existentes
+            self.rebuild_daily_rollup()
 
         # Configurações do bot
         self.bot_config = {
@@ -169,8 +314,19 @@ class MLPStorage:
         """Get database session"""
         return SessionLocal()
 
+    def _upgrade_schema(self) -> None:
+        """Adiciona colunas novas a tabelas criadas por versões anteriores"""
+        inspector = inspect(engine)
+        with engine.begin() as connection:
+            for table in (MLPAnalysis.__table__, MLPTrade.__table__):
+                columns = {column['name'] for column in inspector.get_columns(table.name)}
+                if 'bot_id' not in columns:
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN bot_id VARCHAR"))
+
     def get_analyses(self, symbol: Optional[str] = None, limit: int = 100) -> List[Dict]:
         """Obtém análises MLP filtradas"""
+        # Incluir análises ainda na fila de escrita
+        self.writer.flush()
         db = self.get_db()
         try:
             query = db.query(MLPAnalysis).order_by(MLPAnalysis.timestamp.desc())
@@ -236,49 +392,7 @@ class MLPStorage:
         """Adiciona nova análise MLP"""
         db = self.get_db()
         try:
-            import json
-            
-            # Parsear JSON strings se necessário
-            indicators = analysis.get('indicators', {})
-            if isinstance(indicators, str):
-                indicators = json.loads(indicators)
-            
-            market_data = analysis.get('market_data', {})
-            if isinstance(market_data, str):
-                market_data = json.loads(market_data)
-            
-            market_conditions = analysis.get('market_conditions', {})
-            if isinstance(market_conditions, str):
-                market_conditions_json = market_conditions
-            else:
-                market_conditions_json = json.dumps(market_conditions) if market_conditions else None
-            
-            analysis_obj = MLPAnalysis(
-                symbol=analysis['symbol'],
-                timeframe=analysis.get('timeframe', 'M1'),
-                signal=analysis['signal'],
-                confidence=analysis['confidence'],
-                timestamp=datetime.fromisoformat(analysis.get('timestamp', datetime.now().isoformat())),
-
-                # Indicadores
-                rsi=indicators.get('rsi'),
-                macd_signal=indicators.get('macd_signal'),
-                bb_upper=indicators.get('bb_upper'),
-                bb_lower=indicators.get('bb_lower'),
-                sma_20=indicators.get('sma_20'),
-                sma_50=indicators.get('sma_50'),
-
-                # Dados OHLCV
-                price_open=market_data.get('open'),
-                price_high=market_data.get('high'),
-                price_low=market_data.get('low'),
-                price_close=market_data.get('close'),
-                volume=market_data.get('volume'),
-
-                # Dados JSON
-                market_conditions=market_conditions_json,
-                technical_signals=json.dumps(analysis.get('technical_signals')) if analysis.get('technical_signals') else None,
-            )
+            analysis_obj = self._build_analysis(analysis)
 
             db.add(analysis_obj)
             db.commit()
@@ -292,6 +406,64 @@ class MLPStorage:
         finally:
             db.close()
 
+    def queue_analysis(self, analysis: Dict) -> bool:
+        """
+        Enfileira uma análise para gravação em lote (sem esperar o commit)
+
+        Para chamadores que não precisam do ID da linha, como os loops dos bots.
+
+        Returns:
+            True se enfileirada, False se descartada com a fila cheia
+        """
+        return self.writer.submit(self._build_analysis(analysis))
+
+    def _build_analysis(self, analysis: Dict) -> MLPAnalysis:
+        """Converte o dicionário da análise no objeto MLPAnalysis"""
+        import json
+
+        # Parsear JSON strings se necessário
+        indicators = analysis.get('indicators', {})
+        if isinstance(indicators, str):
+            indicators = json.loads(indicators)
+
+        market_data = analysis.get('market_data', {})
+        if isinstance(market_data, str):
+            market_data = json.loads(market_data)
+
+        market_conditions = analysis.get('market_conditions', {})
+        if isinstance(market_conditions, str):
+            market_conditions_json = market_conditions
+        else:
+            market_conditions_json = json.dumps(market_conditions) if market_conditions else None
+
+        return MLPAnalysis(
+            symbol=analysis['symbol'],
+            timeframe=analysis.get('timeframe', 'M1'),
+            signal=analysis['signal'],
+            confidence=analysis['confidence'],
+            timestamp=datetime.fromisoformat(analysis.get('timestamp', datetime.now().isoformat())),
+            bot_id=analysis.get('bot_id'),
+
+            # Indicadores
+            rsi=indicators.get('rsi'),
+            macd_signal=indicators.get('macd_signal'),
+            bb_upper=indicators.get('bb_upper'),
+            bb_lower=indicators.get('bb_lower'),
+            sma_20=indicators.get('sma_20'),
+            sma_50=indicators.get('sma_50'),
+
+            # Dados OHLCV
+            price_open=market_data.get('open'),
+            price_high=market_data.get('high'),
+            price_low=market_data.get('low'),
+            price_close=market_data.get('close'),
+            volume=market_data.get('volume'),
+
+            # Dados JSON
+            market_conditions=market_conditions_json,
+            technical_signals=json.dumps(analysis.get('technical_signals')) if analysis.get('technical_signals') else None,
+        )
+
     def get_trades(self, symbol: Optional[str] = None, days: int = 30) -> List[Dict]:
         """Obtém trades MLP filtrados por período"""
         db = self.get_db()
@@ -346,6 +518,7 @@ class MLPStorage:
                 profit=trade.get('profit'),
                 exit_reason=trade.get('exit_reason'),
                 analysis_id=trade.get('analysis_id'),
+                bot_id=trade.get('bot_id'),
                 created_at=datetime.fromisoformat(trade.get('created_at', datetime.utcnow().isoformat())),
                 exit_time=datetime.fromisoformat(trade.get('exit_time')) if trade.get('exit_time') else None,
             )
@@ -387,57 +560,106 @@ class MLPStorage:
         finally:
             db.close()
 
-    def get_daily_stats(self, days: int = 30) -> List[Dict]:
-        """Obtém estatísticas diárias MLP"""
+    def get_daily_stats(self, days: int = 30, symbol: Optional[str] = None,
+                        bot_id: Optional[str] = None) -> List[Dict]:
+        """
+        Obtém estatísticas diárias MLP a partir do rollup (data, símbolo, bot)
+
+        Args:
+            days: Dias para trás
+            symbol: Filtrar por símbolo ('all' ou None = todos)
+            bot_id: Filtrar por bot (None = todos)
+        """
+        # Incluir análises ainda na fila de escrita
+        self.writer.flush()
         db = self.get_db()
-        daily_stats = {}
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
+            cutoff = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
 
-            # 1. Obter análises e agrupar por dia
-            analyses = db.query(MLPAnalysis).filter(MLPAnalysis.timestamp >= cutoff_date).all()
-            for analysis in analyses:
-                date_str = analysis.timestamp.strftime('%Y-%m-%d')
-                if date_str not in daily_stats:
-                    daily_stats[date_str] = self._get_default_daily_stat(date_str)
-                
-                daily_stats[date_str]['total_analyses'] += 1
-                if analysis.signal == 'BUY':
-                    daily_stats[date_str]['buy_signals'] += 1
-                elif analysis.signal == 'SELL':
-                    daily_stats[date_str]['sell_signals'] += 1
-                else:
-                    daily_stats[date_str]['hold_signals'] += 1
-
-            # 2. Obter trades e agrupar por dia
-            trades = db.query(MLPTrade).filter(MLPTrade.created_at >= cutoff_date).all()
-            for trade in trades:
-                date_str = trade.created_at.strftime('%Y-%m-%d')
-                if date_str not in daily_stats:
-                    daily_stats[date_str] = self._get_default_daily_stat(date_str)
-
-                daily_stats[date_str]['total_trades'] += 1
-                if trade.profit is not None:
-                    daily_stats[date_str]['total_profit'] += trade.profit
-                    if trade.profit > 0:
-                        daily_stats[date_str]['winning_trades'] += 1
-                    elif trade.profit < 0:
-                        daily_stats[date_str]['losing_trades'] += 1
-
-            # 3. Calcular métricas finais (win_rate, avg_profit)
-            result_list = sorted(daily_stats.values(), key=lambda x: x['date'], reverse=True)
-            for stats in result_list:
+            query = db.query(
+                MLPDailyRollup.date,
+                *[func.sum(getattr(MLPDailyRollup, counter)).label(counter) for counter in ROLLUP_COUNTERS]
+            ).filter(MLPDailyRollup.date >= cutoff)
+
+            if symbol and symbol != 'all':
+                query = query.filter(MLPDailyRollup.symbol == symbol)
+            if bot_id is not None:
+                query = query.filter(MLPDailyRollup.bot_id == bot_id)
+
+            result_list = []
+            for row in query.group_by(MLPDailyRollup.date).order_by(MLPDailyRollup.date.desc()):
+                stats = self._get_default_daily_stat(row.date)
+                for counter in ROLLUP_COUNTERS:
+                    stats[counter] = getattr(row, counter) or 0
+                stats['total_profit'] = float(stats['total_profit'])
+                if not (stats['total_analyses'] or stats['total_trades']):
+                    continue
+
+                # Métricas finais (win_rate, avg_profit)
                 closed_trades = stats['winning_trades'] + stats['losing_trades']
                 if closed_trades > 0:
                     stats['win_rate'] = round((stats['winning_trades'] / closed_trades) * 100, 2)
                 if stats['total_trades'] > 0:
                     stats['avg_profit'] = round(stats['total_profit'] / stats['total_trades'], 2)
+                result_list.append(stats)
 
             return result_list
 
         finally:
             db.close()
 
+    def rebuild_daily_rollup(self) -> int:
+        """
+        Recalcula o rollup diário a partir das tabelas de análises e trades
+
+        Returns:
+            Número de linhas (data, símbolo, bot) gravadas
+        """
+        self.writer.flush()
+        db = self.get_db()
+        try:
+            deltas: Dict[tuple, Dict] = {}
+
+            analysis_day = func.strftime('%Y-%m-%d', MLPAnalysis.timestamp)
+            signal_rows = db.query(
+                analysis_day, MLPAnalysis.symbol, MLPAnalysis.bot_id, MLPAnalysis.signal, func.count()
+            ).group_by(analysis_day, MLPAnalysis.symbol, MLPAnalysis.bot_id, MLPAnalysis.signal)
+            for date, symbol, bot, signal, count in signal_rows:
+                if date is None:
+                    continue
+                signal = signal if signal in ('BUY', 'SELL') else 'HOLD'
+                bucket = deltas.setdefault((date, symbol or '', bot or ''), {})
+                bucket['total_analyses'] = bucket.get('total_analyses', 0) + count
+                bucket[f'{signal.lower()}_signals'] = bucket.get(f'{signal.lower()}_signals', 0) + count
+
+            trade_day = func.strftime('%Y-%m-%d', MLPTrade.created_at)
+            trade_rows = db.query(
+                trade_day, MLPTrade.symbol, MLPTrade.bot_id,
+                func.count(),
+                func.count(MLPTrade.profit).filter(MLPTrade.profit > 0),
+                func.count(MLPTrade.profit).filter(MLPTrade.profit < 0),
+                func.coalesce(func.sum(MLPTrade.profit), 0.0),
+            ).group_by(trade_day, MLPTrade.symbol, MLPTrade.bot_id)
+            for date, symbol, bot, total, winning, losing, profit in trade_rows:
+                if date is None:
+                    continue
+                bucket = deltas.setdefault((date, symbol or '', bot or ''), {})
+                bucket['total_trades'] = bucket.get('total_trades', 0) + total
+                bucket['winning_trades'] = bucket.get('winning_trades', 0) + winning
+                bucket['losing_trades'] = bucket.get('losing_trades', 0) + losing
+                bucket['total_profit'] = bucket.get('total_profit', 0.0) + profit
+
+            db.query(MLPDailyRollup).delete()
+            _apply_rollup_deltas(db.connection(), deltas)
+            db.commit()
+            return len(deltas)
+
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
+
     def _get_default_daily_stat(self, date_str: str) -> Dict:
         """Retorna a estrutura padrão para uma estatística diária."""
         return {
@@ -488,14 +710,7 @@ class MLPStorage:
         """Adiciona um evento do ciclo de vida do bot."""
         db = self.get_db()
         try:
-            import json
-            details_json = json.dumps(details, default=str) if details else None
-
-            event_obj = MLPBotEvent(
-                event_type=event_type,
-                message=message,
-                details=details_json
-            )
+            event_obj = self._build_bot_event(event_type, message, details)
             db.add(event_obj)
             db.commit()
             db.refresh(event_obj)
@@ -506,6 +721,27 @@ class MLPStorage:
         finally:
             db.close()
 
+    def queue_bot_event(self, event_type: str, message: str, details: Optional[Dict] = None) -> bool:
+        """Enfileira um evento do bot para gravação em lote (sem esperar o commit)"""
+        return self.writer.submit(self._build_bot_event(event_type, message, details))
+
+    def _build_bot_event(self, event_type: str, message: str, details: Optional[Dict] = None) -> MLPBotEvent:
+        import json
+        details_json = json.dumps(details, default=str) if details else None
+        return MLPBotEvent(
+            event_type=event_type,
+            message=message,
+            details=details_json
+        )
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Grava tudo o que está na fila de escrita"""
+        return self.writer.flush(timeout)
+
+    def get_writer_stats(self) -> Dict:
+        """Métricas da fila de escrita em lote"""
+        return self.writer.get_stats()
+
     def get_config(self) -> Dict:
         """Obtém configuração do bot MLP"""
         return self.bot_config.copy()
@@ -557,47 +793,76 @@ class MLPStorage:
         finally:
             db.close()
 
-    def save_mt5_trade_history(self, deals: List[Dict]) -> int:
-        """Salva histórico de trades MT5 no banco (upsert)"""
+    def save_mt5_trade_history(self, deals: List[Dict], cursor: Optional[str] = None) -> int:
+        """
+        Salva histórico de trades MT5 no banco (upsert em lote)
+
+        Um único INSERT ... ON CONFLICT(ticket) grava todos os deals; um deal já
+        existente só tem o horário atualizado se o novo for mais recente.
+
+        Args:
+            deals: Deals no formato do banco
+            cursor: Nome do cursor de sincronização a avançar na mesma transação
+
+        Returns:
+            Número de deals novos
+        """
+        if not deals:
+            return 0
+
+        now = datetime.utcnow()
+        rows = {}
+        for deal in deals:
+            ticket = str(deal['ticket'])
+            rows[ticket] = {
+                'ticket': ticket,
+                'order': str(deal.get('order', '')),
+                'symbol': deal['symbol'],
+                'type': deal['type'],
+                'entry': deal['entry'],
+                'magic': deal.get('magic'),
+                'volume': deal['volume'],
+                'price': deal['price'],
+                'commission': deal.get('commission', 0.0),
+                'swap': deal.get('swap', 0.0),
+                'profit': deal.get('profit', 0.0),
+                'fee': deal.get('fee', 0.0),
+                'comment': deal.get('comment'),
+                'external_id': deal.get('external_id'),
+                'time': datetime.fromtimestamp(deal['time']),
+                'created_at': now,
+                'updated_at': now,
+            }
+
         db = self.get_db()
-        saved_count = 0
         try:
-            for deal in deals:
-                ticket = str(deal['ticket'])
-
-                # Verificar se já existe
-                existing = db.query(MT5TradeHistory).filter(MT5TradeHistory.ticket == ticket).first()
-
-                if existing:
-                    # Atualizar apenas se tiver dados mais recentes
-                    new_time = datetime.fromtimestamp(deal['time'])
-                    if new_time > existing.time:
-                        existing.time = new_time
-                        existing.updated_at = datetime.utcnow()
-                else:
-                    # Criar novo
-                    trade_obj = MT5TradeHistory(
-                        ticket=ticket,
-                        order=str(deal.get('order', '')),
-                        symbol=deal['symbol'],
-                        type=deal['type'],
-                        entry=deal['entry'],
-                        magic=deal.get('magic'),
-                        volume=deal['volume'],
-                        price=deal['price'],
-                        commission=deal.get('commission', 0.0),
-                        swap=deal.get('swap', 0.0),
-                        profit=deal.get('profit', 0.0),
-                        fee=deal.get('fee', 0.0),
-                        comment=deal.get('comment'),
-                        external_id=deal.get('external_id'),
-                        time=datetime.fromtimestamp(deal['time'])
-                    )
-                    db.add(trade_obj)
-                    saved_count += 1
+            tickets = list(rows)
+            existing = set()
+            for i in range(0, len(tickets), SQLITE_MAX_VARIABLES):
+                chunk = tickets[i:i + SQLITE_MAX_VARIABLES]
+                existing.update(
+                    ticket for (ticket,) in
+                    db.query(MT5TradeHistory.ticket).filter(MT5TradeHistory.ticket.in_(chunk))
+                )
+
+            values = list(rows.values())
+            # Limite de variáveis do SQLite: 17 colunas por linha
+            per_statement = max(1, SQLITE_MAX_VARIABLES // len(values[0]))
+            for i in range(0, len(values), per_statement):
+                stmt = sqlite_insert(MT5TradeHistory).values(values[i:i + per_statement])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[MT5TradeHistory.ticket],
+                    set_={'time': stmt.excluded.time, 'updated_at': stmt.excluded.updated_at},
+                    where=stmt.excluded.time > MT5TradeHistory.time
+                )
+                db.execute(stmt)
+
+            if cursor:
+                last = max(deals, key=lambda deal: (int(deal['ticket']), deal['time']))
+                self._advance_sync_cursor(db, cursor, int(last['time']), int(last['ticket']))
 
             db.commit()
-            return saved_count
+            return len(rows) - len(existing)
 
         except Exception as e:
             db.rollback()
@@ -605,6 +870,51 @@ class MLPStorage:
         finally:
             db.close()
 
+    def get_sync_cursor(self, name: str) -> Optional[Dict]:
+        """Obtém o cursor de sincronização (último deal gravado) ou None"""
+        db = self.get_db()
+        try:
+            cursor = db.get(MT5SyncCursor, name)
+            if cursor is None:
+                return None
+            return {
+                'name': cursor.name,
+                'last_time': cursor.last_time,
+                'last_ticket': cursor.last_ticket,
+                'updated_at': cursor.updated_at.isoformat() if cursor.updated_at else None,
+            }
+        finally:
+            db.close()
+
+    def reset_sync_cursor(self, name: str) -> bool:
+        """Remove o cursor para que a próxima sincronização refaça o período completo"""
+        db = self.get_db()
+        try:
+            deleted = db.query(MT5SyncCursor).filter(MT5SyncCursor.name == name).delete()
+            db.commit()
+            return deleted > 0
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
+
+    def _advance_sync_cursor(self, db: Session, name: str, last_time: int, last_ticket: int) -> None:
+        """Avança o cursor (nunca retrocede) dentro da transação de db"""
+        stmt = sqlite_insert(MT5SyncCursor).values(
+            name=name, last_time=last_time, last_ticket=last_ticket, updated_at=datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MT5SyncCursor.name],
+            set_={
+                'last_time': stmt.excluded.last_time,
+                'last_ticket': stmt.excluded.last_ticket,
+                'updated_at': stmt.excluded.updated_at,
+            },
+            where=stmt.excluded.last_ticket > MT5SyncCursor.last_ticket
+        )
+        db.execute(stmt)
+
     def get_mt5_trade_statistics(self, days: int = 30, symbol: Optional[str] = None) -> Dict:
         """Calcula estatísticas de trades MT5"""
         db = self.get_db()
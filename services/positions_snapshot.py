@@ -0,0 +1,199 @@
+"""
+Positions snapshot - one positions_get per cycle, indexed for every consumer
+
+Bot status, ``/bots``, the trading engine and ``lib.get_positions`` each
+asked the terminal for the open positions and scanned all of them to find
+their own (by symbol, magic number or the ``Bot <id[:8]>`` order comment).
+With many bots that is one MT5 call and one full scan per bot.
+
+The snapshot asks the terminal once per cycle (``max_age``) and builds hash
+indexes by ticket, magic number, symbol and owning bot. Every reader gets
+the same immutable ``PositionsView``. An ``order_send`` through the MT5
+gateway invalidates the snapshot, so the first read after an order sees the
+new position (or the closed one gone). While the gateway is routed to another
+module (backtests) every read asks it and nothing is kept.
+"""
+import logging
+import re
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from core.mt5_gateway import mt5, mt5_gateway
+from core.mt5_memo import ORDER_EVENTS
+
+logger = logging.getLogger(__name__)
+
+# Idade máxima (segundos) do snapshot antes de consultar o terminal de novo
+DEFAULT_MAX_AGE = 1.0
+
+# Comentário das ordens dos bots: "Bot <bot_id[:8]>"
+_BOT_COMMENT = re.compile(r'Bot (\S{8})')
+
+
+def bot_tag(bot_id: str) -> str:
+    """Part of the bot id written in the comment of its orders"""
+    return bot_id[:8]
+
+
+class PositionsView:
+    """Open positions of one refresh with indexes by ticket, magic, symbol and bot"""
+
+    def __init__(self, positions: Iterable, taken_at: float = 0.0, valid: bool = True):
+        """
+        Args:
+            positions: Position records as returned by ``mt5.positions_get``
+            taken_at: ``time.monotonic()`` of the refresh
+            valid: False when MT5 did not answer (the view is then empty)
+        """
+        self.positions = tuple(positions)
+        self.taken_at = taken_at
+        self.valid = valid
+        self._by_ticket: Dict[int, object] = {}
+        self._by_magic: Dict[int, List] = {}
+        self._by_symbol: Dict[str, List] = {}
+        self._by_bot: Dict[str, List] = {}
+        for position in self.positions:
+            self._by_ticket[position.ticket] = position
+            self._by_magic.setdefault(position.magic, []).append(position)
+            self._by_symbol.setdefault(position.symbol, []).append(position)
+            match = _BOT_COMMENT.search(position.comment or '')
+            if match:
+                self._by_bot.setdefault(match.group(1), []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.positions)
+
+    def ticket(self, ticket: int):
+        """Position with this ticket, or None"""
+        return self._by_ticket.get(ticket)
+
+    def by_magic(self, magic: int) -> List:
+        return list(self._by_magic.get(magic, ()))
+
+    def by_symbol(self, symbol: str) -> List:
+        return list(self._by_symbol.get(symbol, ()))
+
+    def by_bot(self, bot_id: str) -> List:
+        """Positions whose order comment carries the bot id"""
+        return list(self._by_bot.get(bot_tag(bot_id), ()))
+
+    def for_bot(self, bot_id: str, magic: Optional[int] = None, symbol: Optional[str] = None) -> List:
+        """
+        Positions owned by a bot: its magic number or its id in the comment
+
+        Args:
+            bot_id: Bot id
+            magic: Magic number of the bot orders
+            symbol: Only positions of this symbol
+
+        Returns:
+            Positions in terminal order
+        """
+        tickets = {position.ticket for position in self._by_bot.get(bot_tag(bot_id), ())}
+        if magic is not None:
+            tickets.update(position.ticket for position in self._by_magic.get(magic, ()))
+        candidates = self._by_symbol.get(symbol, ()) if symbol is not None else self.positions
+        return [position for position in candidates if position.ticket in tickets]
+
+
+class PositionsSnapshot:
+    """Process-wide positions snapshot refreshed at most once per ``max_age``"""
+
+    def __init__(self, module=mt5, max_age: float = DEFAULT_MAX_AGE):
+        """
+        Args:
+            module: MetaTrader5 module (default: the gateway proxy)
+            max_age: Seconds a snapshot is served without asking MT5
+        """
+        self.module = module
+        self.max_age = max_age
+        self._view: Optional[PositionsView] = None
+        # Incrementada a cada invalidação: um refresh iniciado antes não é guardado
+        self._generation = 0
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'refreshes': 0,
+            'invalidations': 0,
+            'errors': 0,
+        }
+
+    def get(self, max_age: Optional[float] = None) -> PositionsView:
+        """
+        Current positions, refreshed if the snapshot is older than ``max_age``
+
+        Args:
+            max_age: Override of the snapshot-wide ``max_age`` (0 forces a refresh)
+
+        Returns:
+            Indexed view; empty and ``valid=False`` when MT5 did not answer
+        """
+        if mt5_gateway.routed is not None:
+            return self._refresh(store=False)
+
+        max_age = self.max_age if max_age is None else max_age
+        view = self._view
+        if view is not None and time.monotonic() - view.taken_at < max_age:
+            self._count('hits')
+            return view
+
+        # Leitores concorrentes esperam o mesmo refresh em vez de repetir a consulta
+        with self._refresh_lock:
+            view = self._view
+            if view is not None and time.monotonic() - view.taken_at < max_age:
+                self._count('hits')
+                return view
+            return self._refresh()
+
+    def invalidate(self) -> None:
+        """Drop the snapshot (the next read asks MT5)"""
+        with self._lock:
+            self._view = None
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def on_order_event(self, name: str, args: tuple, kwargs: dict, result) -> None:
+        """Gateway listener: an order opens or closes positions"""
+        self.invalidate()
+
+    def get_stats(self) -> Dict:
+        view = self._view
+        with self._lock:
+            return {
+                **self._stats,
+                'max_age': self.max_age,
+                'positions': len(view) if view is not None else None,
+                'age': round(time.monotonic() - view.taken_at, 3) if view is not None else None,
+            }
+
+    def _refresh(self, store: bool = True) -> PositionsView:
+        generation = self._generation
+        try:
+            positions = self.module.positions_get()
+        except Exception as e:
+            logger.error(f"Positions snapshot: erro ao consultar posições - {e}")
+            positions = None
+        self._count('refreshes')
+        if positions is None:
+            self._count('errors')
+            # Sem resposta do MT5: não guarda, a próxima leitura tenta de novo
+            return PositionsView((), time.monotonic(), valid=False)
+        view = PositionsView(positions, time.monotonic())
+        with self._lock:
+            if store and generation == self._generation:
+                self._view = view
+        return view
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+
+# Global instance (invalidado pelas ordens que passam pelo gateway)
+positions_snapshot = PositionsSnapshot()
+mt5_gateway.on_call(ORDER_EVENTS, positions_snapshot.on_order_event)
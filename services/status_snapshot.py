@@ -0,0 +1,156 @@
+"""
+Background status snapshot - expensive status sections refreshed off the request path
+
+A status endpoint registers its sections (bot status, log tail, database
+queries, connectivity checks, ...) with a refresh interval each. Every
+section is a job on the central scheduler that stores its latest value in
+memory, so serving the endpoint is a dictionary read and never waits on MT5,
+the database or the network. A section that has never been computed is
+computed once, synchronously, by the first reader that asks for it, unless it
+was registered with an initial value (sections that may block for long, e.g.
+on a network timeout).
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .bot_scheduler import bot_scheduler
+
+logger = logging.getLogger(__name__)
+
+_NO_VALUE = object()
+
+
+class _Section:
+    """Producer, interval and latest value of one section"""
+
+    def __init__(self, name: str, func: Callable[[], Any], interval: float):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.value: Any = None
+        self.ready = False
+        self.updated_at: Optional[float] = None
+        self.refreshes = 0
+        self.errors = 0
+        self.last_duration = 0.0
+        self.lock = threading.Lock()
+
+    def to_dict(self) -> dict:
+        return {
+            'interval': self.interval,
+            'age': round(time.time() - self.updated_at, 3) if self.updated_at else None,
+            'refreshes': self.refreshes,
+            'errors': self.errors,
+            'last_duration': round(self.last_duration, 4),
+        }
+
+
+class StatusSnapshot:
+    """Sections refreshed in the background at their own cadence, read from memory"""
+
+    def __init__(self, name: str, scheduler=bot_scheduler):
+        """
+        Args:
+            name: Prefix of the scheduler job ids (``<name>:<section>``)
+            scheduler: Scheduler running the refresh jobs
+        """
+        self.name = name
+        self.scheduler = scheduler
+        self._sections: Dict[str, _Section] = {}
+        self._started = False
+        self._lock = threading.Lock()
+
+    def add_section(self, name: str, func: Callable[[], Any], interval: float, initial: Any = _NO_VALUE) -> None:
+        """
+        Register a section
+
+        Args:
+            name: Section name (key of the snapshot)
+            func: Builds the section value; exceptions keep the previous value
+            interval: Seconds between refreshes
+            initial: Value served until the first background refresh (readers
+                then never compute the section themselves)
+        """
+        with self._lock:
+            section = _Section(name, func, interval)
+            if initial is not _NO_VALUE:
+                section.value = initial
+                section.ready = True
+            self._sections[name] = section
+            if self._started:
+                self._schedule(self._sections[name])
+
+    def start(self) -> None:
+        """Schedule the refresh jobs (idempotent)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for section in self._sections.values():
+                self._schedule(section)
+
+    def stop(self) -> None:
+        with self._lock:
+            self._started = False
+            for name in self._sections:
+                self.scheduler.cancel(f"{self.name}:{name}")
+
+    def refresh(self, name: str, missing_only: bool = False) -> Any:
+        """
+        Rebuild one section now and return its value
+
+        Args:
+            missing_only: Only if it has no value yet (concurrent first readers compute it once)
+        """
+        section = self._sections[name]
+        with section.lock:
+            if missing_only and section.ready:
+                return section.value
+            started = time.perf_counter()
+            try:
+                value = section.func()
+            except Exception as e:
+                section.errors += 1
+                logger.error(f"Status snapshot {self.name}: erro na seção {name} - {e}")
+                if not section.ready:
+                    section.value = {'error': str(e)}
+                    section.ready = True
+                return section.value
+            section.value = value
+            section.ready = True
+            section.updated_at = time.time()
+            section.refreshes += 1
+            section.last_duration = time.perf_counter() - started
+            return value
+
+    def get(self, sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Latest value of each section
+
+        Args:
+            sections: Only these sections (unknown names are ignored)
+
+        Returns:
+            Dictionary section name -> value
+        """
+        self.start()
+        names = list(self._sections) if sections is None else [name for name in sections if name in self._sections]
+        snapshot = {}
+        for name in names:
+            section = self._sections[name]
+            snapshot[name] = section.value if section.ready else self.refresh(name, missing_only=True)
+        return snapshot
+
+    def get_stats(self) -> Dict[str, dict]:
+        return {name: section.to_dict() for name, section in self._sections.items()}
+
+    def _schedule(self, section: _Section) -> None:
+        def job():
+            self.refresh(section.name)
+
+        # Seções sem valor inicial são calculadas pelo primeiro leitor: a primeira
+        # execução em segundo plano fica para depois de um intervalo
+        delay = 0 if section.updated_at is None and section.ready else section.interval
+        self.scheduler.schedule(f"{self.name}:{section.name}", job, section.interval, delay=delay)
@@ -0,0 +1,257 @@
+"""
+Write-behind storage writer - batches inserts off the bot threads
+
+Bots used to open a session and commit (one SQLite transaction and fsync)
+for every analysis and lifecycle event, and concurrent commits contended for
+the database lock. Callers that do not need the row id now hand the ORM object
+to this writer and return immediately; a single background thread collects
+rows for up to ``flush_interval`` seconds (or ``batch_size`` rows) and inserts
+them in one transaction.
+
+The queue is bounded: when it is full the caller blocks for at most
+``put_timeout`` seconds and the row is then dropped and counted, so a stalled
+database cannot grow memory without limit. ``flush()`` waits until everything
+queued is committed and ``close()`` (registered with ``atexit``) drains the
+queue on shutdown.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Capacidade da fila de escrita (linhas)
+DEFAULT_MAX_QUEUE = 10000
+# Máximo de linhas por transação
+DEFAULT_BATCH_SIZE = 500
+# Tempo máximo (segundos) que uma linha espera pelo lote
+DEFAULT_FLUSH_INTERVAL = 0.5
+# Tempo máximo (segundos) que o chamador bloqueia com a fila cheia
+DEFAULT_PUT_TIMEOUT = 0.1
+
+_STOP = object()
+
+
+class WriteBehindWriter:
+    """Bounded queue of ORM objects inserted in batches by one background thread"""
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        put_timeout: float = DEFAULT_PUT_TIMEOUT
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._flush_requested = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._stats = {
+            'queued': 0,
+            'written': 0,
+            'batches': 0,
+            'blocked': 0,
+            'dropped': 0,
+            'errors': 0,
+            'max_depth': 0,
+            'max_batch_rows': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+        }
+
+    def submit(self, obj) -> bool:
+        """
+        Queue an ORM object for insertion without waiting for the commit
+
+        Args:
+            obj: Transient SQLAlchemy object (e.g. ``MLPAnalysis``)
+
+        Returns:
+            True if queued, False if dropped because the queue stayed full
+        """
+        if self._closed:
+            raise RuntimeError("Storage writer encerrado")
+        self._ensure_running()
+
+        try:
+            self._queue.put_nowait(obj)
+        except queue.Full:
+            self._count('blocked')
+            try:
+                self._queue.put(obj, timeout=self.put_timeout)
+            except queue.Full:
+                self._count('dropped')
+                logger.warning("Storage writer: fila cheia, linha descartada")
+                return False
+
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats['queued'] += 1
+            if depth > self._stats['max_depth']:
+                self._stats['max_depth'] = depth
+        return True
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """
+        Commit everything queued so far
+
+        Args:
+            timeout: Seconds to wait (None waits forever)
+
+        Returns:
+            True if the queue was fully drained
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.unfinished_tasks == 0
+
+        self._flush_requested.set()
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(
+                lambda: self._queue.unfinished_tasks == 0, timeout
+            )
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Drain the queue and stop the writer thread (durable flush on shutdown)"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+
+        if thread is None or not thread.is_alive():
+            # Sem thread (ex.: encerrando o interpretador): grava o que sobrou aqui mesmo
+            self._write_pending()
+            return
+
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error(f"Storage writer: {self._queue.qsize()} linha(s) pendente(s) após o encerramento")
+
+    def get_stats(self) -> dict:
+        """
+        Queue depth, back-pressure and batch counters
+
+        Returns:
+            Dictionary with counters, current depth and average batch size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['depth'] = self._queue.qsize()
+        stats['avg_batch_rows'] = round(stats['written'] / stats['batches'], 2) if stats['batches'] else 0.0
+        return stats
+
+    def _ensure_running(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='storage-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                self._write_pending()
+                return
+
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if self._flush_requested.is_set():
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                else:
+                    wait = deadline - time.monotonic()
+                    if wait <= 0:
+                        break
+                    try:
+                        # Espera curta para reagir a flush() sem perder o lote
+                        item = self._queue.get(timeout=min(wait, 0.05))
+                    except queue.Empty:
+                        continue
+                if item is _STOP:
+                    self._queue.task_done()
+                    stop = True
+                    break
+                batch.append(item)
+
+            if not self._queue.unfinished_tasks - len(batch):
+                self._flush_requested.clear()
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+            if stop:
+                self._write_pending()
+                return
+
+    def _write_pending(self) -> None:
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+            else:
+                self._queue.task_done()
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                for _ in batch:
+                    self._queue.task_done()
+                batch = []
+        if batch:
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch: list) -> None:
+        start = time.perf_counter()
+        written = 0
+        db = self.session_factory()
+        try:
+            db.add_all(batch)
+            db.commit()
+            written = len(batch)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Storage writer: erro no lote de {len(batch)} linha(s), gravando uma a uma: {e}")
+            # Uma linha inválida não deve descartar o lote inteiro
+            for obj in batch:
+                try:
+                    db.add(obj)
+                    db.commit()
+                    written += 1
+                except Exception as row_error:
+                    db.rollback()
+                    self._count('errors')
+                    logger.error(f"Storage writer: linha descartada: {row_error}")
+        finally:
+            db.close()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats['written'] += written
+            self._stats['batches'] += 1
+            self._stats['max_batch_rows'] = max(self._stats['max_batch_rows'], len(batch))
+            self._stats['last_flush_ms'] = round(elapsed, 3)
+            self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], round(elapsed, 3))
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
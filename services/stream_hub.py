@@ -0,0 +1,380 @@
+"""
+Delta-encoded WebSocket streams - bars, positions and account equity
+
+Dashboards used to poll REST endpoints and receive the full payload every
+time. A stream channel keeps the last state it published and a version
+number: each poll compares the new state with the previous one and
+broadcasts only the difference (``stream_delta``) to the channel room. A
+client that subscribes, reconnects or reports a version other than the
+current one receives the full state (``stream_snapshot``) instead, so a
+client never applies a delta to a base it does not have.
+
+Channels:
+
+- ``bars:<symbol>:<TF>``: closed bars since the last message plus the fields
+  of the forming bar that changed
+- ``positions``: added positions, removed tickets and changed fields per ticket
+  (read from the shared positions snapshot)
+- ``account``: changed account fields (balance, equity, margin, ...)
+
+All channels are refreshed by one job on the central scheduler, only while
+they have subscribers. Fetching from MT5 and emitting happen outside the hub
+lock, which only guards the diff, the state swap and the subscriber sets.
+"""
+import itertools
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from core.mt5_gateway import mt5
+
+from core.config import settings
+from core.mt5_connection import mt5_connection
+from lib import get_timeframe
+from .bar_cache import bar_cache
+from .bot_scheduler import bot_scheduler
+from .positions_snapshot import positions_snapshot
+
+logger = logging.getLogger(__name__)
+
+STREAM_JOB_ID = 'ws-streams'
+# Barras enviadas no snapshot de um canal de barras
+SNAPSHOT_BARS = 200
+
+_BAR_FIELDS = ('time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume')
+_POSITION_FIELDS = (
+    'ticket', 'symbol', 'type', 'volume', 'price_open', 'price_current', 'sl', 'tp',
+    'profit', 'swap', 'time', 'magic', 'comment'
+)
+_ACCOUNT_FIELDS = ('balance', 'equity', 'profit', 'margin', 'margin_free', 'margin_level', 'currency')
+
+
+def _changed(old: Dict, new: Dict) -> Dict:
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+class StreamChannel:
+    """A stream: how to fetch its state and how to diff two states"""
+
+    name: str = ''
+
+    def fetch(self) -> Any:
+        raise NotImplementedError
+
+    def diff(self, old: Any, new: Any) -> Optional[Dict]:
+        """Delta from ``old`` to ``new``; None when nothing changed"""
+        raise NotImplementedError
+
+    def snapshot(self, state: Any) -> Any:
+        return state
+
+
+class BarChannel(StreamChannel):
+    """Bars of one (symbol, timeframe) from the shared bar cache"""
+
+    def __init__(self, symbol: str, timeframe: str, count: int = SNAPSHOT_BARS):
+        self.name = f"bars:{symbol}:{timeframe}"
+        self.symbol = symbol
+        self.timeframe = get_timeframe(timeframe)
+        self.count = count
+
+    def fetch(self) -> Optional[List[Dict]]:
+        rates = bar_cache.get_rates(self.symbol, self.timeframe, self.count)
+        if rates is None or len(rates) == 0:
+            return None
+        return [{field: rates[field][i].item() for field in _BAR_FIELDS} for i in range(len(rates))]
+
+    def diff(self, old: List[Dict], new: List[Dict]) -> Optional[Dict]:
+        forming = old[-1]
+        # Barras que fecharam desde o último envio (inclui a versão final da que estava em formação)
+        closed = [bar for bar in new[:-1] if bar['time'] >= forming['time']]
+        current = new[-1] if new[-1]['time'] != forming['time'] else _changed(forming, new[-1])
+        if not closed and not current:
+            return None
+        return {'closed': closed, 'current': current}
+
+
+class PositionsChannel(StreamChannel):
+    """Open positions of the account, keyed by ticket"""
+
+    name = 'positions'
+
+    def fetch(self) -> Optional[Dict[str, Dict]]:
+        # Mesmo snapshot dos bots e das rotas: sem positions_get extra por ciclo
+        view = positions_snapshot.get()
+        if not view.valid:
+            return None
+        return {
+            str(position.ticket): {field: getattr(position, field, None) for field in _POSITION_FIELDS}
+            for position in view
+        }
+
+    def diff(self, old: Dict[str, Dict], new: Dict[str, Dict]) -> Optional[Dict]:
+        added = [position for ticket, position in new.items() if ticket not in old]
+        removed = [ticket for ticket in old if ticket not in new]
+        modified = {}
+        for ticket, position in new.items():
+            if ticket in old:
+                changes = _changed(old[ticket], position)
+                if changes:
+                    modified[ticket] = changes
+        if not (added or removed or modified):
+            return None
+        return {'added': added, 'removed': removed, 'modified': modified}
+
+    def snapshot(self, state: Dict[str, Dict]) -> List[Dict]:
+        return list(state.values())
+
+
+class AccountChannel(StreamChannel):
+    """Balance, equity and margin of the account"""
+
+    name = 'account'
+
+    def fetch(self) -> Optional[Dict]:
+        account = mt5.account_info()
+        if account is None:
+            return None
+        return {field: getattr(account, field, None) for field in _ACCOUNT_FIELDS}
+
+    def diff(self, old: Dict, new: Dict) -> Optional[Dict]:
+        return _changed(old, new) or None
+
+
+class _ChannelState:
+    """Published state, version and subscribers of a channel"""
+
+    def __init__(self, channel: StreamChannel):
+        self.channel = channel
+        self.state: Any = None
+        self.version = 0
+        self.subscribers: Set[str] = set()
+
+
+def channel_name(name: str) -> str:
+    """
+    Canonical channel name (``bars:btcusdc:m1`` -> ``bars:btcusdc:M1``)
+
+    Raises:
+        ValueError: Unknown channel name
+    """
+    return make_channel(name).name
+
+
+def make_channel(name: str) -> StreamChannel:
+    """Channel object for a channel name (``positions``, ``account`` or ``bars:<symbol>:<TF>``)"""
+    if name == 'positions':
+        return PositionsChannel()
+    if name == 'account':
+        return AccountChannel()
+    parts = name.split(':')
+    if len(parts) == 3 and parts[0] == 'bars' and parts[1]:
+        return BarChannel(parts[1], parts[2].upper())
+    raise ValueError(f"Canal desconhecido: {name}")
+
+
+class StreamHub:
+    """Publishes the subscribed channels as snapshots and deltas"""
+
+    def __init__(
+        self,
+        emit: Optional[Callable[[str, Dict, str], None]] = None,
+        scheduler=bot_scheduler,
+        interval: Optional[float] = None
+    ):
+        """
+        Args:
+            emit: Called with (event, payload, room); the room is the channel name
+                for deltas and the client sid for snapshots
+            scheduler: Scheduler running the refresh job
+            interval: Seconds between refreshes (default ``WS_STREAM_INTERVAL``)
+        """
+        self.emit = emit
+        self.scheduler = scheduler
+        self.interval = interval or settings.WS_STREAM_INTERVAL
+        self._channels: Dict[str, _ChannelState] = {}
+        # Versões únicas entre canais e recriações: uma versão antiga nunca coincide com a atual
+        self._versions = itertools.count(1)
+        self._lock = threading.RLock()
+        self._stats = {
+            'refreshes': 0,
+            'deltas': 0,
+            'snapshots': 0,
+            'unchanged': 0,
+            'errors': 0,
+        }
+
+    def subscribe(self, sid: str, name: str, version: Optional[int] = None) -> Dict:
+        """
+        Add a client to a channel
+
+        Args:
+            sid: Client session id
+            name: Channel name
+            version: Version the client already holds (reconnect); a snapshot is
+                sent unless it is the current one
+
+        Returns:
+            Subscription info (channel and current version)
+
+        Raises:
+            ValueError: Unknown channel name
+        """
+        channel = make_channel(name)
+        with self._lock:
+            state = self._channels.get(channel.name)
+            if state is None:
+                state = _ChannelState(channel)
+                self._channels[channel.name] = state
+            state.subscribers.add(sid)
+            if not self.scheduler.has_job(STREAM_JOB_ID):
+                self.scheduler.schedule(STREAM_JOB_ID, self._refresh_job, self.interval, delay=0)
+            empty = state.state is None
+
+        # Primeiro estado do canal: consulta fora do lock
+        if empty:
+            self._refresh_channel(state)
+
+        with self._lock:
+            snapshot = None
+            if state.state is not None and version != state.version:
+                snapshot = self._snapshot(state)
+            current = state.version
+        if snapshot is not None:
+            self._emit('stream_snapshot', snapshot, sid)
+        return {'channel': channel.name, 'version': current}
+
+    def resync(self, sid: str, name: str) -> bool:
+        """Send the full state of a channel to one client"""
+        with self._lock:
+            state = self._channels.get(name)
+            if state is None or sid not in state.subscribers or state.state is None:
+                return False
+            snapshot = self._snapshot(state)
+        self._emit('stream_snapshot', snapshot, sid)
+        return True
+
+    def unsubscribe(self, sid: str, name: str) -> bool:
+        """
+        Remove a client from a channel (the channel is dropped with its last subscriber)
+
+        Returns:
+            True if the client was subscribed
+        """
+        with self._lock:
+            state = self._channels.get(name)
+            if state is None or sid not in state.subscribers:
+                return False
+            state.subscribers.discard(sid)
+            if not state.subscribers:
+                del self._channels[name]
+                if not self._channels:
+                    self.scheduler.cancel(STREAM_JOB_ID)
+            return True
+
+    def remove_client(self, sid: str) -> List[str]:
+        """Drop every subscription of a disconnected client"""
+        with self._lock:
+            names = [name for name, state in self._channels.items() if sid in state.subscribers]
+            for name in names:
+                self.unsubscribe(sid, name)
+            return names
+
+    def _refresh_job(self) -> None:
+        # Job do scheduler: a contagem de refresh() não é um atraso
+        self.refresh()
+
+    def refresh(self) -> int:
+        """
+        Fetch every subscribed channel and broadcast the deltas
+
+        Returns:
+            Number of deltas emitted
+        """
+        with self._lock:
+            states = list(self._channels.values())
+            self._stats['refreshes'] += 1
+        if not states:
+            return 0
+
+        try:
+            mt5_connection.ensure_connection()
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"Stream hub: sem conexão com o MT5 - {e}")
+            return 0
+
+        return sum(1 for state in states if self._refresh_channel(state))
+
+    def get_stats(self) -> Dict:
+        """Counters, versions and subscriber count per channel"""
+        with self._lock:
+            channels = {
+                name: {'version': state.version, 'subscribers': len(state.subscribers)}
+                for name, state in self._channels.items()
+            }
+            return {**self._stats, 'interval': self.interval, 'channels': channels}
+
+    def _refresh_channel(self, state: _ChannelState) -> bool:
+        """Fetch one channel; emits a delta if it changed (caller must not hold the lock)"""
+        try:
+            new = state.channel.fetch()
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"Stream hub: erro ao atualizar {state.channel.name} - {e}")
+            return False
+        if new is None:
+            return False
+
+        with self._lock:
+            # Canal removido durante a consulta
+            if self._channels.get(state.channel.name) is not state:
+                return False
+
+            if state.state is None:
+                state.state = new
+                state.version = next(self._versions)
+                return False
+
+            delta = state.channel.diff(state.state, new)
+            if delta is None:
+                self._stats['unchanged'] += 1
+                return False
+
+            base = state.version
+            state.state = new
+            state.version = next(self._versions)
+            self._stats['deltas'] += 1
+            payload = {
+                'channel': state.channel.name,
+                'base': base,
+                'version': state.version,
+                'data': delta,
+            }
+        self._emit('stream_delta', payload, state.channel.name)
+        return True
+
+    def _snapshot(self, state: _ChannelState) -> Dict:
+        """Snapshot message of a channel (caller holds the lock)"""
+        self._stats['snapshots'] += 1
+        return {
+            'channel': state.channel.name,
+            'version': state.version,
+            'data': state.channel.snapshot(state.state),
+        }
+
+    def _emit(self, event: str, payload: Dict, room: str) -> None:
+        if self.emit:
+            try:
+                self.emit(event, payload, room)
+            except Exception as e:
+                self._count('errors')
+                logger.error(f"Stream hub: erro ao emitir {event} - {e}")
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+
+# Global instance (emit é ligado pelo init_socketio)
+stream_hub = StreamHub()
@@ -10,12 +10,17 @@ from datetime import datetime, timedelta
 import logging
 from typing import Dict, List, Optional
 
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5
 from core.mt5_connection import mt5_connection
 from services.mlp_storage import mlp_storage
 
 logger = logging.getLogger(__name__)
 
+# Nome do cursor persistido (último deal sincronizado)
+SYNC_CURSOR_NAME = 'mt5_deals'
+# Sobreposição (segundos) da janela pedida ao MT5 antes do cursor
+CURSOR_OVERLAP_SECONDS = 60
+
 
 class MT5TradeSyncService:
     """Serviço automático de sincronização de trades MT5 ↔ SQLite"""
@@ -111,8 +116,13 @@ class MT5TradeSyncService:
             self.logger.error(f"Erro ao parar MT5 Trade Sync Service: {e}")
             return False
 
-    def sync_now(self) -> Optional[Dict]:
-        """Executa sincronização imediata e retorna resultado"""
+    def sync_now(self, full: bool = False) -> Optional[Dict]:
+        """
+        Executa sincronização imediata e retorna resultado
+
+        Args:
+            full: Ignora o cursor e varre os últimos ``lookback_days`` dias
+        """
         try:
             self.logger.info("Executando sincronização manual...")
 
@@ -120,8 +130,8 @@ class MT5TradeSyncService:
             if not self._check_mt5_connection():
                 return {"error": "MT5 não conectado"}
 
-            # Sincronizar últimos X dias
-            result = self._sync_trades_since(timedelta(days=self.lookback_days))
+            # Sincronizar a partir do cursor (ou dos últimos X dias)
+            result = self._sync_trades_since(timedelta(days=self.lookback_days), full=full)
 
             # Atualizar estatísticas
             self.sync_stats['total_syncs'] += 1
@@ -142,6 +152,7 @@ class MT5TradeSyncService:
             'last_sync': self.last_sync.isoformat() if self.last_sync else None,
             'next_sync_in_seconds': self._get_next_sync_seconds(),
             'sync_stats': self.sync_stats,
+            'cursor': mlp_storage.get_sync_cursor(SYNC_CURSOR_NAME),
             'config': {
                 'sync_interval': self.sync_interval,
                 'lookback_days': self.lookback_days
@@ -214,13 +225,27 @@ class MT5TradeSyncService:
 
         self.logger.info("Loop de sincronização finalizado")
 
-    def _sync_trades_since(self, since_time: timedelta) -> Dict:
-        """Sincroniza trades desde determinado ponto no tempo"""
+    def _sync_trades_since(self, since_time: timedelta, full: bool = False) -> Dict:
+        """
+        Sincroniza trades a partir do cursor persistido (ou desde determinado ponto no tempo)
+
+        Com cursor, só os deals posteriores ao último ticket gravado são pedidos ao
+        MT5 e gravados; sem cursor (primeira execução ou full=True) o período
+        ``since_time`` inteiro é varrido. O custo acompanha os deals novos, não o
+        tamanho do histórico.
+        """
         try:
-            from_date = datetime.now() - since_time
             to_date = datetime.now()
+            cursor = None if full else mlp_storage.get_sync_cursor(SYNC_CURSOR_NAME)
+            if cursor:
+                # Pequena sobreposição para deals registrados com atraso; o ticket filtra os já gravados
+                from_date = datetime.fromtimestamp(cursor['last_time']) - timedelta(seconds=CURSOR_OVERLAP_SECONDS)
+                last_ticket = cursor['last_ticket']
+            else:
+                from_date = to_date - since_time
+                last_ticket = 0
 
-            self.logger.debug(f"Sincronizando trades de {from_date.date()} até {to_date.date()}")
+            self.logger.debug(f"Sincronizando trades de {from_date} até {to_date} (ticket > {last_ticket})")
 
             # Buscar trades do MT5
             deals_mt5 = mt5.history_deals_get(from_date, to_date)
@@ -243,40 +268,16 @@ class MT5TradeSyncService:
                     'to_date': to_date.isoformat()
                 }
 
-            # Converter para formato do banco
-            deals_to_save = []
-            existing_tickets = {t['ticket'] for t in mlp_storage.get_mt5_trade_history(days=self.lookback_days)}
-
-            for deal in deals_mt5:
-                ticket = str(deal.ticket)
-
-                # Só salvar se ainda não existe
-                if ticket not in existing_tickets:
-                    deal_dict = {
-                        "ticket": ticket,
-                        "order": str(deal.order),
-                        "symbol": deal.symbol,
-                        "type": "BUY" if deal.type == mt5.DEAL_TYPE_BUY else "SELL",
-                        "entry": "IN" if deal.entry == mt5.DEAL_ENTRY_IN else (
-                            "OUT" if deal.entry == mt5.DEAL_ENTRY_OUT else "REVERSAL"
-                        ),
-                        "magic": deal.magic,
-                        "volume": float(deal.volume),
-                        "price": float(deal.price),
-                        "commission": float(deal.commission),
-                        "swap": float(deal.swap),
-                        "profit": float(deal.profit),
-                        "fee": float(deal.fee),
-                        "comment": deal.comment,
-                        "external_id": deal.external_id,
-                        "time": deal.time
-                    }
-                    deals_to_save.append(deal_dict)
-
-            # Salvar novos trades
+            # Converter para formato do banco (só deals depois do cursor)
+            deals_to_save = [
+                self._deal_to_dict(deal) for deal in deals_mt5
+                if int(deal.ticket) > last_ticket
+            ]
+
+            # Salvar novos trades e avançar o cursor na mesma transação
             saved_count = 0
             if deals_to_save:
-                saved_count = mlp_storage.save_mt5_trade_history(deals_to_save)
+                saved_count = mlp_storage.save_mt5_trade_history(deals_to_save, cursor=SYNC_CURSOR_NAME)
                 self.logger.info(f"Salvos {saved_count} novos trades no banco")
 
             return {
@@ -284,9 +285,10 @@ class MT5TradeSyncService:
                 'saved_trades': saved_count,
                 'mt5_trades_found': len(deals_mt5),
                 'new_trades': len(deals_to_save),
+                'incremental': cursor is not None,
                 'from_date': from_date.isoformat(),
                 'to_date': to_date.isoformat(),
-                'sync_duration_seconds': (datetime.now() - from_date).total_seconds()
+                'sync_duration_seconds': (datetime.now() - to_date).total_seconds()
             }
 
         except Exception as e:
@@ -297,6 +299,29 @@ class MT5TradeSyncService:
                 'saved_trades': 0
             }
 
+    @staticmethod
+    def _deal_to_dict(deal) -> Dict:
+        """Converte um deal do MT5 para o formato do banco"""
+        return {
+            "ticket": str(deal.ticket),
+            "order": str(deal.order),
+            "symbol": deal.symbol,
+            "type": "BUY" if deal.type == mt5.DEAL_TYPE_BUY else "SELL",
+            "entry": "IN" if deal.entry == mt5.DEAL_ENTRY_IN else (
+                "OUT" if deal.entry == mt5.DEAL_ENTRY_OUT else "REVERSAL"
+            ),
+            "magic": deal.magic,
+            "volume": float(deal.volume),
+            "price": float(deal.price),
+            "commission": float(deal.commission),
+            "swap": float(deal.swap),
+            "profit": float(deal.profit),
+            "fee": float(deal.fee),
+            "comment": deal.comment,
+            "external_id": deal.external_id,
+            "time": deal.time
+        }
+
     def _check_mt5_connection(self) -> bool:
         """Verifica se MT5 está conectado"""
         return mt5_connection.is_connected()
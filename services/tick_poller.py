@@ -0,0 +1,213 @@
+"""
+Multiplexed tick poller - one polling job for every WebSocket tick subscription
+
+The WebSocket layer used to start one thread per room, each calling
+``ensure_connection`` and ``symbol_info_tick`` every second. A single job on
+the central scheduler now polls the union of subscribed symbols, checks the
+connection once per cycle and emits a tick only when it changed since the
+last one emitted for that symbol.
+
+Subscriptions are counted per client session (sid): a symbol is dropped when
+its last subscriber leaves or disconnects, and the job is cancelled when no
+symbol is left.
+"""
+import logging
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+from core.mt5_gateway import mt5
+
+from core.config import settings
+from core.mt5_connection import mt5_connection
+from .bot_scheduler import bot_scheduler
+from .tick_store import tick_recorder
+
+logger = logging.getLogger(__name__)
+
+POLLER_JOB_ID = 'ws-tick-poller'
+# Menor e maior intervalo de polling aceitos (segundos)
+MIN_POLL_INTERVAL = 0.1
+MAX_POLL_INTERVAL = 60.0
+
+
+def tick_payload(symbol: str, tick) -> dict:
+    """``tick_update`` message of an MT5 tick"""
+    return {
+        "symbol": symbol,
+        "time": tick.time,
+        "time_msc": tick.time_msc,
+        "bid": tick.bid,
+        "ask": tick.ask,
+        "last": tick.last,
+        "volume": tick.volume,
+        "spread": tick.ask - tick.bid if tick.ask and tick.bid else 0
+    }
+
+
+class TickPoller:
+    """Polls the ticks of all subscribed symbols in one scheduler job"""
+
+    def __init__(
+        self,
+        emit: Optional[Callable[[str, dict], None]] = None,
+        scheduler=bot_scheduler,
+        poll_interval: Optional[float] = None
+    ):
+        """
+        Args:
+            emit: Called with (symbol, payload) for every changed tick
+            scheduler: Scheduler running the polling job
+            poll_interval: Seconds between polls (default ``WS_TICK_POLL_INTERVAL``)
+        """
+        self.emit = emit
+        self.scheduler = scheduler
+        self.poll_interval = max(poll_interval or settings.WS_TICK_POLL_INTERVAL, MIN_POLL_INTERVAL)
+        self._subscribers: Dict[str, Set[str]] = {}
+        self._last: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'polls': 0,
+            'ticks_emitted': 0,
+            'unchanged': 0,
+            'errors': 0,
+        }
+
+    def subscribe(self, sid: str, symbol: str) -> bool:
+        """
+        Add a client session to the subscribers of ``symbol``
+
+        Returns:
+            True if the symbol was not being polled yet
+        """
+        with self._lock:
+            subscribers = self._subscribers.setdefault(symbol, set())
+            first = not subscribers
+            subscribers.add(sid)
+            if not self.scheduler.has_job(POLLER_JOB_ID):
+                self.scheduler.schedule(POLLER_JOB_ID, self._poll_job, self.poll_interval, delay=0)
+        if first:
+            logger.info(f"Tick poller: {symbol} adicionado")
+        return first
+
+    def unsubscribe(self, sid: str, symbol: str) -> bool:
+        """
+        Remove a client session from the subscribers of ``symbol``
+
+        Returns:
+            True if it was the last subscriber (the symbol is no longer polled)
+        """
+        with self._lock:
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None or sid not in subscribers:
+                return False
+            subscribers.discard(sid)
+            if subscribers:
+                return False
+            self._drop(symbol)
+        logger.info(f"Tick poller: {symbol} removido (sem assinantes)")
+        return True
+
+    def remove_client(self, sid: str) -> List[str]:
+        """
+        Drop every subscription of a disconnected session
+
+        Returns:
+            Symbols the session was subscribed to
+        """
+        with self._lock:
+            symbols = [symbol for symbol, subscribers in self._subscribers.items() if sid in subscribers]
+        for symbol in symbols:
+            self.unsubscribe(sid, symbol)
+        return symbols
+
+    def set_poll_interval(self, seconds: float) -> float:
+        """
+        Change the polling interval (clamped to ``MIN_POLL_INTERVAL``..``MAX_POLL_INTERVAL``)
+
+        Returns:
+            The interval in effect
+
+        Raises:
+            ValueError: ``seconds`` is not a finite number
+        """
+        seconds = float(seconds)
+        if not math.isfinite(seconds):
+            # NaN/inf no heap do scheduler compartilhado quebraria a ordem de todos os jobs
+            raise ValueError(f"Intervalo inválido: {seconds}")
+        with self._lock:
+            self.poll_interval = min(max(seconds, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+            if self._subscribers:
+                self.scheduler.schedule(POLLER_JOB_ID, self._poll_job, self.poll_interval, delay=0)
+        return self.poll_interval
+
+    def _poll_job(self) -> None:
+        # Job do scheduler: a contagem de poll() não é um atraso
+        self.poll()
+
+    def poll(self) -> int:
+        """
+        Poll every subscribed symbol once and emit the ticks that changed
+
+        Returns:
+            Number of ticks emitted
+        """
+        with self._lock:
+            symbols = list(self._subscribers)
+            self._stats['polls'] += 1
+        if not symbols:
+            return 0
+
+        try:
+            mt5_connection.ensure_connection()
+        except Exception as e:
+            self._count('errors')
+            logger.error(f"Tick poller: sem conexão com o MT5 - {e}")
+            return 0
+
+        emitted = 0
+        for symbol in symbols:
+            try:
+                tick = mt5.symbol_info_tick(symbol)
+                if not tick:
+                    continue
+                key = (tick.time_msc, tick.bid, tick.ask, tick.last, tick.volume)
+                with self._lock:
+                    if symbol not in self._subscribers:
+                        continue
+                    if self._last.get(symbol) == key:
+                        self._stats['unchanged'] += 1
+                        continue
+                    self._last[symbol] = key
+
+                tick_recorder.record(symbol, tick)
+                if self.emit:
+                    self.emit(symbol, tick_payload(symbol, tick))
+                emitted += 1
+            except Exception as e:
+                self._count('errors')
+                logger.error(f"Tick poller: erro ao consultar {symbol} - {e}")
+
+        with self._lock:
+            self._stats['ticks_emitted'] += emitted
+        return emitted
+
+    def get_stats(self) -> dict:
+        """Counters and subscriber count per symbol"""
+        with self._lock:
+            symbols = {symbol: len(subscribers) for symbol, subscribers in self._subscribers.items()}
+            return {**self._stats, 'poll_interval': self.poll_interval, 'symbols': symbols}
+
+    def _drop(self, symbol: str) -> None:
+        self._subscribers.pop(symbol, None)
+        self._last.pop(symbol, None)
+        if not self._subscribers:
+            self.scheduler.cancel(POLLER_JOB_ID)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+
+# Global instance (emit é ligado pelo init_socketio)
+tick_poller = TickPoller()
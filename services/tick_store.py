@@ -0,0 +1,376 @@
+"""
+Tick recorder and compressed tick archive
+
+Ticks polled from ``mt5.symbol_info_tick`` (tick streams, scalping paths) used
+to be discarded after use. ``tick_recorder`` keeps every distinct tick it
+observes - handed over with ``record`` or polled in the background for the
+symbols passed to ``watch`` - and ``tick_archive`` stores them per symbol in
+one segment file per day (``<symbol>/<YYYYMMDD>.tck`` under the archive root).
+
+A segment is a sequence of independently compressed chunks. Each chunk holds
+the columns time_msc, bid, spread (ask - bid), last and volume as
+delta-encoded int64 (prices scaled by ``10 ** digits``), byte-shuffled and
+zlib-compressed. The chunk index next to the segment (``<YYYYMMDD>.json``)
+keeps the offset and time span of every chunk, so ``read`` only decompresses
+the chunks that overlap the requested range.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from core.mt5_gateway import mt5
+
+logger = logging.getLogger(__name__)
+
+TICK_DTYPE = np.dtype([
+    ('time_msc', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+])
+
+DEFAULT_ROOT = "data/ticks"
+# Casas decimais usadas quando o MT5 não informa as do símbolo
+DEFAULT_DIGITS = 5
+# Ticks por chunk comprimido
+DEFAULT_CHUNK_TICKS = 4096
+# Tempo máximo (segundos) que um tick fica só em memória
+DEFAULT_FLUSH_INTERVAL = 30.0
+# Intervalo (segundos) do polling dos símbolos observados
+DEFAULT_POLL_INTERVAL = 0.25
+# Nível de compressão zlib dos chunks
+COMPRESSION_LEVEL = 9
+
+_COLUMNS = len(TICK_DTYPE.names)
+_DAY_MSC = 86400 * 1000
+
+
+def _day(time_msc: int) -> str:
+    return datetime.fromtimestamp(time_msc // 1000, tz=timezone.utc).strftime('%Y%m%d')
+
+
+def encode_chunk(ticks: np.ndarray, digits: int) -> bytes:
+    """Delta-encode, byte-shuffle and compress a chunk of ticks"""
+    scale = 10 ** digits
+    columns = np.empty((_COLUMNS, len(ticks)), dtype='<i8')
+    columns[0] = ticks['time_msc']
+    columns[1] = np.round(ticks['bid'] * scale)
+    # ask guardado como spread: quase constante, comprime a quase nada
+    columns[2] = np.round(ticks['ask'] * scale) - columns[1]
+    columns[3] = np.round(ticks['last'] * scale)
+    columns[4] = ticks['volume']
+    deltas = np.diff(columns, axis=1, prepend=0)
+    # Bytes de mesma ordem juntos: deltas pequenos viram longas sequências de zeros
+    shuffled = deltas.view(np.uint8).reshape(_COLUMNS, len(ticks), 8).transpose(0, 2, 1)
+    return zlib.compress(np.ascontiguousarray(shuffled).tobytes(), COMPRESSION_LEVEL)
+
+
+def decode_chunk(data: bytes, rows: int, digits: int) -> np.ndarray:
+    """Inverse of ``encode_chunk``"""
+    shuffled = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(_COLUMNS, 8, rows)
+    deltas = np.ascontiguousarray(shuffled.transpose(0, 2, 1)).view('<i8').reshape(_COLUMNS, rows)
+    columns = np.cumsum(deltas, axis=1)
+
+    scale = 10 ** digits
+    ticks = np.empty(rows, dtype=TICK_DTYPE)
+    ticks['time_msc'] = columns[0]
+    ticks['bid'] = columns[1] / scale
+    ticks['ask'] = (columns[1] + columns[2]) / scale
+    ticks['last'] = columns[3] / scale
+    ticks['volume'] = columns[4]
+    return ticks
+
+
+class _Segment:
+    """Data file and chunk index of one (symbol, day)"""
+
+    def __init__(self, data_path: str, index_path: str):
+        self.data_path = data_path
+        self.index_path = index_path
+        # [offset, length, rows, first_msc, last_msc, digits]
+        self.chunks: List[List[int]] = []
+
+
+class TickArchive:
+    """Daily compressed tick segments per symbol with a chunk index"""
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+        self._segments: Dict[tuple, _Segment] = {}
+        self._lock = threading.RLock()
+
+    def _get_segment(self, symbol: str, day: str) -> _Segment:
+        key = (symbol, day)
+        segment = self._segments.get(key)
+        if segment is None:
+            base = os.path.join(self.root, symbol, day)
+            segment = _Segment(base + '.tck', base + '.json')
+            self._load_index(segment)
+            self._segments[key] = segment
+        return segment
+
+    def _load_index(self, segment: _Segment) -> None:
+        if os.path.exists(segment.index_path):
+            try:
+                with open(segment.index_path, encoding='utf-8') as f:
+                    segment.chunks = json.load(f)['chunks']
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Tick archive: índice ilegível {segment.index_path} - {e}")
+
+        size = os.path.getsize(segment.data_path) if os.path.exists(segment.data_path) else 0
+        segment.chunks = [chunk for chunk in segment.chunks if chunk[0] + chunk[1] <= size]
+        end = segment.chunks[-1][0] + segment.chunks[-1][1] if segment.chunks else 0
+        if size > end:
+            # Chunk gravado sem entrada no índice (escrita interrompida): descartado
+            with open(segment.data_path, 'r+b') as f:
+                f.truncate(end)
+            logger.warning(f"Tick archive: {size - end} bytes sem índice removidos de {segment.data_path}")
+
+    def _save_index(self, segment: _Segment) -> None:
+        temp = segment.index_path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({'dtype': TICK_DTYPE.descr, 'chunks': segment.chunks}, f)
+        os.replace(temp, segment.index_path)
+
+    def append(self, symbol: str, ticks: np.ndarray, digits: int = DEFAULT_DIGITS) -> int:
+        """
+        Append ticks (sorted by time_msc) as new chunks of their day segments
+
+        Args:
+            symbol: Symbol name
+            ticks: Structured array with the ``TICK_DTYPE`` fields
+            digits: Price decimals kept (``symbol_info().digits``)
+
+        Returns:
+            Number of ticks written
+        """
+        if not len(ticks):
+            return 0
+        ticks = np.asarray(ticks, dtype=TICK_DTYPE)
+        days = ticks['time_msc'] // _DAY_MSC
+        bounds = np.flatnonzero(np.diff(days)) + 1
+
+        with self._lock:
+            for part in np.split(ticks, bounds):
+                segment = self._get_segment(symbol, _day(int(part['time_msc'][0])))
+                data = encode_chunk(part, digits)
+                os.makedirs(os.path.dirname(segment.data_path), exist_ok=True)
+                offset = segment.chunks[-1][0] + segment.chunks[-1][1] if segment.chunks else 0
+                with open(segment.data_path, 'ab') as f:
+                    f.write(data)
+                segment.chunks.append([
+                    offset, len(data), len(part),
+                    int(part['time_msc'][0]), int(part['time_msc'][-1]), digits
+                ])
+                self._save_index(segment)
+        return len(ticks)
+
+    def days(self, symbol: str) -> List[str]:
+        """Days (YYYYMMDD) with a segment for ``symbol``"""
+        directory = os.path.join(self.root, symbol)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.tck'))
+
+    def read(self, symbol: str, start_msc: int, end_msc: int) -> np.ndarray:
+        """
+        Ticks of ``[start_msc, end_msc]`` (epoch milliseconds, inclusive)
+
+        Only the chunks whose time span overlaps the range are decompressed.
+
+        Returns:
+            Structured array (``TICK_DTYPE``) sorted by time_msc
+        """
+        parts = []
+        first_day, last_day = _day(start_msc), _day(end_msc)
+        for day in self.days(symbol):
+            if day < first_day or day > last_day:
+                continue
+            with self._lock:
+                segment = self._get_segment(symbol, day)
+                chunks = [chunk for chunk in segment.chunks if chunk[4] >= start_msc and chunk[3] <= end_msc]
+            if not chunks:
+                continue
+            with open(segment.data_path, 'rb') as f:
+                for offset, length, rows, _, _, digits in chunks:
+                    f.seek(offset)
+                    parts.append(decode_chunk(f.read(length), rows, digits))
+
+        if not parts:
+            return np.zeros(0, dtype=TICK_DTYPE)
+        ticks = np.concatenate(parts)
+        times = ticks['time_msc']
+        return ticks[(times >= start_msc) & (times <= end_msc)]
+
+    def read_day(self, symbol: str, day: str) -> np.ndarray:
+        """Every tick of one day segment (YYYYMMDD)"""
+        start = int(datetime.strptime(day, '%Y%m%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+        return self.read(symbol, start, start + _DAY_MSC - 1)
+
+
+class TickRecorder:
+    """Buffers observed ticks per symbol and writes them to the archive in chunks"""
+
+    def __init__(
+        self,
+        archive: TickArchive,
+        chunk_ticks: int = DEFAULT_CHUNK_TICKS,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        poll_interval: float = DEFAULT_POLL_INTERVAL
+    ):
+        self.archive = archive
+        self.chunk_ticks = chunk_ticks
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self._buffers: Dict[str, List[tuple]] = {}
+        self._buffer_since: Dict[str, float] = {}
+        self._last: Dict[str, tuple] = {}
+        self._digits: Dict[str, int] = {}
+        self._watched: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            'recorded': 0,
+            'duplicates': 0,
+            'written': 0,
+            'chunks': 0,
+            'poll_errors': 0,
+        }
+
+    def record(self, symbol: str, tick) -> bool:
+        """
+        Keep a tick returned by ``mt5.symbol_info_tick``
+
+        Repeated polls of the same tick and ticks older than the last one
+        recorded for the symbol are ignored.
+
+        Returns:
+            True if the tick was new
+        """
+        if tick is None:
+            return False
+        row = (int(tick.time_msc), float(tick.bid), float(tick.ask), float(tick.last), int(tick.volume))
+
+        with self._lock:
+            last = self._last.get(symbol)
+            if last is not None and (row[0] < last[0] or row == last):
+                self._stats['duplicates'] += 1
+                return False
+            self._last[symbol] = row
+            buffer = self._buffers.setdefault(symbol, [])
+            started = not buffer
+            if started:
+                self._buffer_since[symbol] = time.monotonic()
+            buffer.append(row)
+            self._stats['recorded'] += 1
+            full = len(buffer) >= self.chunk_ticks
+
+        if full:
+            self._flush_symbol(symbol)
+        elif started:
+            # Buffer novo: a thread grava por idade mesmo sem símbolos em watch()
+            self._ensure_running()
+        return True
+
+    def _symbol_digits(self, symbol: str) -> int:
+        digits = self._digits.get(symbol)
+        if digits is None:
+            try:
+                digits = getattr(mt5.symbol_info(symbol), 'digits', None)
+            except Exception:
+                digits = None
+            if not isinstance(digits, int):
+                digits = DEFAULT_DIGITS
+            self._digits[symbol] = digits
+        return digits
+
+    def _flush_symbol(self, symbol: str) -> int:
+        with self._lock:
+            rows = self._buffers.pop(symbol, None)
+            self._buffer_since.pop(symbol, None)
+        if not rows:
+            return 0
+        try:
+            written = self.archive.append(symbol, np.array(rows, dtype=TICK_DTYPE), self._symbol_digits(symbol))
+        except Exception as e:
+            logger.error(f"Tick recorder: falha ao gravar {len(rows)} ticks de {symbol} - {e}")
+            return 0
+        with self._lock:
+            self._stats['written'] += written
+            self._stats['chunks'] += 1
+        return written
+
+    def flush(self, max_age: Optional[float] = None) -> int:
+        """
+        Write buffered ticks to the archive
+
+        Args:
+            max_age: Only buffers holding ticks older than this (seconds)
+
+        Returns:
+            Number of ticks written
+        """
+        now = time.monotonic()
+        with self._lock:
+            symbols = [
+                symbol for symbol, since in self._buffer_since.items()
+                if max_age is None or now - since >= max_age
+            ]
+        return sum(self._flush_symbol(symbol) for symbol in symbols)
+
+    def watch(self, symbol: str) -> None:
+        """Poll ``symbol`` in the background recorder thread"""
+        with self._lock:
+            self._watched.add(symbol)
+        self._ensure_running()
+
+    def unwatch(self, symbol: str) -> None:
+        with self._lock:
+            self._watched.discard(symbol)
+        self._flush_symbol(symbol)
+
+    def _ensure_running(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='tick-recorder', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        logger.info("Tick recorder iniciado")
+        while not self._stop.wait(self.poll_interval):
+            with self._lock:
+                symbols = list(self._watched)
+            for symbol in symbols:
+                try:
+                    self.record(symbol, mt5.symbol_info_tick(symbol))
+                except Exception as e:
+                    self._stats['poll_errors'] += 1
+                    logger.error(f"Tick recorder: erro ao consultar {symbol} - {e}")
+            self.flush(self.flush_interval)
+        logger.info("Tick recorder parado")
+
+    def stop(self) -> None:
+        """Stop polling and write everything still buffered"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            buffered = sum(len(rows) for rows in self._buffers.values())
+            return {**self._stats, 'buffered': buffered, 'watched': sorted(self._watched)}
+
+
+# Instâncias globais
+tick_archive = TickArchive()
+tick_recorder = TickRecorder(tick_archive)
+atexit.register(tick_recorder.stop)
@@ -2,11 +2,12 @@
 Trading service - handles orders, positions, and trade execution
 """
 import logging
-import MetaTrader5 as mt5
+from core.mt5_gateway import mt5
 import pandas as pd
 from typing import List, Optional
 
 from core.mt5_connection import mt5_connection
+from core.mt5_memo import mt5_memo
 from core.exceptions import (
     InvalidOrderError,
     OrderExecutionError,
@@ -29,7 +30,7 @@ class TradingService:
         """
         mt5_connection.ensure_connection()
 
-        info = mt5.account_info()
+        info = mt5_memo.account_info()
         if info is None:
             raise MT5Exception("Failed to get account information")
 
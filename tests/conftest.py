@@ -12,9 +12,49 @@ import shutil
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import app
+from services.bot_scheduler import BotScheduler, Reschedule
 from services.mlp_storage import MLPStorage
 
 
+class FakeScheduler:
+    """Scheduler que guarda os jobs e só os executa quando o teste chama run()"""
+
+    def __init__(self):
+        self.jobs = {}
+
+    def has_job(self, job_id):
+        return job_id in self.jobs
+
+    def schedule(self, job_id, func, interval, **kwargs):
+        self.jobs[job_id] = (func, interval, kwargs.get('delay'))
+
+    def cancel(self, job_id):
+        return self.jobs.pop(job_id, None) is not None
+
+    def interval(self, job_id):
+        return self.jobs[job_id][1]
+
+    def run(self, job_id):
+        """Executa o job uma vez; retorna o atraso até a próxima execução, como o BotScheduler"""
+        func, interval, _ = self.jobs[job_id]
+        result = func()
+        return result.seconds if isinstance(result, Reschedule) else interval
+
+
+@pytest.fixture
+def fake_scheduler():
+    """Scheduler falso (jobs executados manualmente com run())"""
+    return FakeScheduler()
+
+
+@pytest.fixture
+def real_scheduler():
+    """BotScheduler próprio do teste (encerrado no fim)"""
+    scheduler = BotScheduler(max_workers=2)
+    yield scheduler
+    scheduler.shutdown(wait=False)
+
+
 @pytest.fixture
 def client():
     """Cliente de teste Flask"""
@@ -0,0 +1,61 @@
+"""
+Testes do feed de análises em memória (pub/sub para o stream SSE)
+"""
+import queue
+import threading
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services.analysis_feed import AnalysisFeed
+
+
+def analysis(bot_id, n):
+    return {'bot_id': bot_id, 'signal': 'HOLD', 'timestamp': f"2025-01-01T00:00:{n:02d}"}
+
+
+@pytest.mark.unit
+class TestAnalysisFeed:
+
+    def test_latest_is_newest_first_and_filtered(self):
+        feed = AnalysisFeed(per_bot=3, recent=10)
+        for n in range(12):
+            feed.publish('bot-a' if n % 2 else 'bot-b', analysis('bot-a' if n % 2 else 'bot-b', n))
+
+        latest = feed.latest(4)
+        assert [a['timestamp'][-2:] for a in latest] == ['11', '10', '09', '08']
+        assert all(a['bot_id'] == 'bot-a' for a in feed.latest(3, {'bot-a'}))
+        assert feed.latest(5, set()) == []
+        assert [a['timestamp'][-2:] for a in feed.bot_analyses('bot-a')] == ['07', '09', '11']
+        assert feed.get_stats()['recent'] == 10
+
+    def test_subscribers_and_resume(self):
+        feed = AnalysisFeed(subscriber_queue=2)
+        everything = feed.subscribe()
+        only_b = feed.subscribe('bot-b')
+
+        seqs = [feed.publish(bot_id, analysis(bot_id, n)) for n, bot_id in enumerate(['bot-a', 'bot-b', 'bot-a'])]
+
+        # Fila cheia: a análise mais antiga é descartada, o publicador não bloqueia
+        assert [everything.get(timeout=0)[0] for _ in range(2)] == seqs[1:]
+        assert everything.dropped == 1
+        assert only_b.get(timeout=0)[0] == seqs[1]
+        with pytest.raises(queue.Empty):
+            only_b.get(timeout=0)
+
+        assert [seq for seq, _ in feed.since(seqs[0])] == seqs[1:]
+        assert [seq for seq, _ in feed.since(0, 'bot-b')] == [seqs[1]]
+
+        feed.unsubscribe(everything)
+        feed.publish('bot-a', analysis('bot-a', 9))
+        assert everything.queue.empty()
+
+    def test_live_filter_reads_bot_flags_only(self):
+        from routes.bot_analysis_routes import _running_bot_ids
+
+        manager = MagicMock()
+        manager.lock = threading.Lock()
+        manager.bots = {'bot-a': MagicMock(is_running=True), 'bot-b': MagicMock(is_running=False)}
+        with patch('services.bot_manager_service.bot_manager', manager):
+            assert _running_bot_ids() == {'bot-a'}
+        manager.get_all_bots.assert_not_called()
@@ -0,0 +1,197 @@
+"""
+Testes do backtester orientado a eventos e do MetaTrader5 simulado
+"""
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+
+from backtest import (
+    Backtester, ParameterSweep, SimulatedMT5, SymbolSpec, VectorizedBacktester, load_bars, rule_signals
+)
+from backtest.sweep import apply_params, grid, sample
+
+SPEC = SymbolSpec(symbol='BTCUSDc', digits=2, point=0.01, tick_size=0.01, tick_value=0.01,
+                  spread_typical=100, commission_per_lot=1.0)
+
+
+def make_rates(closes, start=1_700_000_040, spread=5.0):
+    closes = np.asarray(closes, dtype=float)
+    rates = np.zeros(len(closes), dtype=[('time', '<i8'), ('open', '<f8'), ('high', '<f8'),
+                                         ('low', '<f8'), ('close', '<f8'), ('tick_volume', '<u8')])
+    rates['time'] = start + np.arange(len(closes)) * 60
+    rates['open'] = np.r_[closes[0], closes[:-1]]
+    rates['high'] = np.maximum(rates['open'], closes) + spread
+    rates['low'] = np.minimum(rates['open'], closes) - spread
+    rates['close'] = closes
+    rates['tick_volume'] = 10
+    return rates
+
+
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return make_rates(50000 + np.cumsum(rng.normal(0, 20, n)))
+
+
+@pytest.mark.unit
+class TestSimulatedMT5:
+
+    def test_market_order_fills_with_spread_and_take_profit(self):
+        sim = SimulatedMT5('BTCUSDc', make_rates([100, 100, 100, 120]), spec=SPEC)
+        sim.advance(1)
+
+        result = sim.order_send({'action': sim.TRADE_ACTION_DEAL, 'symbol': 'BTCUSDc', 'volume': 0.1,
+                                 'type': sim.ORDER_TYPE_BUY, 'tp': 110.0, 'sl': 90.0, 'magic': 7})
+        assert result.retcode == sim.TRADE_RETCODE_DONE
+        assert result.price == pytest.approx(101.0)  # ask = bid + 100 pontos
+        assert len(sim.positions_get(magic=7)) == 1
+
+        sim.advance(2)
+        assert len(sim.positions_get()) == 1  # barra 2 não toca SL nem TP
+        closed = sim.advance(3)
+
+        [trade] = closed
+        assert trade['exit_reason'] == 'TP' and trade['exit_price'] == 110.0
+        # (110 - 101) / tick_size * tick_value * volume - comissão
+        assert trade['profit'] == pytest.approx(9 / 0.01 * 0.01 * 0.1 - 0.1)
+        assert sim.balance == pytest.approx(10000 + trade['profit'])
+
+    def test_bar_touching_both_levels_hits_stop_loss(self):
+        rates = make_rates([100, 100, 100])
+        rates['high'][2], rates['low'][2] = 130, 70
+        sim = SimulatedMT5('BTCUSDc', rates, spec=SPEC)
+        sim.advance(1)
+        sim.order_send({'action': sim.TRADE_ACTION_DEAL, 'symbol': 'BTCUSDc', 'volume': 0.01,
+                        'type': sim.ORDER_TYPE_SELL, 'sl': 120.0, 'tp': 80.0})
+
+        [trade] = sim.advance(2)
+        assert trade['exit_reason'] == 'SL'
+
+    def test_rates_never_show_future_bars(self):
+        sim = SimulatedMT5('BTCUSDc', random_walk(200), spec=SPEC)
+        sim.advance(120)
+
+        m1 = sim.copy_rates_from_pos('BTCUSDc', sim.TIMEFRAME_M1, 0, 50)
+        m5 = sim.copy_rates_from_pos('BTCUSDc', sim.TIMEFRAME_M5, 0, 10)
+
+        assert m1['time'][-1] == sim.bars['time'][120] and len(m1) == 50
+        assert m5['time'][-1] <= sim.bars['time'][120]
+        assert m5['close'][-1] == sim.bars['close'][120]
+        assert sim.symbol_info_tick('BTCUSDc').bid == sim.bars['close'][120]
+
+
+@pytest.mark.unit
+class TestBacktester:
+
+    def test_bot_strategy_replays_through_simulated_mt5(self):
+        from core.mt5_gateway import mt5_gateway
+        config = {'symbol': 'BTCUSDc', 'timeframe': 'M1', 'lot_size': 0.01, 'take_profit': 5000,
+                  'stop_loss': 10000, 'max_positions': 1, 'signals': {'min_confidence': 0.65}}
+
+        terminal = MagicMock()
+        with patch.object(mt5_gateway, 'module', terminal):
+            result = Backtester('BTCUSDc', random_walk(1500), spec=SPEC).run_bot(config)
+
+        summary = result.summary()
+        assert summary['bars'] == 1400 and summary['analyses'] == 1400
+        assert summary['total_trades'] > 0
+        assert len(result.equity_curve) == 1400
+        assert result.final_balance == pytest.approx(10000 + sum(t['profit'] for t in result.trades))
+        assert {trade['exit_reason'] for trade in result.trades} <= {'SL', 'TP', 'END'}
+        # Nada chega ao terminal real, e o gateway volta a ele depois do backtest
+        assert terminal.mock_calls == []
+        assert mt5_gateway.routed is None
+
+    def test_custom_step_and_due(self):
+        backtester = Backtester('BTCUSDc', random_walk(300), spec=SPEC, warmup=50)
+        calls = []
+
+        result = backtester.run(lambda sim, i: calls.append(i), due=lambda i: i % 10 == 0)
+
+        assert calls == list(range(50, 300, 10))
+        assert result.trades == [] and result.summary()['net_profit'] == 0
+
+    def test_load_bars_from_csv(self, tmp_path):
+        path = tmp_path / 'bars.csv'
+        path.write_text("time,open,high,low,close,tick_volume\n"
+                        "2025-01-01 00:01:00,2,3,1,2,5\n"
+                        "2025-01-01 00:00:00,1,2,0.5,1.5,4\n")
+
+        bars = load_bars(str(path))
+
+        assert list(bars['time']) == [1735689600, 1735689660]
+        assert bars['close'][0] == 1.5
+
+
+@pytest.mark.unit
+class TestVectorizedBacktester:
+
+    @pytest.mark.parametrize('config', [
+        {'timeframe': 'M1', 'lot_size': 0.01, 'take_profit': 5000, 'stop_loss': 10000, 'max_positions': 1},
+        {'timeframe': 'M1', 'lot_size': 0.02, 'take_profit': 3000, 'stop_loss': 2000, 'max_positions': 3,
+         'signals': {'min_confidence': 0.7}},
+        {'timeframe': 'M5', 'lot_size': 0.01, 'take_profit': 3000, 'stop_loss': 2000, 'max_positions': 2},
+    ])
+    def test_matches_event_replay(self, config):
+        bars = random_walk(2000, seed=3)
+
+        replay = Backtester('BTCUSDc', bars, spec=SPEC).run_bot(config)
+        vectorized = VectorizedBacktester('BTCUSDc', bars, spec=SPEC).run_bot(config)
+
+        def key(trade):
+            return (trade['type'], trade['entry_time'], trade['exit_time'], trade['exit_reason'],
+                    round(trade['entry_price'], 6), round(trade['exit_price'], 6), round(trade['profit'], 6))
+
+        assert len(replay.trades) > 0
+        assert [key(t) for t in vectorized.trades] == [key(t) for t in replay.trades]
+        assert vectorized.analyses == replay.analyses and vectorized.signals == replay.signals
+        np.testing.assert_array_equal(vectorized.equity_curve['time'], replay.equity_curve['time'])
+        np.testing.assert_allclose(vectorized.equity_curve['equity'], replay.equity_curve['equity'], atol=1e-6)
+        assert vectorized.final_balance == pytest.approx(replay.final_balance)
+
+    def test_rule_priority(self):
+        # Queda contínua: RSI em 0 domina a tendência de baixa → BUY forte
+        signal, confidence = rule_signals(np.linspace(200, 100, 60))
+        assert signal[-1] == 1 and confidence[-1] == 0.85
+        # Sem histórico suficiente: RSI neutro e médias = preço → HOLD
+        signal, confidence = rule_signals(np.full(10, 100.0))
+        assert (signal == 0).all() and (confidence == 0.5).all()
+
+    def test_invalid_volume_opens_nothing(self):
+        result = VectorizedBacktester('BTCUSDc', random_walk(500), spec=SPEC).run_bot({'lot_size': 0.015})
+
+        assert result.trades == []
+        assert result.final_balance == 10000
+
+
+@pytest.mark.unit
+class TestParameterSweep:
+
+    def test_grid_sample_and_nested_params(self):
+        space = {'take_profit': [2000, 5000], 'signals.min_confidence': [0.65, 0.85]}
+        assert len(grid(space)) == 4
+
+        drawn = sample({'take_profit': (1000, 9000), 'max_positions': [1, 2]}, 20, seed=1)
+        assert drawn == sample({'take_profit': (1000, 9000), 'max_positions': [1, 2]}, 20, seed=1)
+        assert all(1000 <= params['take_profit'] <= 9000 and isinstance(params['take_profit'], int)
+                   for params in drawn)
+
+        base = {'lot_size': 0.01, 'signals': {'min_confidence': 0.7}}
+        config = apply_params(base, {'signals.min_confidence': 0.85, 'advanced.magic_number': 7})
+        assert config['signals']['min_confidence'] == 0.85 and config['advanced'] == {'magic_number': 7}
+        assert base['signals']['min_confidence'] == 0.7
+
+    def test_pool_results_match_direct_runs_and_are_ranked(self):
+        bars = random_walk(1500, seed=5)
+        base = {'timeframe': 'M1', 'lot_size': 0.01, 'max_positions': 1}
+        configs = grid({'take_profit': [2000, 5000], 'stop_loss': [2000, 10000]})
+
+        results = ParameterSweep('BTCUSDc', bars, spec=SPEC, workers=2).run(base, configs)
+
+        assert [result['rank'] for result in results] == [1, 2, 3, 4]
+        factors = [result['profit_factor'] for result in results if result['total_trades']]
+        assert factors == sorted(factors, reverse=True)
+        direct = VectorizedBacktester('BTCUSDc', bars, spec=SPEC)
+        for result in results:
+            expected = direct.run_bot(apply_params(base, result['params'])).summary()
+            assert result['net_profit'] == expected['net_profit']
+            assert result['total_trades'] == expected['total_trades']
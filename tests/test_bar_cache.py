@@ -0,0 +1,94 @@
+"""
+Testes do cache compartilhado de barras OHLCV
+"""
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from services.bar_cache import BarCache, timeframe_seconds
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')
+])
+
+
+class FakeTerminal:
+    """Simula copy_rates_from_pos sobre uma série M1 que cresce"""
+
+    def __init__(self, bars: int):
+        self.bars = bars
+        self.calls = []
+
+    def rates(self):
+        data = np.zeros(self.bars, dtype=RATES_DTYPE)
+        data['time'] = 1_700_000_000 + np.arange(self.bars) * 60
+        data['close'] = 100.0 + np.arange(self.bars)
+        return data
+
+    def copy_rates_from_pos(self, symbol, timeframe, start, count):
+        self.calls.append(count)
+        return self.rates()[-count:].copy()
+
+
+@pytest.fixture
+def terminal():
+    fake = FakeTerminal(bars=500)
+    with patch('services.bar_cache.mt5.copy_rates_from_pos', side_effect=fake.copy_rates_from_pos):
+        yield fake
+
+
+@pytest.mark.unit
+class TestBarCache:
+
+    def test_timeframe_seconds(self):
+        assert timeframe_seconds(1) == 60
+        assert timeframe_seconds(15) == 900
+        assert timeframe_seconds(16385) == 3600
+        assert timeframe_seconds(16408) == 86400
+
+    def test_shared_read_only_views(self, terminal):
+        cache = BarCache(max_age=60)
+
+        first = cache.get_rates('BTCUSDc', 1, 100)
+        second = cache.get_rates('BTCUSDc', 1, 60)
+
+        assert len(terminal.calls) == 1
+        assert len(first) == 100 and len(second) == 60
+        assert second['time'][-1] == first['time'][-1]
+        assert not first.flags.writeable
+        assert cache.get_stats()['hits'] == 1
+
+    def test_incremental_fetch_only_new_bars(self, terminal):
+        cache = BarCache(max_age=0)
+        cache.get_rates('BTCUSDc', 1, 100)
+
+        terminal.bars += 1
+        rates = cache.get_rates('BTCUSDc', 1, 100)
+
+        assert terminal.calls[1] <= 3
+        assert rates['time'][-1] == terminal.rates()['time'][-1]
+        assert np.all(np.diff(rates['time']) == 60)
+        assert cache.last_bar_time('BTCUSDc', 1) == int(rates['time'][-1])
+
+    def test_gap_larger_than_probe(self, terminal):
+        cache = BarCache(max_age=0)
+        cache.get_rates('BTCUSDc', 1, 100)
+
+        terminal.bars += 40
+        rates = cache.get_rates('BTCUSDc', 1, 100)
+
+        np.testing.assert_array_equal(rates, terminal.rates()[-100:])
+
+    def test_larger_window_triggers_full_fetch(self, terminal):
+        cache = BarCache(max_age=60)
+        cache.get_rates('BTCUSDc', 1, 50)
+        rates = cache.get_rates('BTCUSDc', 1, 300)
+
+        assert len(rates) == 300
+        assert cache.get_stats()['full_fetches'] == 2
+
+    def test_no_data_returns_none(self):
+        cache = BarCache()
+        with patch('services.bar_cache.mt5.copy_rates_from_pos', return_value=None):
+            assert cache.get_rates('INVALID', 1, 100) is None
@@ -0,0 +1,99 @@
+"""
+Testes dos eventos de fechamento de barra
+"""
+import time
+
+import numpy as np
+import pytest
+
+from services.bar_events import BarCloseMonitor, MONITOR_JOB_ID
+
+
+class FakeCache:
+    """get_rates sobre uma barra em formação controlada pelo teste"""
+
+    def __init__(self):
+        self.time = 1_700_000_000
+        self.price = 100.0
+        self.reads = 0
+
+    def get_rates(self, symbol, timeframe, count):
+        self.reads += 1
+        rates = np.zeros(2, dtype=[('time', '<i8'), ('close', '<f8')])
+        rates['time'] = [self.time - 60, self.time]
+        rates['close'] = self.price
+        return rates
+
+
+@pytest.fixture
+def monitor(fake_scheduler):
+    return BarCloseMonitor(scheduler=fake_scheduler, cache=FakeCache())
+
+
+@pytest.mark.unit
+class TestBarCloseMonitor:
+
+    def test_fires_only_on_new_bar(self, monitor):
+        events = []
+        monitor.subscribe('bot-1', 'BTCUSDc', 1, events.append)
+
+        monitor.poll()  # primeira observação não dispara
+        monitor.cache.price = 105.0
+        monitor.poll()
+        assert events == []
+
+        monitor.cache.time += 60
+        monitor.poll()
+        monitor.poll()
+        assert events == ['bar_close']
+        assert monitor.get_stats()['bar_closes'] == 1
+
+    def test_intrabar_threshold(self, monitor):
+        events = []
+        monitor.subscribe('bot-1', 'BTCUSDc', 1, events.append, intrabar_threshold=0.01)
+
+        monitor.poll()
+        monitor.cache.price = 100.5
+        monitor.poll()
+        assert events == []
+
+        monitor.cache.price = 101.0
+        monitor.poll()
+        monitor.poll()
+        assert events == ['intrabar']
+
+    def test_only_subscribers_of_series_fire(self, monitor):
+        m1, h1 = [], []
+        monitor.subscribe('bot-m1', 'BTCUSDc', 1, m1.append)
+        monitor.subscribe('bot-h1', 'BTCUSDc', 16385, h1.append)
+        monitor.poll()
+
+        # FakeCache devolve a mesma série para todos; só testa o roteamento por inscrição
+        monitor.unsubscribe('bot-h1')
+        monitor.cache.time += 60
+        monitor.poll()
+
+        assert m1 == ['bar_close'] and h1 == []
+
+    def test_monitor_job_follows_subscriptions(self, monitor):
+        monitor.subscribe('bot-1', 'BTCUSDc', 1, lambda reason: None)
+        assert monitor.scheduler.has_job(MONITOR_JOB_ID)
+        assert monitor.scheduler.run(MONITOR_JOB_ID) == monitor.poll_interval
+
+        assert monitor.unsubscribe('bot-1')
+        assert not monitor.scheduler.has_job(MONITOR_JOB_ID)
+        assert not monitor.unsubscribe('bot-1')
+
+    def test_poll_rate_on_real_scheduler(self, real_scheduler):
+        monitor = BarCloseMonitor(scheduler=real_scheduler, cache=FakeCache(), poll_interval=0.05)
+        events = []
+        monitor.subscribe('bot-1', 'BTCUSDc', 1, events.append)
+        time.sleep(0.2)
+        monitor.cache.time += 60
+        time.sleep(0.3)
+        monitor.unsubscribe('bot-1')
+
+        # ~10 polls em 0.5s: nem busy loop quando nada dispara, nem atraso depois de um disparo
+        assert 5 <= monitor.get_stats()['polls'] <= 15
+        assert monitor.cache.reads == monitor.get_stats()['polls']
+        assert events == ['bar_close']
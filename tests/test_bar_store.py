@@ -0,0 +1,171 @@
+"""
+Testes do bar store local (arquivos colunares por símbolo/timeframe)
+"""
+import os
+
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from services.bar_store import RATES_DTYPE, BarStore
+
+START = 1_700_000_040  # múltiplo de 60
+
+
+def make_rates(first: int, count: int, step: int = 60) -> np.ndarray:
+    rates = np.zeros(count, dtype=RATES_DTYPE)
+    rates['time'] = first + np.arange(count) * step
+    rates['close'] = 100.0 + (rates['time'] - START) / 60
+    return rates
+
+
+class FakeTerminal:
+    """Simula copy_rates_range/copy_rates_from_pos sobre um histórico M1 com um fim de semana"""
+
+    def __init__(self, bars: int = 3000, closed=(1000, 1200)):
+        history = make_rates(START, bars)
+        keep = np.ones(bars, dtype=bool)
+        keep[closed[0]:closed[1]] = False
+        self.history = history[keep]
+        self.ranges = []
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        self.ranges.append((int(date_from.timestamp()), int(date_to.timestamp())))
+        times = self.history['time']
+        return self.history[(times >= date_from.timestamp()) & (times <= date_to.timestamp())].copy()
+
+    def copy_rates_from_pos(self, symbol, timeframe, start, count):
+        return self.history[-count:].copy()
+
+
+@pytest.fixture
+def terminal():
+    fake = FakeTerminal()
+    with patch('services.bar_store.mt5.copy_rates_range', side_effect=fake.copy_rates_range), \
+            patch('services.bar_store.mt5.copy_rates_from_pos', side_effect=fake.copy_rates_from_pos):
+        yield fake
+
+
+@pytest.mark.unit
+class TestBarStore:
+
+    def test_append_and_memmap_read(self, tmp_path):
+        store = BarStore(str(tmp_path))
+        assert store.write('BTCUSDc', 1, make_rates(START, 100)) == 100
+        assert store.write('BTCUSDc', 1, make_rates(START + 100 * 60, 50)) == 50
+
+        rates = store.read('BTCUSDc', 1)
+        assert isinstance(rates, np.memmap)
+        assert not rates.flags.writeable
+        assert len(rates) == 150
+        assert os.path.getsize(tmp_path / 'BTCUSDc' / 'M1.bin') == 150 * RATES_DTYPE.itemsize
+
+        window = store.read('BTCUSDc', 1, start=START + 10 * 60, end=START + 19 * 60)
+        assert len(window) == 10 and window['time'][0] == START + 600
+        assert list(store.read('BTCUSDc', 1, count=3)['time']) == list(rates['time'][-3:])
+
+    def test_forming_bar_is_overwritten(self, tmp_path):
+        store = BarStore(str(tmp_path))
+        store.write('BTCUSDc', 1, make_rates(START, 10))
+
+        update = make_rates(START + 9 * 60, 2)
+        update['close'][0] = 999.0
+        assert store.write('BTCUSDc', 1, update) == 1
+
+        rates = store.read('BTCUSDc', 1)
+        assert len(rates) == 11
+        assert rates['close'][9] == 999.0
+
+    def test_older_bars_are_merged(self, tmp_path):
+        store = BarStore(str(tmp_path))
+        store.write('BTCUSDc', 1, make_rates(START + 50 * 60, 50))
+        assert store.write('BTCUSDc', 1, make_rates(START, 60)) == 50
+
+        times = store.read('BTCUSDc', 1)['time']
+        assert len(times) == 100
+        assert (np.diff(times) == 60).all()
+
+    def test_read_view_survives_backfill(self, tmp_path):
+        store = BarStore(str(tmp_path))
+        store.write('BTCUSDc', 1, make_rates(START + 50 * 60, 50))
+        view = store.read('BTCUSDc', 1)
+
+        # Barras mais antigas vão para uma nova geração; a view antiga continua válida
+        assert store.write('BTCUSDc', 1, make_rates(START, 50)) == 50
+        assert len(view) == 50 and view['time'][0] == START + 50 * 60
+        assert len(store.read('BTCUSDc', 1)) == 100
+
+        reopened = BarStore(str(tmp_path))
+        assert reopened.read('BTCUSDc', 1)['time'][0] == START
+        assert sorted(os.listdir(tmp_path / 'BTCUSDc')) == ['M1.1.bin', 'M1.json']
+
+    def test_mapped_generation_is_removed_later(self, tmp_path):
+        store = BarStore(str(tmp_path))
+        store.write('BTCUSDc', 1, make_rates(START + 50 * 60, 50))
+
+        # Windows: arquivo ainda mapeado não pode ser apagado
+        with patch('services.bar_store.os.remove', side_effect=PermissionError):
+            assert store.write('BTCUSDc', 1, make_rates(START, 50)) == 50
+        assert (tmp_path / 'BTCUSDc' / 'M1.bin').exists()
+        assert len(store.read('BTCUSDc', 1)) == 100
+
+        store.write('BTCUSDc', 1, make_rates(START + 100 * 60, 1))
+        assert not (tmp_path / 'BTCUSDc' / 'M1.bin').exists()
+        assert len(BarStore(str(tmp_path)).read('BTCUSDc', 1)) == 101
+
+    def test_index_is_rebuilt(self, tmp_path):
+        store = BarStore(str(tmp_path))
+        rates = make_rates(START, 100)
+        store.write('BTCUSDc', 1, np.concatenate((rates[:40], rates[60:])))
+
+        # Índice perdido e registro pela metade no fim do arquivo
+        os.remove(tmp_path / 'BTCUSDc' / 'M1.json')
+        with open(tmp_path / 'BTCUSDc' / 'M1.bin', 'ab') as f:
+            f.write(b'\0' * 10)
+
+        reopened = BarStore(str(tmp_path))
+        assert len(reopened.read('BTCUSDc', 1)) == 80
+        assert reopened.coverage('BTCUSDc', 1) == [
+            (START, START + 40 * 60), (START + 60 * 60, START + 99 * 60)
+        ]
+        assert reopened.missing_bars('BTCUSDc', 1) == [(START + 40 * 60, START + 60 * 60)]
+
+    def test_gaps_and_backfill(self, tmp_path, terminal):
+        store = BarStore(str(tmp_path))
+        store.write('BTCUSDc', 1, terminal.history[500:600])
+
+        start, end = START + 400 * 60, START + 700 * 60
+        assert store.gaps('BTCUSDc', 1, start, end) == [
+            (start, START + 500 * 60), (START + 599 * 60, end)
+        ]
+
+        assert store.backfill('BTCUSDc', 1, start, end) == 200
+        assert store.gaps('BTCUSDc', 1, start, end) == [(START + 699 * 60, end)]
+        times = store.read('BTCUSDc', 1)['time']
+        assert times[0] == start and (np.diff(times) == 60).all()
+
+    def test_get_range_fetches_only_missing_spans(self, tmp_path, terminal):
+        store = BarStore(str(tmp_path))
+        start, end = START + 900 * 60, START + 1500 * 60
+
+        rates = store.get_range('BTCUSDc', 1, start, end)
+        assert len(rates) == 401  # 200 barras do fim de semana não existem
+        assert store.missing_bars('BTCUSDc', 1) == [(START + 1000 * 60, START + 1200 * 60)]
+
+        calls = len(terminal.ranges)
+        again = store.get_range('BTCUSDc', 1, start + 60, end - 60)
+        assert len(terminal.ranges) == calls  # servido do disco
+        assert len(again) == 399
+
+    def test_history_and_update(self, tmp_path, terminal):
+        store = BarStore(str(tmp_path))
+        assert store.update('BTCUSDc', 1, initial_bars=100) == 100
+        rates = store.history('BTCUSDc', 1, days=0.5)
+        assert len(rates) == 12 * 60 + 1
+        assert rates['time'][-1] == terminal.history['time'][-1]
+
+        # Barras novas no terminal: update busca só a partir da última gravada
+        terminal.history = np.concatenate((terminal.history, make_rates(int(rates['time'][-1]) + 60, 5)))
+        assert store.update('BTCUSDc', 1) == 5
+        last_from, _ = terminal.ranges[-1]
+        assert last_from == rates['time'][-1]
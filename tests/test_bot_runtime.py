@@ -0,0 +1,37 @@
+"""
+Testes do runtime headless dos bots gerenciados
+"""
+import pytest
+from unittest.mock import patch
+
+from bot.config import BotConfig
+from bot.runtime import bot_config, create_bot_engine, shared_model
+
+
+@pytest.mark.unit
+class TestBotRuntime:
+
+    def test_bot_config_is_isolated_per_bot(self):
+        base = BotConfig()
+        btc = bot_config({'symbol': 'BTCUSDc', 'lot_size': 0.02, 'advanced': {'magic_number': 777}}, base)
+        xau = bot_config({'symbol': 'XAUUSDc', 'take_profit': 300, 'stop_loss': 150}, base)
+
+        assert (btc.trading.symbol, btc.trading.lot_size, btc.trading.magic_number) == ('BTCUSDc', 0.02, 777)
+        assert (xau.trading.symbol, xau.trading.take_profit_pips, xau.trading.stop_loss_pips) == ('XAUUSDc', 300, 150)
+        assert xau.trading.magic_number == base.trading.magic_number
+        # A configuração global não é alterada; as demais seções são compartilhadas
+        assert base.trading.symbol == 'BTCUSDc' and base.trading.lot_size == 0.01
+        assert btc.mlp is base.mlp and xau.mt5 is base.mt5
+
+    def test_engines_share_one_model(self):
+        engines = [create_bot_engine({'symbol': f'SYM{i}'}) for i in range(20)]
+        assert all(engine.mlp_model is shared_model() for engine in engines)
+        assert len({engine.config.trading.symbol for engine in engines}) == 20
+        assert len({engine.monitor_job_id for engine in engines}) == 20
+
+    def test_stopping_a_bot_engine_keeps_the_connection(self):
+        engine = create_bot_engine({'symbol': 'BTCUSDc'})
+        with patch('bot.trading_engine.mt5_connection') as connection, \
+                patch('bot.trading_engine.bot_scheduler'):
+            engine.stop()
+        connection.shutdown.assert_not_called()
@@ -0,0 +1,148 @@
+"""
+Testes do scheduler central dos bots
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from services.bot_scheduler import BotScheduler, Reschedule
+from services.inference_service import BatchInferenceService
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+@pytest.fixture
+def scheduler():
+    sched = BotScheduler(max_workers=2)
+    yield sched
+    sched.shutdown(wait=False)
+
+
+@pytest.mark.unit
+class TestBotScheduler:
+
+    def test_periodic_runs_on_bounded_pool(self, scheduler):
+        runs = {}
+        threads = set()
+
+        def job(name):
+            def run():
+                runs[name] = runs.get(name, 0) + 1
+                threads.add(threading.current_thread().name)
+            return run
+
+        for i in range(20):
+            scheduler.schedule(f'bot:{i}', job(i), interval=0.02, delay=0)
+
+        assert wait_until(lambda: len(runs) == 20 and min(runs.values()) >= 3)
+        assert len(threads) <= 2
+
+    def test_cancel_stops_future_runs(self, scheduler):
+        runs = []
+        scheduler.schedule('bot:a', lambda: runs.append(1), interval=0.01, delay=0)
+        assert wait_until(lambda: len(runs) >= 2)
+
+        assert scheduler.cancel('bot:a')
+        time.sleep(0.05)
+        count = len(runs)
+        time.sleep(0.05)
+
+        assert len(runs) == count
+        assert not scheduler.has_job('bot:a')
+        assert not scheduler.cancel('bot:a')
+
+    def test_overrun_detection(self, scheduler):
+        scheduler.schedule('bot:slow', lambda: time.sleep(0.05), interval=0.01, delay=0)
+        assert wait_until(lambda: scheduler.get_stats()['jobs']['bot:slow']['runs'] >= 2)
+
+        stats = scheduler.get_stats()['jobs']['bot:slow']
+        assert stats['overruns'] >= 2
+        assert stats['max_duration'] >= 0.05
+
+    def test_returned_delay_overrides_interval(self, scheduler):
+        runs = []
+
+        def job():
+            runs.append(time.monotonic())
+            return Reschedule(10)  # próximo ciclo bem depois
+
+        scheduler.schedule('bot:a', job, interval=0.01, delay=0)
+        time.sleep(0.1)
+        assert len(runs) == 1
+
+    def test_numeric_return_does_not_change_cadence(self, scheduler):
+        counts = {'zero': 0, 'many': 0}
+
+        def job(name, result):
+            def run():
+                counts[name] += 1
+                return result  # ex.: quantidade de eventos processados
+            return run
+
+        scheduler.schedule('job:zero', job('zero', 0), interval=0.05, delay=0)
+        scheduler.schedule('job:many', job('many', 5), interval=0.05, delay=0)
+        time.sleep(0.5)
+        # ~10 execuções cada: 0 não vira busy loop e 5 não vira atraso de 5s
+        assert 5 <= counts['zero'] <= 15
+        assert 5 <= counts['many'] <= 15
+
+    def test_trigger_during_run_reruns_once(self, scheduler):
+        started = threading.Event()
+        release = threading.Event()
+        runs = []
+
+        def job():
+            runs.append(1)
+            started.set()
+            release.wait(1)
+
+        scheduler.schedule('bot:a', job, interval=10, delay=0)
+        assert started.wait(1)
+
+        scheduler.trigger('bot:a')
+        scheduler.trigger('bot:a')
+        release.set()
+
+        assert wait_until(lambda: len(runs) == 2)
+        time.sleep(0.05)
+        assert len(runs) == 2
+
+    def test_inference_jobs_batch_through_scheduler(self):
+        class Model:
+            def predict_proba(self, X):
+                return np.full((len(X), 3), 1 / 3)
+
+        model = Model()
+        service = BatchInferenceService(max_wait=0.05)
+        scheduler = BotScheduler(max_workers=8)
+        runs = []
+
+        def engine():
+            service.predict_proba(model, np.zeros((1, 4)))
+            runs.append(1)
+
+        try:
+            with patch('services.bot_scheduler.inference_service', service):
+                # Jitter e início em instantes diferentes, como os engines reais
+                for i in range(6):
+                    scheduler.schedule(f'engine:{i}', engine, interval=0.2, jitter=1.0,
+                                       delay=i * 0.03, inference=True)
+                    time.sleep(0.01)
+                assert wait_until(lambda: len(runs) >= 12, timeout=3)
+        finally:
+            scheduler.shutdown(wait=False)
+
+        # Os 6 engines vencem no mesmo ponto da grade: um lote por tick
+        stats = service.get_stats()
+        assert stats['max_batch_rows'] == 6
+        assert stats['batches'] <= stats['requests'] / 3
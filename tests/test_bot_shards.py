@@ -0,0 +1,179 @@
+"""
+Testes da análise dos bots em processos worker (shards por símbolo)
+"""
+import threading
+import time
+from multiprocessing import Pipe
+
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services.bar_store import RATES_DTYPE
+from services.bot_shards import BotShardPool, SharedBarRing, serve, shard_for
+from services.bot_strategy import evaluate_rules
+from utils.indicators import StreamingIndicators
+
+
+def make_rates(n, start=0):
+    rates = np.zeros(n, dtype=RATES_DTYPE)
+    rates['time'] = (start + np.arange(n)) * 60
+    rates['close'] = 100 + np.sin((start + np.arange(n)) / 5.0)
+    rates['open'] = rates['high'] = rates['low'] = rates['close']
+    return rates
+
+
+class FakeBot:
+    """O que o pool usa de um BotInstance"""
+
+    def __init__(self, bot_id, symbol):
+        self.bot_id = bot_id
+        self.config = {'symbol': symbol}
+        self.timeframe = 1
+        self.is_running = True
+        self.published = []
+        self.done = threading.Event()
+
+    def publish_analysis(self, analysis):
+        self.published.append(analysis)
+        self.done.set()
+
+
+@pytest.fixture
+def ring():
+    ring = SharedBarRing.create(capacity=8)
+    yield ring
+    ring.close()
+
+
+@pytest.mark.unit
+class TestBotShards:
+
+    def test_shard_is_stable_per_symbol(self):
+        assert shard_for('BTCUSDc', 4) == shard_for('BTCUSDc', 4)
+        assert {shard_for(f'SYM{i}', 4) for i in range(50)} == {0, 1, 2, 3}
+
+    def test_ring_appends_and_rewrites_forming_bar(self, ring):
+        assert ring.write(make_rates(5)) == 5
+        forming = make_rates(2, start=4)
+        forming['close'] = 999.0
+        assert ring.write(forming) == 2  # barra 4 reescrita, barra 5 nova
+        rates = ring.read(100)
+        assert list(rates['time'] // 60) == [0, 1, 2, 3, 4, 5]
+        assert rates['close'][-2] == 999.0
+        assert ring.write(make_rates(3)) == 0  # nada mais novo que a última barra
+
+    def test_ring_wraps_and_is_shared_by_name(self, ring):
+        ring.write(make_rates(20))
+        reader = SharedBarRing.attach(ring.name)
+        try:
+            assert list(reader.read(3)['time'] // 60) == [17, 18, 19]
+            assert len(reader.read(100)) == 8
+            ring.write(make_rates(1, start=20))
+            assert reader.read(1)['time'][0] // 60 == 20
+        finally:
+            reader.close()
+
+    def test_worker_loop_matches_in_process_rules(self, ring):
+        ring.write(make_rates(8))
+        parent, child = Pipe()
+        worker = threading.Thread(target=serve, args=(child,), daemon=True)
+        worker.start()
+        try:
+            parent.send(('add', 'bot1', 'BTCUSDc'))
+            parent.send(('add', 'bot2', 'BTCUSDc'))
+            parent.send(('analyze', 7, 8, [('bot1', ring.name), ('bot2', ring.name)]))
+            _, batch, results = parent.recv()
+            expected = evaluate_rules(StreamingIndicators(), make_rates(8))
+            assert batch == 7
+            assert results == [('bot1', expected, None), ('bot2', expected, None)]
+
+            parent.send(('remove', 'bot1'))
+            parent.send(('analyze', 8, 8, [('bot1', ring.name)]))
+            assert parent.recv()[2] == [('bot1', None, None)]
+        finally:
+            parent.send(None)
+            worker.join(5)
+
+    def test_analysis_in_worker_process_returns_to_owner(self):
+        bots = [FakeBot('bot1', 'BTCUSDc'), FakeBot('bot2', 'XAUUSDc')]
+        pool = BotShardPool(2)
+        try:
+            for bot in bots:
+                pool.add_bot(bot)
+            with patch('services.bar_cache.bar_cache') as bar_cache:
+                bar_cache.get_rates.return_value = make_rates(100)
+                assert all(pool.submit(bot) for bot in bots)
+                assert all(bot.done.wait(30) for bot in bots)
+
+            stats = pool.get_stats()
+            assert (stats['completed'], stats['errors'], stats['rings']) == (2, 0, 2)
+            assert stats['pending'] == 0
+            assert all(shard['alive'] for shard in stats['shards'])
+            assert bots[0].published[0]['signal'] in ('BUY', 'SELL', 'HOLD')
+        finally:
+            pool.stop()
+        assert pool.get_stats()['rings'] == 0
+
+    def test_bot_in_flight_is_not_resubmitted(self):
+        pool = BotShardPool(1, pending_timeout=30)
+        bot = FakeBot('bot1', 'BTCUSDc')
+        pool._shards[0].bots[bot.bot_id] = bot
+        pool._pending[bot.bot_id] = (1, time.perf_counter())
+        assert not pool.submit(bot)
+        assert pool.get_stats()['skipped'] == 1
+
+        # Sem resposta além do pending_timeout: o bot volta a ser enviado
+        pool._pending[bot.bot_id] = (1, time.perf_counter() - 31)
+        assert pool.submit(bot)
+        assert pool.get_stats()['expired'] == 1 and pool._due == [bot]
+
+    def test_due_bots_share_bar_reads_and_messages(self):
+        pool = BotShardPool(2)
+        bots = [FakeBot(f'btc{i}', 'BTCUSDc') for i in range(3)] + [FakeBot('xau', 'XAUUSDc')]
+        for bot in bots:
+            pool._shards[pool.shard_for(bot.config['symbol'])].bots[bot.bot_id] = bot
+        pool._send = MagicMock(return_value=True)
+        try:
+            assert all(pool.submit(bot) for bot in bots)
+            with patch('services.bar_cache.bar_cache') as bar_cache:
+                bar_cache.get_rates.return_value = make_rates(100)
+                assert pool.dispatch() == 4
+
+            # Uma leitura por (símbolo, timeframe) e uma mensagem por shard
+            assert bar_cache.get_rates.call_count == 2
+            messages = [call.args[1] for call in pool._send.call_args_list]
+            assert len(messages) == len({pool.shard_for('BTCUSDc'), pool.shard_for('XAUUSDc')})
+            assert sorted(bot_id for message in messages for bot_id, _ in message[3]) == ['btc0', 'btc1', 'btc2', 'xau']
+            assert pool.get_stats()['pending'] == 4
+        finally:
+            with pool._ring_lock:
+                for ring in pool._rings.values():
+                    ring.close()
+
+    def test_late_result_of_expired_batch_is_dropped(self):
+        pool = BotShardPool(1)
+        bot = FakeBot('bot1', 'BTCUSDc')
+        shard = pool._shards[0]
+        shard.bots[bot.bot_id] = bot
+        pool._pending[bot.bot_id] = (2, time.perf_counter())
+        parent, child = Pipe()
+        reader = threading.Thread(target=pool._read_results, args=(shard, parent), daemon=True)
+        reader.start()
+        child.send(('results', 1, [('bot1', {'signal': 'BUY'}, None)]))
+        child.send(('results', 2, [('bot1', {'signal': 'SELL'}, None)]))
+        child.close()
+        reader.join(5)
+        assert bot.published == [{'signal': 'SELL'}]
+        assert pool.get_stats()['completed'] == 1
+
+    def test_sharded_bot_does_not_analyse_in_process(self):
+        from services.bot_manager_service import BotInstance
+
+        bot = BotInstance('bot1', {'symbol': 'BTCUSDc'}, None)
+        bot.shard_pool = MagicMock()
+        bot.is_running = True
+        with patch('services.bar_cache.bar_cache') as bar_cache:
+            bot._analysis_step()
+        bot.shard_pool.submit.assert_called_once_with(bot)
+        bar_cache.get_rates.assert_not_called()
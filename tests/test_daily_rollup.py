@@ -0,0 +1,105 @@
+"""
+Testes do rollup de estatísticas diárias (data, símbolo, bot)
+"""
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from services.mlp_storage import Base, MLPAnalysis, MLPDailyRollup, mlp_storage, session_factory
+
+
+@pytest.fixture
+def storage():
+    """mlp_storage apontando para um SQLite em memória"""
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with patch('services.mlp_storage.SessionLocal', session_factory(engine)):
+        yield mlp_storage
+        mlp_storage.flush()
+
+
+def analysis(signal, bot_id='bot-a', symbol='BTCUSDc'):
+    return {
+        'symbol': symbol,
+        'bot_id': bot_id,
+        'signal': signal,
+        'confidence': 0.7,
+        'timestamp': datetime.utcnow().isoformat(),
+        'indicators': {},
+        'market_data': {},
+    }
+
+
+def trade(ticket, bot_id='bot-a'):
+    return {
+        'ticket': ticket,
+        'symbol': 'BTCUSDc',
+        'bot_id': bot_id,
+        'type': 'BUY',
+        'volume': 0.01,
+        'entry_price': 50000.0,
+    }
+
+
+def rollup_rows(storage):
+    db = storage.get_db()
+    try:
+        return {
+            (row.symbol, row.bot_id): (row.total_analyses, row.buy_signals, row.total_trades,
+                                       row.winning_trades, row.losing_trades, round(row.total_profit, 6))
+            for row in db.query(MLPDailyRollup)
+        }
+    finally:
+        db.close()
+
+
+@pytest.mark.unit
+class TestDailyRollup:
+
+    def test_inserts_and_updates_keep_rollup_current(self, storage):
+        storage.add_analysis(analysis('BUY'))
+        storage.add_analysis(analysis('HOLD'))
+        storage.queue_analysis(analysis('SELL', bot_id='bot-b'))
+        storage.add_trade(trade('1'))
+        storage.add_trade(trade('2'))
+
+        storage.update_trade('1', {'profit': 12.5})
+        storage.update_trade('2', {'profit': -2.5})
+        storage.update_trade('1', {'profit': 10.0})  # correção do lucro não duplica o trade
+
+        [today] = storage.get_daily_stats(days=1)
+        assert today['total_analyses'] == 3
+        assert (today['buy_signals'], today['sell_signals'], today['hold_signals']) == (1, 1, 1)
+        assert today['total_trades'] == 2
+        assert (today['winning_trades'], today['losing_trades']) == (1, 1)
+        assert today['total_profit'] == pytest.approx(7.5)
+        assert today['win_rate'] == 50.0
+
+        [bot_b] = storage.get_daily_stats(days=1, bot_id='bot-b')
+        assert bot_b['total_analyses'] == 1 and bot_b['total_trades'] == 0
+
+    def test_rebuild_matches_incremental_rollup(self, storage):
+        storage.add_analysis(analysis('BUY'))
+        storage.add_analysis(analysis('SELL', symbol='XAUUSDc', bot_id=None))
+        storage.add_trade(trade('1'))
+        storage.update_trade('1', {'profit': 3.0})
+
+        incremental = rollup_rows(storage)
+        assert storage.rebuild_daily_rollup() == 2
+        assert rollup_rows(storage) == incremental
+        assert incremental[('XAUUSDc', '')][0] == 1
+
+    def test_other_sessions_do_not_get_the_hook(self, storage):
+        engine = create_engine('sqlite://')
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            db.add(MLPAnalysis(symbol='BTCUSDc', bot_id='bot-a', signal='BUY', confidence=0.7))
+            db.commit()
+            assert db.query(MLPDailyRollup).count() == 0
+        finally:
+            db.close()
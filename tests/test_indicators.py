@@ -0,0 +1,80 @@
+"""
+Testes dos indicadores técnicos (modo streaming x modo batch)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.indicators import StreamingIndicators, compute_indicators, rsi, sma, rolling_std
+
+
+@pytest.fixture
+def ohlc():
+    rng = np.random.default_rng(42)
+    close = 50000 + np.cumsum(rng.normal(0, 25, 400))
+    high = close + rng.random(400) * 10
+    low = close - rng.random(400) * 10
+    return high, low, close
+
+
+def as_rates(high, low, close):
+    rates = np.zeros(len(close), dtype=[('time', '<i8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8')])
+    rates['time'] = 1_700_000_000 + np.arange(len(close)) * 60
+    rates['high'], rates['low'], rates['close'] = high, low, close
+    return rates
+
+
+@pytest.mark.unit
+class TestIndicators:
+
+    @pytest.mark.parametrize('adjust', [True, False])
+    def test_streaming_matches_batch(self, ohlc, adjust):
+        high, low, close = ohlc
+        batch = compute_indicators(high, low, close, ema_adjust=adjust)
+
+        stream = StreamingIndicators(ema_adjust=adjust)
+        rows = [stream.update(h, l, c) for h, l, c in zip(high, low, close)]
+
+        for name, expected in batch.items():
+            streamed = np.array([row[name] for row in rows])
+            np.testing.assert_allclose(streamed, expected, rtol=1e-9, atol=1e-8, equal_nan=True, err_msg=name)
+
+    def test_batch_matches_pandas_rolling(self, ohlc):
+        _, _, close = ohlc
+        series = pd.Series(close)
+        np.testing.assert_allclose(sma(close, 20), series.rolling(20).mean(), equal_nan=True)
+        np.testing.assert_allclose(rolling_std(close, 20), series.rolling(20).std(), equal_nan=True)
+
+    def test_rsi_bounds_and_warmup(self, ohlc):
+        _, _, close = ohlc
+        values = rsi(close, 14)
+        assert np.isnan(values[:14]).all()
+        assert ((values[14:] >= 0) & (values[14:] <= 100)).all()
+
+    def test_peek_does_not_commit(self, ohlc):
+        high, low, close = ohlc
+        stream = StreamingIndicators()
+        for h, l, c in zip(high[:-1], low[:-1], close[:-1]):
+            stream.update(h, l, c)
+
+        before = stream.last_values()
+        peeked = stream.peek(high[-1], low[-1], close[-1])
+        batch = compute_indicators(high, low, close)
+
+        assert stream.last_values() == before
+        for name, expected in batch.items():
+            assert peeked[name] == pytest.approx(expected[-1], rel=1e-9)
+
+    def test_sync_processes_only_new_bars(self, ohlc):
+        rates = as_rates(*ohlc)
+        stream = StreamingIndicators()
+
+        stream.sync(rates[:100])
+        assert stream.bars == 99  # última barra ainda em formação
+
+        values = stream.sync(rates[1:101])
+        assert stream.bars == 100
+
+        batch = compute_indicators(rates['high'][:101], rates['low'][:101], rates['close'][:101])
+        assert values['sma_50'] == pytest.approx(batch['sma_50'][-1])
+        assert values['rsi'] == pytest.approx(batch['rsi'][-1])
@@ -0,0 +1,99 @@
+"""
+Testes do serviço de inferência em lote
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from services.inference_service import BatchInferenceService
+
+
+class CountingModel:
+    """predict_proba determinístico que conta as chamadas"""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict_proba(self, X):
+        self.calls.append(len(X))
+        return np.column_stack((X[:, 0], 1 - X[:, 0]))
+
+
+@pytest.mark.unit
+class TestBatchInferenceService:
+
+    def test_flush_evaluates_one_matrix_per_model(self):
+        service = BatchInferenceService()
+        shared, other = CountingModel(), CountingModel()
+        results = {}
+
+        # Simula um líder ocupado: os pedidos ficam na fila até o flush()
+        service._leading = True
+        threads = [
+            threading.Thread(target=lambda i=i: results.__setitem__(i, service.predict_proba(shared, np.array([[i / 10]]))))
+            for i in range(5)
+        ]
+        threads.append(threading.Thread(target=lambda: service.predict_proba(other, np.array([[0.9]]))))
+        for thread in threads:
+            thread.start()
+        while service.get_stats()['pending'] < 6:
+            time.sleep(0.001)
+
+        assert service.flush() == 6
+        for thread in threads:
+            thread.join()
+
+        assert shared.calls == [5] and other.calls == [1]
+        for i, probabilities in results.items():
+            np.testing.assert_allclose(probabilities, [[i / 10, 1 - i / 10]])
+        assert service.get_stats()['batches'] == 2
+
+    def test_concurrent_bots_share_batch(self):
+        service = BatchInferenceService()
+        model = CountingModel()
+        slow_predict = model.predict_proba
+
+        def predict_proba(X):
+            time.sleep(0.05)  # enquanto o líder avalia, os outros bots enfileiram
+            return slow_predict(X)
+
+        model.predict_proba = predict_proba
+        barrier = threading.Barrier(20)
+        results = {}
+
+        def bot(i):
+            barrier.wait()
+            results[i] = service.predict_proba(model, np.array([[i / 100]]))
+
+        threads = [threading.Thread(target=bot, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sum(model.calls) == 20
+        assert len(model.calls) < 20
+        for i, probabilities in results.items():
+            assert probabilities[0, 0] == pytest.approx(i / 100)
+
+    def test_single_caller_evaluates_inline(self):
+        service = BatchInferenceService()
+        model = CountingModel()
+
+        probabilities = service.predict_proba(model, np.array([[0.3]]))
+
+        np.testing.assert_allclose(probabilities, [[0.3, 0.7]])
+        assert model.calls == [1]
+        assert service.get_stats()['pending'] == 0
+
+    def test_errors_reach_every_caller(self):
+        class BrokenModel:
+            def predict_proba(self, X):
+                raise ValueError("shape errado")
+
+        service = BatchInferenceService()
+        with pytest.raises(ValueError):
+            service.predict_proba(BrokenModel(), np.zeros((1, 3)))
+        assert service.get_stats()['errors'] == 1
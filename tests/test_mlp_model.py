@@ -0,0 +1,129 @@
+"""
+Testes do caminho de inferência do MLPModel
+"""
+import dataclasses
+
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+from bot.mlp_model import MLPModel
+from bot.mlp_runtime import NumpyMLP
+from utils.indicators import compute_indicators
+
+
+def make_bars(n: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 50000 + np.cumsum(rng.normal(0, 25, n))
+    return pd.DataFrame({
+        'time': pd.date_range('2025-01-01', periods=n, freq='min'),
+        'open': close + rng.normal(0, 5, n),
+        'high': close + rng.random(n) * 15,
+        'low': close - rng.random(n) * 15,
+        'close': close,
+        'tick_volume': rng.integers(10, 100, n),
+    })
+
+
+@pytest.fixture(scope='module')
+def trained_model(tmp_path_factory):
+    model = MLPModel(model_path=str(tmp_path_factory.mktemp('models') / 'mlp_model.pkl'))
+    history = make_bars(1500)
+    model.train(history, model.generate_training_labels(history))
+    return model
+
+
+@pytest.mark.unit
+class TestMLPModelInference:
+
+    def test_latest_features_use_persisted_scaler(self, trained_model):
+        window = make_bars(60, seed=7)
+        preprocessor = trained_model.preprocessor
+        mean_before = preprocessor.scaler.mean_.copy()
+
+        row = preprocessor.prepare_latest_features(window)
+
+        # Mesma linha do caminho completo, mas normalizada com o scaler do treino
+        features = preprocessor._calculate_technical_indicators(window)
+        columns = preprocessor._select_features(features.columns)
+        expected = preprocessor.scaler.transform(features[columns].values[-1:])
+
+        assert row.shape == (1, len(columns))
+        np.testing.assert_allclose(row, expected)
+        np.testing.assert_array_equal(preprocessor.scaler.mean_, mean_before)
+
+    def test_precomputed_indicators_match(self, trained_model):
+        window = make_bars(60, seed=7)
+        computed = compute_indicators(window['high'].values, window['low'].values, window['close'].values)
+        latest = {name: values[-1] for name, values in computed.items()}
+
+        preprocessor = trained_model.preprocessor
+        np.testing.assert_allclose(
+            preprocessor.prepare_latest_features(window, latest),
+            preprocessor.prepare_latest_features(window)
+        )
+
+    def test_predict_single_probability_pass(self, trained_model):
+        window = make_bars(60, seed=7)
+        model = trained_model.model
+
+        with patch.object(model, 'predict', wraps=model.predict) as predict, \
+                patch.object(model, 'predict_proba', wraps=model.predict_proba) as predict_proba:
+            signal, confidence = trained_model.predict(window)
+
+        assert predict.call_count == 0
+        assert predict_proba.call_count == 1
+        assert predict_proba.call_args[0][0].shape[0] == 1
+        assert signal in ('BUY', 'SELL', 'HOLD')
+        assert 0.0 <= confidence <= 1.0
+
+    def test_unfitted_scaler_holds(self, trained_model):
+        model = MLPModel(model_path=trained_model.model_path)
+        model.model = trained_model.model
+
+        assert model.predict(make_bars(60, seed=7)) == ('HOLD', 0.5)
+        # Nenhum scaler é ajustado na janela ao vivo
+        assert model.preprocessor.scaler is None
+
+    def test_window_predict_keeps_trained_scaler(self, trained_model):
+        preprocessor = trained_model.preprocessor
+        mean_before = preprocessor.scaler.mean_.copy()
+
+        trained_model.predict(make_bars(60, seed=11), fast=False)
+
+        np.testing.assert_array_equal(preprocessor.scaler.mean_, mean_before)
+
+
+@pytest.mark.unit
+class TestNumpyRuntime:
+
+    def test_export_matches_sklearn(self, trained_model, tmp_path):
+        path = trained_model.export_numpy(str(tmp_path / 'mlp_model.npz'))
+        runtime = NumpyMLP.load(path)
+
+        X = np.random.default_rng(3).normal(size=(200, runtime.n_features_in_))
+        np.testing.assert_allclose(runtime.predict_proba(X), trained_model.model.predict_proba(X), atol=1e-4)
+        np.testing.assert_array_equal(runtime.predict(X), trained_model.model.predict(X))
+        np.testing.assert_allclose(runtime.scaler.mean_, trained_model.preprocessor.scaler.mean_, rtol=1e-6)
+
+    def test_numpy_backend_selected_from_config(self, trained_model, tmp_path):
+        model_path = str(tmp_path / 'mlp_model.pkl')
+        original = trained_model.model_path, trained_model.numpy_path
+        trained_model.model_path, trained_model.numpy_path = model_path, model_path.replace('.pkl', '.npz')
+        try:
+            trained_model.save_model()
+        finally:
+            trained_model.model_path, trained_model.numpy_path = original
+
+        runtime = MLPModel(model_path=model_path)
+        runtime.config = dataclasses.replace(runtime.config, inference_backend='numpy')
+        runtime.load_model()
+
+        assert isinstance(runtime.model, NumpyMLP)
+
+        window = make_bars(60, seed=7)
+        signal, confidence = runtime.predict(window)
+        expected_signal, expected_confidence = trained_model.predict(window)
+        assert signal == expected_signal
+        assert confidence == pytest.approx(expected_confidence, abs=1e-4)
@@ -0,0 +1,209 @@
+"""
+Testes do gateway MT5 (thread dona, fila por prioridade e chamadas coalescidas)
+"""
+import threading
+import time
+
+import pytest
+
+from core.exceptions import MT5ConnectionError
+from core.mt5_gateway import PRIORITY_BULK, PRIORITY_ORDER, MT5Gateway, MT5Module, call_priority
+
+
+class FakeTerminal:
+    """Módulo MetaTrader5 falso que registra a ordem e a thread das chamadas"""
+
+    ORDER_TYPE_BUY = 0
+
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+        self.gate = threading.Event()
+        self.gate.set()
+        self.error = (1, 'Success')
+
+    def _called(self, name):
+        self.calls.append(name)
+        self.threads.add(threading.current_thread().name)
+
+    def initialize(self):
+        self._called('initialize')
+        return True
+
+    def symbol_info_tick(self, symbol):
+        self._called('symbol_info_tick')
+        self.gate.wait(5)
+        return (symbol, len(self.calls))
+
+    def positions_get(self, symbol=None):
+        self._called('positions_get')
+        if symbol == 'NONE':
+            self.error = (-1, 'Terminal: Call failed')
+            return None
+        return ()
+
+    def copy_rates_from_pos(self, symbol, timeframe, start, count):
+        self._called('copy_rates_from_pos')
+        return []
+
+    def order_send(self, request):
+        self._called('order_send')
+        self.gate.wait(5)
+        return request
+
+    def last_error(self):
+        return self.error
+
+
+@pytest.fixture
+def gateway():
+    terminal = FakeTerminal()
+    gateway = MT5Gateway(module=terminal, timeout=5)
+    yield gateway, terminal
+    terminal.gate.set()
+    gateway.stop()
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.005)
+
+
+@pytest.mark.unit
+class TestMT5Gateway:
+
+    def test_calls_run_on_owner_thread(self, gateway):
+        gateway, terminal = gateway
+        assert gateway.call('positions_get') == ()
+        assert gateway.call('order_send', {'volume': 0.01}) == {'volume': 0.01}
+        assert terminal.threads == {'mt5-gateway'}
+
+    def test_orders_jump_ahead_of_reads(self, gateway):
+        gateway, terminal = gateway
+        terminal.gate.clear()
+        blocker = threading.Thread(target=gateway.call, args=('symbol_info_tick', 'BTCUSDc'))
+        blocker.start()
+        wait_until(lambda: terminal.calls == ['symbol_info_tick'])
+
+        # Com a thread dona ocupada: uma leitura pesada, uma leitura e uma ordem na fila
+        threads = [
+            threading.Thread(target=gateway.call, args=('copy_rates_from_pos', 'BTCUSDc', 1, 0, 10)),
+            threading.Thread(target=gateway.call, args=('positions_get',)),
+            threading.Thread(target=gateway.call, args=('order_send', {})),
+        ]
+        for thread in threads:
+            thread.start()
+        wait_until(lambda: gateway.get_stats()['queued'] == 3)
+        terminal.gate.set()
+        for thread in [blocker] + threads:
+            thread.join(5)
+
+        assert terminal.calls == ['symbol_info_tick', 'order_send', 'positions_get', 'copy_rates_from_pos']
+
+    def test_identical_inflight_reads_are_coalesced(self, gateway):
+        gateway, terminal = gateway
+        terminal.gate.clear()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(gateway.call('symbol_info_tick', 'BTCUSDc')))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        wait_until(lambda: gateway.get_stats()['coalesced'] == 4)
+        terminal.gate.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert terminal.calls == ['symbol_info_tick']
+        assert len(set(results)) == 1 and len(results) == 5
+        # Terminada a chamada, um pedido novo vai ao terminal
+        gateway.call('symbol_info_tick', 'BTCUSDc')
+        assert terminal.calls.count('symbol_info_tick') == 2
+
+    def test_per_function_counters_and_last_error(self, gateway):
+        gateway, terminal = gateway
+        assert gateway.call('positions_get', symbol='NONE') is None
+        assert gateway.last_error() == (-1, 'Terminal: Call failed')
+        gateway.call('positions_get')
+        assert gateway.last_error() == (1, 'Success')
+
+        stats = gateway.get_stats()
+        assert stats['functions']['positions_get']['calls'] == 2
+        assert stats['functions']['positions_get']['errors'] == 1
+        assert stats['errors'] == 1
+
+    def test_initialize_answered_locally_once_connected(self, gateway):
+        gateway, terminal = gateway
+        assert gateway.initialize() and gateway.initialize() and gateway.initialize()
+        assert terminal.calls == ['initialize']
+        assert gateway.get_stats()['initialize_skipped'] == 2
+
+    def test_timeout(self, gateway):
+        gateway, terminal = gateway
+        terminal.gate.clear()
+        with pytest.raises(MT5ConnectionError):
+            gateway.execute('symbol_info_tick', ('BTCUSDc',), timeout=0.05)
+        assert gateway.get_stats()['timeouts'] == 1
+
+    def test_timed_out_call_is_dropped_before_it_runs(self, gateway):
+        gateway, terminal = gateway
+        terminal.gate.clear()
+        blocker = threading.Thread(target=gateway.call, args=('symbol_info_tick', 'BTCUSDc'))
+        blocker.start()
+        wait_until(lambda: terminal.calls == ['symbol_info_tick'])
+
+        with pytest.raises(MT5ConnectionError):
+            gateway.execute('order_send', ({'volume': 0.01},), timeout=0.05)
+        terminal.gate.set()
+        blocker.join(5)
+        gateway.stop()
+
+        # A ordem abandonada pelo chamador nunca chega ao terminal
+        assert terminal.calls == ['symbol_info_tick']
+        assert gateway.get_stats()['cancelled'] == 1
+
+    def test_running_order_is_waited_for(self, gateway):
+        gateway, terminal = gateway
+        terminal.gate.clear()
+        results = []
+        sender = threading.Thread(
+            target=lambda: results.append(gateway.execute('order_send', ({'volume': 0.01},), timeout=0.05))
+        )
+        sender.start()
+        wait_until(lambda: gateway.get_stats()['timeouts'] == 1)
+        assert sender.is_alive() and terminal.calls == ['order_send']
+
+        terminal.gate.set()
+        sender.join(5)
+        assert results == [{'volume': 0.01}]
+        assert gateway.get_stats()['cancelled'] == 0
+
+    def test_module_proxy(self, gateway):
+        gateway, terminal = gateway
+        mt5 = MT5Module(gateway)
+        assert mt5.ORDER_TYPE_BUY == 0
+        assert mt5.initialize()
+        assert mt5.positions_get(symbol='BTCUSDc') == ()
+        assert terminal.threads == {'mt5-gateway'}
+        assert call_priority('order_send') == PRIORITY_ORDER
+        assert call_priority('history_deals_get') == PRIORITY_BULK
+
+    def test_route_sends_calls_to_another_module(self, gateway):
+        gateway, terminal = gateway
+        simulated = FakeTerminal()
+        simulated.ORDER_TYPE_BUY = 10
+        mt5 = MT5Module(gateway)
+        with gateway.route(simulated):
+            assert mt5.ORDER_TYPE_BUY == 10
+            assert mt5.positions_get(symbol='NONE') is None
+            assert mt5.last_error() == (-1, 'Terminal: Call failed')
+            assert mt5.initialize()
+        assert simulated.calls == ['positions_get', 'initialize']
+        assert simulated.threads == {threading.current_thread().name}
+        # Nada chega ao terminal real, nem aos contadores ou ao estado da conexão
+        assert terminal.calls == [] and gateway.routed is None
+        assert gateway.get_stats()['calls'] == 0 and not gateway.connected
+        assert mt5.ORDER_TYPE_BUY == 0
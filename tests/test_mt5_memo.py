@@ -0,0 +1,98 @@
+"""
+Testes do memo de leituras do MT5 (TTL por função e invalidação por ordens)
+"""
+from collections import namedtuple
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from core.mt5_gateway import MT5Gateway
+from core.mt5_memo import ORDER_EVENTS, MT5Memo
+
+Tick = namedtuple('Tick', 'bid ask')
+Account = namedtuple('Account', 'balance equity')
+
+
+@pytest.fixture
+def terminal():
+    terminal = MagicMock()
+    terminal.symbol_info_tick.side_effect = lambda symbol: Tick(100.0, 100.5)
+    terminal.account_info.return_value = Account(1000.0, 1000.0)
+    terminal.symbol_info.side_effect = lambda symbol: None if symbol == 'NONE' else MagicMock(point=0.01)
+    return terminal
+
+
+@pytest.fixture
+def clock():
+    now = [1000.0]
+    with patch('core.mt5_memo.time.monotonic', side_effect=lambda: now[0]):
+        yield now
+
+
+@pytest.mark.unit
+class TestMT5Memo:
+
+    def test_ttl_per_function(self, terminal, clock):
+        memo = MT5Memo(module=terminal, ttls={'symbol_info': 3600, 'symbol_info_tick': 0.1, 'account_info': 1.0})
+        for _ in range(3):
+            memo.symbol_info('BTCUSDc')
+            memo.symbol_info_tick('BTCUSDc')
+            memo.account_info()
+        assert terminal.symbol_info.call_count == 1
+        assert terminal.symbol_info_tick.call_count == 1
+        assert terminal.account_info.call_count == 1
+
+        clock[0] += 0.5  # tick expirou, conta e especificação não
+        memo.symbol_info('BTCUSDc')
+        memo.symbol_info_tick('BTCUSDc')
+        memo.account_info()
+        assert terminal.symbol_info_tick.call_count == 2
+        assert terminal.account_info.call_count == 1
+
+        clock[0] += 1.0
+        memo.account_info()
+        assert terminal.account_info.call_count == 2
+        assert terminal.symbol_info.call_count == 1
+
+    def test_failed_reads_are_not_kept(self, terminal, clock):
+        memo = MT5Memo(module=terminal)
+        assert memo.symbol_info('NONE') is None
+        assert memo.symbol_info('NONE') is None
+        assert terminal.symbol_info.call_count == 2
+
+    def test_order_event_invalidates_account_and_symbol_tick(self, terminal, clock):
+        memo = MT5Memo(module=terminal, ttls={'symbol_info_tick': 10})
+        memo.account_info()
+        memo.symbol_info_tick('BTCUSDc')
+        memo.symbol_info_tick('XAUUSDc')
+        memo.symbol_info('BTCUSDc')
+
+        memo.on_order_event('order_send', ({'symbol': 'BTCUSDc'},), {}, None)
+        memo.account_info()
+        memo.symbol_info_tick('BTCUSDc')
+        memo.symbol_info_tick('XAUUSDc')
+        memo.symbol_info('BTCUSDc')
+        assert terminal.account_info.call_count == 2
+        assert terminal.symbol_info_tick.call_count == 3  # só o tick do símbolo da ordem
+        assert terminal.symbol_info.call_count == 1
+
+    def test_gateway_order_send_triggers_invalidation(self, terminal):
+        gateway = MT5Gateway(module=terminal, timeout=5)
+        memo = MT5Memo(module=terminal)
+        gateway.on_call(ORDER_EVENTS, memo.on_order_event)
+        try:
+            memo.account_info()
+            gateway.call('order_send', {'symbol': 'BTCUSDc'})
+            memo.account_info()
+        finally:
+            gateway.stop()
+        assert terminal.account_info.call_count == 2
+
+    def test_hit_rate(self, terminal, clock):
+        memo = MT5Memo(module=terminal)
+        for _ in range(4):
+            memo.symbol_info('BTCUSDc')
+        stats = memo.get_stats()
+        assert (stats['hits'], stats['misses']) == (3, 1)
+        assert stats['hit_rate'] == 0.75
+        assert stats['functions']['symbol_info']['hit_rate'] == 0.75
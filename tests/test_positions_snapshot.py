@@ -0,0 +1,79 @@
+"""
+Testes do snapshot de posições indexado (ticket, magic, símbolo e bot)
+"""
+from collections import namedtuple
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services.positions_snapshot import PositionsSnapshot, PositionsView
+
+Position = namedtuple('Position', 'ticket symbol type volume magic profit comment')
+
+POSITIONS = (
+    Position(1, 'BTCUSDc', 0, 0.01, 111, 1.0, 'Bot abcdef12'),
+    Position(2, 'BTCUSDc', 1, 0.01, 222, 2.0, 'Bot 99999999'),
+    Position(3, 'XAUUSDc', 0, 0.02, 111, 3.0, ''),
+    Position(4, 'BTCUSDc', 0, 0.01, 333, 4.0, 'manual'),
+)
+
+
+@pytest.fixture
+def terminal():
+    terminal = MagicMock()
+    terminal.positions_get.return_value = POSITIONS
+    return terminal
+
+
+@pytest.fixture
+def clock():
+    now = [1000.0]
+    with patch('services.positions_snapshot.time.monotonic', side_effect=lambda: now[0]):
+        yield now
+
+
+@pytest.mark.unit
+class TestPositionsSnapshot:
+
+    def test_indexes(self):
+        view = PositionsView(POSITIONS)
+        assert view.ticket(2).magic == 222 and view.ticket(9) is None
+        assert [p.ticket for p in view.by_magic(111)] == [1, 3]
+        assert [p.ticket for p in view.by_symbol('BTCUSDc')] == [1, 2, 4]
+        assert [p.ticket for p in view.by_bot('abcdef12-0000-4000-8000-000000000000')] == [1]
+
+    def test_for_bot_matches_magic_or_comment_on_symbol(self):
+        view = PositionsView(POSITIONS)
+        bot_id = '99999999-0000-4000-8000-000000000000'
+        assert [p.ticket for p in view.for_bot(bot_id, magic=111, symbol='BTCUSDc')] == [1, 2]
+        assert [p.ticket for p in view.for_bot(bot_id, magic=111)] == [1, 2, 3]
+        assert view.for_bot('00000000-x', magic=555, symbol='BTCUSDc') == []
+
+    def test_one_terminal_call_per_cycle(self, terminal, clock):
+        snapshot = PositionsSnapshot(module=terminal, max_age=1.0)
+        for _ in range(50):
+            snapshot.get()
+        assert terminal.positions_get.call_count == 1
+
+        clock[0] += 1.5
+        snapshot.get()
+        assert terminal.positions_get.call_count == 2
+        snapshot.get(max_age=0)
+        assert terminal.positions_get.call_count == 3
+        assert snapshot.get_stats()['hits'] == 49
+
+    def test_order_event_invalidates(self, terminal, clock):
+        snapshot = PositionsSnapshot(module=terminal)
+        snapshot.get()
+        snapshot.on_order_event('order_send', ({'symbol': 'BTCUSDc'},), {}, None)
+        snapshot.get()
+        assert terminal.positions_get.call_count == 2
+
+    def test_failed_refresh_is_not_kept(self, terminal, clock):
+        terminal.positions_get.return_value = None
+        snapshot = PositionsSnapshot(module=terminal)
+        view = snapshot.get()
+        assert not view.valid and len(view) == 0
+        snapshot.get()
+        assert terminal.positions_get.call_count == 2
+        assert snapshot.get_stats()['errors'] == 2
@@ -0,0 +1,72 @@
+"""
+Testes do snapshot de status atualizado em segundo plano
+"""
+import time
+
+import pytest
+
+from services.status_snapshot import StatusSnapshot
+
+
+@pytest.mark.unit
+class TestStatusSnapshot:
+
+    def test_sections_served_from_memory(self, fake_scheduler):
+        calls = {'fast': 0, 'slow': 0}
+
+        def fast():
+            calls['fast'] += 1
+            return calls['fast']
+
+        def slow():
+            calls['slow'] += 1
+            return {'slow': calls['slow']}
+
+        snapshot = StatusSnapshot('test', scheduler=fake_scheduler)
+        snapshot.add_section('fast', fast, 1.0)
+        snapshot.add_section('slow', slow, 60.0)
+
+        assert snapshot.get() == {'fast': 1, 'slow': {'slow': 1}}
+        assert snapshot.get() == {'fast': 1, 'slow': {'slow': 1}}
+        assert calls == {'fast': 1, 'slow': 1}
+
+        # Cada seção tem seu próprio job, no seu intervalo
+        scheduler = snapshot.scheduler
+        assert scheduler.interval('test:fast') == 1.0 and scheduler.interval('test:slow') == 60.0
+        assert scheduler.run('test:fast') == 1.0
+        assert snapshot.get(['fast', 'unknown']) == {'fast': 2}
+        assert calls['slow'] == 1
+
+    def test_initial_value_and_errors(self, fake_scheduler):
+        state = {'fail': False}
+
+        def webhook():
+            if state['fail']:
+                raise RuntimeError('timeout')
+            return {'status': 'reachable'}
+
+        snapshot = StatusSnapshot('test', scheduler=fake_scheduler)
+        snapshot.add_section('webhook', webhook, 30.0, initial={'status': 'pending'})
+        assert snapshot.get() == {'webhook': {'status': 'pending'}}
+        assert snapshot.scheduler.jobs['test:webhook'][2] == 0
+
+        snapshot.refresh('webhook')
+        state['fail'] = True
+        snapshot.refresh('webhook')
+        assert snapshot.get() == {'webhook': {'status': 'reachable'}}
+        assert snapshot.get_stats()['webhook']['errors'] == 1
+
+    def test_refresh_rate_on_real_scheduler(self, real_scheduler):
+        calls = {'count': 0}
+
+        def count():
+            calls['count'] += 1
+            return calls['count']  # valor numérico da seção não é um atraso
+
+        snapshot = StatusSnapshot('test', scheduler=real_scheduler)
+        snapshot.add_section('count', count, 0.05, initial=0)
+        snapshot.start()
+        time.sleep(0.5)
+        snapshot.stop()
+
+        assert 5 <= snapshot.get_stats()['count']['refreshes'] <= 15
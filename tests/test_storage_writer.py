@@ -0,0 +1,91 @@
+"""
+Testes da gravação em lote (write-behind) do storage
+"""
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from services.mlp_storage import Base, MLPAnalysis, MLPBotEvent
+from services.storage_writer import WriteBehindWriter
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        'sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def count(session_factory, model):
+    db = session_factory()
+    try:
+        return db.query(model).count()
+    finally:
+        db.close()
+
+
+def event(i):
+    return MLPBotEvent(event_type='TEST', message=f'evento {i}')
+
+
+@pytest.mark.unit
+class TestWriteBehindWriter:
+
+    def test_rows_are_batched_into_few_transactions(self, session_factory):
+        writer = WriteBehindWriter(session_factory, batch_size=100, flush_interval=5)
+        for i in range(250):
+            assert writer.submit(event(i))
+
+        assert writer.flush(timeout=5)
+        stats = writer.get_stats()
+        assert count(session_factory, MLPBotEvent) == 250
+        assert stats['written'] == 250
+        assert stats['batches'] <= 4
+        assert stats['max_batch_rows'] <= 100
+        writer.close()
+
+    def test_close_drains_queue(self, session_factory):
+        writer = WriteBehindWriter(session_factory, flush_interval=60)
+        for i in range(10):
+            writer.submit(MLPAnalysis(symbol='BTCUSDc', signal='HOLD', confidence=0.5))
+
+        writer.close()
+
+        assert count(session_factory, MLPAnalysis) == 10
+        with pytest.raises(RuntimeError):
+            writer.submit(event(0))
+
+    def test_full_queue_drops_after_timeout(self, session_factory):
+        release = threading.Event()
+
+        def slow_factory():
+            release.wait(5)  # segura o writer dentro do lote
+            return session_factory()
+
+        writer = WriteBehindWriter(slow_factory, max_queue=2, batch_size=1, put_timeout=0.01)
+        results = [writer.submit(event(i)) for i in range(6)]
+
+        stats = writer.get_stats()
+        assert not all(results)
+        assert stats['blocked'] >= 1 and stats['dropped'] >= 1
+        assert stats['queued'] + stats['dropped'] == 6
+
+        release.set()
+        writer.close()
+        assert count(session_factory, MLPBotEvent) == stats['queued']
+
+    def test_bad_row_does_not_lose_batch(self, session_factory):
+        writer = WriteBehindWriter(session_factory, flush_interval=5)
+        writer.submit(event(1))
+        writer.submit(MLPBotEvent(event_type='TEST', message='x', timestamp='não é data'))
+        writer.submit(event(2))
+
+        writer.close()
+
+        assert count(session_factory, MLPBotEvent) == 2
+        assert writer.get_stats()['errors'] == 1
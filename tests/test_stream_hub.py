@@ -0,0 +1,160 @@
+"""
+Testes dos streams WebSocket com deltas (barras, posições e conta)
+"""
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services.positions_snapshot import PositionsSnapshot
+from services.stream_hub import STREAM_JOB_ID, StreamHub
+
+Position = namedtuple('Position', 'ticket symbol type volume price_open price_current sl tp profit swap time magic comment')
+Account = namedtuple('Account', 'balance equity profit margin margin_free margin_level currency')
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')
+])
+
+
+class FakeTerminal:
+    def __init__(self):
+        self.positions = [self.position(1, 100.0), self.position(2, 200.0)]
+        self.account = Account(1000.0, 1000.0, 0.0, 10.0, 990.0, 10000.0, 'USC')
+        self.bars = np.zeros(3, dtype=RATES_DTYPE)
+        self.bars['time'] = [0, 60, 120]
+        self.bars['close'] = [1.0, 2.0, 3.0]
+
+    @staticmethod
+    def position(ticket, price):
+        return Position(ticket, 'BTCUSDc', 0, 0.01, price, price, 0.0, 0.0, 0.0, 0.0, 0, 0, '')
+
+    def get_rates(self, symbol, timeframe, count):
+        return self.bars[-count:].copy()
+
+
+@pytest.fixture
+def hub(fake_scheduler):
+    terminal = FakeTerminal()
+    emitted = []
+    snapshot = PositionsSnapshot(module=MagicMock(), max_age=0)
+    snapshot.module.positions_get.side_effect = lambda: terminal.positions
+    with patch('services.stream_hub.positions_snapshot', snapshot), \
+            patch('services.stream_hub.mt5.account_info', side_effect=lambda: terminal.account), \
+            patch('services.stream_hub.bar_cache.get_rates', side_effect=terminal.get_rates), \
+            patch('services.stream_hub.mt5_connection'):
+        hub = StreamHub(emit=lambda event, payload, room: emitted.append((event, payload, room)),
+                        scheduler=fake_scheduler, interval=1.0)
+        yield hub, terminal, emitted
+
+
+@pytest.mark.unit
+class TestStreamHub:
+
+    def test_positions_deltas(self, hub):
+        hub, terminal, emitted = hub
+        hub.subscribe('sid-1', 'positions')
+        assert emitted[-1][0] == 'stream_snapshot' and emitted[-1][2] == 'sid-1'
+        assert len(emitted[-1][1]['data']) == 2
+
+        assert hub.refresh() == 0  # nada mudou
+        terminal.positions = [terminal.position(1, 100.0)._replace(profit=5.0), terminal.position(3, 300.0)]
+        assert hub.refresh() == 1
+
+        event, payload, room = emitted[-1]
+        assert (event, room) == ('stream_delta', 'positions')
+        assert payload['base'] == emitted[0][1]['version'] and payload['version'] > payload['base']
+        assert payload['data']['removed'] == ['2']
+        assert [position['ticket'] for position in payload['data']['added']] == [3]
+        assert payload['data']['modified'] == {'1': {'profit': 5.0}}
+
+    def test_account_delta_only_changed_fields(self, hub):
+        hub, terminal, emitted = hub
+        hub.subscribe('sid-1', 'account')
+        terminal.account = terminal.account._replace(equity=1010.0, profit=10.0)
+        hub.refresh()
+        assert emitted[-1][1]['data'] == {'equity': 1010.0, 'profit': 10.0}
+
+    def test_bar_patch_and_closed_bars(self, hub):
+        hub, terminal, emitted = hub
+        hub.subscribe('sid-1', 'bars:BTCUSDc:m1')
+
+        terminal.bars['close'][-1] = 3.5
+        hub.refresh()
+        assert emitted[-1][1]['data'] == {'closed': [], 'current': {'close': 3.5}}
+
+        new_bar = np.zeros(1, dtype=RATES_DTYPE)
+        new_bar['time'], new_bar['close'] = 180, 4.0
+        terminal.bars = np.concatenate((terminal.bars, new_bar))
+        hub.refresh()
+        data = emitted[-1][1]['data']
+        assert [bar['time'] for bar in data['closed']] == [120]
+        assert data['current']['time'] == 180
+
+    def test_reconnect_resync(self, hub):
+        hub, terminal, emitted = hub
+        info = hub.subscribe('sid-1', 'account')
+        hub.remove_client('sid-1')
+        assert not hub.scheduler.has_job(STREAM_JOB_ID)
+
+        # Canal recriado: a versão de antes da reconexão não vale mais (snapshot);
+        # com a versão atual não há snapshot
+        emitted.clear()
+        hub.subscribe('sid-2', 'account', version=info['version'])
+        assert [event for event, _, _ in emitted] == ['stream_snapshot']
+        current = hub.get_stats()['channels']['account']['version']
+        hub.subscribe('sid-3', 'account', version=current)
+        assert len(emitted) == 1
+
+        assert hub.resync('sid-3', 'account')
+        assert emitted[-1][2] == 'sid-3'
+        assert not hub.resync('sid-9', 'account')
+
+    def test_fetch_does_not_hold_the_hub_lock(self, hub):
+        hub, terminal, emitted = hub
+        hub.subscribe('sid-1', 'account')
+        blocked = []
+
+        def slow_account():
+            # Outro cliente se inscreve enquanto o terminal está respondendo
+            other = threading.Thread(target=hub.subscribe, args=('sid-2', 'positions'))
+            other.start()
+            other.join(2)
+            blocked.append(other.is_alive())
+            return terminal.account._replace(equity=1010.0)
+
+        with patch('services.stream_hub.mt5.account_info', side_effect=slow_account):
+            assert hub.refresh() == 1
+        assert blocked == [False]
+        assert emitted[-1][1]['data'] == {'equity': 1010.0}
+
+    def test_job_keeps_interval_after_deltas(self, hub):
+        hub, terminal, emitted = hub
+        hub.subscribe('sid-1', 'account')
+        terminal.account = terminal.account._replace(equity=1010.0)
+        assert hub.scheduler.run(STREAM_JOB_ID) == hub.interval
+        assert emitted[-1][0] == 'stream_delta'
+
+    def test_refresh_rate_on_real_scheduler(self, hub, real_scheduler):
+        _, terminal, _ = hub
+        emitted = []
+        hub = StreamHub(emit=lambda event, payload, room: emitted.append(event),
+                        scheduler=real_scheduler, interval=0.05)
+        hub.subscribe('sid-1', 'account')
+        time.sleep(0.25)
+        terminal.account = terminal.account._replace(equity=1010.0)
+        time.sleep(0.25)
+        hub.remove_client('sid-1')
+
+        # ~10 refreshes em 0.5s: nem busy loop sem mudanças, nem atraso depois de um delta
+        assert 5 <= hub.get_stats()['refreshes'] <= 15
+        assert emitted.count('stream_delta') == 1
+
+    def test_unknown_channel(self, hub):
+        hub, _, _ = hub
+        with pytest.raises(ValueError):
+            hub.subscribe('sid-1', 'orders')
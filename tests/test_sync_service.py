@@ -2,6 +2,7 @@
 Testes para o serviço de sincronização de trades do MT5.
 """
 import json
+from datetime import datetime, timedelta
 import pytest
 from unittest.mock import patch
 
@@ -112,4 +113,66 @@ class TestSyncServiceEndpoints:
             assert response.status_code == 500
             data = json.loads(response.data)
             assert 'error' in data
-            assert data['error'] == "Database error"
\ No newline at end of file
+            assert data['error'] == "Database error"
+
+@pytest.fixture
+def sync_db():
+    """Banco SQLite em memória no lugar do mlp_data.db"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+    from services.mlp_storage import Base, session_factory
+
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with patch('services.mlp_storage.SessionLocal', session_factory(engine)):
+        yield
+
+
+def make_deal(ticket, time):
+    from types import SimpleNamespace
+    return SimpleNamespace(
+        ticket=ticket, order=ticket, symbol='BTCUSDc', type=0, entry=1, magic=0,
+        volume=0.01, price=50000.0, commission=0.0, swap=0.0, profit=1.5, fee=0.0,
+        comment='', external_id='', time=time
+    )
+
+
+class TestSyncCursor:
+    """Sincronização incremental pelo cursor persistido"""
+
+    @pytest.mark.sync
+    def test_bulk_upsert_counts_only_new_deals(self, sync_db):
+        from services.mlp_storage import mlp_storage, MT5TradeHistory
+        from services.sync_mt5_trades_service import MT5TradeSyncService
+
+        deals = [MT5TradeSyncService._deal_to_dict(make_deal(t, 1_700_000_000 + t)) for t in range(1, 4)]
+        assert mlp_storage.save_mt5_trade_history(deals, cursor='test') == 3
+        assert mlp_storage.save_mt5_trade_history(deals[1:], cursor='test') == 0
+
+        db = mlp_storage.get_db()
+        try:
+            assert db.query(MT5TradeHistory).count() == 3
+        finally:
+            db.close()
+        assert mlp_storage.get_sync_cursor('test')['last_ticket'] == 3
+
+    @pytest.mark.sync
+    def test_sync_requests_only_deals_after_cursor(self, sync_db):
+        from services.sync_mt5_trades_service import MT5TradeSyncService
+        sync_service = MT5TradeSyncService()
+        now = int(datetime.now().timestamp())
+        history = [make_deal(t, now - 100 + t) for t in range(1, 6)]
+
+        with patch.object(sync_service, '_check_mt5_connection', return_value=True), \
+                patch('services.sync_mt5_trades_service.mt5.history_deals_get', return_value=history) as deals_get:
+            first = sync_service.sync_now()
+            assert first['saved_trades'] == 5 and first['incremental'] is False
+
+            history.append(make_deal(6, now - 1))
+            second = sync_service.sync_now()
+
+        assert second['incremental'] is True
+        assert second['new_trades'] == 1 and second['saved_trades'] == 1
+        # A segunda janela começa no cursor, não em lookback_days
+        from_date = deals_get.call_args_list[1].args[0]
+        assert from_date >= datetime.fromtimestamp(now - 95) - timedelta(seconds=60)
@@ -0,0 +1,101 @@
+"""
+Testes do poller de ticks compartilhado pelas salas WebSocket
+"""
+import time
+from collections import namedtuple
+
+import pytest
+from unittest.mock import patch
+
+from services.tick_poller import MAX_POLL_INTERVAL, MIN_POLL_INTERVAL, POLLER_JOB_ID, TickPoller
+
+Tick = namedtuple('Tick', 'time bid ask last volume time_msc')
+
+
+@pytest.fixture
+def terminal():
+    ticks = {'BTCUSDc': Tick(1, 100.0, 100.5, 0.0, 1, 1000), 'XAUUSDc': Tick(1, 2000.0, 2000.3, 0.0, 1, 1000)}
+    with patch('services.tick_poller.mt5.symbol_info_tick', side_effect=lambda symbol: ticks.get(symbol)) as info, \
+            patch('services.tick_poller.mt5_connection') as connection, \
+            patch('services.tick_poller.tick_recorder'):
+        yield ticks, info, connection
+
+
+@pytest.fixture
+def poller(fake_scheduler):
+    emitted = []
+    return TickPoller(emit=lambda symbol, data: emitted.append((symbol, data['bid'])),
+                      scheduler=fake_scheduler, poll_interval=1.0), emitted
+
+
+@pytest.mark.unit
+class TestTickPoller:
+
+    def test_emits_only_changed_ticks(self, poller, terminal):
+        poller, emitted = poller
+        ticks, info, connection = terminal
+        poller.subscribe('sid-1', 'BTCUSDc')
+        poller.subscribe('sid-2', 'BTCUSDc')
+        poller.subscribe('sid-2', 'XAUUSDc')
+
+        assert poller.poll() == 2
+        assert poller.poll() == 0
+        ticks['BTCUSDc'] = Tick(2, 101.0, 101.5, 0.0, 1, 2000)
+        assert poller.poll() == 1
+
+        assert emitted == [('BTCUSDc', 100.0), ('XAUUSDc', 2000.0), ('BTCUSDc', 101.0)]
+        assert info.call_count == 6  # um símbolo por consulta, não por sala/cliente
+        assert connection.ensure_connection.call_count == 3
+
+    def test_reference_counting_per_sid(self, poller, terminal):
+        poller, _ = poller
+        assert poller.subscribe('sid-1', 'BTCUSDc')
+        assert not poller.subscribe('sid-1', 'BTCUSDc')
+        assert not poller.subscribe('sid-2', 'BTCUSDc')
+        assert poller.scheduler.has_job(POLLER_JOB_ID)
+
+        assert not poller.unsubscribe('sid-1', 'BTCUSDc')
+        assert not poller.unsubscribe('sid-1', 'BTCUSDc')
+        assert poller.get_stats()['symbols'] == {'BTCUSDc': 1}
+
+        assert poller.remove_client('sid-2') == ['BTCUSDc']
+        assert poller.get_stats()['symbols'] == {}
+        assert not poller.scheduler.has_job(POLLER_JOB_ID)
+
+    def test_poll_interval_floor(self, poller):
+        poller, _ = poller
+        poller.subscribe('sid-1', 'BTCUSDc')
+        assert poller.set_poll_interval(0.01) == MIN_POLL_INTERVAL
+        assert poller.scheduler.interval(POLLER_JOB_ID) == MIN_POLL_INTERVAL
+        assert poller.set_poll_interval(0.25) == 0.25
+        assert poller.set_poll_interval(1e9) == MAX_POLL_INTERVAL
+        for value in ('nan', 'inf', '-inf'):
+            with pytest.raises(ValueError):
+                poller.set_poll_interval(value)
+        assert poller.poll_interval == MAX_POLL_INTERVAL
+
+    def test_job_keeps_interval_after_emitting(self, poller, terminal):
+        poller, emitted = poller
+        poller.subscribe('sid-1', 'BTCUSDc')
+        assert poller.scheduler.run(POLLER_JOB_ID) == 1.0
+        assert len(emitted) == 1
+
+    def test_poll_rate_on_real_scheduler(self, real_scheduler, terminal):
+        ticks, info, _ = terminal
+        calls = []
+
+        def changing_tick(symbol):
+            calls.append(symbol)
+            tick = ticks[symbol]
+            # BTCUSDc muda a cada consulta, XAUUSDc nunca
+            return tick._replace(time_msc=tick.time_msc + len(calls)) if symbol == 'BTCUSDc' else tick
+
+        info.side_effect = changing_tick
+        poller = TickPoller(scheduler=real_scheduler, poll_interval=0.1)
+        poller.subscribe('sid-1', 'BTCUSDc')
+        poller.subscribe('sid-1', 'XAUUSDc')
+        time.sleep(0.55)
+        poller.remove_client('sid-1')
+
+        # ~6 polls: nem busy loop com ticks iguais, nem atraso por tick emitido
+        assert 3 <= poller.get_stats()['polls'] <= 9
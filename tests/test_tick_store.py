@@ -0,0 +1,116 @@
+"""
+Testes do gravador de ticks e do arquivo comprimido por dia
+"""
+import io
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from services.tick_store import TICK_DTYPE, TickArchive, TickRecorder, decode_chunk, encode_chunk
+
+Tick = namedtuple('Tick', 'time bid ask last volume time_msc')
+
+DAY_START = 1_700_006_400 * 1000  # 2023-11-15 00:00 UTC
+
+
+def make_ticks(count: int, start: int = DAY_START, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    ticks = np.zeros(count, dtype=TICK_DTYPE)
+    ticks['time_msc'] = start + np.cumsum(rng.integers(50, 900, count))
+    ticks['bid'] = np.round(37000 + np.cumsum(rng.integers(-3, 4, count)) * 0.01, 2)
+    ticks['ask'] = np.round(ticks['bid'] + 0.12, 2)
+    ticks['volume'] = rng.integers(0, 3, count)
+    return ticks
+
+
+@pytest.mark.unit
+class TestTickArchive:
+
+    def test_chunk_round_trip(self):
+        ticks = make_ticks(1000)
+        decoded = decode_chunk(encode_chunk(ticks, 2), len(ticks), 2)
+        assert (decoded == ticks).all()
+
+    def test_smaller_than_csv(self):
+        ticks = make_ticks(20000)
+        csv = io.StringIO()
+        np.savetxt(csv, np.column_stack([ticks[name] for name in TICK_DTYPE.names]),
+                   fmt=['%d', '%.2f', '%.2f', '%.2f', '%d'], delimiter=',')
+        assert len(encode_chunk(ticks, 2)) * 10 < len(csv.getvalue())
+
+    def test_range_reads_only_overlapping_chunks(self, tmp_path):
+        archive = TickArchive(str(tmp_path))
+        ticks = make_ticks(3000)
+        for start in range(0, 3000, 1000):
+            archive.append('BTCUSDc', ticks[start:start + 1000], digits=2)
+
+        first, last = int(ticks['time_msc'][1200]), int(ticks['time_msc'][1800])
+        with patch('services.tick_store.decode_chunk', wraps=decode_chunk) as decode:
+            window = archive.read('BTCUSDc', first, last)
+        assert decode.call_count == 1
+        assert (window == ticks[1200:1801]).all()
+
+    def test_day_segments(self, tmp_path):
+        archive = TickArchive(str(tmp_path))
+        ticks = make_ticks(200, start=DAY_START - 50_000)
+        archive.append('BTCUSDc', ticks, digits=2)
+
+        assert archive.days('BTCUSDc') == ['20231114', '20231115']
+        day = archive.read_day('BTCUSDc', '20231115')
+        assert (day['time_msc'] >= DAY_START).all()
+        assert len(day) + len(archive.read_day('BTCUSDc', '20231114')) == 200
+
+    def test_unindexed_tail_is_dropped(self, tmp_path):
+        archive = TickArchive(str(tmp_path))
+        ticks = make_ticks(500)
+        archive.append('BTCUSDc', ticks, digits=2)
+        with open(tmp_path / 'BTCUSDc' / '20231115.tck', 'ab') as f:
+            f.write(b'partial chunk')
+
+        reopened = TickArchive(str(tmp_path))
+        assert (reopened.read_day('BTCUSDc', '20231115') == ticks).all()
+        reopened.append('BTCUSDc', make_ticks(10, start=int(ticks['time_msc'][-1])), digits=2)
+        assert len(reopened.read_day('BTCUSDc', '20231115')) == 510
+
+
+@pytest.mark.unit
+class TestTickRecorder:
+
+    def test_record_skips_repeated_polls_and_writes_chunks(self, tmp_path):
+        archive = TickArchive(str(tmp_path))
+        recorder = TickRecorder(archive, chunk_ticks=3)
+        recorder._digits['BTCUSDc'] = 2
+
+        ticks = [Tick(0, 37000.0 + i, 37000.12 + i, 0.0, 1, DAY_START + i * 100) for i in range(4)]
+        assert recorder.record('BTCUSDc', ticks[0])
+        assert not recorder.record('BTCUSDc', ticks[0])
+        for tick in ticks[1:]:
+            recorder.record('BTCUSDc', tick)
+
+        assert len(os.listdir(tmp_path / 'BTCUSDc')) == 2  # segmento + índice
+        stats = recorder.get_stats()
+        assert stats['written'] == 3 and stats['buffered'] == 1 and stats['duplicates'] == 1
+
+        recorder.stop()
+        stored = archive.read_day('BTCUSDc', '20231115')
+        assert list(stored['time_msc']) == [tick.time_msc for tick in ticks]
+        assert list(stored['ask']) == [tick.ask for tick in ticks]
+
+    def test_recorded_ticks_are_flushed_by_age(self, tmp_path):
+        archive = TickArchive(str(tmp_path))
+        recorder = TickRecorder(archive, flush_interval=0.05, poll_interval=0.01)
+        recorder._digits['BTCUSDc'] = 2
+        try:
+            # Ticks vindos de fora do polling (sem watch())
+            assert recorder.record('BTCUSDc', Tick(0, 37000.0, 37000.12, 0.0, 1, DAY_START))
+            deadline = time.monotonic() + 5
+            while recorder.get_stats()['written'] == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert recorder.get_stats()['buffered'] == 0
+            assert len(archive.read_day('BTCUSDc', '20231115')) == 1
+        finally:
+            recorder.stop()
@@ -0,0 +1,80 @@
+"""
+Testes do pipeline walk-forward do MLPModel
+"""
+import numpy as np
+import pytest
+
+from backtest import SymbolSpec
+from backtest.walk_forward import WalkForward, forward_labels, make_folds
+
+SPEC = SymbolSpec(symbol='BTCUSDc', digits=2, point=0.01, tick_size=0.01, tick_value=0.01,
+                  spread_typical=100, commission_per_lot=1.0)
+DAY = 86400
+START = 1_735_689_600  # 2025-01-01 00:00 UTC
+
+
+def make_bars(days, seed=0):
+    rng = np.random.default_rng(seed)
+    n = days * 1440
+    close = 50000 + np.cumsum(rng.normal(0, 40, n))
+    bars = np.zeros(n, dtype=[('time', '<i8'), ('open', '<f8'), ('high', '<f8'),
+                              ('low', '<f8'), ('close', '<f8'), ('tick_volume', '<u8')])
+    bars['time'] = START + np.arange(n) * 60
+    bars['open'] = np.r_[close[0], close[:-1]]
+    bars['high'] = np.maximum(bars['open'], close) + 5
+    bars['low'] = np.minimum(bars['open'], close) - 5
+    bars['close'] = close
+    bars['tick_volume'] = rng.integers(10, 100, n)
+    return bars
+
+
+@pytest.mark.unit
+class TestFolds:
+
+    def test_folds_are_time_ordered_and_aligned(self):
+        times = START + 3600 + np.arange(6 * 1440) * 60
+
+        folds = make_folds(times, train_days=2, test_days=1)
+
+        assert [fold.test_start for fold in folds] == [START + d * DAY for d in (3, 4, 5)]
+        for fold in folds:
+            assert fold.train_start == fold.test_start - 2 * DAY and fold.test_end == fold.test_start + DAY
+        # Janela de teste ainda aberta só entra quando pedida
+        assert len(make_folds(times, 2, 1, include_partial=True)) == 4
+
+    def test_new_data_keeps_existing_boundaries(self):
+        old = make_folds(START + np.arange(5 * 1440) * 60, 2, 1)
+        new = make_folds(START + np.arange(6 * 1440) * 60, 2, 1)
+        assert new[:len(old)] == old and len(new) == len(old) + 1
+
+    def test_labels_look_ahead(self):
+        labels = forward_labels(np.array([100.0, 101.0, 100.0, 100.0]), horizon=1, threshold=0.001)
+        assert list(labels) == [0, 1, 2, -1]
+
+
+@pytest.mark.unit
+class TestWalkForward:
+
+    def test_folds_train_out_of_sample_and_cache(self, tmp_path):
+        execution = {'lot_size': 0.01, 'take_profit': 3000, 'stop_loss': 3000, 'signals': {'min_confidence': 0.0}}
+        bars = make_bars(5)
+        wf = WalkForward('BTCUSDc', bars[:4 * 1440], spec=SPEC, train_days=2, test_days=1, threshold=0.0002,
+                         execution=execution, cache_dir=str(tmp_path), workers=2)
+
+        report = wf.run()
+
+        folds = report['folds']
+        assert [fold['cached'] for fold in folds] == [False, False]
+        for fold in folds:
+            assert fold['samples_test'] == 1440
+            assert all(fold['test_start'] + 60 <= trade['entry_time'] <= fold['test_end'] for trade in fold['trades'])
+            assert fold['trading']['total_trades'] == len(fold['trades'])
+        assert report['summary']['total_trades'] == sum(len(fold['trades']) for fold in folds)
+        assert report['summary']['total_trades'] > 0
+
+        # Um dia novo de barras: só o fold novo é treinado
+        wf = WalkForward('BTCUSDc', bars, spec=SPEC, train_days=2, test_days=1, threshold=0.0002,
+                         execution=execution, cache_dir=str(tmp_path), workers=2)
+        report = wf.run()
+        assert [fold['cached'] for fold in report['folds']] == [True, True, False]
+        assert report['folds'][0]['trading'] == folds[0]['trading']
@@ -8,11 +8,12 @@ import pandas as pd
 import numpy as np
 from sklearn.neural_network import MLPClassifier
 from sklearn.preprocessing import StandardScaler
-from datetime import datetime, timedelta
 import joblib
 import logging
 import os
 
+from services.bar_store import bar_store
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -35,21 +36,12 @@ def conectar_mt5():
     return True
 
 def obter_dados_historicos():
-    """Obtém dados históricos do MT5"""
+    """Obtém dados históricos (bar store local; do MT5 só o que ainda não foi baixado)"""
     logger.info(f"Obtendo {DAYS_HISTORY} dias de dados históricos...")
 
-    # Definir período
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=DAYS_HISTORY)
-
-    # Converter para datetime do MT5
-    utc_from = start_date
-    utc_to = end_date
-
-    # Obter dados
-    rates = mt5.copy_rates_range(SYMBOL, TIMEFRAME, utc_from, utc_to)
+    rates = bar_store.history(SYMBOL, TIMEFRAME, DAYS_HISTORY)
 
-    if rates is None or len(rates) == 0:
+    if len(rates) == 0:
         raise Exception("Falha ao obter dados históricos")
 
     # Converter para DataFrame
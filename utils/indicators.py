@@ -0,0 +1,465 @@
+"""
+Technical indicators - single implementation shared by bots, engine, model and routes
+
+Two modes over the same definitions:
+
+* Streaming (``StreamingIndicators`` and the per-indicator classes): state is
+  updated in O(1) per appended bar (running sums, running EMAs, Wilder RSI,
+  sliding-window Welford variance and monotonic deques for Williams %R).
+  ``peek`` evaluates a still-forming bar without committing it.
+* Batch (``compute_indicators`` and the array functions): vectorized over a
+  whole history, returning arrays with NaN during warm-up.
+
+Both modes produce the same values (within float tolerance) for the same bars.
+"""
+import math
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+NAN = float('nan')
+
+
+# ---------------------------------------------------------------------------
+# Streaming indicators
+# ---------------------------------------------------------------------------
+
+class RollingWindow:
+    """Sliding window with running sum and Welford mean/variance (sample, ddof=1)"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @staticmethod
+    def _add(n: int, mean: float, m2: float, x: float) -> Tuple[int, float, float]:
+        n += 1
+        delta = x - mean
+        mean += delta / n
+        m2 += delta * (x - mean)
+        return n, mean, m2
+
+    @staticmethod
+    def _remove(n: int, mean: float, m2: float, x: float) -> Tuple[int, float, float]:
+        if n <= 1:
+            return 0, 0.0, 0.0
+        n -= 1
+        delta = x - mean
+        mean -= delta / n
+        m2 -= delta * (x - mean)
+        return n, mean, max(m2, 0.0)
+
+    def _step(self, x: float) -> Tuple[int, float, float]:
+        n, mean, m2 = len(self.values), self.mean, self.m2
+        if n == self.period:
+            n, mean, m2 = self._remove(n, mean, m2, self.values[0])
+        return self._add(n, mean, m2, x)
+
+    @staticmethod
+    def _result(n: int, mean: float, m2: float, period: int) -> Tuple[float, float]:
+        if n < period:
+            return NAN, NAN
+        std = math.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+        return mean, std
+
+    def update(self, x: float) -> Tuple[float, float]:
+        """Append a value; returns (mean, std) or NaN while warming up"""
+        n, self.mean, self.m2 = self._step(x)
+        if len(self.values) == self.period:
+            self.values.popleft()
+        self.values.append(x)
+        return self._result(n, self.mean, self.m2, self.period)
+
+    def peek(self, x: float) -> Tuple[float, float]:
+        """(mean, std) as if ``x`` were appended, without changing state"""
+        n, mean, m2 = self._step(x)
+        return self._result(n, mean, m2, self.period)
+
+
+class EMA:
+    """Running exponential moving average (pandas ``ewm(span=...)`` semantics)"""
+
+    def __init__(self, span: Optional[int] = None, alpha: Optional[float] = None, adjust: bool = True):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+        self.adjust = adjust
+        self.num = 0.0
+        self.den = 0.0
+        self.value = NAN
+
+    def _step(self, x: float) -> Tuple[float, float, float]:
+        decay = 1.0 - self.alpha
+        if self.adjust:
+            num = x + decay * self.num
+            den = 1.0 + decay * self.den
+            return num, den, num / den
+        if math.isnan(self.value):
+            return 0.0, 0.0, x
+        return 0.0, 0.0, self.value + self.alpha * (x - self.value)
+
+    def update(self, x: float) -> float:
+        self.num, self.den, self.value = self._step(x)
+        return self.value
+
+    def peek(self, x: float) -> float:
+        return self._step(x)[2]
+
+
+class RSI:
+    """Wilder RSI: simple average of the first ``period`` moves, then Wilder smoothing"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    @staticmethod
+    def _value(avg_gain: float, avg_loss: float) -> float:
+        if avg_loss == 0.0:
+            return 50.0 if avg_gain == 0.0 else 100.0
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    def _step(self, close: float) -> Tuple[int, float, float]:
+        if self.prev_close is None:
+            return 0, 0.0, 0.0
+        change = close - self.prev_close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        count = self.count + 1
+        if count <= self.period:
+            # Fase de aquecimento: acumula somas para a média simples inicial
+            return count, self.avg_gain + gain, self.avg_loss + loss
+        p = self.period
+        return count, (self.avg_gain * (p - 1) + gain) / p, (self.avg_loss * (p - 1) + loss) / p
+
+    def _result(self, count: int, avg_gain: float, avg_loss: float) -> float:
+        if count < self.period:
+            return NAN
+        if count == self.period:
+            avg_gain, avg_loss = avg_gain / self.period, avg_loss / self.period
+        return self._value(avg_gain, avg_loss)
+
+    def update(self, close: float) -> float:
+        count, avg_gain, avg_loss = self._step(close)
+        value = self._result(count, avg_gain, avg_loss)
+        if count == self.period:
+            avg_gain, avg_loss = avg_gain / self.period, avg_loss / self.period
+        self.count, self.avg_gain, self.avg_loss = count, avg_gain, avg_loss
+        self.prev_close = close
+        return value
+
+    def peek(self, close: float) -> float:
+        return self._result(*self._step(close))
+
+
+class MACD:
+    """MACD line, signal line and histogram from running EMAs"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9, adjust: bool = True):
+        self.fast = EMA(fast, adjust=adjust)
+        self.slow = EMA(slow, adjust=adjust)
+        self.signal = EMA(signal, adjust=adjust)
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
+
+    def peek(self, close: float) -> Tuple[float, float, float]:
+        macd = self.fast.peek(close) - self.slow.peek(close)
+        signal = self.signal.peek(macd)
+        return macd, signal, macd - signal
+
+
+class WilliamsR:
+    """Williams %R with monotonic deques for the rolling high/low (amortized O(1))"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.index = -1
+        self.highs = deque()  # (index, high) com highs decrescentes
+        self.lows = deque()   # (index, low) com lows crescentes
+
+    @staticmethod
+    def _value(highest: float, lowest: float, close: float) -> float:
+        if highest == lowest:
+            return NAN
+        return -100.0 * (highest - close) / (highest - lowest)
+
+    def _extreme_without_oldest(self, queue: deque, oldest: int, default: float) -> float:
+        if not queue:
+            return default
+        if queue[0][0] <= oldest:
+            return queue[1][1] if len(queue) > 1 else default
+        return queue[0][1]
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self.index += 1
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((self.index, high))
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((self.index, low))
+
+        oldest_valid = self.index - self.period + 1
+        while self.highs[0][0] < oldest_valid:
+            self.highs.popleft()
+        while self.lows[0][0] < oldest_valid:
+            self.lows.popleft()
+
+        if self.index + 1 < self.period:
+            return NAN
+        return self._value(self.highs[0][1], self.lows[0][1], close)
+
+    def peek(self, high: float, low: float, close: float) -> float:
+        if self.index + 2 < self.period:
+            return NAN
+        oldest = self.index + 1 - self.period  # sai da janela quando a barra nova entra
+        highest = max(high, self._extreme_without_oldest(self.highs, oldest, -math.inf))
+        lowest = min(low, self._extreme_without_oldest(self.lows, oldest, math.inf))
+        return self._value(highest, lowest, close)
+
+
+class StreamingIndicators:
+    """
+    Stateful indicator set for one (symbol, timeframe) series
+
+    Closed bars are committed with ``update``; ``sync`` takes the rates window
+    served by the bar cache, commits only bars newer than the last committed
+    one and evaluates the forming (last) bar with ``peek``.
+    """
+
+    def __init__(
+        self,
+        rsi_period: int = 14,
+        sma_periods: Iterable[int] = (20, 50),
+        bb_period: int = 20,
+        bb_std: float = 2.0,
+        macd_periods: Tuple[int, int, int] = (12, 26, 9),
+        williams_period: int = 14,
+        ema_adjust: bool = True
+    ):
+        self.rsi_period = rsi_period
+        self.sma_periods = tuple(sma_periods)
+        self.bb_period = bb_period
+        self.bb_std = bb_std
+        self.macd_periods = tuple(macd_periods)
+        self.williams_period = williams_period
+        self.ema_adjust = ema_adjust
+        self.reset()
+
+    def reset(self):
+        """Discard all state"""
+        self.rsi = RSI(self.rsi_period)
+        self.smas = {p: RollingWindow(p) for p in self.sma_periods}
+        self.bands = self.smas.get(self.bb_period) or RollingWindow(self.bb_period)
+        self.macd = MACD(*self.macd_periods, adjust=self.ema_adjust)
+        self.williams = WilliamsR(self.williams_period)
+        self.values = None
+        self.last_time = None
+        self.bars = 0
+
+    def _windows(self):
+        windows = list(self.smas.values())
+        if self.bands not in windows:
+            windows.append(self.bands)
+        return windows
+
+    def _collect(self, rsi, sma_values, band, macd, williams) -> Dict[str, float]:
+        middle, std = band
+        values = {'rsi': rsi}
+        for period, (mean, _) in sma_values.items():
+            values[f'sma_{period}'] = mean
+        values.update({
+            'macd': macd[0],
+            'macd_signal': macd[1],
+            'macd_histogram': macd[2],
+            'bb_middle': middle,
+            'bb_std': std,
+            'bb_upper': middle + std * self.bb_std,
+            'bb_lower': middle - std * self.bb_std,
+            'williams_r': williams,
+        })
+        return values
+
+    def update(self, high: float, low: float, close: float, time: Optional[int] = None) -> Dict[str, float]:
+        """Commit a closed bar and return the indicator values at that bar"""
+        results = {id(w): w.update(close) for w in self._windows()}
+        values = self._collect(
+            self.rsi.update(close),
+            {p: results[id(w)] for p, w in self.smas.items()},
+            results[id(self.bands)],
+            self.macd.update(close),
+            self.williams.update(high, low, close),
+        )
+        self.values = values
+        self.last_time = time
+        self.bars += 1
+        return values
+
+    def peek(self, high: float, low: float, close: float) -> Dict[str, float]:
+        """Indicator values as if this bar were appended, without committing it"""
+        return self._collect(
+            self.rsi.peek(close),
+            {p: w.peek(close) for p, w in self.smas.items()},
+            self.bands.peek(close),
+            self.macd.peek(close),
+            self.williams.peek(high, low, close),
+        )
+
+    def sync(self, rates, include_forming: bool = True) -> Dict[str, float]:
+        """
+        Bring the state up to date with a rates window and return the latest values
+
+        Args:
+            rates: Structured array (MT5 rates) ordered by time; the last bar is
+                treated as still forming when ``include_forming`` is True
+            include_forming: Evaluate the last bar with ``peek`` instead of committing it
+
+        Returns:
+            Dictionary of indicator values for the newest bar (NaN while warming up)
+        """
+        times = rates['time']
+        closed = len(rates) - 1 if include_forming else len(rates)
+
+        if self.last_time is None or (len(rates) > 0 and times[0] > self.last_time):
+            # Primeira carga ou lacuna maior que a janela: reconstrói a partir da janela
+            self.reset()
+            start = 0
+        else:
+            start = int(np.searchsorted(times, self.last_time, side='right'))
+
+        high, low, close = rates['high'], rates['low'], rates['close']
+        for i in range(start, closed):
+            self.update(float(high[i]), float(low[i]), float(close[i]), int(times[i]))
+
+        if include_forming and len(rates) > 0:
+            return self.peek(float(high[-1]), float(low[-1]), float(close[-1]))
+        return self.last_values()
+
+    def last_values(self) -> Dict[str, float]:
+        """Values at the last committed bar (NaN before any bar)"""
+        if self.values is None:
+            return self._collect(NAN, {p: (NAN, NAN) for p in self.smas}, (NAN, NAN), (NAN, NAN, NAN), NAN)
+        return dict(self.values)
+
+
+# ---------------------------------------------------------------------------
+# Batch (vectorized) indicators
+# ---------------------------------------------------------------------------
+
+def _rolling(values: np.ndarray, period: int, reducer) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if 0 < period <= len(values):
+        out[period - 1:] = reducer(sliding_window_view(values, period), axis=1)
+    return out
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average"""
+    return _rolling(values, period, np.mean)
+
+
+def rolling_std(values: np.ndarray, period: int) -> np.ndarray:
+    """Rolling sample standard deviation (ddof=1)"""
+    if period < 2:
+        return np.where(np.isnan(sma(values, period)), np.nan, 0.0)
+    return _rolling(values, period, lambda w, axis: np.std(w, axis=axis, ddof=1))
+
+
+def ema(values: np.ndarray, span: int, adjust: bool = True) -> np.ndarray:
+    """Exponential moving average"""
+    return pd.Series(np.asarray(values, dtype=np.float64)).ewm(span=span, adjust=adjust).mean().to_numpy()
+
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Wilder RSI"""
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(len(close), np.nan)
+    if len(close) <= period:
+        return out
+
+    change = np.diff(close)
+    gains = np.clip(change, 0.0, None)
+    losses = np.clip(-change, 0.0, None)
+
+    # Semente = média simples dos primeiros `period` movimentos, depois suavização de Wilder
+    seeded_gain = np.concatenate(([gains[:period].mean()], gains[period:]))
+    seeded_loss = np.concatenate(([losses[:period].mean()], losses[period:]))
+    alpha = 1.0 / period
+    avg_gain = pd.Series(seeded_gain).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    avg_loss = pd.Series(seeded_loss).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    values = np.where(avg_loss == 0.0, np.where(avg_gain == 0.0, 50.0, 100.0), values)
+    out[period:] = values
+    return out
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9,
+         adjust: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD line, signal line and histogram"""
+    line = ema(close, fast, adjust) - ema(close, slow, adjust)
+    signal_line = ema(line, signal, adjust)
+    return line, signal_line, line - signal_line
+
+
+def bollinger_bands(close: np.ndarray, period: int = 20,
+                    num_std: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger middle, upper and lower bands plus the rolling std"""
+    middle = sma(close, period)
+    std = rolling_std(close, period)
+    return middle, middle + std * num_std, middle - std * num_std, std
+
+
+def williams_r(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Williams %R"""
+    highest = _rolling(high, period, np.max)
+    lowest = _rolling(low, period, np.min)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = -100.0 * (highest - np.asarray(close, dtype=np.float64)) / (highest - lowest)
+    return np.where(highest == lowest, np.nan, values)
+
+
+def compute_indicators(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    rsi_period: int = 14,
+    sma_periods: Iterable[int] = (20, 50),
+    bb_period: int = 20,
+    bb_std: float = 2.0,
+    macd_periods: Tuple[int, int, int] = (12, 26, 9),
+    williams_period: int = 14,
+    ema_adjust: bool = True
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized indicator set over a whole history
+
+    Same keys and definitions as ``StreamingIndicators``.
+    """
+    result = {'rsi': rsi(close, rsi_period)}
+    for period in sma_periods:
+        result[f'sma_{period}'] = sma(close, period)
+
+    line, signal_line, histogram = macd(close, *macd_periods, adjust=ema_adjust)
+    middle, upper, lower, std = bollinger_bands(close, bb_period, bb_std)
+    result.update({
+        'macd': line,
+        'macd_signal': signal_line,
+        'macd_histogram': histogram,
+        'bb_middle': middle,
+        'bb_std': std,
+        'bb_upper': upper,
+        'bb_lower': lower,
+        'williams_r': williams_r(high, low, close, williams_period),
+    })
+    return result
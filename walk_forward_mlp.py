@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Treino e avaliação walk-forward do modelo MLP sobre barras históricas
+
+Divide o histórico em janelas móveis em ordem temporal (treino de N dias,
+teste dos M dias seguintes), treina um modelo por janela em paralelo e opera
+cada janela de teste fora da amostra. Folds já treinados ficam em cache em
+bot/models/walk_forward/: rodar de novo com um mês a mais treina só o fold novo.
+
+Uso:
+    python walk_forward_mlp.py barras_btc_m1.npy --symbol BTCUSDc
+    python walk_forward_mlp.py barras.csv --symbol BTCUSDc --train-days 60 --test-days 30 --workers 4
+    python walk_forward_mlp.py barras.npy --symbol BTCUSDc --deploy   # instala o modelo do último fold
+"""
+
+import argparse
+import json
+
+from backtest import load_bars
+from backtest.walk_forward import DEFAULT_CACHE_DIR, DEFAULT_EXECUTION, WalkForward
+from lib import get_timeframe
+
+
+def deploy(model_path: str):
+    """Instala o modelo de um fold como modelo do bot (pickle, scaler e exportação NumPy)"""
+    import joblib
+    from bot.mlp_model import MLPModel
+
+    model = MLPModel()
+    model.model = joblib.load(model_path)
+    model.preprocessor.scaler = joblib.load(model_path.replace('.pkl', '_scaler.pkl'))
+    model.save_model()
+    joblib.dump(model.preprocessor.scaler, model.model_path.replace('.pkl', '_scaler.pkl'))
+    return model.model_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('bars', help='Arquivo de barras (.csv ou .npy)')
+    parser.add_argument('--symbol', required=True, help='Símbolo das barras (custos de symbols_config)')
+    parser.add_argument('--timeframe', default='M1', help='Timeframe das barras do arquivo')
+    parser.add_argument('--train-days', type=float, default=30, help='Dias de cada janela de treino')
+    parser.add_argument('--test-days', type=float, default=7, help='Dias de cada janela de teste (passo entre folds)')
+    parser.add_argument('--horizon', type=int, default=1, help='Barras à frente usadas nos rótulos')
+    parser.add_argument('--threshold', type=float, default=0.001, help='Retorno mínimo para BUY/SELL')
+    parser.add_argument('--execution', help='Arquivo JSON com as regras de ordem (lot_size, take_profit, ...)')
+    parser.add_argument('--workers', type=int, help='Processos (padrão: número de CPUs)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Diretório do cache de folds')
+    parser.add_argument('--partial', action='store_true', help='Incluir o último fold com teste incompleto')
+    parser.add_argument('--deploy', action='store_true', help='Instalar o modelo do último fold como modelo do bot')
+    args = parser.parse_args()
+
+    execution = DEFAULT_EXECUTION
+    if args.execution:
+        with open(args.execution, encoding='utf-8') as f:
+            execution = json.load(f)
+
+    walk_forward = WalkForward(
+        args.symbol, load_bars(args.bars), get_timeframe(args.timeframe),
+        train_days=args.train_days, test_days=args.test_days, horizon=args.horizon,
+        threshold=args.threshold, execution=execution, cache_dir=args.cache_dir, workers=args.workers
+    )
+    folds = walk_forward.folds(args.partial)
+    print(f"Walk-forward {args.symbol}: {len(folds)} folds ({args.train_days:g}d treino / {args.test_days:g}d teste)")
+    report = walk_forward.run(args.partial)
+
+    print("=" * 90)
+    for fold in report['folds']:
+        trading = fold['trading']
+        accuracy = f"{fold['test_accuracy']:.3f}" if fold['test_accuracy'] is not None else '-'
+        print(f"  fold {fold['fold']:3d}  acc={accuracy}  trades={trading['total_trades']:5d}  "
+              f"net={trading['net_profit']:10.2f}  pf={trading['profit_factor']}  "
+              f"dd={trading['max_drawdown_pct']}%{'  (cache)' if fold['cached'] else ''}")
+    print("-" * 90)
+    for key, value in report['summary'].items():
+        print(f"  {key:24s}: {value}")
+    print("=" * 90)
+
+    if args.deploy:
+        if not report['folds'] or not report['folds'][-1].get('model_path'):
+            parser.error('--deploy exige ao menos um fold e o cache de folds habilitado')
+        last = report['folds'][-1]
+        print(f"Modelo do fold {last['fold']} instalado em {deploy(last['model_path'])}")
+
+
+if __name__ == "__main__":
+    main()